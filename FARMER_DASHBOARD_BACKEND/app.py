@@ -11,6 +11,7 @@ Then access:
     - http://localhost:5000/api/predict-profit (POST)
     - http://localhost:5000/api/forecast-arima (POST)
     - http://localhost:5000/api/recommend-crop (POST)
+    - http://localhost:5000/api/rank-crops (POST)
 """
 
 import os
@@ -43,7 +44,8 @@ def index():
         'endpoints': {
             'predict_profit': 'POST /api/predict-profit',
             'forecast_arima': 'POST /api/forecast-arima',
-            'recommend_crop': 'POST /api/recommend-crop'
+            'recommend_crop': 'POST /api/recommend-crop',
+            'rank_crops': 'POST /api/rank-crops'
         }
     }), 200
 
@@ -87,6 +89,7 @@ if __name__ == '__main__':
     - POST http://localhost:5000/api/predict-profit
     - POST http://localhost:5000/api/forecast-arima
     - POST http://localhost:5000/api/recommend-crop
+    - POST http://localhost:5000/api/rank-crops
     
     Health Check:
     - GET http://localhost:5000/
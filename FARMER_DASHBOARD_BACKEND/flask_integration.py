@@ -5,6 +5,12 @@ Provides 3 main API endpoints:
 1. /api/predict-profit - Calculate profit metrics for oilseed vs alternative crop
 2. /api/forecast-arima - Generate 12-month profit forecast with confidence intervals
 3. /api/recommend-crop - Get recommendation with 5-factor scoring
+4. /api/rank-crops - Rank all known crops with the same 5 factors in one pass
+
+Endpoints 1-3 are served from response_cache.py for repeated identical
+request bodies (X-Cache: HIT/MISS), per config.PERFORMANCE / FEATURES.
+Endpoint 2 is rate limited per client (rate_limiter.py, config.RATE_LIMIT);
+cache hits do not count against the limit.
 
 Usage in Flask app:
     from flask import Flask
@@ -19,11 +25,14 @@ import numpy as np
 import logging
 from profit_calculator import calculate_profit_metrics, compare_crops, validate_crop_input
 from arima_forecaster import train_arima_model, forecast_profits, generate_seasonal_historical_data
+from response_cache import cached_response
+from rate_limiter import rate_limited
 from recommendation_engine import (
     generate_recommendation,
     get_cultivation_ease,
     format_recommendation_output,
-    calculate_recommendation_score_breakdown
+    calculate_recommendation_score_breakdown,
+    rank_crops as rank_all_crops
 )
 
 logger = logging.getLogger(__name__)
@@ -34,6 +43,7 @@ dashboard_bp = Blueprint('farmer_dashboard', __name__, url_prefix='/api')
 
 
 @dashboard_bp.route('/predict-profit', methods=['POST'])
+@cached_response
 def predict_profit():
     """
     Calculate profit metrics for oil seed and alternative crop
@@ -141,6 +151,8 @@ def predict_profit():
 
 
 @dashboard_bp.route('/forecast-arima', methods=['POST'])
+@cached_response
+@rate_limited('arima')
 def forecast_arima():
     """
     Generate 12-month ARIMA forecast for profit predictions
@@ -240,6 +252,7 @@ def forecast_arima():
 
 
 @dashboard_bp.route('/recommend-crop', methods=['POST'])
+@cached_response
 def recommend_crop():
     """
     Generate crop recommendation with 5-factor scoring
@@ -375,6 +388,60 @@ def recommend_crop():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@dashboard_bp.route('/rank-crops', methods=['POST'])
+def rank_crops():
+    """
+    Rank every crop in CULTIVATION_FACTORS; crops without yield/price/cost
+    parameters are listed last, unscored, with the reason
+    
+    Request JSON (all optional):
+    {
+        "land_area": 2,
+        "crops": {"Soybean": {"expected_yield": 2000, "market_price": 60, "total_cost_per_hectare": 45000}},
+        "forecast_std": {"Soybean": 35000, "Maize": 41000},
+        "only": ["Soybean", "Maize", "Mustard"]
+    }
+    Crops not given in "crops" use config.DEFAULT_CROP_PARAMS.
+    
+    Returns:
+    {
+        "success": true,
+        "land_area": 2,
+        "ranking": [
+            {"rank": 1, "crop": "Maize", "score": 8.58, "breakdown": {...},
+             "net_profit": 178000, "roi": 247.22, "profit_margin": 71.2, "difficulty": 3},
+            ...
+            {"rank": null, "crop": "Cotton", "score": null, "reason": "..."}
+        ]
+    }
+    """
+    try:
+        data = request.get_json() or {}
+        land_area = float(data.get('land_area', 2))
+        if land_area <= 0:
+            return jsonify({'success': False, 'error': 'Land area must be positive'}), 400
+        
+        crop_params = data.get('crops') or {}
+        for name, params in crop_params.items():
+            is_valid, error = validate_crop_input(dict(params, land_area=land_area))
+            if not is_valid:
+                return jsonify({'success': False, 'error': f"{name}: {error}"}), 400
+        
+        ranking = rank_all_crops(
+            land_area,
+            crop_params=crop_params,
+            forecast_std=data.get('forecast_std'),
+            crops=data.get('only')
+        )
+        
+        return jsonify({'success': True, 'land_area': land_area, 'ranking': ranking}), 200
+    
+    except ValueError as e:
+        return jsonify({'success': False, 'error': f"Invalid input: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 def register_dashboard_routes(app):
     """
     Register all dashboard routes to Flask app
@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+from profit_math import profit_metrics
 
 def calculate_profit_metrics(crop_dict):
     """
@@ -12,33 +13,23 @@ def calculate_profit_metrics(crop_dict):
         dict: Contains 'total_yield', 'total_revenue', 'total_cost', 'net_profit', 'profit_margin', 'roi'
     """
     try:
-        land_area = crop_dict['land_area']
-        yield_per_hectare = crop_dict['expected_yield']
-        price_per_kg = crop_dict['market_price']
-        total_cost_per_hectare = crop_dict['total_cost_per_hectare']
-        
-        # Revenue calculation
-        total_yield = yield_per_hectare * land_area  # kg
-        total_revenue = total_yield * price_per_kg  # ₹
-        
-        # Cost calculation
-        total_cost = total_cost_per_hectare * land_area  # ₹
-        
-        # Profit calculation
-        net_profit = total_revenue - total_cost  # ₹
-        profit_margin = (net_profit / total_revenue * 100) if total_revenue > 0 else 0  # %
-        roi = (net_profit / total_cost * 100) if total_cost > 0 else 0  # %
+        metrics = profit_metrics(
+            crop_dict['land_area'],
+            crop_dict['expected_yield'],
+            crop_dict['market_price'],
+            crop_dict['total_cost_per_hectare']
+        )
         
         return {
-            'total_yield': total_yield,
-            'total_revenue': total_revenue,
-            'total_cost': total_cost,
-            'net_profit': net_profit,
-            'profit_margin': profit_margin,
-            'roi': roi,
-            'revenue_per_kg': price_per_kg,
-            'cost_per_kg': total_cost_per_hectare / yield_per_hectare,
-            'profit_per_kg': (total_revenue - total_cost) / total_yield if total_yield > 0 else 0
+            'total_yield': float(metrics['total_yield']),  # kg
+            'total_revenue': float(metrics['total_revenue']),  # ₹
+            'total_cost': float(metrics['total_cost']),  # ₹
+            'net_profit': float(metrics['net_profit']),  # ₹
+            'profit_margin': float(metrics['profit_margin']),  # %
+            'roi': float(metrics['roi']),  # %
+            'revenue_per_kg': crop_dict['market_price'],
+            'cost_per_kg': float(metrics['cost_per_unit']),
+            'profit_per_kg': float(metrics['profit_per_unit'])
         }
     except Exception as e:
         raise ValueError(f"Error calculating profit metrics: {str(e)}")
@@ -0,0 +1,51 @@
+"""
+Rate limiting for the dashboard API
+
+Enforces config.RATE_LIMIT (calls per per_seconds) per client and per
+endpoint cost class with the token buckets in token_bucket.py (the main
+backend keeps a copy). A request takes COST_CLASSES[cost_class] tokens, so
+an ARIMA fit uses up the budget ten times faster than a cheap call.
+
+Set RATE_LIMIT_DB to share buckets between worker processes through a SQLite
+file; a path under /dev/shm keeps it in shared memory.
+
+Limited requests get 429 with a Retry-After header (seconds).
+"""
+
+import os
+
+from flask import request
+
+from config import RATE_LIMIT
+from token_bucket import InProcessStore, SQLiteStore, make_rate_limited, make_store
+from token_bucket import RateLimiter as TokenBucketLimiter
+
+# Tokens taken per request, by endpoint cost class
+COST_CLASSES = {
+    'default': 1,
+    'mandi': 5,       # calls out to the data.gov.in mandi API
+    'arima': 10,      # fits an ARIMA model per request
+}
+
+RATE_LIMIT_DB = os.getenv('RATE_LIMIT_DB')
+
+
+class RateLimiter(TokenBucketLimiter):
+    """Token buckets defaulting to config.RATE_LIMIT"""
+
+    def __init__(self, calls=None, per_seconds=None, **kwargs):
+        super().__init__(calls or RATE_LIMIT['calls'], per_seconds or RATE_LIMIT['per_seconds'], **kwargs)
+
+
+rate_limiter = RateLimiter(store=make_store(RATE_LIMIT_DB))
+
+
+def client_id():
+    """Identify the caller by remote address"""
+    return request.remote_addr or 'unknown'
+
+
+rate_limited = make_rate_limited(
+    RATE_LIMIT, COST_CLASSES, lambda: rate_limiter, client_id,
+    lambda retry_after: {'success': False, 'error': f'Rate limit exceeded. Try again in {retry_after} seconds.'}
+)
@@ -1,4 +1,6 @@
 import numpy as np
+from config import SCORING_WEIGHTS, DEFAULT_CROP_PARAMS
+from profit_math import profit_metrics
 
 # Cultivation factors database
 CULTIVATION_FACTORS = {
@@ -38,6 +40,152 @@ def get_cultivation_ease(crop_name):
     })
 
 
+# Factor order of the score matrices; higher-is-better unless listed in LOWER_IS_BETTER
+SCORING_FACTORS = ('net_profit', 'roi', 'profit_margin', 'cultivation_ease', 'forecast_stability')
+LOWER_IS_BETTER = ('cultivation_ease', 'forecast_stability')   # difficulty, forecast std
+
+
+def score_crop_matrix(net_profit, roi, profit_margin, difficulty, forecast_std, weights=None):
+    """
+    Score any number of crops on the five weighted factors in one NumPy pass
+    
+    Every argument is an array shaped (..., n_crops): the last axis holds the
+    crops being compared, leading axes are independent scenarios (e.g. one row
+    per farmer). Within each scenario a factor is min-max normalised across
+    the crops and worth weight * 10 points, so the best crop on a factor gets
+    the full points and the worst none; crops sharing the best value all get
+    the full points. With two crops that differ on a factor this is the same
+    winner-takes-the-points split as generate_recommendation. A factor on which
+    every crop ties splits its points evenly: generate_recommendation breaks
+    such ties by which side is the oilseed, which has no meaning for N crops.
+    
+    Args:
+        net_profit, roi, profit_margin: Higher is better
+        difficulty (array): Cultivation difficulty (0-10), lower is better
+        forecast_std (array): Std of the profit forecast, lower is better
+        weights (dict): Factor weights, default config.SCORING_WEIGHTS
+    
+    Returns:
+        tuple: (scores (..., n_crops), points (..., n_crops, 5) in SCORING_FACTORS order)
+    """
+    weights = weights or SCORING_WEIGHTS
+    factors = np.stack(np.broadcast_arrays(
+        *[np.asarray(values, dtype=float) for values in (net_profit, roi, profit_margin, difficulty, forecast_std)]
+    ), axis=-1)                                                     # (..., n_crops, 5)
+    
+    low = factors.min(axis=-2, keepdims=True)
+    high = factors.max(axis=-2, keepdims=True)
+    span = high - low
+    lower_is_better = np.array([factor in LOWER_IS_BETTER for factor in SCORING_FACTORS])
+    distance = np.where(lower_is_better, high - factors, factors - low)
+    normalised = np.divide(distance, span, out=np.full_like(factors, 0.5), where=span > 0)
+    
+    points = normalised * (np.array([weights[factor] for factor in SCORING_FACTORS]) * 10)
+    return points.sum(axis=-1), points
+
+
+def crop_profit_matrix(land_area, expected_yield, market_price, total_cost_per_hectare):
+    """
+    Net profit, ROI and profit margin for arrays of crops/scenarios
+    (see profit_math.profit_metrics)
+    """
+    metrics = profit_metrics(land_area, expected_yield, market_price, total_cost_per_hectare)
+    return metrics['net_profit'], metrics['roi'], metrics['profit_margin']
+
+
+def rank_crops(land_area, crop_params=None, forecast_std=None, crops=None, weights=None):
+    """
+    Rank every crop in CULTIVATION_FACTORS that has economic parameters
+    
+    Crops without yield, price and cost (from crop_params or
+    config.DEFAULT_CROP_PARAMS) cannot be scored; they are listed after the
+    ranked crops with rank and score None and the reason.
+    
+    Args:
+        land_area (float): Hectares
+        crop_params (dict): {crop: {'expected_yield', 'market_price', 'total_cost_per_hectare'}},
+            merged over config.DEFAULT_CROP_PARAMS
+        forecast_std (dict): Optional {crop: forecast std}; crops without one are
+            treated as equally stable
+        crops (list): Restrict the ranking to these crops
+        weights (dict): Factor weights, default config.SCORING_WEIGHTS
+    
+    Returns:
+        list: One dict per crop, best first, with rank, score, per-factor breakdown and metrics,
+            followed by the unscored crops
+    """
+    params = dict(DEFAULT_CROP_PARAMS)
+    params.update(crop_params or {})
+    requested = list(crops or CULTIVATION_FACTORS)
+    names = [name for name in requested if name in params]
+    unscored = [
+        {
+            'rank': None,
+            'crop': name,
+            'score': None,
+            'reason': 'No expected_yield, market_price and total_cost_per_hectare; supply them in crop_params'
+        }
+        for name in requested if name not in params
+    ]
+    if not names:
+        return unscored
+    
+    columns = {
+        field: np.array([float(params[name][field]) for name in names])
+        for field in ('expected_yield', 'market_price', 'total_cost_per_hectare')
+    }
+    net_profit, roi, profit_margin = crop_profit_matrix(
+        land_area, columns['expected_yield'], columns['market_price'], columns['total_cost_per_hectare']
+    )
+    difficulty = np.array([get_cultivation_ease(name)['difficulty'] for name in names], dtype=float)
+    stds = forecast_std or {}
+    stability = np.array([float(stds.get(name, 0.0)) for name in names])
+    
+    scores, points = score_crop_matrix(net_profit, roi, profit_margin, difficulty, stability, weights)
+    order = np.argsort(-scores, kind='stable')
+    
+    return [
+        {
+            'rank': rank,
+            'crop': names[i],
+            'score': round(float(scores[i]), 2),
+            'breakdown': {factor: round(float(points[i, j]), 2) for j, factor in enumerate(SCORING_FACTORS)},
+            'net_profit': round(float(net_profit[i]), 2),
+            'roi': round(float(roi[i]), 2),
+            'profit_margin': round(float(profit_margin[i]), 2),
+            'difficulty': int(difficulty[i])
+        }
+        for rank, i in enumerate(order, start=1)
+    ] + unscored
+
+
+def score_scenarios(crops, land_area, expected_yield, market_price, total_cost_per_hectare,
+                    forecast_std=None, weights=None):
+    """
+    Score many farmer scenarios (e.g. a whole district) against the same crops in one call
+    
+    Args:
+        crops (list): n_crops crop names (for difficulty lookup)
+        land_area (array): (n_scenarios,) or (n_scenarios, n_crops) hectares
+        expected_yield, market_price, total_cost_per_hectare (array): (n_scenarios, n_crops),
+            or (n_crops,) to share across scenarios
+        forecast_std (array): Optional, broadcastable to (n_scenarios, n_crops)
+    
+    Returns:
+        dict: 'scores' (n_scenarios, n_crops), 'best_crop' index per scenario, 'crops'
+    """
+    land_area = np.asarray(land_area, dtype=float)
+    if land_area.ndim == 1:
+        land_area = land_area[:, None]
+    net_profit, roi, profit_margin = crop_profit_matrix(land_area, expected_yield, market_price,
+                                                        total_cost_per_hectare)
+    difficulty = np.array([get_cultivation_ease(name)['difficulty'] for name in crops], dtype=float)
+    stability = np.zeros(len(crops)) if forecast_std is None else forecast_std
+    
+    scores, _ = score_crop_matrix(net_profit, roi, profit_margin, difficulty, stability, weights)
+    return {'scores': scores, 'best_crop': scores.argmax(axis=-1), 'crops': list(crops)}
+
+
 def generate_recommendation(oilseed_metrics, crop_metrics, oilseed_data, crop_data,
                            oilseed_ease, crop_ease, forecast_oilseed, forecast_crop):
     """
@@ -0,0 +1,140 @@
+"""
+Response cache for the dashboard API
+
+Identical what-if submissions (same endpoint, same JSON body) are answered
+from memory instead of recomputing metrics or refitting ARIMA models.
+
+- Keys are a SHA-256 of the endpoint and the canonicalised request body
+  (sorted keys, no whitespace, 2 / 2.0 treated alike).
+- Entries live for PERFORMANCE['cache_ttl_seconds'].
+- The cache is an LRU bounded by entry count and by total body bytes.
+- Expired entries are swept PERFORMANCE['batch_processing_size'] at a time.
+- FEATURES['enable_historical_data_caching'] switches the cache on/off.
+
+Responses carry X-Cache: HIT, MISS or BYPASS. Only 200 responses are stored.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from itertools import islice
+
+from flask import Response, make_response, request
+
+from config import FEATURES, PERFORMANCE
+
+MAX_ENTRIES = 2048
+MAX_BYTES = 32 * 1024 * 1024
+
+
+def _canonical(value):
+    """Normalise a JSON value so equivalent bodies serialise identically"""
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    return value
+
+
+def request_key(endpoint, body):
+    """Cache key for an endpoint and its parsed JSON body"""
+    canonical = json.dumps(_canonical(body), sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(f'{endpoint}\n{canonical}'.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """Thread-safe LRU with TTL, bounded by entry count and total bytes"""
+
+    def __init__(self, ttl=None, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES,
+                 sweep_batch=None, clock=time.monotonic):
+        self.ttl = PERFORMANCE['cache_ttl_seconds'] if ttl is None else ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_batch = sweep_batch or PERFORMANCE['batch_processing_size']
+        self.clock = clock
+        self.entries = OrderedDict()    # key -> (expires_at, body, status)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] <= self.clock():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, key, body, status=200):
+        if len(body) > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (self.clock() + self.ttl, body, status)
+            self.bytes += len(body)
+            self._sweep_expired()
+            while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        return {'entries': len(self.entries), 'bytes': self.bytes, 'hits': self.hits, 'misses': self.misses}
+
+    def _remove(self, key):
+        _, body, _ = self.entries.pop(key)
+        self.bytes -= len(body)
+
+    def _sweep_expired(self):
+        # LRU order is not expiry order; check the oldest sweep_batch entries per insert
+        now = self.clock()
+        expired = [key for key, (expires_at, _, _) in islice(self.entries.items(), self.sweep_batch)
+                   if expires_at <= now]
+        for key in expired:
+            self._remove(key)
+
+
+response_cache = ResponseCache()
+
+
+def cached_response(view):
+    """Serve a JSON POST view from response_cache when the same body was seen recently"""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        body = request.get_json(silent=True)
+        if not FEATURES.get('enable_historical_data_caching', True) or body is None:
+            response = make_response(view(*args, **kwargs))
+            response.headers['X-Cache'] = 'BYPASS'
+            return response
+
+        key = request_key(request.endpoint, body)
+        cached = response_cache.get(key)
+        if cached is not None:
+            response = Response(cached[0], status=cached[1], mimetype='application/json')
+            response.headers['X-Cache'] = 'HIT'
+            return response
+
+        response = make_response(view(*args, **kwargs))
+        if response.status_code == 200:
+            response_cache.put(key, response.get_data(), response.status_code)
+        response.headers['X-Cache'] = 'MISS'
+        return response
+
+    return wrapper
@@ -7,6 +7,8 @@ Test coverage:
 - Crop recommendation endpoints
 - Input validation
 - Error handling
+- Response caching
+- Rate limiting
 
 To run:
     python -m pytest test_endpoints.py -v
@@ -15,12 +17,22 @@ To run:
 
 import unittest
 import json
+import os
+import tempfile
 import numpy as np
-from flask import Flask
+from flask import Flask, jsonify, request
 from flask_integration import register_dashboard_routes
 from profit_calculator import calculate_profit_metrics, compare_crops, validate_crop_input
+from profit_math import profit_metrics, round_values
 from arima_forecaster import train_arima_model, forecast_profits, generate_seasonal_historical_data
-from recommendation_engine import generate_recommendation, get_cultivation_ease
+from recommendation_engine import (
+    generate_recommendation, get_cultivation_ease,
+    score_crop_matrix, rank_crops, score_scenarios
+)
+from response_cache import ResponseCache, cached_response, response_cache, request_key
+import config
+import rate_limiter
+from rate_limiter import RateLimiter, InProcessStore, SQLiteStore, rate_limited
 from utils import (
     format_currency, format_percentage, sanitize_string,
     calculate_percentage_change, get_risk_level
@@ -122,6 +134,57 @@ class TestProfitCalculator(unittest.TestCase):
         self.assertEqual(metrics['net_profit'], -90000)  # Loss = -cost
 
 
+class TestProfitMath(unittest.TestCase):
+    """Test the shared vectorized profit math"""
+    
+    def test_arrays_match_scalar_calls(self):
+        """One call over arrays equals one call per scenario"""
+        rng = np.random.default_rng(7)
+        area, yld, price, cost = (rng.uniform(0, 10, 500), rng.uniform(0, 5000, 500),
+                                  rng.uniform(0, 100, 500), rng.uniform(0, 60000, 500))
+        batch = profit_metrics(area, yld, price, cost)
+        for i in range(0, 500, 50):
+            single = calculate_profit_metrics({
+                'land_area': area[i], 'expected_yield': yld[i],
+                'market_price': price[i], 'total_cost_per_hectare': cost[i]
+            })
+            self.assertEqual(single['net_profit'], batch['net_profit'][i])
+            self.assertEqual(single['roi'], batch['roi'][i])
+            self.assertEqual(single['profit_margin'], batch['profit_margin'][i])
+    
+    def test_zero_denominators_are_masked(self):
+        """Zero revenue, cost or yield gives 0 ratios without warnings"""
+        with np.errstate(all='raise'):
+            metrics = profit_metrics([2, 2, 0], [0, 2000, 2000], [60, 60, 60], [45000, 0, 45000])
+        self.assertEqual(metrics['profit_margin'].tolist(), [0, 100, 0])
+        self.assertEqual(metrics['roi'].tolist(), [-100, 0, 0])
+        self.assertEqual(metrics['cost_per_unit'][0], 0)
+        self.assertEqual(metrics['profit_per_unit'][2], 0)
+    
+    def test_broadcasts_sweeps(self):
+        """Price x yield grids evaluate in one call"""
+        prices = np.linspace(40, 80, 41)[:, None]
+        yields = np.linspace(1000, 3000, 21)[None, :]
+        metrics = profit_metrics(2, yields, prices, 45000)
+        self.assertEqual(metrics['net_profit'].shape, (41, 21))
+        self.assertEqual(metrics['net_profit'][20, 10], 150000)
+    
+    def test_staged_rounding(self):
+        """decimals rounds totals as they are computed, like the ML stub"""
+        metrics = profit_metrics(2.333, 8.5, 5100, 15000, decimals=2)
+        self.assertEqual(float(metrics['total_yield']), round(8.5 * 2.333, 2))
+        self.assertEqual(float(metrics['total_revenue']), round(round(8.5 * 2.333, 2) * 5100, 2))
+        self.assertEqual(float(metrics['total_cost']), round(15000 * 2.333, 2))
+    
+    def test_array_rounding_matches_builtin_round(self):
+        """Half-cent values round the same in arrays as with round()"""
+        values = np.array([12.65 * 0.5, 2.675, 1.005, 0.125, -6.325, 1234567.885, 3.14159])
+        self.assertEqual(round_values(values, 2).tolist(), [round(v, 2) for v in values.tolist()])
+        rng = np.random.default_rng(3)
+        values = np.round(rng.uniform(0, 100, 20000), 3) * rng.choice([0.5, 1.5, 2.5], 20000)
+        self.assertEqual(round_values(values, 2).tolist(), [round(v, 2) for v in values.tolist()])
+
+
 class TestArimaForecasting(unittest.TestCase):
     """Test ARIMA forecasting functions"""
     
@@ -244,6 +307,79 @@ class TestRecommendationEngine(unittest.TestCase):
         self.assertTrue(len(reasons_os) > 0 or len(reasons_cp) > 0)
 
 
+class TestCropRanking(unittest.TestCase):
+    """Test the N-way vectorized crop scorer"""
+    
+    def test_two_crops_match_pairwise_scoring(self):
+        """With two crops each factor's points go to the better crop"""
+        scores, points = score_crop_matrix(
+            net_profit=[150000, 178000], roi=[166.67, 247.22], profit_margin=[62.5, 71.2],
+            difficulty=[4, 3], forecast_std=[16000, 17000]
+        )
+        np.testing.assert_allclose(scores, [1.0, 9.0])
+        np.testing.assert_allclose(points.sum(axis=0), [3.0, 2.5, 2.0, 1.5, 1.0])
+    
+    def test_tied_factor_splits_points(self):
+        """A factor on which every crop ties is split evenly, not given in full to all"""
+        scores, points = score_crop_matrix(
+            net_profit=[100000, 100000, 100000], roi=[100, 100, 100], profit_margin=[50, 50, 50],
+            difficulty=[4, 4, 4], forecast_std=[0, 0, 0]
+        )
+        np.testing.assert_allclose(scores, [5.0, 5.0, 5.0])
+        
+        # Crops sharing the best value still get the full points
+        _, points = score_crop_matrix(
+            net_profit=[200000, 200000, 100000], roi=[1, 1, 1], profit_margin=[1, 1, 1],
+            difficulty=[4, 4, 4], forecast_std=[0, 0, 0]
+        )
+        np.testing.assert_allclose(points[:, 0], [3.0, 3.0, 0.0])
+    
+    def test_rank_crops_orders_all_known_crops(self):
+        """Ranking covers every crop with parameters, best first"""
+        ranking = [r for r in rank_crops(2) if r['rank'] is not None]
+        self.assertEqual(len(ranking), 7)
+        self.assertEqual([r['rank'] for r in ranking], list(range(1, 8)))
+        scores = [r['score'] for r in ranking]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertTrue(all(0 <= score <= 10 for score in scores))
+        self.assertEqual(ranking[0]['crop'], 'Maize')
+    
+    def test_rank_crops_lists_unscored_crops(self):
+        """Crops without parameters are returned after the ranking with a reason"""
+        ranking = rank_crops(2)
+        self.assertEqual([r['crop'] for r in ranking[7:]],
+                         ['Sesame', 'Castor', 'Linseed', 'Rapeseed', 'Safflower', 'Niger_Seed', 'Cotton'])
+        for entry in ranking[7:]:
+            self.assertIsNone(entry['rank'])
+            self.assertIsNone(entry['score'])
+            self.assertIn('crop_params', entry['reason'])
+    
+    def test_rank_crops_accepts_custom_crops(self):
+        """Crops from CULTIVATION_FACTORS can be scored with farmer-supplied parameters"""
+        ranking = rank_crops(1, crop_params={
+            'Sesame': {'expected_yield': 900, 'market_price': 130, 'total_cost_per_hectare': 30000}
+        }, crops=['Sesame', 'Soybean'])
+        self.assertEqual({r['crop'] for r in ranking}, {'Sesame', 'Soybean'})
+    
+    def test_score_scenarios_is_batched(self):
+        """Thousands of scenarios are scored in one call"""
+        rng = np.random.default_rng(7)
+        crops = ['Soybean', 'Mustard', 'Wheat']
+        n = 5000
+        result = score_scenarios(
+            crops, rng.uniform(0.5, 5, n),
+            rng.uniform(1000, 6000, (n, 3)), rng.uniform(20, 100, (n, 3)), rng.uniform(25000, 55000, (n, 3))
+        )
+        self.assertEqual(result['scores'].shape, (n, 3))
+        self.assertEqual(result['best_crop'].shape, (n,))
+        
+        # Row i equals scoring scenario i on its own
+        single = score_scenarios(crops, [2.0], [[2000, 1200, 5000]], [[60, 100, 20]], [[45000, 40000, 28000]])
+        ranking = rank_crops(2, crops=crops)
+        by_crop = {r['crop']: r['score'] for r in ranking}
+        np.testing.assert_allclose(single['scores'][0], [by_crop[c] for c in crops], atol=0.01)
+
+
 class TestUtilityFunctions(unittest.TestCase):
     """Test utility functions"""
     
@@ -393,6 +529,165 @@ class TestFlaskAPI(unittest.TestCase):
         self.assertIn('recommendation', data)
         self.assertIn('recommendation_score', data)
         self.assertIn('reasoning', data)
+    
+    def test_rank_crops_endpoint(self):
+        """Test /api/rank-crops endpoint"""
+        response = self.client.post('/api/rank-crops',
+                                   data=json.dumps({'land_area': 2, 'only': ['Soybean', 'Maize']}),
+                                   content_type='application/json')
+        
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertTrue(data['success'])
+        self.assertEqual([r['crop'] for r in data['ranking']], ['Maize', 'Soybean'])
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test the dashboard response cache"""
+    
+    def setUp(self):
+        """Set up a counting view behind the cache and the dashboard routes"""
+        self.app = Flask(__name__)
+        register_dashboard_routes(self.app)
+        self.calls = []
+        
+        @self.app.route('/echo', methods=['POST'])
+        @cached_response
+        def echo():
+            self.calls.append(request.get_json())
+            return jsonify({'success': True, 'calls': len(self.calls)})
+        
+        self.client = self.app.test_client()
+        response_cache.clear()
+        self.payload = {'crop_name': 'Soybean', 'land_area': 2, 'expected_yield': 2000}
+    
+    def post(self, body, endpoint='/echo'):
+        return self.client.post(endpoint, data=body, content_type='application/json')
+    
+    def test_repeat_request_is_a_hit(self):
+        """Second identical request is served from the cache"""
+        first = self.post(json.dumps(self.payload))
+        second = self.post(json.dumps(self.payload))
+        self.assertEqual(first.headers['X-Cache'], 'MISS')
+        self.assertEqual(second.headers['X-Cache'], 'HIT')
+        self.assertEqual(second.get_json(), first.get_json())
+        self.assertEqual(len(self.calls), 1)
+    
+    def test_equivalent_bodies_share_a_key(self):
+        """Key order, whitespace and 2 vs 2.0 do not change the key"""
+        self.post(json.dumps(self.payload))
+        reordered = dict(reversed(list(self.payload.items())), land_area=2.0)
+        self.assertEqual(self.post(json.dumps(reordered, indent=2)).headers['X-Cache'], 'HIT')
+        self.assertEqual(self.post(json.dumps(dict(self.payload, land_area=3))).headers['X-Cache'], 'MISS')
+        self.assertNotEqual(request_key('a', self.payload), request_key('b', self.payload))
+    
+    def test_errors_are_not_cached(self):
+        """Validation errors from the dashboard endpoints are recomputed every time"""
+        body = json.dumps({'oilseed_area': -1})
+        for endpoint in ('/api/predict-profit', '/api/recommend-crop'):
+            self.assertEqual(self.post(body, endpoint).status_code, 400)
+            self.assertEqual(self.post(body, endpoint).headers['X-Cache'], 'MISS')
+        self.assertEqual(response_cache.stats()['entries'], 0)
+    
+    def test_disabled_feature_bypasses_cache(self):
+        """FEATURES['enable_historical_data_caching'] turns caching off"""
+        config.FEATURES['enable_historical_data_caching'] = False
+        try:
+            self.post(json.dumps(self.payload))
+            self.assertEqual(self.post(json.dumps(self.payload)).headers['X-Cache'], 'BYPASS')
+        finally:
+            config.FEATURES['enable_historical_data_caching'] = True
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(response_cache.stats()['entries'], 0)
+    
+    def test_entries_expire_after_ttl(self):
+        """Entries live for cache_ttl_seconds"""
+        now = [0.0]
+        cache = ResponseCache(clock=lambda: now[0])
+        self.assertEqual(cache.ttl, config.PERFORMANCE['cache_ttl_seconds'])
+        cache.put('k', b'{}')
+        now[0] = cache.ttl - 1
+        self.assertIsNotNone(cache.get('k'))
+        now[0] = cache.ttl
+        self.assertIsNone(cache.get('k'))
+        self.assertEqual(cache.stats()['bytes'], 0)
+    
+    def test_lru_is_bounded_by_entries_and_bytes(self):
+        """Least recently used entries are evicted first"""
+        cache = ResponseCache(max_entries=2, max_bytes=10)
+        cache.put('a', b'1234')
+        cache.put('b', b'1234')
+        cache.get('a')
+        cache.put('c', b'1234')
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        cache.put('d', b'12345678')
+        self.assertEqual(list(cache.entries), ['d'])
+        self.assertLessEqual(cache.stats()['bytes'], 10)
+
+class TestRateLimiter(unittest.TestCase):
+    """Test per-client, per-cost-class rate limiting"""
+    
+    def setUp(self):
+        self.now = [1000.0]
+        self.clock = lambda: self.now[0]
+    
+    def test_bucket_allows_burst_then_refills(self):
+        """RATE_LIMIT['calls'] requests pass, then tokens refill over per_seconds"""
+        limiter = RateLimiter(store=InProcessStore(), clock=self.clock)
+        calls, per_seconds = config.RATE_LIMIT['calls'], config.RATE_LIMIT['per_seconds']
+        results = [limiter.hit('client')[0] for _ in range(calls + 1)]
+        self.assertEqual(results.count(True), calls)
+        allowed, retry_after = limiter.hit('client')
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(retry_after, per_seconds / calls)
+        self.now[0] += retry_after
+        self.assertTrue(limiter.hit('client')[0])
+        self.assertTrue(limiter.hit('other-client')[0])
+    
+    def test_cost_drains_bucket_faster(self):
+        """A cost-10 request takes 10 tokens"""
+        limiter = RateLimiter(calls=100, per_seconds=60, store=InProcessStore(), clock=self.clock)
+        self.assertEqual([limiter.hit('k', cost=10)[0] for _ in range(11)].count(True), 10)
+    
+    def test_sqlite_store_is_shared(self):
+        """Two limiters on the same file share buckets, as separate workers would"""
+        path = os.path.join(tempfile.mkdtemp(), 'rate_limits.sqlite3')
+        first = RateLimiter(calls=3, per_seconds=60, store=SQLiteStore(path), clock=self.clock)
+        second = RateLimiter(calls=3, per_seconds=60, store=SQLiteStore(path), clock=self.clock)
+        self.assertTrue(first.hit('k')[0])
+        self.assertTrue(second.hit('k')[0])
+        self.assertTrue(first.hit('k')[0])
+        allowed, retry_after = second.hit('k')
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(retry_after, 20)
+    
+    def test_limited_requests_get_429_with_retry_after(self):
+        """Views return 429 with Retry-After once the bucket is empty"""
+        app = Flask(__name__)
+        
+        @app.route('/fit', methods=['POST'])
+        @rate_limited('arima')
+        def fit():
+            return jsonify({'success': True})
+        
+        original = rate_limiter.rate_limiter
+        rate_limiter.rate_limiter = RateLimiter(calls=20, per_seconds=60, store=InProcessStore(), clock=self.clock)
+        try:
+            client = app.test_client()
+            statuses = [client.post('/fit').status_code for _ in range(3)]
+            self.assertEqual(statuses, [200, 200, 429])
+            response = client.post('/fit')
+            self.assertEqual(response.headers['Retry-After'], '30')
+            self.assertFalse(response.get_json()['success'])
+            
+            config.RATE_LIMIT['enabled'] = False
+            try:
+                self.assertEqual(client.post('/fit').status_code, 200)
+            finally:
+                config.RATE_LIMIT['enabled'] = True
+        finally:
+            rate_limiter.rate_limiter = original
 
 
 if __name__ == '__main__':
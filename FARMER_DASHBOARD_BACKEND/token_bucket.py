@@ -0,0 +1,153 @@
+"""
+Per-client token buckets shared by the dashboard API and the main backend
+
+Each (cost class, client) pair has its own bucket of `calls` tokens refilled
+over `per_seconds`; a request takes its cost class's tokens. The policy
+(calls, per_seconds, enabled), the cost classes, how a client is identified
+and the 429 body are supplied by each app's rate_limiter module.
+
+Buckets are stored as one "theoretical arrival time" float per key (GCRA),
+so a check is a single read-decide-write:
+- InProcessStore keeps them in a dict (one worker process). It is not
+  lock-free: the read-decide-write runs under a threading.Lock, because
+  without one two threads can read the same state and both take the last
+  token. The lock covers one dict read and one write.
+- SQLiteStore keeps them in a SQLite file shared by every worker on the host,
+  in one IMMEDIATE transaction per check.
+
+The dashboard and the main backend do not share an import root, so each
+imports its own copy as the top-level module `token_bucket`:
+FARMER_DASHBOARD_BACKEND/token_bucket.py is the original and
+backend/token_bucket.py a verbatim copy; backend/test_rate_limiter.py checks
+that they stay identical.
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from flask import jsonify
+
+
+class InProcessStore:
+    """Bucket state in a dict for a single worker process"""
+
+    def __init__(self):
+        self.tats = {}
+        self.lock = threading.Lock()
+
+    def update(self, key, decide):
+        # Read, decide and write under one lock so concurrent requests cannot both take the last token
+        with self.lock:
+            allowed, tat, retry_after = decide(self.tats.get(key))
+            if allowed:
+                self.tats[key] = tat
+        return allowed, retry_after
+
+
+class SQLiteStore:
+    """Bucket state in a SQLite file so limits hold across worker processes"""
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, tat REAL NOT NULL)')
+
+    def _connect(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        return conn
+
+    def update(self, key, decide):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tat FROM rate_limits WHERE key = ?', (key,)).fetchone()
+            allowed, tat, retry_after = decide(row[0] if row else None)
+            if allowed:
+                conn.execute('INSERT OR REPLACE INTO rate_limits (key, tat) VALUES (?, ?)', (key, tat))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return allowed, retry_after
+
+
+def make_store(path=None):
+    """SQLiteStore at path (e.g. from RATE_LIMIT_DB), else an InProcessStore"""
+    return SQLiteStore(path) if path else InProcessStore()
+
+
+class RateLimiter:
+    """GCRA token buckets: `calls` tokens per `per_seconds`, burst of `calls`"""
+
+    def __init__(self, calls, per_seconds, store=None, clock=time.time):
+        self.calls = calls
+        self.per_seconds = per_seconds
+        self.interval = self.per_seconds / self.calls     # seconds per token
+        self.store = store or InProcessStore()
+        self.clock = clock
+
+    def hit(self, key, cost=1):
+        """Take `cost` tokens from key's bucket. Returns (allowed, retry_after_seconds)."""
+        cost = min(cost, self.calls)
+        now = self.clock()
+
+        def decide(tat):
+            tat = max(tat or now, now) + cost * self.interval
+            wait = tat - now - self.per_seconds
+            if wait > 0:
+                return False, None, wait
+            return True, tat, 0.0
+
+        return self.store.update(key, decide)
+
+
+def make_rate_limited(settings, cost_classes, get_limiter, client_id, error_body):
+    """
+    Build a rate_limited(cost_class) view decorator
+
+    Args:
+        settings (dict): Policy with 'enabled', read on every request
+        cost_classes (dict): Tokens per request by cost class
+        get_limiter (callable): Returns the RateLimiter to use, looked up per
+            request so tests can swap the module-level limiter
+        client_id (callable): Identifies the caller of the current request
+        error_body (callable): retry_after seconds -> JSON body of the 429
+
+    Returns:
+        callable: rate_limited(cost_class='default')
+    """
+    def rate_limited(cost_class='default'):
+        """Reject the view with 429 + Retry-After once the client's bucket for cost_class is empty"""
+        cost = cost_classes[cost_class]
+
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not settings.get('enabled', True):
+                    return view(*args, **kwargs)
+
+                allowed, retry_after = get_limiter().hit(f'{cost_class}:{client_id()}', cost)
+                if not allowed:
+                    retry_after = max(1, math.ceil(retry_after))
+                    response = jsonify(error_body(retry_after))
+                    response.status_code = 429
+                    response.headers['Retry-After'] = str(retry_after)
+                    return response
+                return view(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    return rate_limited
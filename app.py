@@ -12,6 +12,7 @@ import os
 from datetime import datetime
 from forecast_engine import ForecastEngine
 from forecast_dashboard_enhanced import create_forecast_dashboard_routes, ENHANCED_DASHBOARD_HTML
+from profit_math import profit_metrics
 
 # ============================================================
 # CONFIGURATION
@@ -97,22 +98,16 @@ def preprocess_single_row(input_dict: dict) -> pd.DataFrame:
 
 def calculate_profit(yield_kg, price_per_kg, area_ha, cost_per_ha):
     """Calculate farm profit metrics."""
-    total_yield = yield_kg * area_ha
-    total_revenue = total_yield * price_per_kg
-    total_cost = cost_per_ha * area_ha
-    net_profit = total_revenue - total_cost
-    profit_margin = (net_profit / total_revenue * 100) if total_revenue > 0 else 0
-    roi = (net_profit / total_cost * 100) if total_cost > 0 else 0
-    profit_per_kg = net_profit / total_yield if total_yield > 0 else 0
+    metrics = profit_metrics(area_ha, yield_kg, price_per_kg, cost_per_ha)
     
     return {
-        "total_yield_kg": round(total_yield, 2),
-        "total_revenue": round(total_revenue, 2),
-        "total_cost": round(total_cost, 2),
-        "net_profit": round(net_profit, 2),
-        "profit_margin_percent": round(profit_margin, 2),
-        "roi_percent": round(roi, 2),
-        "profit_per_kg": round(profit_per_kg, 2)
+        "total_yield_kg": round(float(metrics['total_yield']), 2),
+        "total_revenue": round(float(metrics['total_revenue']), 2),
+        "total_cost": round(float(metrics['total_cost']), 2),
+        "net_profit": round(float(metrics['net_profit']), 2),
+        "profit_margin_percent": round(float(metrics['profit_margin']), 2),
+        "roi_percent": round(float(metrics['roi']), 2),
+        "profit_per_kg": round(float(metrics['profit_per_unit']), 2)
     }
 
 
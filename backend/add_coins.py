@@ -3,8 +3,8 @@
 Script to add coins to a farmer for testing
 """
 from app import app, db
-from models import Farmer, CoinBalance
-from datetime import datetime
+from models import Farmer
+from coin_ledger import credit_coins
 
 def add_coins_to_farmer(farmer_id, coins_amount):
     """Add coins to a farmer's balance"""
@@ -18,20 +18,9 @@ def add_coins_to_farmer(farmer_id, coins_amount):
         
         print(f"✓ Found farmer: {farmer.name} (ID: {farmer.farmer_id})")
         
-        # Get or create coin balance
-        coin_balance = farmer.coin_balance
-        if not coin_balance:
-            coin_balance = CoinBalance(farmer_id=farmer.id)
-            db.session.add(coin_balance)
-            print(f"✓ Created new CoinBalance record")
-        
-        # Add coins
-        old_available = coin_balance.available_coins
-        coin_balance.total_coins += coins_amount
-        coin_balance.available_coins += coins_amount
-        coin_balance.updated_at = datetime.utcnow()
-        
-        db.session.commit()
+        # Credit through the ledger so the balance can be rebuilt from it
+        old_available = farmer.coin_balance.available_coins if farmer.coin_balance else 0
+        coin_balance = credit_coins(farmer.id, coins_amount, 'Manual Addition (script)')
         
         print(f"✅ Successfully added {coins_amount} coins")
         print(f"   Old balance: {old_available}")
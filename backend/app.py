@@ -50,7 +50,7 @@ from routes.redemption_store import redemption_bp
 from routes.buyer_auth import buyer_auth_bp
 from routes.translation import translation_bp
 from routes.bidding import bidding_bp
-from translations import get_translation, TRANSLATIONS
+from translations import get_language_table, TRANSLATIONS
 
 app.register_blueprint(auth_bp)
 app.register_blueprint(onboarding_bp)
@@ -124,7 +124,7 @@ def translate_filter(text, target_lang='en'):
     """Jinja template filter for translation"""
     if not text or target_lang == 'en':
         return text
-    return get_translation(text, target_lang)
+    return get_language_table(target_lang).get(text, text)
 
 
 @app.before_request
@@ -145,6 +145,16 @@ if __name__ == '__main__':
     # ❗️IMPORTANT: Do NOT use db.create_all() when using Flask-Migrate
     # Migrations now handle schema updates.
     
+    # Background mandi price sync (started in the reloader's serving process only)
+    if os.getenv('PRICE_SYNC_ENABLED', 'true').lower() == 'true' and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        from price_sync import start_price_sync_scheduler
+        start_price_sync_scheduler(app)
+
+    # Nightly scheme recommendation precompute
+    if os.getenv('RECOMMENDATION_BATCH_ENABLED', 'true').lower() == 'true' and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        from recommendation_batch import start_recommendation_scheduler
+        start_recommendation_scheduler(app)
+
     # Run with WebSocket support
     ws_socketio.run(app, debug=True, host='0.0.0.0', port=5000)
         # ----------------------- CUSTOM CLI COMMANDS -----------------------
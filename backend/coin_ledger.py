@@ -0,0 +1,192 @@
+"""
+Coin ledger
+CoinTransaction is the append-only ledger and the source of truth for coins;
+the CoinBalance columns are a materialized view of it, updated in the same
+transaction as every ledger row and rebuildable with rebuild_balance().
+
+Redemption never reads-then-writes in Python. Stock and balance are taken
+with conditional UPDATEs (decrement only if enough is left), so concurrent
+redemptions cannot oversell an offer or overdraw a balance: whichever
+statement finds the condition false matches no row and the redemption is
+rolled back.
+
+The offer's cost, validity and title are returned by the stock-taking
+UPDATE, so a redemption always charges the current price; the cached offer
+catalogue is only used for browsing.
+"""
+import base64
+import secrets
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, func
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import Farmer, CoinBalance, CoinTransaction, RedemptionOffer, FarmerRedemption
+from offer_catalogue import record_redemption
+
+CREDIT_TYPES = ('earned', 'refund')
+DEBIT_TYPES = ('redeemed',)
+CODE_BYTES = 10   # 80 bits -> 16 base32 characters
+
+
+class RedemptionError(Exception):
+    """Redemption refused; carries the JSON payload and HTTP status for the API."""
+
+    def __init__(self, payload, status=400):
+        super().__init__(payload.get('error'))
+        self.payload = payload
+        self.status = status
+
+
+def generate_redemption_code():
+    """
+    Random 80-bit redemption code such as TS7K2M9QX4ZP3W8RJ5.
+    Collisions are vanishingly unlikely, so no lookup is made; the unique
+    index on redemption_code is the backstop.
+    """
+    return 'TS' + base64.b32encode(secrets.token_bytes(CODE_BYTES)).decode('ascii')
+
+
+def get_or_create_balance(farmer_id):
+    """CoinBalance row for a farmer, created if missing (safe against concurrent creation)."""
+    balance = CoinBalance.query.filter_by(farmer_id=farmer_id).first()
+    if balance:
+        return balance
+    try:
+        balance = CoinBalance(farmer_id=farmer_id, total_coins=0, available_coins=0, redeemed_coins=0)
+        db.session.add(balance)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        balance = CoinBalance.query.filter_by(farmer_id=farmer_id).one()
+    return balance
+
+
+def credit_coins(farmer_id, amount, reason, related_type=None, related_id=None, transaction_type='earned'):
+    """Append a credit to the ledger and apply it to the materialized balance."""
+    if amount <= 0:
+        raise ValueError('amount must be positive')
+    balance = get_or_create_balance(farmer_id)
+
+    db.session.add(CoinTransaction(
+        coin_balance_id=balance.id,
+        transaction_type=transaction_type,
+        amount=amount,
+        reason=reason,
+        related_type=related_type,
+        related_id=related_id
+    ))
+    db.session.execute(
+        CoinBalance.__table__.update()
+        .where(CoinBalance.id == balance.id)
+        .values(total_coins=CoinBalance.total_coins + amount,
+                available_coins=CoinBalance.available_coins + amount,
+                updated_at=datetime.utcnow())
+    )
+    db.session.execute(
+        Farmer.__table__.update()
+        .where(Farmer.id == farmer_id)
+        .values(coins_earned=func.coalesce(Farmer.coins_earned, 0) + amount)
+    )
+    db.session.commit()
+    db.session.refresh(balance)
+    return balance
+
+
+def redeem(farmer_id, offer_id):
+    """
+    Redeem an offer for a farmer in one transaction.
+    Returns (FarmerRedemption, remaining_coins); raises RedemptionError.
+    """
+    balance = get_or_create_balance(farmer_id)
+
+    try:
+        # Take one unit of stock if any is left, reading the offer's current terms
+        taken = db.session.execute(
+            RedemptionOffer.__table__.update()
+            .where(RedemptionOffer.id == offer_id,
+                   RedemptionOffer.is_active == True,
+                   (RedemptionOffer.stock_limit == None) |
+                   (func.coalesce(RedemptionOffer.stock_redeemed, 0) < RedemptionOffer.stock_limit))
+            .values(stock_redeemed=func.coalesce(RedemptionOffer.stock_redeemed, 0) + 1)
+            .returning(RedemptionOffer.coin_cost, RedemptionOffer.validity_days, RedemptionOffer.title)
+        ).first()
+        if taken is None:
+            raise _unavailable(offer_id)
+        cost = taken.coin_cost
+
+        # Spend the coins if the balance covers them
+        spent = db.session.execute(
+            CoinBalance.__table__.update()
+            .where(CoinBalance.id == balance.id, CoinBalance.available_coins >= cost)
+            .values(available_coins=CoinBalance.available_coins - cost,
+                    redeemed_coins=CoinBalance.redeemed_coins + cost,
+                    updated_at=datetime.utcnow())
+        ).rowcount
+        if not spent:
+            db.session.rollback()
+            db.session.refresh(balance)
+            raise RedemptionError({'error': 'Insufficient coins', 'required': cost,
+                                   'available': balance.available_coins})
+
+        redemption = FarmerRedemption(
+            farmer_id=farmer_id,
+            offer_id=offer_id,
+            coins_spent=cost,
+            redemption_code=generate_redemption_code(),
+            expires_at=datetime.utcnow() + timedelta(days=taken.validity_days or 0),
+            status='active'
+        )
+        db.session.add(redemption)
+        db.session.flush()
+        db.session.add(CoinTransaction(
+            coin_balance_id=balance.id,
+            transaction_type='redeemed',
+            amount=cost,
+            reason=f"Redeemed: {taken.title}",
+            related_type='redemption_offer',
+            related_id=offer_id
+        ))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    record_redemption(offer_id)
+
+    db.session.refresh(balance)
+    return redemption, balance.available_coins
+
+
+def _unavailable(offer_id):
+    """RedemptionError explaining why no stock could be taken for offer_id."""
+    offer = db.session.get(RedemptionOffer, offer_id, populate_existing=True) if offer_id else None
+    if offer is None:
+        return RedemptionError({'error': 'Offer not found'}, 404)
+    if not offer.is_active:
+        return RedemptionError({'error': 'Offer is no longer active'})
+    return RedemptionError({'error': 'Out of stock'})
+
+
+def ledger_totals(coin_balance_id):
+    """(earned, redeemed) summed from the ledger."""
+    earned, redeemed = db.session.query(
+        func.coalesce(func.sum(case((CoinTransaction.transaction_type.in_(CREDIT_TYPES), CoinTransaction.amount),
+                                    else_=0)), 0),
+        func.coalesce(func.sum(case((CoinTransaction.transaction_type.in_(DEBIT_TYPES), CoinTransaction.amount),
+                                    else_=0)), 0),
+    ).filter(CoinTransaction.coin_balance_id == coin_balance_id).one()
+    return int(earned), int(redeemed)
+
+
+def rebuild_balance(farmer_id):
+    """Recompute a farmer's materialized balance from the ledger. Returns the balance."""
+    balance = get_or_create_balance(farmer_id)
+    earned, redeemed = ledger_totals(balance.id)
+    balance.total_coins = earned
+    balance.redeemed_coins = redeemed
+    balance.available_coins = earned - redeemed
+    balance.updated_at = datetime.utcnow()
+    db.session.commit()
+    return balance
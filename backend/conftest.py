@@ -0,0 +1,54 @@
+"""
+Shared pytest setup for the backend tests
+Points the app at a throwaway SQLite database (and translation cache)
+before any test module imports it, and gives every test module an empty
+schema and fresh in-process caches. Test modules share one imported app,
+so this is what keeps one module's rows and compiled indexes out of the
+next module's assertions.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+_TEST_DIR = tempfile.mkdtemp(prefix='backend-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_TEST_DIR, 'backend.db')
+os.environ.setdefault('TRANSLATION_CACHE_DB', os.path.join(_TEST_DIR, 'translation_cache.sqlite3'))
+
+# (module, function) pairs that drop caches built from database rows
+CACHE_RESETS = (
+    ('scheme_eligibility', 'invalidate_scheme_index'),
+    ('offer_catalogue', 'invalidate_offer_catalogue'),
+    ('price_history', 'invalidate_price_history'),
+    ('geo_index', 'invalidate_offer_index'),
+    ('matching_engine', 'reset_matching_engine'),
+)
+
+
+def reset_caches():
+    for module_name, function in CACHE_RESETS:
+        module = sys.modules.get(module_name)
+        if module is not None:
+            getattr(module, function)()
+
+
+@pytest.fixture(autouse=True, scope='module')
+def isolated_database():
+    """Empty schema and caches for each test module (runs before setup_module)."""
+    from app import app
+    from extensions import db
+
+    # Translations still being written belong to the previous module's schema
+    content_i18n = sys.modules.get('content_i18n')
+    if content_i18n is not None:
+        content_i18n.translation_queue.join()
+
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+    reset_caches()
+    yield
+    with app.app_context():
+        db.session.remove()
@@ -0,0 +1,274 @@
+"""
+Pre-translated scheme and offer content
+Every translatable text field of a Scheme or RedemptionOffer is translated
+into CONTENT_LANGUAGES when the row is created or updated, and stored in
+ContentTranslation together with the sha256 of the source text. On update
+only fields whose source hash changed are re-translated (see translator.py
+for the caches in front of the API).
+
+The mapper hooks only note which rows changed. Once the transaction commits
+the noted rows are handed to translation_queue, which translates them on a
+worker thread with one batched translator call per language for all rows,
+so neither a flush nor the committing request waits on the translation API.
+
+Pages and APIs then overlay the stored translations with one indexed query
+(localize), so serving localized content does no translation work.
+Translations that come back unchanged (API not configured or failing) are
+not stored and the source text is served; `python content_i18n.py` fills
+in anything missing for existing rows.
+"""
+import hashlib
+import queue
+import threading
+import uuid
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import and_, delete, event, inspect, insert, select, tuple_
+from sqlalchemy.orm import object_session
+
+from extensions import db
+from models import Scheme, RedemptionOffer, ContentTranslation
+from translator import translator as text_translator
+
+CONTENT_LANGUAGES = ('hi', 'mr', 'gu')
+
+TRANSLATED_FIELDS = {
+    'scheme': ('name', 'description', 'benefit_amount', 'eligibility_criteria', 'focus_area'),
+    'offer': ('title', 'description', 'actual_value'),
+}
+
+CONTENT_TYPES = {Scheme: 'scheme', RedemptionOffer: 'offer'}
+
+_table = ContentTranslation.__table__
+
+
+def source_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def sync_translations(connection, content_type, sources_by_id, languages=CONTENT_LANGUAGES):
+    """
+    Bring stored translations of many rows in line with `sources_by_id`
+    ({content_id: {field: text}}). Only fields whose source hash differs from
+    the stored one are translated, with one translator call per language.
+    Returns the number of (language, field) translations written.
+    """
+    if not sources_by_id:
+        return 0
+    existing = {
+        (content_id, language, field): stored_hash
+        for content_id, language, field, stored_hash in connection.execute(
+            select(_table.c.content_id, _table.c.language, _table.c.field, _table.c.source_hash).where(
+                _table.c.content_type == content_type, _table.c.content_id.in_(list(sources_by_id))
+            )
+        )
+    }
+    hashes = {
+        content_id: {field: source_hash(text) for field, text in sources.items() if text}
+        for content_id, sources in sources_by_id.items()
+    }
+
+    stale_keys = []
+    new_rows = []
+    now = datetime.utcnow()
+    for language in languages:
+        pending = []
+        for content_id, sources in sources_by_id.items():
+            for field in sources:
+                stored = existing.get((content_id, language, field))
+                if stored == hashes[content_id].get(field):
+                    continue                # up to date (or empty and never stored)
+                if stored is not None:
+                    stale_keys.append((content_id, language, field))
+                if field in hashes[content_id]:
+                    pending.append((content_id, field))
+        if not pending:
+            continue
+        texts = [sources_by_id[content_id][field] for content_id, field in pending]
+        translated = text_translator.translate_batch(texts, language)
+        for (content_id, field), source, text in zip(pending, texts, translated):
+            if text and text != source:
+                new_rows.append({
+                    'id': str(uuid.uuid4()), 'content_type': content_type, 'content_id': content_id,
+                    'language': language, 'field': field, 'source_hash': hashes[content_id][field],
+                    'text': text, 'updated_at': now
+                })
+
+    if stale_keys:
+        connection.execute(delete(_table).where(
+            _table.c.content_type == content_type,
+            tuple_(_table.c.content_id, _table.c.language, _table.c.field).in_(stale_keys)
+        ))
+    if new_rows:
+        connection.execute(insert(_table), new_rows)
+    return len(new_rows)
+
+
+def _load_sources(connection, content_type, ids):
+    """{content_id: {field: text}} of the rows' current translated fields (deleted rows are left out)."""
+    model = next(model for model, name in CONTENT_TYPES.items() if name == content_type)
+    fields = TRANSLATED_FIELDS[content_type]
+    return {
+        row[0]: dict(zip(fields, row[1:]))
+        for row in connection.execute(
+            select(model.id, *[getattr(model, field) for field in fields]).where(model.id.in_(list(ids)))
+        )
+    }
+
+
+def translate_changed(changed):
+    """Translate rows noted by the mapper hooks ({content_type: {content_id, ...}}). Returns rows written."""
+    written = 0
+    with db.engine.begin() as connection:
+        for content_type, ids in changed.items():
+            written += sync_translations(connection, content_type, _load_sources(connection, content_type, ids))
+    return written
+
+
+def load_translations(content_type, ids, language):
+    """{content_id: {field: text}} of stored translations, in one query."""
+    if language not in CONTENT_LANGUAGES or not ids:
+        return {}
+    translations = {}
+    for content_id, field, text in db.session.execute(
+        select(ContentTranslation.content_id, ContentTranslation.field, ContentTranslation.text).where(
+            ContentTranslation.content_type == content_type,
+            ContentTranslation.language == language,
+            ContentTranslation.content_id.in_(set(ids))
+        )
+    ):
+        translations.setdefault(content_id, {})[field] = text
+    return translations
+
+
+def localize(content_type, items, language, id_key='id'):
+    """
+    Overlay stored translations onto dicts (e.g. to_dict() output), in place.
+    English and unknown languages are returned untouched without a query.
+    """
+    translations = load_translations(content_type, [item[id_key] for item in items], language)
+    for item in items:
+        item.update(translations.get(item[id_key], {}))
+    return items
+
+
+def translate_existing(batch_size=200):
+    """Backfill: sync every scheme and offer. Returns translations written."""
+    written = 0
+    for model, content_type in CONTENT_TYPES.items():
+        fields = TRANSLATED_FIELDS[content_type]
+        after = ''
+        while True:
+            rows = db.session.execute(
+                select(model.id, *[getattr(model, field) for field in fields])
+                .where(model.id > after).order_by(model.id).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            written += sync_translations(db.session.connection(), content_type,
+                                         {row[0]: dict(zip(fields, row[1:])) for row in rows})
+            db.session.commit()
+            after = rows[-1][0]
+    return written
+
+
+# ==================== TRANSLATION QUEUE ====================
+
+class ThreadTranslationQueue:
+    """Translates committed changes one batch at a time on a daemon thread, inside an app context."""
+
+    def __init__(self):
+        self.jobs = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def submit(self, app, changed):
+        self.jobs.put((app, changed))
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='content-translations', daemon=True)
+                self.thread.start()
+
+    def join(self):
+        """Block until every submitted batch has been translated."""
+        self.jobs.join()
+
+    def _run(self):
+        while True:
+            app, changed = self.jobs.get()
+            with app.app_context():
+                try:
+                    translate_changed(changed)
+                except Exception as e:
+                    # Left for `python content_i18n.py` to fill in
+                    print(f"❌ Content translation failed: {e}")
+                finally:
+                    self.jobs.task_done()
+
+
+class InlineTranslationQueue:
+    """Stand-in backend: translates on the committing thread, right after the commit."""
+
+    def submit(self, app, changed):
+        translate_changed(changed)
+
+    def join(self):
+        pass
+
+
+translation_queue = ThreadTranslationQueue()
+
+
+# ==================== MAPPER HOOKS ====================
+
+_CHANGED_KEY = 'content_i18n_changed'
+
+
+def _note_changed(target, content_type, fields):
+    session = object_session(target)
+    if session is not None and fields:
+        session.info.setdefault(_CHANGED_KEY, {}).setdefault(content_type, set()).add(target.id)
+
+
+def _content_inserted(mapper, connection, target):
+    _note_changed(target, CONTENT_TYPES[mapper.class_], TRANSLATED_FIELDS[CONTENT_TYPES[mapper.class_]])
+
+
+def _content_updated(mapper, connection, target):
+    # Stock, status and timestamp updates touch no translated field: nothing noted
+    content_type = CONTENT_TYPES[mapper.class_]
+    state = inspect(target)
+    _note_changed(target, content_type,
+                  [field for field in TRANSLATED_FIELDS[content_type] if state.attrs[field].history.has_changes()])
+
+
+def _content_deleted(mapper, connection, target):
+    connection.execute(delete(_table).where(
+        and_(_table.c.content_type == CONTENT_TYPES[mapper.class_], _table.c.content_id == target.id)
+    ))
+
+
+def _session_committed(session):
+    changed = session.info.pop(_CHANGED_KEY, None)
+    if changed:
+        translation_queue.submit(current_app._get_current_object(), changed)
+
+
+def _session_rolled_back(session):
+    session.info.pop(_CHANGED_KEY, None)
+
+
+for _model in CONTENT_TYPES:
+    event.listen(_model, 'after_insert', _content_inserted)
+    event.listen(_model, 'after_update', _content_updated)
+    event.listen(_model, 'after_delete', _content_deleted)
+event.listen(db.session, 'after_commit', _session_committed)
+event.listen(db.session, 'after_rollback', _session_rolled_back)
+
+
+if __name__ == '__main__':
+    from app import app
+
+    with app.app_context():
+        print(f"🌐 Content translations written: {translate_existing()}")
@@ -0,0 +1,422 @@
+"""
+Geo layer for the marketplace
+Places farmers and buyer offers on the map using district centroids from
+data/district_centroids.csv (state, district, aliases, headquarters pincode,
+latitude, longitude), and keeps pending BuyerOffers in an in-process grid
+index so nearby searches only look at the cells around the farmer.
+
+Districts are keyed by (state, district): names such as Aurangabad,
+Bilaspur and Hamirpur exist in more than one state. A lookup without a
+state only resolves a name that a single state in the table uses.
+
+The table is not a full list of India's districts: it covers the main
+oilseed districts (mostly Maharashtra, where the app's farmers are) and a
+few in other states. Farmers and offers in districts it does not list are
+placed by pincode prefix when one is known, and otherwise get no location
+and the no-distance fallback (best price first).
+
+- A farmer is placed by exact pincode, else district in the farmer's
+  state, else the 3-digit pincode prefix (postal sorting district).
+- An offer is placed at district_wanted, else a district named in
+  location_wanted (both looked up in the buyer's state first, then by a
+  name unique to one state), else the buyer's district in the buyer's
+  state, else buyer_location. Offers that cannot be placed have no
+  distance and are left out of radius searches.
+- nearby_offers(crop, origin, radius_km, limit): haversine distance,
+  nearest first (best price first at the same distance). Cells are visited
+  in rings around the origin until the nearest `limit` offers are settled.
+  Offers at the same centroid share one distance computation.
+
+The index is loaded with one query and then follows ORM changes: mapper
+events collect changed offers on the session and they are applied after
+commit (dropped on rollback). INDEX_MAX_AGE bounds staleness for writes
+made by other processes.
+"""
+import csv
+import heapq
+import math
+import os
+import re
+import threading
+import time
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+from extensions import db
+from models_marketplace import Buyer, BuyerOffer
+
+CENTROIDS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'district_centroids.csv')
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+GRID_DEGREES = 0.5          # ~55 km cells
+DEFAULT_RADIUS_KM = 150
+DEFAULT_NEARBY_LIMIT = 20
+MAX_NEARBY_LIMIT = 200
+INDEX_MAX_AGE = 5 * 60
+
+_offers = BuyerOffer.__table__
+_buyers = Buyer.__table__
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def crop_key(crop_name):
+    return (crop_name or '').strip().lower()
+
+
+def _name_key(text):
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', (text or '').lower()).split())
+
+
+# ==================== DISTRICT CENTROIDS ====================
+
+class DistrictCentroids:
+    """(state, district) name / pincode -> (lat, lon) lookups."""
+
+    def __init__(self, rows):
+        self.by_state = {}    # (state key, name key) -> point
+        self.by_name = {}     # name key -> point, for names used by a single state
+        self.by_pincode = {}
+        self.by_prefix = {}
+        states = {}           # name key -> {state key}
+        for row in rows:
+            point = (float(row['latitude']), float(row['longitude']))
+            state = _name_key(row['state'])
+            names = [row['district']] + [alias for alias in (row.get('aliases') or '').split('|') if alias]
+            for name in names:
+                self.by_state.setdefault((state, _name_key(name)), point)
+                states.setdefault(_name_key(name), set()).add(state)
+            pincode = (row.get('pincode') or '').strip()
+            if pincode:
+                self.by_pincode[pincode] = point
+                self.by_prefix.setdefault(pincode[:3], point)
+        for name, in_states in states.items():
+            if len(in_states) == 1:
+                self.by_name[name] = self.by_state[(next(iter(in_states)), name)]
+        # Longest names first, so "Mumbai Suburban" wins over "Mumbai" in free text
+        self.names = sorted(states, key=len, reverse=True)
+
+    def district(self, name, state=None):
+        """District in the given state; without a state, only a name unique to one state."""
+        if not name:
+            return None
+        if state:
+            return self.by_state.get((_name_key(state), _name_key(name)))
+        return self.by_name.get(_name_key(name))
+
+    def pincode(self, pincode, exact=True):
+        pincode = str(pincode or '').strip()
+        if len(pincode) != 6:
+            return None
+        return self.by_pincode.get(pincode) if exact else self.by_prefix.get(pincode[:3])
+
+    def text(self, text, state=None):
+        """First district (or alias) named anywhere in free text such as 'APMC Yard, Latur'."""
+        if not text:
+            return None
+        padded = f' {_name_key(text)} '
+        for name in self.names:
+            if f' {name} ' in padded:
+                point = self.district(name, state)
+                if point:
+                    return point
+        return None
+
+
+_centroids = None
+
+
+def get_centroids():
+    global _centroids
+    if _centroids is None:
+        with open(CENTROIDS_FILE, newline='', encoding='utf-8') as f:
+            _centroids = DistrictCentroids(csv.DictReader(f))
+    return _centroids
+
+
+def locate_place(district=None, pincode=None, text=None, state=None):
+    """(lat, lon) from exact pincode, district, pincode prefix or free text, in that order."""
+    centroids = get_centroids()
+    return (centroids.pincode(pincode)
+            or centroids.district(district, state)
+            or centroids.pincode(pincode, exact=False)
+            or centroids.text(text, state))
+
+
+def locate_farmer(farmer):
+    """(lat, lon) for a Farmer, or None."""
+    if farmer is None:
+        return None
+    return locate_place(farmer.district, farmer.pincode, state=farmer.state)
+
+
+def locate_offer(district_wanted=None, location_wanted=None, buyer_district=None, buyer_location=None,
+                 buyer_state=None):
+    """(lat, lon) for a BuyerOffer's sourcing area, or None."""
+    centroids = get_centroids()
+    # The wanted area may lie outside the buyer's state
+    wanted = ((buyer_state and centroids.district(district_wanted, buyer_state))
+              or centroids.district(district_wanted)
+              or (buyer_state and centroids.text(location_wanted, buyer_state))
+              or centroids.text(location_wanted))
+    return (wanted
+            or centroids.district(buyer_district, buyer_state)
+            or centroids.text(buyer_location, buyer_state))
+
+
+# ==================== GRID INDEX ====================
+
+def _entry(row):
+    """Index entry for a pending offer row (mapping with offer columns and buyer_district)."""
+    point = locate_offer(row['district_wanted'], row['location_wanted'],
+                         row.get('buyer_district'), row['buyer_location'], row.get('buyer_state'))
+    return {
+        'offer_id': row['id'],
+        'crop': crop_key(row['crop_name']),
+        'price': row['initial_price'],
+        'quantity_quintal': row['quantity_quintal'],
+        'buyer_name': row['buyer_name'] or row['buyer_company'] or 'Buyer',
+        'buyer_location': row['buyer_location'],
+        'buyer_mobile': row['buyer_mobile'],
+        'district': row['district_wanted'] or row.get('buyer_district'),
+        'point': point,
+    }
+
+
+class OfferGeoIndex:
+    """Pending buyer offers per crop, bucketed by grid cell and then by point."""
+
+    def __init__(self, entries=(), version=0, cell_degrees=GRID_DEGREES):
+        self.version = version
+        self.cell_degrees = cell_degrees
+        self.loaded_at = time.time()
+        self.cells = {}       # crop -> {cell: {point: {offer_id: entry}}}
+        self.extent = {}      # crop -> [min_row, max_row, min_col, max_col] of occupied cells
+        self.unplaced = {}    # crop -> {offer_id: entry}
+        self.located = {}     # offer_id -> (crop, cell, point); cell None when unplaced
+        for entry in entries:
+            self.add(entry)
+
+    def __len__(self):
+        return len(self.located)
+
+    def cell(self, lat, lon):
+        return math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees)
+
+    def add(self, entry):
+        self.remove(entry['offer_id'])
+        crop, point = entry['crop'], entry['point']
+        if point is None:
+            self.unplaced.setdefault(crop, {})[entry['offer_id']] = entry
+            self.located[entry['offer_id']] = (crop, None, None)
+            return
+        cell = self.cell(*point)
+        self.cells.setdefault(crop, {}).setdefault(cell, {}).setdefault(point, {})[entry['offer_id']] = entry
+        self.located[entry['offer_id']] = (crop, cell, point)
+        extent = self.extent.setdefault(crop, [cell[0], cell[0], cell[1], cell[1]])
+        extent[:] = [min(extent[0], cell[0]), max(extent[1], cell[0]),
+                     min(extent[2], cell[1]), max(extent[3], cell[1])]
+
+    def remove(self, offer_id):
+        crop, cell, point = self.located.pop(offer_id, (None, None, None))
+        if crop is None:
+            return
+        if cell is None:
+            del self.unplaced[crop][offer_id]
+            return
+        points = self.cells[crop][cell]
+        del points[point][offer_id]
+        if not points[point]:
+            del points[point]
+            if not points:
+                del self.cells[crop][cell]
+
+    def _ring(self, center, radius):
+        row, col = center
+        if radius == 0:
+            yield center
+            return
+        for c in range(col - radius, col + radius + 1):
+            yield row - radius, c
+            yield row + radius, c
+        for r in range(row - radius + 1, row + radius):
+            yield r, col - radius
+            yield r, col + radius
+
+    def nearby(self, crop_name, lat, lon, radius_km=DEFAULT_RADIUS_KM, limit=DEFAULT_NEARBY_LIMIT):
+        """
+        Offers for the crop within radius_km (None = any distance), nearest first,
+        as (distance_km, entry) pairs; at most `limit` (None = all).
+        """
+        cells = self.cells.get(crop_key(crop_name))
+        if not cells:
+            return []
+        center = self.cell(lat, lon)
+        extent = self.extent[crop_key(crop_name)]
+        max_ring = max(abs(center[0] - extent[0]), abs(center[0] - extent[1]),
+                       abs(center[1] - extent[2]), abs(center[1] - extent[3]))
+        if radius_km is not None:
+            # Narrowest cell side between here and the edge of the search radius
+            edge_lat = min(89.0, abs(lat) + radius_km / KM_PER_DEGREE)
+            cell_km = self.cell_degrees * KM_PER_DEGREE * math.cos(math.radians(edge_lat))
+            max_ring = min(max_ring, int(radius_km // cell_km) + 1)
+
+        groups = []     # (distance, -best price, point, entries) per occupied point
+        for ring in range(max_ring + 1):
+            if limit and ring > 0 and self._settled(groups, limit, ring, lat):
+                break
+            for cell in self._ring(center, ring):
+                for point, entries in cells.get(cell, {}).items():
+                    distance = haversine_km(lat, lon, *point)
+                    if radius_km is None or distance <= radius_km:
+                        groups.append((distance, point, entries))
+
+        groups.sort(key=lambda group: group[0])
+        results = []
+        for distance, _, entries in groups:
+            wanted = len(entries) if not limit else limit - len(results)
+            if wanted <= 0:
+                break
+            best = heapq.nlargest(wanted, entries.values(), key=lambda entry: entry['price'] or 0)
+            results.extend((distance, entry) for entry in best)
+        return results
+
+    def _settled(self, groups, limit, ring, lat):
+        """True when `limit` offers are already closer than anything in `ring` can be."""
+        if sum(len(entries) for _, _, entries in groups) < limit:
+            return False
+        # Every point in ring r is at least (r - 1) cells away along one axis
+        edge_lat = min(89.0, abs(lat) + ring * self.cell_degrees)
+        ring_km = (ring - 1) * self.cell_degrees * KM_PER_DEGREE * math.cos(math.radians(edge_lat))
+        count = 0
+        for distance, _, entries in sorted(groups, key=lambda group: group[0]):
+            count += len(entries)
+            if count >= limit:
+                return distance <= ring_km
+        return False
+
+    def best_priced(self, crop_name, limit=DEFAULT_NEARBY_LIMIT):
+        """All offers for the crop (placed or not), best price first, without distances."""
+        key = crop_key(crop_name)
+        entries = [entry for points in self.cells.get(key, {}).values()
+                   for group in points.values() for entry in group.values()]
+        entries.extend(self.unplaced.get(key, {}).values())
+        if limit:
+            return heapq.nlargest(limit, entries, key=lambda entry: entry['price'] or 0)
+        return sorted(entries, key=lambda entry: entry['price'] or 0, reverse=True)
+
+
+_index = None
+_version = 0
+_lock = threading.RLock()
+
+
+def _pending_offers_query():
+    return (select(_offers, _buyers.c.district.label('buyer_district'), _buyers.c.state.label('buyer_state'))
+            .select_from(_offers)
+            .outerjoin(_buyers, _buyers.c.id == _offers.c.buyer_id)
+            .where(_offers.c.status == 'pending'))
+
+
+def get_offer_index():
+    """Current index, loading it (one query) when missing or too old."""
+    global _index
+    index = _index
+    if index is not None and time.time() - index.loaded_at < INDEX_MAX_AGE:
+        return index
+
+    with _lock:
+        version = _version
+        rows = db.session.execute(_pending_offers_query()).mappings()
+        index = OfferGeoIndex((_entry(row) for row in rows), version)
+        # Keep it only if no commit changed offers while loading
+        if version == _version:
+            _index = index
+        return index
+
+
+def invalidate_offer_index():
+    """Drop the index; the next reader reloads it."""
+    global _index, _version
+    with _lock:
+        _version += 1
+        _index = None
+
+
+def nearby_offers(crop_name, origin, radius_km=DEFAULT_RADIUS_KM, limit=DEFAULT_NEARBY_LIMIT):
+    """
+    Pending offers for a crop as dicts with distance_km, nearest first.
+    Without an origin, the best-priced offers with distance_km None.
+    """
+    index = get_offer_index()
+    with _lock:
+        if origin is None:
+            return [dict(entry, distance_km=None) for entry in index.best_priced(crop_name, limit)]
+        return [dict(entry, distance_km=round(distance, 1))
+                for distance, entry in index.nearby(crop_name, *origin, radius_km=radius_km, limit=limit)]
+
+
+# ==================== CHANGE TRACKING ====================
+
+PENDING_CHANGES = 'geo_index_offer_changes'
+
+
+def _record(target, entry):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(PENDING_CHANGES, {})[target.id] = entry
+
+
+def _offer_saved(mapper, connection, target):
+    if (target.status or 'pending') != 'pending':
+        _record(target, None)
+        return
+    row = {attr.key: getattr(target, attr.key) for attr in mapper.column_attrs}
+    row['buyer_district'] = row['buyer_state'] = None
+    if target.buyer_id:
+        buyer = connection.execute(
+            select(_buyers.c.district, _buyers.c.state).where(_buyers.c.id == target.buyer_id)
+        ).first()
+        if buyer:
+            row['buyer_district'], row['buyer_state'] = buyer
+    _record(target, _entry(row))
+
+
+def _offer_deleted(mapper, connection, target):
+    _record(target, None)
+
+
+def _apply_changes(session):
+    global _version
+    changes = session.info.pop(PENDING_CHANGES, None)
+    if not changes:
+        return
+    with _lock:
+        _version += 1
+        if _index is None:
+            return
+        for offer_id, entry in changes.items():
+            if entry is None:
+                _index.remove(offer_id)
+            else:
+                _index.add(entry)
+        _index.version = _version
+
+
+def _discard_changes(session):
+    session.info.pop(PENDING_CHANGES, None)
+
+
+event.listen(BuyerOffer, 'after_insert', _offer_saved)
+event.listen(BuyerOffer, 'after_update', _offer_saved)
+event.listen(BuyerOffer, 'after_delete', _offer_deleted)
+event.listen(Session, 'after_commit', _apply_changes)
+event.listen(Session, 'after_rollback', _discard_changes)
@@ -0,0 +1,393 @@
+"""
+Background LLM (Gemini) scheme recommendations
+The subsidies page answers with the rule-based recommendations straight
+away and calls request_upgrade(); the Gemini call then runs on a job queue
+and replaces the farmer's rule-based rows when it finishes.
+
+- Prompts are built from normalized profile features only, so farmers with
+  the same features and the same scheme catalogue share one prompt. Results
+  are cached under sha256(features, catalogue version) and identical jobs
+  already in flight are merged.
+- A token bucket (GEMINI_REQUESTS_PER_MINUTE) spaces out model calls; a
+  quota error empties the bucket so the next call waits for a refill.
+- Failed keys are remembered for FAILURE_TTL seconds; until then requests
+  for them get 'retry_later' instead of queueing another doomed call.
+- The queue backend is swappable: ThreadJobQueue runs jobs on a worker
+  thread inside the app process, InlineJobQueue is the stand-in for tests.
+  The queue is bounded (JOB_QUEUE_SIZE); when it is full the request is
+  answered with 'retry_later' and the farmer keeps the rule-based rows.
+"""
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from extensions import db
+from models import Farmer, Scheme, FarmerRecommendation
+from scheme_eligibility import get_scheme_index, profile_hash
+
+try:
+    import google.generativeai as genai
+    GEMINI_AVAILABLE = True
+except ImportError:
+    GEMINI_AVAILABLE = False
+
+GEMINI_MODEL = 'gemini-2.5-flash'
+REQUESTS_PER_MINUTE = float(os.getenv('GEMINI_REQUESTS_PER_MINUTE', 10))
+BURST = int(os.getenv('GEMINI_BURST', 3))
+RESULT_CACHE_SIZE = 2048
+RESULT_CACHE_TTL = 24 * 60 * 60
+FAILURE_TTL = int(os.getenv('GEMINI_FAILURE_TTL_SECONDS', 10 * 60))
+JOB_QUEUE_SIZE = int(os.getenv('GEMINI_JOB_QUEUE_SIZE', 100))
+RECOMMENDATION_TTL = timedelta(hours=24)
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, at most `capacity` saved up."""
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if available. Returns 0 on success, else seconds to wait."""
+        with self.lock:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            return (tokens - self.tokens) / self.rate
+
+    def acquire(self, tokens=1, sleep=time.sleep):
+        """Block until tokens are available."""
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return
+            sleep(wait)
+
+    def drain(self):
+        """Drop all saved tokens (after the upstream reports quota exhaustion)."""
+        with self.lock:
+            self._refill()
+            self.tokens = 0.0
+
+
+class ResultCache:
+    """Small LRU with expiry for model results, keyed by content hash."""
+
+    def __init__(self, maxsize=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL, clock=time.time):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if self.clock() - stored_at > self.ttl:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (self.clock(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class ThreadJobQueue:
+    """Runs submitted jobs one at a time on a daemon thread, inside an app context."""
+
+    def __init__(self, maxsize=JOB_QUEUE_SIZE):
+        self.jobs = queue.Queue(maxsize=maxsize)
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        """Queue a job. Returns False (job dropped) when the queue is full."""
+        app = current_app._get_current_object()
+        try:
+            self.jobs.put_nowait((app, fn, args))
+        except queue.Full:
+            return False
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='llm-recommendations', daemon=True)
+                self.thread.start()
+        return True
+
+    def _run(self):
+        while True:
+            app, fn, args = self.jobs.get()
+            with app.app_context():
+                try:
+                    fn(*args)
+                except Exception as e:
+                    print(f"❌ LLM recommendation job failed: {e}")
+                finally:
+                    db.session.remove()
+
+
+class InlineJobQueue:
+    """Stand-in backend: holds jobs until run_pending() is called."""
+
+    def __init__(self, maxsize=JOB_QUEUE_SIZE):
+        self.jobs = []
+        self.maxsize = maxsize
+
+    def submit(self, fn, *args):
+        if len(self.jobs) >= self.maxsize:
+            return False
+        self.jobs.append((fn, args))
+        return True
+
+    def run_pending(self):
+        jobs, self.jobs = self.jobs, []
+        for fn, args in jobs:
+            fn(*args)
+        return len(jobs)
+
+
+def _gemini_generate(prompt):
+    genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
+    model = genai.GenerativeModel(GEMINI_MODEL)
+    return model.generate_content(prompt).text
+
+
+def profile_features(farmer):
+    """Normalized farmer features sent to the model (no names or village-level detail)."""
+    crops = sorted({c.strip().lower() for c in (farmer.current_crops or '').split(',') if c.strip()})
+    return {
+        'state': (farmer.state or '').strip().lower(),
+        'district': (farmer.district or '').strip().lower(),
+        # Half-hectare steps are as precise as any scheme rule gets
+        'land_area_hectares': round((farmer.total_land_area_hectares or 0.0) * 2) / 2,
+        'land_holder_type': (farmer.land_holder_type or '').strip().lower(),
+        'soil_type': (farmer.soil_type or '').strip().lower(),
+        'current_crops': crops,
+        'caste_category': (farmer.caste_category or '').strip().upper(),
+        'is_oilseed_farmer': bool(farmer.is_oilseed_farmer),
+        'is_pm_kisan_beneficiary': bool(farmer.is_pm_kisan_beneficiary),
+        'is_physically_handicapped': bool(farmer.is_physically_handicapped),
+    }
+
+
+def catalogue_version():
+    """Version string of the active scheme catalogue."""
+    return repr(get_scheme_index().fingerprint)
+
+
+def cache_key(features, version):
+    payload = json.dumps({'features': features, 'catalogue': version}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def build_prompt(features, schemes):
+    schemes_list = [
+        {
+            'id': s.id,
+            'name': s.name,
+            'description': s.description,
+            'benefit_amount': s.benefit_amount,
+            'eligibility': s.eligibility_criteria,
+            'focus_area': s.focus_area,
+            'scheme_type': s.scheme_type
+        }
+        for s in schemes
+    ]
+    return f"""
+You are an agricultural subsidy and scheme recommendation expert for Indian farmers.
+
+FARMER PROFILE:
+{json.dumps(features, indent=2)}
+
+AVAILABLE SCHEMES & SUBSIDIES:
+{json.dumps(schemes_list, indent=2)}
+
+Based on the farmer's profile, recommend TOP 5 most relevant schemes.
+
+Consider:
+1. Land area and type
+2. Current crops (especially oilseeds)
+3. Caste category eligibility
+4. Disability benefits
+5. Geographic location
+6. Income level
+7. Existing beneficiary status
+
+Return ONLY valid JSON:
+{{
+    "recommended_schemes": [
+        {{"scheme_id": "id", "priority": "high", "match_percentage": 90, "reason": "Why suitable"}}
+    ]
+}}
+"""
+
+
+def parse_response(text, scheme_ids):
+    """Pull the recommended_schemes list out of the model's reply, keeping known schemes only."""
+    json_start = text.find('{')
+    json_end = text.rfind('}') + 1
+    if json_start == -1 or json_end <= json_start:
+        return None
+    recommendations = json.loads(text[json_start:json_end]).get('recommended_schemes') or []
+    return [
+        {
+            'scheme_id': rec['scheme_id'],
+            'priority': rec.get('priority', 'medium'),
+            'match_percentage': rec.get('match_percentage', 75),
+            'reason': rec.get('reason', ''),
+        }
+        for rec in recommendations if rec.get('scheme_id') in scheme_ids
+    ]
+
+
+class LLMRecommender:
+    """Dedupes, rate-limits and runs Gemini recommendation jobs."""
+
+    def __init__(self, job_queue=None, generate=None, bucket=None, cache=None, failures=None):
+        self.job_queue = job_queue or ThreadJobQueue()
+        self.generate = generate or _gemini_generate
+        self.bucket = bucket or TokenBucket(REQUESTS_PER_MINUTE / 60.0, BURST)
+        self.cache = cache or ResultCache()
+        self.failures = failures or ResultCache(ttl=FAILURE_TTL)   # cache key -> error message
+        self.pending = {}            # cache key -> farmer ids waiting on it
+        self.lock = threading.Lock()
+        self.stats = {'calls': 0, 'cache_hits': 0, 'merged': 0, 'failures': 0, 'rejected': 0}
+
+    @property
+    def enabled(self):
+        return self.generate is not _gemini_generate or (GEMINI_AVAILABLE and bool(os.getenv('GEMINI_API_KEY')))
+
+    def request_upgrade(self, farmer):
+        """
+        Ask for LLM recommendations for a farmer without waiting on the model.
+        Returns 'cached' (rows already written), 'queued', 'retry_later'
+        (the key failed recently or the job queue is full) or 'disabled'.
+        """
+        if not self.enabled:
+            return 'disabled'
+
+        features = profile_features(farmer)
+        key = cache_key(features, catalogue_version())
+        result = self.cache.get(key)
+        if result is not None:
+            self.stats['cache_hits'] += 1
+            store_recommendations([farmer.id], result)
+            return 'cached'
+        if self.failures.get(key) is not None:
+            return 'retry_later'
+
+        with self.lock:
+            waiting = self.pending.get(key)
+            if waiting is not None:
+                waiting.add(farmer.id)
+                self.stats['merged'] += 1
+                return 'queued'
+            # Submitting under the lock: nobody can merge into a job that is then dropped
+            if not self.job_queue.submit(self.run_job, key, features):
+                self.stats['rejected'] += 1
+                return 'retry_later'
+            self.pending[key] = {farmer.id}
+        return 'queued'
+
+    def upgrade_status(self, farmer):
+        """'queued' while the farmer's job is in flight, 'retry_later' after it failed, else None."""
+        if self.is_pending(farmer.id):
+            return 'queued'
+        key = cache_key(profile_features(farmer), catalogue_version())
+        return 'retry_later' if self.failures.get(key) is not None else None
+
+    def is_pending(self, farmer_id):
+        with self.lock:
+            return any(farmer_id in ids for ids in self.pending.values())
+
+    def run_job(self, key, features):
+        """
+        Job body: call the model once and store the result for every waiting farmer.
+        Returns 'done', or 'failed' after remembering the failure for FAILURE_TTL.
+        """
+        try:
+            result = self.cache.get(key)
+            if result is None:
+                schemes = Scheme.query.filter_by(is_active=True).all()
+                self.bucket.acquire()
+                self.stats['calls'] += 1
+                try:
+                    text = self.generate(build_prompt(features, schemes))
+                except Exception as e:
+                    if 'quota' in str(e).lower() or '429' in str(e):
+                        self.bucket.drain()
+                    raise
+                result = parse_response(text, {s.id for s in schemes})
+                if not result:
+                    raise ValueError('Model returned no usable recommendations')
+                self.cache.put(key, result)
+        except Exception as e:
+            self.stats['failures'] += 1
+            print(f"Gemini API error: {str(e)}")
+            self.failures.put(key, str(e))
+            with self.lock:
+                self.pending.pop(key, None)
+            return 'failed'
+
+        with self.lock:
+            farmer_ids = self.pending.pop(key, set())
+        store_recommendations(farmer_ids, result)
+        return 'done'
+
+
+def store_recommendations(farmer_ids, result):
+    """Replace the farmers' stored recommendations with LLM picks."""
+    farmer_ids = list(farmer_ids)
+    if not farmer_ids:
+        return
+    expires_at = datetime.now() + RECOMMENDATION_TTL
+    hashes = {farmer.id: profile_hash(farmer) for farmer in Farmer.query.filter(Farmer.id.in_(farmer_ids))}
+    FarmerRecommendation.query.filter(
+        FarmerRecommendation.farmer_id.in_(farmer_ids)
+    ).delete(synchronize_session=False)
+    db.session.add_all([
+        FarmerRecommendation(
+            farmer_id=farmer_id,
+            scheme_id=rec['scheme_id'],
+            priority=rec['priority'],
+            match_percentage=rec['match_percentage'],
+            reason=rec['reason'],
+            ai_method='gemini',
+            profile_hash=hashes.get(farmer_id),
+            expires_at=expires_at
+        )
+        for farmer_id in farmer_ids for rec in result
+    ])
+    db.session.commit()
+
+
+llm_recommender = LLMRecommender()
@@ -0,0 +1,366 @@
+"""
+Continuous matching between farmers' SellRequests (asks) and BuyerOffers (bids)
+For every crop the engine keeps an in-process book of open asks (cheapest
+first) and open bids (highest first), each bucketed by geo_index grid cell.
+A new order is matched against the other side in price-time priority:
+it crosses while ask price <= bid price, the two are within
+MAX_MATCH_DISTANCE_KM (orders without a known location match at any
+distance), and both still have quantity left. Each cross becomes a
+MatchProposal for the smaller remaining quantity at the resting order's
+price, so a large order fills partially against several counterparties;
+whatever is left rests in the book.
+
+Adding an order is a bisect plus a list insert into its cell bucket
+(O(log k) comparisons and an O(k) shift for a bucket of k orders; buckets
+are per grid cell, so k stays small), and matching walks only the buckets
+within range with a heap merge. An order's remaining quantity is its
+quantity minus its non-declined proposals.
+
+marketplace.create_sell_request and buyer_auth.create_offer call
+match_sell_request / match_buyer_offer after committing the new order.
+The books are loaded with one query per side and reloaded after
+ENGINE_MAX_AGE. The book can be behind other worker processes, so before
+proposing, the new order's and the counterparties' rows are locked
+(SELECT ... FOR UPDATE, sell requests before buyer offers, each by id) and
+their remaining quantity is recomputed from every process's proposals;
+fills are redone until the book agrees with the database. Counterparties
+that are no longer pending or have nothing left leave the book.
+"""
+import heapq
+import math
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+from extensions import db
+from geo_index import GRID_DEGREES, KM_PER_DEGREE, crop_key, haversine_km, locate_offer, locate_place
+from models import Farmer, Notification
+from models_marketplace import Buyer, BuyerOffer, MatchProposal, SellRequest
+from notification_service import add_notifications
+
+MAX_MATCH_DISTANCE_KM = 300
+ENGINE_MAX_AGE = 5 * 60
+MIN_FILL_QUINTAL = 0.01
+
+ASK, BID = 'ask', 'bid'
+
+_sell = SellRequest.__table__
+_offer = BuyerOffer.__table__
+_farmers = Farmer.__table__
+_buyers = Buyer.__table__
+_proposals = MatchProposal.__table__
+
+
+class Order:
+    """Open quantity of one SellRequest (ask) or BuyerOffer (bid)."""
+    __slots__ = ('id', 'side', 'crop', 'price', 'remaining', 'created_at', 'point', 'owner_id')
+
+    def __init__(self, id, side, crop, price, remaining, created_at=None, point=None, owner_id=None):
+        self.id = id
+        self.side = side
+        self.crop = crop
+        self.price = float(price)
+        self.remaining = float(remaining)
+        self.created_at = created_at or datetime.utcnow()
+        self.point = point
+        self.owner_id = owner_id
+
+    @property
+    def priority(self):
+        """Book order: cheapest ask / highest bid first, then oldest."""
+        return (self.price if self.side == ASK else -self.price, self.created_at, self.id)
+
+    def crosses(self, other):
+        ask, bid = (self, other) if self.side == ASK else (other, self)
+        return ask.price <= bid.price
+
+
+class OrderBook:
+    """One side of one crop's book: priority-sorted orders per grid cell (None = no location)."""
+
+    def __init__(self, cell_degrees=GRID_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.buckets = {}     # cell -> sorted [(priority, order)]
+        self.orders = {}      # order id -> (cell, order)
+
+    def __len__(self):
+        return len(self.orders)
+
+    def cell(self, point):
+        if point is None:
+            return None
+        return math.floor(point[0] / self.cell_degrees), math.floor(point[1] / self.cell_degrees)
+
+    def add(self, order):
+        cell = self.cell(order.point)
+        insort(self.buckets.setdefault(cell, []), (order.priority, order))
+        self.orders[order.id] = (cell, order)
+
+    def remove(self, order_id):
+        cell, order = self.orders.pop(order_id, (None, None))
+        if order is None:
+            return
+        bucket = self.buckets[cell]
+        del bucket[bisect_left(bucket, (order.priority,))]
+        if not bucket:
+            del self.buckets[cell]
+
+    def _cells_near(self, point, max_km):
+        if point is None:
+            return list(self.buckets)
+        # Cell range of the bounding box of the search circle, plus orders without a location
+        lat, lon = point
+        dlat = max_km / KM_PER_DEGREE
+        dlon = max_km / (KM_PER_DEGREE * max(math.cos(math.radians(min(89.0, abs(lat) + dlat))), 0.01))
+        rows = range(math.floor((lat - dlat) / self.cell_degrees), math.floor((lat + dlat) / self.cell_degrees) + 1)
+        cols = range(math.floor((lon - dlon) / self.cell_degrees), math.floor((lon + dlon) / self.cell_degrees) + 1)
+        if len(rows) * len(cols) > len(self.buckets):
+            return [cell for cell in self.buckets if cell is None or (cell[0] in rows and cell[1] in cols)]
+        return [None] + [(row, col) for row in rows for col in cols]
+
+    def candidates(self, point, max_km):
+        """Orders in priority order from every bucket that can be within max_km of point."""
+        buckets = [self.buckets[cell] for cell in self._cells_near(point, max_km) if cell in self.buckets]
+        for _, order in heapq.merge(*buckets, key=lambda item: item[0]):
+            yield order
+
+
+class MatchingEngine:
+    """Ask and bid books for every crop."""
+
+    def __init__(self, max_distance_km=MAX_MATCH_DISTANCE_KM):
+        self.max_distance_km = max_distance_km
+        self.loaded_at = time.time()
+        self.books = {}       # (crop, side) -> OrderBook
+
+    def book(self, crop, side):
+        return self.books.setdefault((crop, side), OrderBook())
+
+    def add(self, order):
+        if order.remaining >= MIN_FILL_QUINTAL:
+            self.book(order.crop, order.side).add(order)
+
+    def remove(self, order):
+        self.book(order.crop, order.side).remove(order.id)
+
+    def distance(self, a, b):
+        if a.point is None or b.point is None:
+            return None
+        return haversine_km(*a.point, *b.point)
+
+    def find_matches(self, order):
+        """
+        Fills for a new order against the opposite book without changing either:
+        [(resting order, quantity, distance_km)] in priority order.
+        """
+        opposite = self.book(order.crop, BID if order.side == ASK else ASK)
+        left, fills = order.remaining, []
+        for resting in opposite.candidates(order.point, self.max_distance_km):
+            if not order.crosses(resting):
+                break
+            distance = self.distance(order, resting)
+            if distance is not None and distance > self.max_distance_km:
+                continue
+            quantity = min(left, resting.remaining)
+            fills.append((resting, quantity, distance))
+            left -= quantity
+            if left < MIN_FILL_QUINTAL:
+                break
+        return fills
+
+    def apply(self, order, fills):
+        """Take the filled quantity off both sides and rest what is left of the new order."""
+        for resting, quantity, _ in fills:
+            resting.remaining -= quantity
+            if resting.remaining < MIN_FILL_QUINTAL:
+                self.remove(resting)
+            order.remaining -= quantity
+        self.add(order)
+
+
+# ==================== LOADING ====================
+
+def _ask_order(row, reserved=0.0):
+    return Order(row['id'], ASK, crop_key(row['crop_name']), row['expected_price'],
+                 row['quantity_quintal'] - reserved, row['created_at'],
+                 locate_place(row['district'], row['pincode'], row['location'], row['state']),
+                 row['farmer_id'])
+
+
+def _bid_order(row, reserved=0.0):
+    return Order(row['id'], BID, crop_key(row['crop_name']), row['initial_price'],
+                 row['quantity_quintal'] - reserved, row['created_at'],
+                 locate_offer(row['district_wanted'], row['location_wanted'],
+                              row['buyer_district'], row['buyer_location'], row['buyer_state']), row['buyer_id'])
+
+
+def _asks_query():
+    return (select(_sell.c.id, _sell.c.farmer_id, _sell.c.crop_name, _sell.c.quantity_quintal,
+                   _sell.c.expected_price, _sell.c.location, _sell.c.created_at,
+                   _farmers.c.district, _farmers.c.pincode, _farmers.c.state)
+            .select_from(_sell).outerjoin(_farmers, _farmers.c.id == _sell.c.farmer_id)
+            .where(_sell.c.status == 'pending', _sell.c.expected_price > 0))
+
+
+def _bids_query():
+    return (select(_offer.c.id, _offer.c.buyer_id, _offer.c.crop_name, _offer.c.quantity_quintal,
+                   _offer.c.initial_price, _offer.c.district_wanted, _offer.c.location_wanted,
+                   _offer.c.buyer_location, _offer.c.created_at, _buyers.c.district.label('buyer_district'),
+                   _buyers.c.state.label('buyer_state'))
+            .select_from(_offer).outerjoin(_buyers, _buyers.c.id == _offer.c.buyer_id)
+            .where(_offer.c.status == 'pending', _offer.c.initial_price > 0))
+
+
+def _reserved(column, ids=None):
+    """{order id: quantity held by non-declined proposals}"""
+    query = select(column, func.sum(_proposals.c.quantity_quintal)).where(_proposals.c.status != 'declined')
+    if ids is not None:
+        query = query.where(column.in_(ids))
+    return dict(db.session.execute(query.group_by(column)).all())
+
+
+def load_engine():
+    """Books of every pending order with quantity left (one query per side)."""
+    engine = MatchingEngine()
+    held = _reserved(_proposals.c.sell_request_id)
+    for row in db.session.execute(_asks_query()).mappings():
+        engine.add(_ask_order(row, held.get(row['id'], 0.0)))
+    held = _reserved(_proposals.c.buyer_offer_id)
+    for row in db.session.execute(_bids_query()).mappings():
+        engine.add(_bid_order(row, held.get(row['id'], 0.0)))
+    return engine
+
+
+_engine = None
+_lock = threading.RLock()
+
+
+def get_matching_engine():
+    """Current engine, loading the books when missing or too old."""
+    global _engine
+    engine = _engine
+    if engine is not None and time.time() - engine.loaded_at < ENGINE_MAX_AGE:
+        return engine
+    with _lock:
+        if _engine is None or time.time() - _engine.loaded_at >= ENGINE_MAX_AGE:
+            _engine = load_engine()
+        return _engine
+
+
+def reset_matching_engine():
+    """Drop the books; the next call reloads them."""
+    global _engine
+    with _lock:
+        _engine = None
+
+
+# ==================== MATCHING ====================
+
+def _lock_available(orders):
+    """
+    Lock the rows of orders that are still pending (sell requests first, each
+    by id, so concurrent matchers take locks in the same order) and return
+    {order id: quantity not held by any non-declined proposal}.
+    """
+    available = {}
+    for side, table, column in ((ASK, _sell, _proposals.c.sell_request_id),
+                                (BID, _offer, _proposals.c.buyer_offer_id)):
+        ids = sorted(o.id for o in orders if o.side == side)
+        if not ids:
+            continue
+        rows = db.session.execute(
+            select(table.c.id, table.c.quantity_quintal)
+            .where(table.c.id.in_(ids), table.c.status == 'pending')
+            .order_by(table.c.id).with_for_update()
+        ).all()
+        held = _reserved(column, [row.id for row in rows])
+        available.update({row.id: row.quantity_quintal - held.get(row.id, 0.0) for row in rows})
+    return available
+
+
+def _match(order):
+    """Propose trades for a new order and rest its remainder. Returns the MatchProposals."""
+    with _lock:
+        engine = get_matching_engine()
+        # Books loaded after the order was committed already hold it; match it afresh
+        engine.remove(order)
+
+        while True:
+            fills = engine.find_matches(order) if order.remaining >= MIN_FILL_QUINTAL else []
+            if not fills:
+                break
+            # Other processes may have proposed against these orders since the book was loaded
+            available = _lock_available([order] + [resting for resting, _, _ in fills])
+            changed = False
+            for current in [order] + [resting for resting, _, _ in fills]:
+                free = available.get(current.id, 0.0)
+                if free < current.remaining - MIN_FILL_QUINTAL / 2:
+                    current.remaining = free
+                    changed = True
+                    if current is not order and free < MIN_FILL_QUINTAL:
+                        engine.remove(current)
+            if not changed:
+                break
+
+        proposals = []
+        for resting, quantity, distance in fills:
+            ask, bid = (order, resting) if order.side == ASK else (resting, order)
+            proposals.append(MatchProposal(
+                sell_request_id=ask.id,
+                buyer_offer_id=bid.id,
+                crop_key=order.crop,
+                quantity_quintal=round(quantity, 2),
+                price=resting.price,
+                ask_price=ask.price,
+                bid_price=bid.price,
+                distance_km=round(distance, 1) if distance is not None else None,
+                status='proposed'
+            ))
+        if proposals:
+            db.session.add_all(proposals)
+            if order.side == BID:
+                _notify_farmers(order, fills)
+        # Releases the row locks
+        db.session.commit()
+        engine.apply(order, fills)
+        if proposals:
+            print(f"🤝 {len(proposals)} match proposal(s) for {order.side} {order.id} ({order.crop})")
+        return proposals
+
+
+def _notify_farmers(bid, fills):
+    """Tell each farmer whose sell request a new buyer offer matched."""
+    add_notifications([Notification(
+        farmer_id=ask.owner_id,
+        title=f'Buyer found for your {ask.crop.title()}',
+        description=(f'A buyer wants {quantity:g} quintal at ₹{ask.price:g}/quintal'
+                     + (f', {distance:.0f} km away.' if distance is not None else '.')),
+        notification_type='market_match',
+        related_id=ask.id,
+        related_type='sell_request',
+        action_link='/market/all-deals',
+    ) for ask, quantity, distance in fills if ask.owner_id], commit=False)
+
+
+def match_sell_request(sell_request):
+    """Match a newly committed SellRequest against open buyer offers."""
+    farmer = db.session.get(Farmer, sell_request.farmer_id)
+    point = locate_place(farmer.district if farmer else None, farmer.pincode if farmer else None,
+                         sell_request.location, farmer.state if farmer else None)
+    held = _reserved(_proposals.c.sell_request_id, [sell_request.id]).get(sell_request.id, 0.0)
+    return _match(Order(sell_request.id, ASK, crop_key(sell_request.crop_name), sell_request.expected_price,
+                        sell_request.quantity_quintal - held, sell_request.created_at, point,
+                        sell_request.farmer_id))
+
+
+def match_buyer_offer(offer):
+    """Match a newly committed BuyerOffer against open sell requests."""
+    buyer = db.session.get(Buyer, offer.buyer_id) if offer.buyer_id else None
+    point = locate_offer(offer.district_wanted, offer.location_wanted, buyer.district if buyer else None,
+                         offer.buyer_location, buyer.state if buyer else None)
+    held = _reserved(_proposals.c.buyer_offer_id, [offer.id]).get(offer.id, 0.0)
+    return _match(Order(offer.id, BID, crop_key(offer.crop_name), offer.initial_price,
+                        offer.quantity_quintal - held, offer.created_at, point, offer.buyer_id))
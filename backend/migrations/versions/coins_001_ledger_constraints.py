@@ -0,0 +1,69 @@
+"""Backfill coin ledger, repair overdrawn balances, add balance check and ledger index.
+
+Revision ID: coins_001
+Revises: recommendations_001
+Create Date: 2025-12-13
+
+"""
+import uuid
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'coins_001'
+down_revision = 'recommendations_001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    # Balances credited outside the ledger get an opening-balance entry so the
+    # ledger sums match the materialized columns. Where the ledger already holds
+    # more than the column, a negative correction entry brings it back down.
+    rows = bind.execute(sa.text("""
+        SELECT b.id, COALESCE(b.total_coins, 0), COALESCE(b.redeemed_coins, 0),
+               COALESCE(SUM(CASE WHEN t.transaction_type IN ('earned', 'refund') THEN t.amount ELSE 0 END), 0),
+               COALESCE(SUM(CASE WHEN t.transaction_type = 'redeemed' THEN t.amount ELSE 0 END), 0)
+        FROM coin_balances b LEFT JOIN coin_transactions t ON t.coin_balance_id = b.id
+        GROUP BY b.id, b.total_coins, b.redeemed_coins
+    """)).fetchall()
+    insert = sa.text("""
+        INSERT INTO coin_transactions (id, coin_balance_id, transaction_type, amount, reason, created_at)
+        VALUES (:id, :balance_id, :type, :amount, :reason, :created_at)
+    """)
+    now = datetime.utcnow()
+    for balance_id, total, redeemed, ledger_earned, ledger_redeemed in rows:
+        for tx_type, diff in (('earned', total - ledger_earned), ('redeemed', redeemed - ledger_redeemed)):
+            if diff:
+                bind.execute(insert, {'id': str(uuid.uuid4()), 'balance_id': balance_id, 'type': tx_type,
+                                      'amount': diff, 'created_at': now,
+                                      'reason': 'Opening balance' if diff > 0 else 'Opening balance correction'})
+
+    # The check constraint below would fail on overdrawn balances: credit them
+    # back to zero, with a ledger entry for each credit.
+    overdrawn = bind.execute(sa.text(
+        "SELECT id, available_coins FROM coin_balances WHERE available_coins < 0"
+    )).fetchall()
+    for balance_id, available in overdrawn:
+        bind.execute(insert, {'id': str(uuid.uuid4()), 'balance_id': balance_id, 'type': 'earned',
+                              'amount': -available, 'reason': 'Negative balance correction', 'created_at': now})
+        bind.execute(sa.text("""
+            UPDATE coin_balances
+            SET total_coins = COALESCE(total_coins, 0) + :credit, available_coins = 0, updated_at = :now
+            WHERE id = :id
+        """), {'credit': -available, 'now': now, 'id': balance_id})
+
+    op.create_index('ix_coin_transactions_balance_created', 'coin_transactions', ['coin_balance_id', 'created_at'], unique=False)
+    with op.batch_alter_table('coin_balances', schema=None) as batch_op:
+        batch_op.create_check_constraint('ck_coin_balances_available_nonnegative', 'available_coins >= 0')
+
+
+def downgrade():
+    with op.batch_alter_table('coin_balances', schema=None) as batch_op:
+        batch_op.drop_constraint('ck_coin_balances_available_nonnegative', type_='check')
+    op.drop_index('ix_coin_transactions_balance_created', table_name='coin_transactions')
@@ -0,0 +1,36 @@
+"""Add content_translations for pre-translated scheme and offer text.
+
+Revision ID: content_i18n_001
+Revises: notifications_001
+Create Date: 2025-12-13
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'content_i18n_001'
+down_revision = 'notifications_001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('content_translations',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('content_type', sa.String(length=30), nullable=False),
+    sa.Column('content_id', sa.String(length=36), nullable=False),
+    sa.Column('language', sa.String(length=5), nullable=False),
+    sa.Column('field', sa.String(length=50), nullable=False),
+    sa.Column('source_hash', sa.String(length=64), nullable=False),
+    sa.Column('text', sa.Text(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('content_type', 'language', 'content_id', 'field', name='uq_content_translations_key')
+    )
+    # Existing rows are translated by running: python content_i18n.py
+
+
+def downgrade():
+    op.drop_table('content_translations')
@@ -0,0 +1,31 @@
+"""Add (farmer_id, created_at, id) indexes for the paginated deals feed.
+
+Revision ID: deals_feed_001
+Revises: price_summaries_001
+Create Date: 2025-12-13
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'deals_feed_001'
+down_revision = 'price_summaries_001'
+branch_labels = None
+depends_on = None
+
+DEAL_FEED_COLUMNS = ['crop_name', 'quantity_quintal', 'expected_price', 'harvest_date', 'status']
+
+
+def upgrade():
+    # INCLUDE columns make these covering on PostgreSQL; other databases ignore them
+    op.create_index('ix_sell_requests_farmer_created', 'sell_requests', ['farmer_id', 'created_at', 'id'],
+                    unique=False, postgresql_include=DEAL_FEED_COLUMNS + ['buyer_price'])
+    op.create_index('ix_crop_listings_farmer_created', 'crop_listings', ['farmer_id', 'created_at', 'id'],
+                    unique=False, postgresql_include=DEAL_FEED_COLUMNS)
+
+
+def downgrade():
+    op.drop_index('ix_crop_listings_farmer_created', table_name='crop_listings')
+    op.drop_index('ix_sell_requests_farmer_created', table_name='sell_requests')
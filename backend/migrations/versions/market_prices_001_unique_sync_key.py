@@ -0,0 +1,36 @@
+"""Add unique (commodity_name, market_name, price_date) index to market_prices.
+
+Used as the conflict target of the bulk price sync upsert. Duplicate rows
+left by the old per-record sync are removed first, keeping one per key.
+
+Revision ID: market_prices_001
+Revises: iot_enhancements_002
+Create Date: 2025-12-12
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'market_prices_001'
+down_revision = 'iot_enhancements_002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        "DELETE FROM market_prices WHERE id NOT IN ("
+        "SELECT MIN(id) FROM market_prices GROUP BY commodity_name, market_name, price_date)"
+    )
+    op.create_index(
+        'uq_market_prices_commodity_market_date',
+        'market_prices',
+        ['commodity_name', 'market_name', 'price_date'],
+        unique=True
+    )
+
+
+def downgrade():
+    op.drop_index('uq_market_prices_commodity_market_date', table_name='market_prices')
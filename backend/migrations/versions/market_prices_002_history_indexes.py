@@ -0,0 +1,26 @@
+"""Add composite indexes for market price history queries.
+
+Revision ID: market_prices_002
+Revises: market_prices_001
+Create Date: 2025-12-12
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'market_prices_002'
+down_revision = 'market_prices_001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_market_prices_commodity_date', 'market_prices', ['commodity_name', 'price_date'], unique=False)
+    op.create_index('ix_market_prices_state_commodity_date', 'market_prices', ['market_state', 'commodity_name', 'price_date'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_market_prices_state_commodity_date', table_name='market_prices')
+    op.drop_index('ix_market_prices_commodity_date', table_name='market_prices')
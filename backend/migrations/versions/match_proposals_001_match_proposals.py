@@ -0,0 +1,47 @@
+"""Add match_proposals for the SellRequest / BuyerOffer matching engine.
+
+Revision ID: match_proposals_001
+Revises: deals_feed_001
+Create Date: 2025-12-13
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'match_proposals_001'
+down_revision = 'deals_feed_001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('match_proposals',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('sell_request_id', sa.String(length=36), nullable=False),
+    sa.Column('buyer_offer_id', sa.String(length=36), nullable=False),
+    sa.Column('crop_key', sa.String(length=100), nullable=False),
+    sa.Column('quantity_quintal', sa.Float(), nullable=False),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.Column('ask_price', sa.Float(), nullable=False),
+    sa.Column('bid_price', sa.Float(), nullable=False),
+    sa.Column('distance_km', sa.Float(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['buyer_offer_id'], ['buyer_offers.id'], ),
+    sa.ForeignKeyConstraint(['sell_request_id'], ['sell_requests.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('sell_request_id', 'buyer_offer_id', name='uq_match_proposals_pair')
+    )
+    with op.batch_alter_table('match_proposals', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_match_proposals_sell_request_id'), ['sell_request_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_match_proposals_buyer_offer_id'), ['buyer_offer_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('match_proposals', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_match_proposals_buyer_offer_id'))
+        batch_op.drop_index(batch_op.f('ix_match_proposals_sell_request_id'))
+
+    op.drop_table('match_proposals')
@@ -0,0 +1,41 @@
+"""Add notification unread counters and (farmer_id, is_read, created_at) index.
+
+Revision ID: notifications_001
+Revises: coins_001
+Create Date: 2025-12-13
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'notifications_001'
+down_revision = 'coins_001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('notification_counters',
+    sa.Column('farmer_id', sa.String(length=36), nullable=False),
+    sa.Column('unread_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['farmer_id'], ['farmers.id'], ),
+    sa.PrimaryKeyConstraint('farmer_id')
+    )
+    op.create_index('ix_notifications_farmer_read_created', 'notifications', ['farmer_id', 'is_read', 'created_at'], unique=False)
+
+    # Seed counters from the existing unread notifications
+    op.execute("""
+        INSERT INTO notification_counters (farmer_id, unread_count, updated_at)
+        SELECT farmer_id, COUNT(*), CURRENT_TIMESTAMP
+        FROM notifications
+        WHERE is_read = false
+        GROUP BY farmer_id
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_notifications_farmer_read_created', table_name='notifications')
+    op.drop_table('notification_counters')
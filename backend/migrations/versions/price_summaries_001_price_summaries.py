@@ -0,0 +1,39 @@
+"""Add price_summaries for per-crop / per-district marketplace price statistics.
+
+Revision ID: price_summaries_001
+Revises: content_i18n_001
+Create Date: 2025-12-13
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'price_summaries_001'
+down_revision = 'content_i18n_001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('price_summaries',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('source', sa.String(length=10), nullable=False),
+    sa.Column('crop_key', sa.String(length=100), nullable=False),
+    sa.Column('district', sa.String(length=100), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.Column('min_price', sa.Float(), nullable=True),
+    sa.Column('max_price', sa.Float(), nullable=True),
+    sa.Column('recent_prices', sa.Text(), nullable=True),
+    sa.Column('recent_median', sa.Float(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('source', 'crop_key', 'district', name='uq_price_summaries_key')
+    )
+    # Existing listings and offers are summarised by running: python price_summary.py
+
+
+def downgrade():
+    op.drop_table('price_summaries')
@@ -0,0 +1,39 @@
+"""Add recommendation batch runs table and farmer/expiry index.
+
+Revision ID: recommendations_001
+Revises: market_prices_002
+Create Date: 2025-12-13
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'recommendations_001'
+down_revision = 'market_prices_002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('recommendation_batch_runs',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('last_farmer_id', sa.String(length=36), nullable=True),
+    sa.Column('farmers_processed', sa.Integer(), nullable=True),
+    sa.Column('recommendations_written', sa.Integer(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_recommendation_batch_runs_status', 'recommendation_batch_runs', ['status'], unique=False)
+    op.create_index('ix_farmer_recommendations_farmer_expires', 'farmer_recommendations', ['farmer_id', 'expires_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_farmer_recommendations_farmer_expires', table_name='farmer_recommendations')
+    op.drop_index('ix_recommendation_batch_runs_status', table_name='recommendation_batch_runs')
+    op.drop_table('recommendation_batch_runs')
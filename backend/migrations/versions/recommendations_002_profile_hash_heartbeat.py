@@ -0,0 +1,32 @@
+"""Add profile hash to farmer recommendations and a heartbeat to batch runs.
+
+Revision ID: recommendations_002
+Revises: match_proposals_001
+Create Date: 2025-12-13
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'recommendations_002'
+down_revision = 'match_proposals_001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('farmer_recommendations', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('profile_hash', sa.String(length=16), nullable=True))
+
+    with op.batch_alter_table('recommendation_batch_runs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('recommendation_batch_runs', schema=None) as batch_op:
+        batch_op.drop_column('heartbeat_at')
+
+    with op.batch_alter_table('farmer_recommendations', schema=None) as batch_op:
+        batch_op.drop_column('profile_hash')
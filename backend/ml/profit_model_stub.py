@@ -19,15 +19,41 @@ Output:
     "gross_income": 108375.0,
     "net_profit": 85875.0
 }
+
+Profit arithmetic is profit_math.profit_metrics (shared with the farmer
+dashboards), so the same inputs can also be evaluated as numpy arrays.
 """
 import random
 
+from profit_math import profit_metrics
+
 
 def predict_profit(crop_name, state, market_district, harvest_month, soil_type, water_type, area_in_acres):
     """
     Stub ML model to predict yield, price, costs, and profit.
     Returns profit metrics as a dict.
     """
+    yield_per_acre, price_per_quintal, input_cost_per_acre = crop_inputs(crop_name, soil_type, water_type)
+    
+    # Totals are rounded to paise as they are computed
+    metrics = profit_metrics(area_in_acres, yield_per_acre, price_per_quintal, input_cost_per_acre, decimals=2)
+    
+    return {
+        'yield_per_acre': yield_per_acre,
+        'total_yield_quintals': float(metrics['total_yield']),
+        'price_per_quintal': price_per_quintal,
+        'input_cost': float(metrics['total_cost']),
+        'gross_income': float(metrics['total_revenue']),
+        'net_profit': float(metrics['net_profit'])
+    }
+
+
+def crop_inputs(crop_name, soil_type, water_type, jitter=True):
+    """
+    Per-acre yield (quintals), price (₹/quintal) and input cost (₹) for a crop.
+    jitter=False leaves out the random price variation (for simulations).
+    Returns (yield_per_acre, price_per_quintal, input_cost_per_acre).
+    """
     
     # Base yield per acre (quintals) for different crops
     base_yield = {
@@ -76,7 +102,8 @@ def predict_profit(crop_name, state, market_district, harvest_month, soil_type,
     price_per_quintal = base_price.get(crop_name, 5000)
     
     # Small randomization for variation (stub only)
-    price_per_quintal += random.randint(-200, 200)
+    if jitter:
+        price_per_quintal += random.randint(-200, 200)
     price_per_quintal = round(price_per_quintal, 2)
     
     # Input costs per acre (₹)
@@ -99,18 +126,4 @@ def predict_profit(crop_name, state, market_district, harvest_month, soil_type,
         elif 'brackish' in wt:
             input_cost_per_acre += 1500
     
-    total_input_cost = round(input_cost_per_acre * area_in_acres, 2)
-    
-    # Calculate income and profit
-    total_yield_quintals = round(yield_per_acre * area_in_acres, 2)
-    gross_income = round(total_yield_quintals * price_per_quintal, 2)
-    net_profit = round(gross_income - total_input_cost, 2)
-    
-    return {
-        'yield_per_acre': yield_per_acre,
-        'total_yield_quintals': total_yield_quintals,
-        'price_per_quintal': price_per_quintal,
-        'input_cost': total_input_cost,
-        'gross_income': gross_income,
-        'net_profit': net_profit
-    }
+    return yield_per_acre, price_per_quintal, input_cost_per_acre
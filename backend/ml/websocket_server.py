@@ -4,17 +4,30 @@ Handles live bid updates, auction management, and real-time notifications
 """
 
 from flask_socketio import SocketIO, emit, join_room, leave_room
-from flask import session
+from flask import session, request
 from extensions import db
 from models_marketplace import Auction, Bid, BidHistory, AuctionNotification, Transaction
 from datetime import datetime
 import json
+import threading
 
 socketio = SocketIO(cors_allowed_origins="*", async_mode='threading')
 
 # Track active auction rooms and watchers
 active_auctions = {}
-user_sessions = {}  # Track user connections
+user_sessions = {}  # user_id -> {'sids': open socket ids, 'user_type': ..., 'active_auctions': [...]}
+_sessions_lock = threading.Lock()
+
+
+def user_room(user_id):
+    """Room joined by every socket of a user; used for per-user pushes"""
+    return f"user_{user_id}"
+
+
+def online_users():
+    """Ids of users with at least one open socket on this server"""
+    with _sessions_lock:
+        return set(user_sessions)
 
 
 # ==================== CONNECTION EVENTS ====================
@@ -27,12 +40,18 @@ def handle_connect():
     
     print(f"✅ Client connected: {user_id} ({user_type})")
     
-    # Track user session
-    user_sessions[user_id] = {
-        'sid': id,
-        'user_type': user_type,
-        'active_auctions': []
-    }
+    if user_id:
+        # Personal room for notifications, unread counts and outbid alerts
+        join_room(user_room(user_id))
+        
+        # Track user session (one entry per user, one sid per open tab)
+        with _sessions_lock:
+            entry = user_sessions.setdefault(user_id, {
+                'sids': set(),
+                'user_type': user_type,
+                'active_auctions': []
+            })
+            entry['sids'].add(request.sid)
     
     emit('connection_response', {
         'status': 'connected',
@@ -48,9 +67,13 @@ def handle_disconnect():
     user_id = session.get('farmer_id_verified') or session.get('buyer_id_verified')
     print(f"❌ Client disconnected: {user_id}")
     
-    # Clean up user session
-    if user_id in user_sessions:
-        del user_sessions[user_id]
+    # Clean up user session once the user's last socket is gone
+    with _sessions_lock:
+        entry = user_sessions.get(user_id)
+        if entry:
+            entry['sids'].discard(request.sid)
+            if not entry['sids']:
+                del user_sessions[user_id]
 
 
 # ==================== AUCTION ROOM MANAGEMENT ====================
@@ -250,7 +273,7 @@ def on_place_bid(data):
                 'amount': bid_amount,
                 'outbid_by': buyer_id,
                 'message': f'❌ You were outbid! New highest bid: ₹{bid_amount}'
-            }, to=f"user_{old_winning.buyer_id}")
+            }, to=user_room(old_winning.buyer_id))
         
     except Exception as e:
         print(f"❌ Error placing bid: {str(e)}")
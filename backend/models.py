@@ -329,6 +329,9 @@ class Notification(db.Model):
     Types: scheme_update, deal_alert, price_alert, general_alert, system_update
     """
     __tablename__ = 'notifications'
+    __table_args__ = (
+        db.Index('ix_notifications_farmer_read_created', 'farmer_id', 'is_read', 'created_at'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     farmer_id = db.Column(db.String(36), db.ForeignKey('farmers.id'), nullable=False)
@@ -368,6 +371,21 @@ class Notification(db.Model):
         }
 
 
+class NotificationCounter(db.Model):
+    """
+    Per-farmer unread notification count, kept in step with the notifications
+    table by notification_service so the unread badge is a primary-key read.
+    """
+    __tablename__ = 'notification_counters'
+    
+    farmer_id = db.Column(db.String(36), db.ForeignKey('farmers.id'), primary_key=True)
+    unread_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<NotificationCounter {self.farmer_id} unread:{self.unread_count}>'
+
+
 class DeviceRequest(db.Model):
     """Records farmer requests for an IoT kit installation."""
     __tablename__ = 'device_requests'
@@ -527,6 +545,9 @@ class SensorReading(db.Model):
 class CoinBalance(db.Model):
     """Tracks total coins earned by each farmer."""
     __tablename__ = 'coin_balances'
+    __table_args__ = (
+        db.CheckConstraint('available_coins >= 0', name='ck_coin_balances_available_nonnegative'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     farmer_id = db.Column(db.String(36), db.ForeignKey('farmers.id'), unique=True, nullable=False)
@@ -546,6 +567,9 @@ class CoinBalance(db.Model):
 class CoinTransaction(db.Model):
     """Records all coin earnings and redemptions."""
     __tablename__ = 'coin_transactions'
+    __table_args__ = (
+        db.Index('ix_coin_transactions_balance_created', 'coin_balance_id', 'created_at'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     coin_balance_id = db.Column(db.String(36), db.ForeignKey('coin_balances.id'), nullable=False)
@@ -612,10 +636,37 @@ class RedemptionOffer(db.Model):
             'is_active': self.is_active,
             'stock_limit': self.stock_limit,
             'stock_redeemed': self.stock_redeemed,
-            'available_stock': self.stock_limit - self.stock_redeemed if self.stock_limit else None
+            # stock_limit 0 means sold out, only None is unlimited (as in coin_ledger.redeem)
+            'available_stock': max(self.stock_limit - (self.stock_redeemed or 0), 0)
+                               if self.stock_limit is not None else None
         }
 
 
+class ContentTranslation(db.Model):
+    """
+    Stored translation of one text field of a Scheme or RedemptionOffer.
+    Maintained by content_i18n.py whenever the source text changes; source_hash
+    identifies the text the translation was made from.
+    """
+    __tablename__ = 'content_translations'
+    __table_args__ = (
+        db.UniqueConstraint('content_type', 'language', 'content_id', 'field',
+                            name='uq_content_translations_key'),
+    )
+    
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    content_type = db.Column(db.String(30), nullable=False)  # scheme, offer
+    content_id = db.Column(db.String(36), nullable=False)
+    language = db.Column(db.String(5), nullable=False)  # hi, mr, gu
+    field = db.Column(db.String(50), nullable=False)
+    source_hash = db.Column(db.String(64), nullable=False)
+    text = db.Column(db.Text, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ContentTranslation {self.content_type}:{self.content_id} {self.language}.{self.field}>'
+
+
 class FarmerRedemption(db.Model):
     """Records individual farmer redemptions."""
     __tablename__ = 'farmer_redemptions'
@@ -663,6 +714,9 @@ class FarmerRecommendation(db.Model):
     Prevents repeated API calls by caching recommendations in database.
     """
     __tablename__ = 'farmer_recommendations'
+    __table_args__ = (
+        db.Index('ix_farmer_recommendations_farmer_expires', 'farmer_id', 'expires_at'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     farmer_id = db.Column(db.String(36), db.ForeignKey('farmers.id'), nullable=False, index=True)
@@ -676,6 +730,9 @@ class FarmerRecommendation(db.Model):
     # AI method used
     ai_method = db.Column(db.String(50), default='gemini')  # gemini, rule_based, hybrid
     
+    # scheme_eligibility.profile_hash() of the farmer when the row was written
+    profile_hash = db.Column(db.String(16))
+    
     # Metadata
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     expires_at = db.Column(db.DateTime)  # Recommendation expires after 24 hours
@@ -706,3 +763,40 @@ class FarmerRecommendation(db.Model):
             'created_at': self.created_at.isoformat()
         }
 
+
+class RecommendationBatchRun(db.Model):
+    """
+    One run of the nightly recommendation precompute.
+    last_farmer_id is the watermark: farmers are processed in id order, so an
+    interrupted run resumes after the last committed chunk.
+    """
+    __tablename__ = 'recommendation_batch_runs'
+    
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    status = db.Column(db.String(20), default='running', index=True)  # running, completed, failed
+    last_farmer_id = db.Column(db.String(36))  # Watermark
+    farmers_processed = db.Column(db.Integer, default=0)
+    recommendations_written = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text)
+    
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    heartbeat_at = db.Column(db.DateTime)  # Bumped after every chunk by the process running it
+    finished_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<RecommendationBatchRun {self.id} {self.status}>'
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'last_farmer_id': self.last_farmer_id,
+            'farmers_processed': self.farmers_processed,
+            'recommendations_written': self.recommendations_written,
+            'error': self.error,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'heartbeat_at': self.heartbeat_at.isoformat() if self.heartbeat_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
@@ -38,8 +38,17 @@ class Buyer(db.Model):
         return f'<Buyer {self.buyer_name} - {self.email}>'
 
 
+# Columns served by the deals feed (/market/deals-list), carried in its
+# (farmer_id, created_at, id) indexes on PostgreSQL so pages are index-only scans
+DEAL_FEED_COLUMNS = ['crop_name', 'quantity_quintal', 'expected_price', 'harvest_date', 'status']
+
+
 class CropListing(db.Model):
     __tablename__ = "crop_listings"
+    __table_args__ = (
+        db.Index('ix_crop_listings_farmer_created', 'farmer_id', 'created_at', 'id',
+                 postgresql_include=DEAL_FEED_COLUMNS),
+    )
 
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     farmer_id = db.Column(db.String(36), db.ForeignKey("farmers.id"), nullable=False)
@@ -63,6 +72,10 @@ class CropListing(db.Model):
 
 class SellRequest(db.Model):
     __tablename__ = "sell_requests"
+    __table_args__ = (
+        db.Index('ix_sell_requests_farmer_created', 'farmer_id', 'created_at', 'id',
+                 postgresql_include=DEAL_FEED_COLUMNS + ['buyer_price']),
+    )
 
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     farmer_id = db.Column(db.String(36), db.ForeignKey("farmers.id"), nullable=False)
@@ -132,6 +145,69 @@ class BuyerOffer(db.Model):
         return f'<BuyerOffer {self.crop_name} by {self.buyer_name}>'
 
 
+class PriceSummary(db.Model):
+    """Running price statistics per crop and district, maintained by price_summary.py"""
+    __tablename__ = "price_summaries"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    source = db.Column(db.String(10), nullable=False)       # 'sell' (SellRequest) or 'offer' (BuyerOffer)
+    crop_key = db.Column(db.String(100), nullable=False)    # lower-cased, trimmed crop name
+    district = db.Column(db.String(100), nullable=False, default='')    # '' = all districts
+
+    count = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Float, nullable=False, default=0)
+    min_price = db.Column(db.Float)
+    max_price = db.Column(db.Float)
+    recent_prices = db.Column(db.Text)      # JSON list of the latest prices, oldest first
+    recent_median = db.Column(db.Float)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('source', 'crop_key', 'district', name='uq_price_summaries_key'),
+    )
+
+
+class MatchProposal(db.Model):
+    """Proposed trade between a SellRequest (ask) and a BuyerOffer (bid), produced by matching_engine.py"""
+    __tablename__ = "match_proposals"
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    sell_request_id = db.Column(db.String(36), db.ForeignKey("sell_requests.id"), nullable=False, index=True)
+    buyer_offer_id = db.Column(db.String(36), db.ForeignKey("buyer_offers.id"), nullable=False, index=True)
+
+    crop_key = db.Column(db.String(100), nullable=False)
+    quantity_quintal = db.Column(db.Float, nullable=False)     # may be part of either order
+    price = db.Column(db.Float, nullable=False)                # price of the order that was resting in the book
+    ask_price = db.Column(db.Float, nullable=False)
+    bid_price = db.Column(db.Float, nullable=False)
+    distance_km = db.Column(db.Float)                          # None when either side has no known location
+
+    # Status: proposed → accepted / declined (only non-declined proposals hold quantity)
+    status = db.Column(db.String(20), nullable=False, default="proposed")
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('sell_request_id', 'buyer_offer_id', name='uq_match_proposals_pair'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'sell_request_id': self.sell_request_id,
+            'buyer_offer_id': self.buyer_offer_id,
+            'crop': self.crop_key,
+            'quantity_quintal': self.quantity_quintal,
+            'price': self.price,
+            'ask_price': self.ask_price,
+            'bid_price': self.bid_price,
+            'distance_km': self.distance_km,
+            'status': self.status,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
+
+
 # ===== CHAT MODELS =====
 
 class Chat(db.Model):
@@ -182,6 +258,13 @@ class ChatMessage(db.Model):
 
 class MarketPrice(db.Model):
     __tablename__ = "market_prices"
+    __table_args__ = (
+        # Upsert key for the price sync (one row per commodity, market and day)
+        db.Index('uq_market_prices_commodity_market_date', 'commodity_name', 'market_name', 'price_date', unique=True),
+        # Price history range scans (all India / per state)
+        db.Index('ix_market_prices_commodity_date', 'commodity_name', 'price_date'),
+        db.Index('ix_market_prices_state_commodity_date', 'market_state', 'commodity_name', 'price_date'),
+    )
 
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     
@@ -441,6 +524,16 @@ class AuctionNotification(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     read_at = db.Column(db.DateTime, nullable=True)
     
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'message': self.message,
+            'type': self.notification_type,
+            'is_read': self.is_read,
+            'auction_id': self.auction_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+    
     def __repr__(self):
         return f'<AuctionNotification {self.notification_type}>'
 
@@ -0,0 +1,269 @@
+"""
+Notification service
+Single place that creates, reads and deletes farmer notifications while
+keeping NotificationCounter (unread count per farmer) in step, so the
+unread badge is a primary-key read instead of a COUNT(*).
+
+Segment fan-out (state / district / crop) writes the notifications with
+chunked INSERT ... SELECT statements over the farmers table, FANOUT_CHUNK_SIZE
+farmers at a time in farmer-id order, and bumps the chunk's counters with
+two set-based statements. Nothing is loaded into Python per recipient.
+
+Connected farmers get new notifications and unread counts pushed over
+SocketIO (see realtime.py) once each change is committed.
+
+A missing counter is created with INSERT ... ON CONFLICT DO NOTHING, so two
+requests creating the same farmer's counter at once cannot fail on the
+primary key.
+"""
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import and_, func, insert, literal, select, text, update
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import Farmer, Notification, NotificationCounter
+import realtime
+
+FANOUT_CHUNK_SIZE = 5000
+
+NOTIFICATION_FIELDS = ('title', 'description', 'notification_type', 'icon', 'color', 'related_id',
+                       'related_type', 'action_link', 'is_important', 'expires_at')
+
+
+def _uuid_sql():
+    """SQL expression producing a fresh UUID per row."""
+    if db.engine.dialect.name == 'postgresql':
+        return text('gen_random_uuid()::text')
+    # SQLite: build a version-4 UUID from random bytes
+    return text(
+        "lower(hex(randomblob(4))) || '-' || lower(hex(randomblob(2))) || '-4' || "
+        "substr(lower(hex(randomblob(2))), 2) || '-' || substr('89ab', abs(random()) % 4 + 1, 1) || "
+        "substr(lower(hex(randomblob(2))), 2) || '-' || lower(hex(randomblob(6)))"
+    )
+
+
+def _segment_filters(state=None, district=None, crop=None):
+    filters = []
+    if state:
+        filters.append(func.lower(Farmer.state) == state.strip().lower())
+    if district:
+        filters.append(func.lower(Farmer.district) == district.strip().lower())
+    if crop:
+        filters.append(Farmer.current_crops.ilike(f'%{crop.strip()}%'))
+    return filters
+
+
+def _bump_counters(farmer_condition, delta):
+    """
+    Add delta to the counters of every farmer matching farmer_condition.
+    Missing counters are created from the farmer's current unread count, so
+    call this before inserting the new notifications.
+    """
+    now = datetime.utcnow()
+    current_unread = select(func.count(Notification.id)).where(
+        Notification.farmer_id == Farmer.id, Notification.is_read == False
+    ).scalar_subquery()
+    missing = select(Farmer.id, current_unread, literal(now)).where(
+        farmer_condition,
+        ~select(NotificationCounter.farmer_id).where(NotificationCounter.farmer_id == Farmer.id).exists()
+    )
+    db.session.execute(
+        insert(NotificationCounter).from_select(['farmer_id', 'unread_count', 'updated_at'], missing)
+    )
+    db.session.execute(
+        update(NotificationCounter)
+        .where(NotificationCounter.farmer_id.in_(select(Farmer.id).where(farmer_condition)))
+        .values(unread_count=NotificationCounter.unread_count + delta, updated_at=now),
+        execution_options={'synchronize_session': False}
+    )
+
+
+def _create_counter(farmer_id, unread_count):
+    """
+    Insert a counter row unless one exists. Returns True if this call created it,
+    False if another request got there first.
+    """
+    values = {'farmer_id': farmer_id, 'unread_count': unread_count, 'updated_at': datetime.utcnow()}
+    dialect = db.engine.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        return bool(db.session.execute(
+            upsert(NotificationCounter).values(**values).on_conflict_do_nothing(index_elements=['farmer_id'])
+        ).rowcount)
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(NotificationCounter).values(**values))
+        return True
+    except IntegrityError:
+        return False
+
+
+def _adjust_counter(farmer_id, delta):
+    """Add delta to one farmer's counter (never below zero), creating it if missing."""
+    if not delta:
+        return
+    counter = db.session.get(NotificationCounter, farmer_id)
+    if counter is None:
+        # First touch: count once, after which the counter is maintained incrementally
+        db.session.flush()
+        if _create_counter(farmer_id, _count_unread(farmer_id)):
+            return
+        # Created concurrently from committed rows only: still apply our change
+    db.session.execute(
+        update(NotificationCounter)
+        .where(NotificationCounter.farmer_id == farmer_id)
+        .values(unread_count=func.max(NotificationCounter.unread_count + delta, 0)
+                if db.engine.dialect.name == 'sqlite'
+                else func.greatest(NotificationCounter.unread_count + delta, 0),
+                updated_at=datetime.utcnow()),
+        execution_options={'synchronize_session': False}
+    )
+    if counter is not None:
+        db.session.expire(counter)
+
+
+def _count_unread(farmer_id):
+    return Notification.query.filter_by(farmer_id=farmer_id, is_read=False).count()
+
+
+# ==================== CREATE ====================
+
+def add_notifications(notifications, commit=True):
+    """Store already-built Notification objects and bump their farmers' counters."""
+    if not notifications:
+        return []
+    db.session.add_all(notifications)
+    unread = Counter(n.farmer_id for n in notifications if not n.is_read)
+    for farmer_id, count in unread.items():
+        _adjust_counter(farmer_id, count)
+    if commit:
+        db.session.commit()
+    return notifications
+
+
+def notify_farmer(farmer_id, title, description, notification_type='general_alert', **fields):
+    """Create one notification for a farmer. Returns the Notification."""
+    notification = Notification(
+        id=str(uuid.uuid4()),
+        farmer_id=farmer_id,
+        title=title,
+        description=description,
+        notification_type=notification_type,
+        **fields
+    )
+    add_notifications([notification])
+    return notification
+
+
+def fan_out(title, description, notification_type='general_alert', state=None, district=None, crop=None,
+            chunk_size=FANOUT_CHUNK_SIZE, **fields):
+    """
+    Send one notification to every farmer in a segment (all farmers if no
+    filter is given). Returns the number of notifications written.
+    """
+    unknown = set(fields) - set(NOTIFICATION_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown notification fields: {', '.join(sorted(unknown))}")
+
+    values = dict(fields, title=title, description=description, notification_type=notification_type)
+    values.setdefault('is_important', False)
+    now = datetime.utcnow()
+    columns = ['id', 'farmer_id', 'is_read', 'created_at', 'updated_at'] + list(values)
+    segment = _segment_filters(state, district, crop)
+
+    written = 0
+    after = None
+    while True:
+        in_range = list(segment)
+        if after is not None:
+            in_range.append(Farmer.id > after)
+        # Last farmer id of this chunk (None -> the rest fits in one chunk)
+        upper = db.session.execute(
+            select(Farmer.id).where(*in_range).order_by(Farmer.id).offset(chunk_size - 1).limit(1)
+        ).scalar()
+        if upper is not None:
+            in_range.append(Farmer.id <= upper)
+        condition = and_(*in_range) if in_range else literal(True)
+
+        rows = select(
+            _uuid_sql(), Farmer.id, literal(False), literal(now), literal(now),
+            *[literal(value) for value in values.values()]
+        ).where(condition)
+        _bump_counters(condition, 1)
+        result = db.session.execute(insert(Notification).from_select(columns, rows))
+        db.session.commit()
+        realtime.publish_segment(condition, values)
+
+        written += result.rowcount or 0
+        if upper is None:
+            return written
+        after = upper
+
+
+# ==================== READ / UPDATE ====================
+
+def unread_count(farmer_id):
+    """Unread notifications for a farmer (primary-key read of the counter)."""
+    counter = db.session.get(NotificationCounter, farmer_id)
+    if counter is None:
+        _create_counter(farmer_id, _count_unread(farmer_id))
+        db.session.commit()
+        counter = db.session.get(NotificationCounter, farmer_id)
+    return counter.unread_count
+
+
+def mark_read(farmer_id, notification_id):
+    """Mark one notification read. Returns 1 if it was unread, else 0."""
+    changed = db.session.execute(
+        update(Notification)
+        .where(Notification.id == notification_id, Notification.farmer_id == farmer_id,
+               Notification.is_read == False)
+        .values(is_read=True, updated_at=datetime.utcnow()),
+        execution_options={'synchronize_session': 'fetch'}
+    ).rowcount
+    _adjust_counter(farmer_id, -changed)
+    db.session.commit()
+    if changed:
+        realtime.publish_unread_counts([farmer_id])
+    return changed
+
+
+def mark_all_read(farmer_id):
+    Notification.query.filter_by(farmer_id=farmer_id, is_read=False).update(
+        {'is_read': True, 'updated_at': datetime.utcnow()}, synchronize_session=False
+    )
+    _set_counter(farmer_id, 0)
+    db.session.commit()
+    realtime.publish_unread_counts([farmer_id])
+
+
+def delete_notification(notification):
+    farmer_id, was_unread = notification.farmer_id, not notification.is_read
+    db.session.delete(notification)
+    if was_unread:
+        _adjust_counter(farmer_id, -1)
+    db.session.commit()
+    if was_unread:
+        realtime.publish_unread_counts([farmer_id])
+
+
+def clear_all(farmer_id):
+    Notification.query.filter_by(farmer_id=farmer_id).delete(synchronize_session=False)
+    _set_counter(farmer_id, 0)
+    db.session.commit()
+    realtime.publish_unread_counts([farmer_id])
+
+
+def _set_counter(farmer_id, value):
+    counter = db.session.get(NotificationCounter, farmer_id)
+    if counter is None:
+        if _create_counter(farmer_id, value):
+            return
+        counter = db.session.get(NotificationCounter, farmer_id)
+    counter.unread_count = value
@@ -0,0 +1,120 @@
+"""
+In-memory redemption offer catalogue
+Active RedemptionOffers are loaded once into a versioned catalogue holding:
+- the offers in display (created_at) order,
+- one pre-built list per category,
+- the offers sorted by coin_cost with a parallel cost list, so the best
+  offer a balance can afford is a bisect.
+
+Any ORM insert/update/delete of a RedemptionOffer drops the catalogue and
+redemptions adjust the cached stock in place, so the store serves offers
+without catalogue queries. CATALOGUE_MAX_AGE bounds staleness for changes
+made by other processes. Stored offer translations (content_i18n.py) are
+loaded once per language per catalogue and overlaid on the served dicts.
+"""
+import threading
+import time
+from bisect import bisect_right
+
+from sqlalchemy import event
+
+from content_i18n import CONTENT_LANGUAGES, load_translations
+from models import RedemptionOffer
+
+CATALOGUE_MAX_AGE = 5 * 60
+
+
+class OfferCatalogue:
+    """Immutable snapshot of active offers (as dicts) with lookup structures."""
+
+    def __init__(self, offers, version, seeded=True):
+        self.version = version
+        self.seeded = seeded      # any offer rows exist, active or not
+        self.loaded_at = time.time()
+        self.all = offers
+        self.by_id = {offer['id']: offer for offer in offers}
+        self.buckets = {}
+        for offer in offers:
+            self.buckets.setdefault(offer['category'], []).append(offer)
+        self.by_cost = sorted(offers, key=lambda offer: offer['coin_cost'])
+        self.costs = [offer['coin_cost'] for offer in self.by_cost]
+        self.translations = {}    # language -> {offer_id: {field: text}}, loaded on first use
+
+    def offers(self, category=None, language='en'):
+        if not category or category == 'all':
+            return self.localize(self.all, language)
+        return self.localize(self.buckets.get(category, []), language)
+
+    def localize(self, offers, language):
+        """Offers with translated text fields for `language` (the same dicts for English)."""
+        if language not in CONTENT_LANGUAGES:
+            return offers
+        translations = self.translations.get(language)
+        if translations is None:
+            translations = self.translations[language] = load_translations('offer', list(self.by_id), language)
+        return [dict(offer, **translations[offer['id']]) if offer['id'] in translations else offer
+                for offer in offers]
+
+    def cheapest(self):
+        return self.by_cost[0] if self.by_cost else None
+
+    def best_affordable(self, coins):
+        """Most valuable in-stock offer costing at most `coins`, or None."""
+        i = bisect_right(self.costs, coins) - 1
+        while i >= 0:
+            offer = self.by_cost[i]
+            if offer['available_stock'] is None or offer['available_stock'] > 0:
+                return offer
+            i -= 1
+        return None
+
+
+_catalogue = None
+_version = 0
+# Re-entrant: loading can autoflush a pending offer change, which invalidates
+_lock = threading.RLock()
+
+
+def get_offer_catalogue():
+    """Current catalogue, loading it (one query) when missing or too old."""
+    global _catalogue
+    catalogue = _catalogue
+    if catalogue is not None and time.time() - catalogue.loaded_at < CATALOGUE_MAX_AGE:
+        return catalogue
+
+    with _lock:
+        version = _version
+        offers = RedemptionOffer.query.order_by(RedemptionOffer.created_at).all()
+        catalogue = OfferCatalogue([offer.to_dict() for offer in offers if offer.is_active], version,
+                                   seeded=bool(offers))
+        # Keep it only if nothing invalidated the catalogue while loading
+        if version == _version:
+            _catalogue = catalogue
+        return catalogue
+
+
+def invalidate_offer_catalogue():
+    """Drop the catalogue; the next reader reloads it under a new version."""
+    global _catalogue, _version
+    with _lock:
+        _version += 1
+        _catalogue = None
+
+
+def record_redemption(offer_id):
+    """Reflect one redeemed unit of stock in the cached catalogue."""
+    catalogue = _catalogue
+    offer = catalogue.by_id.get(offer_id) if catalogue else None
+    if offer is None:
+        return
+    with _lock:
+        offer['stock_redeemed'] = (offer['stock_redeemed'] or 0) + 1
+        if offer['stock_limit'] is not None:
+            offer['available_stock'] = max(offer['stock_limit'] - offer['stock_redeemed'], 0)
+
+
+@event.listens_for(RedemptionOffer, 'after_insert')
+@event.listens_for(RedemptionOffer, 'after_update')
+@event.listens_for(RedemptionOffer, 'after_delete')
+def _offer_changed(mapper, connection, target):
+    invalidate_offer_catalogue()
@@ -0,0 +1,157 @@
+"""
+Price history query engine over MarketPrice
+Builds weekly / monthly OHLC series per commodity (optionally per state)
+from the stored mandi prices. Rows are read with one indexed range query
+on (commodity_name, price_date) or (market_state, commodity_name, price_date)
+and resampled with NumPy. Built series are cached until the TTL expires or
+the price sync writes new rows; the cache keeps at most
+HISTORY_CACHE_MAX_ENTRIES series and drops the least recently used.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+
+from extensions import db
+from models_marketplace import MarketPrice
+
+HISTORY_CACHE_TTL_SECONDS = 15 * 60
+HISTORY_CACHE_MAX_ENTRIES = 256
+INTERVALS = ('week', 'month')
+
+# (commodity names, state, interval, months) -> (built_at, series), oldest use first.
+# state comes from the query string, so the cache must stay bounded.
+_series_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def period_start(day, interval):
+    """First day of the week (Monday) or month containing day."""
+    if interval == 'week':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def _load_rows(commodity_names, state, since):
+    query = db.session.query(
+        MarketPrice.price_date,
+        MarketPrice.open_price,
+        MarketPrice.high_price,
+        MarketPrice.low_price,
+        MarketPrice.close_price,
+        MarketPrice.trading_volume,
+    ).filter(
+        MarketPrice.commodity_name.in_(commodity_names),
+        MarketPrice.price_date >= since,
+    )
+    if state:
+        query = query.filter(MarketPrice.market_state == state)
+    return query.order_by(MarketPrice.price_date).all()
+
+
+def resample_ohlc(rows, interval='month'):
+    """
+    Resample (price_date, open, high, low, close, volume) rows, sorted by date,
+    into OHLC periods. Prices are first averaged across markets per day, then
+    open/close are the first/last daily average in the period, high/low the
+    extreme daily high/low, and price the mean daily average.
+    """
+    if not rows:
+        return []
+
+    days = np.array([r[0].toordinal() for r in rows], dtype=np.int64)
+    nan = np.nan
+    close = np.array([r[4] if r[4] is not None else nan for r in rows], dtype=float)
+    opens = np.array([r[1] if r[1] is not None else nan for r in rows], dtype=float)
+    high = np.array([r[2] if r[2] is not None else nan for r in rows], dtype=float)
+    low = np.array([r[3] if r[3] is not None else nan for r in rows], dtype=float)
+    volume = np.array([r[5] or 0.0 for r in rows], dtype=float)
+
+    # Rows without a close (modal) price fall back to their open price
+    close = np.where(np.isnan(close), opens, close)
+    high = np.where(np.isnan(high), close, high)
+    low = np.where(np.isnan(low), close, low)
+
+    # --- daily aggregation across markets ---
+    day_starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+    valid = ~np.isnan(close)
+    day_sum = np.add.reduceat(np.where(valid, close, 0.0), day_starts)
+    day_n = np.add.reduceat(valid.astype(np.int64), day_starts)
+    day_rows = np.diff(np.r_[day_starts, len(days)])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        day_mean = day_sum / day_n
+    day_high = np.fmax.reduceat(high, day_starts)
+    day_low = np.fmin.reduceat(low, day_starts)
+    day_volume = np.add.reduceat(volume, day_starts)
+    day_dates = [date.fromordinal(int(d)) for d in days[day_starts]]
+
+    keep = day_n > 0
+    if not keep.any():
+        return []
+    day_mean, day_high, day_low = day_mean[keep], day_high[keep], day_low[keep]
+    day_volume, day_rows = day_volume[keep], day_rows[keep]
+    day_dates = [d for d, k in zip(day_dates, keep) if k]
+
+    # --- period aggregation ---
+    periods = np.array([period_start(d, interval).toordinal() for d in day_dates], dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]])
+    ends = np.r_[starts[1:], len(periods)] - 1
+    counts = np.diff(np.r_[starts, len(periods)])
+
+    p_open = day_mean[starts]
+    p_close = day_mean[ends]
+    p_high = np.fmax.reduceat(day_high, starts)
+    p_low = np.fmin.reduceat(day_low, starts)
+    p_avg = np.add.reduceat(day_mean, starts) / counts
+    p_volume = np.add.reduceat(day_volume, starts)
+    p_rows = np.add.reduceat(day_rows, starts)
+
+    series = []
+    for i, start in enumerate(starts):
+        period = date.fromordinal(int(periods[start]))
+        series.append({
+            'date': period.isoformat(),
+            'month': period.strftime('%b %Y') if interval == 'month' else period.strftime('%d %b %Y'),
+            'price': round(float(p_avg[i]), 2),
+            'open': round(float(p_open[i]), 2),
+            'high': round(float(p_high[i]), 2),
+            'low': round(float(p_low[i]), 2),
+            'close': round(float(p_close[i]), 2),
+            'volume': round(float(p_volume[i]), 2),
+            'count': int(p_rows[i]),
+        })
+    return series
+
+
+def get_price_series(commodity_names, state=None, interval='month', months=12):
+    """Cached OHLC series for a commodity (all name variants), optionally one state."""
+    if interval not in INTERVALS:
+        raise ValueError(f"interval must be one of {INTERVALS}")
+
+    key = (tuple(sorted(commodity_names)), state, interval, months)
+    now = time.time()
+    with _cache_lock:
+        cached = _series_cache.get(key)
+        if cached:
+            _series_cache.move_to_end(key)
+    if cached and now - cached[0] < HISTORY_CACHE_TTL_SECONDS:
+        return cached[1]
+
+    since = period_start(date.today() - relativedelta(months=months), interval)
+    series = resample_ohlc(_load_rows(list(commodity_names), state, since), interval)
+
+    with _cache_lock:
+        _series_cache[key] = (now, series)
+        _series_cache.move_to_end(key)
+        while len(_series_cache) > HISTORY_CACHE_MAX_ENTRIES:
+            _series_cache.popitem(last=False)
+    return series
+
+
+def invalidate_price_history():
+    """Drop all cached series (called after new prices are stored)."""
+    with _cache_lock:
+        _series_cache.clear()
@@ -0,0 +1,203 @@
+"""
+Shared mandi price fetcher for the data.gov.in commodity price APIs
+Used by crop_economics, bidding and buyer_auth so that page requests are
+served from a TTL cache instead of waiting on the government API.
+
+- Fresh entries are returned directly.
+- Stale entries are returned immediately and refreshed in the background
+  (stale-while-revalidate).
+- Concurrent requests for the same key share one upstream call (single-flight).
+- Upstream failures are cached briefly so a slow/down API is not retried on
+  every page view.
+
+The HTTP source is pluggable: tests call set_source() with a local stand-in.
+"""
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+GOVT_API_KEY = os.getenv('DATA_GOV_API_KEY', '579b464db66ec23bdd00000139dd36efa19740c954f95d9ca3b5abd0')
+GOVT_API_ROOT = 'https://api.data.gov.in/resource'
+
+# data.gov.in datasets
+DAILY_PRICES_RESOURCE = '9ef84268-d588-465a-a5c3-375cda092f58'       # filter: commodity
+COMMODITY_PRICES_RESOURCE = '5e4ff2f1-d728-49b5-b92e-12640c4e3ede'   # filter: commodity_name
+
+REQUEST_TIMEOUT = 10
+CACHE_TTL_SECONDS = int(os.getenv('PRICE_CACHE_TTL_SECONDS', 15 * 60))
+STALE_TTL_SECONDS = int(os.getenv('PRICE_STALE_TTL_SECONDS', 6 * 60 * 60))
+ERROR_TTL_SECONDS = 60
+
+# Oilseed crop -> commodity name used by the data.gov.in datasets. The dashboard,
+# the price sync and price history all read this table so that rows written
+# under one name are found again by the others.
+OILSEED_COMMODITIES = {
+    'Soybean': 'Soyabean',
+    'Mustard': 'Mustard/Rape seed',
+    'Groundnut': 'Groundnut',
+    'Sunflower': 'Sunflower',
+    'Safflower': 'Safflower',
+    'Sesame': 'Sesame',
+    'Coconut': 'Coconut',
+    'Castor': 'Castor',
+}
+
+
+def commodity_names(crop_name):
+    """Every name a crop's prices may be stored under in MarketPrice."""
+    return {crop_name, OILSEED_COMMODITIES.get(crop_name, crop_name)}
+
+
+class PriceSourceError(Exception):
+    """Raised when prices cannot be fetched and nothing is cached."""
+
+
+class MandiHttpSource:
+    """Fetches raw records from data.gov.in over one pooled HTTP session."""
+
+    def __init__(self, api_key=GOVT_API_KEY, api_root=GOVT_API_ROOT, timeout=REQUEST_TIMEOUT):
+        self.api_key = api_key
+        self.api_root = api_root
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        self.session.mount('https://', adapter)
+
+    def __call__(self, resource_id, filters, limit, offset=0):
+        params = {'api-key': self.api_key, 'format': 'json', 'limit': limit, 'offset': offset}
+        for field, value in filters.items():
+            params[f'filters[{field}]'] = value
+
+        response = self.session.get(f'{self.api_root}/{resource_id}', params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json().get('records', [])
+
+
+class CachedPrices:
+    """Records for one key plus when they were fetched."""
+    __slots__ = ('records', 'fetched_at', 'stale', 'error')
+
+    def __init__(self, records, fetched_at, stale=False, error=None):
+        self.records = records
+        self.fetched_at = fetched_at
+        self.stale = stale
+        self.error = error
+
+
+class PriceService:
+    """TTL + single-flight + stale-while-revalidate cache in front of a price source."""
+
+    def __init__(self, source=None, ttl=CACHE_TTL_SECONDS, stale_ttl=STALE_TTL_SECONDS,
+                 error_ttl=ERROR_TTL_SECONDS, clock=time.time):
+        self.source = source or MandiHttpSource()
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.error_ttl = error_ttl
+        self.clock = clock
+        self._entries = {}     # key -> CachedPrices
+        self._errors = {}      # key -> (failed_at, message)
+        self._inflight = {}    # key -> threading.Event
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(resource_id, filters, limit):
+        return (resource_id, tuple(sorted(filters.items())), limit)
+
+    def lookup(self, resource_id, filters, limit=100):
+        """
+        Return CachedPrices for (resource, filters, limit).
+        Raises PriceSourceError if upstream fails and nothing is cached.
+        """
+        key = self._key(resource_id, filters, limit)
+        now = self.clock()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            age = now - entry.fetched_at if entry else None
+
+            if entry and age < self.ttl:
+                return entry
+
+            failed = self._errors.get(key)
+            recently_failed = failed and now - failed[0] < self.error_ttl
+
+            if entry and age < self.ttl + self.stale_ttl:
+                # While upstream keeps failing, serve stale without a refresh per request
+                if key not in self._inflight and not recently_failed:
+                    self._inflight[key] = threading.Event()
+                    threading.Thread(target=self._refresh, args=(key,), daemon=True).start()
+                return CachedPrices(entry.records, entry.fetched_at, stale=True,
+                                    error=failed[1] if recently_failed else None)
+
+            if recently_failed:
+                raise PriceSourceError(failed[1])
+
+            event = self._inflight.get(key)
+            leader = event is None
+            if leader:
+                event = self._inflight[key] = threading.Event()
+
+        if leader:
+            self._refresh(key)
+        else:
+            event.wait(self.source_timeout())
+
+        with self._lock:
+            entry = self._entries.get(key)
+            failed = self._errors.get(key)
+        if entry and self.clock() - entry.fetched_at < self.ttl + self.stale_ttl:
+            return entry
+        raise PriceSourceError(failed[1] if failed else 'price fetch did not complete')
+
+    def get_records(self, resource_id, filters, limit=100):
+        """Return cached raw records, fetching if needed."""
+        return self.lookup(resource_id, filters, limit).records
+
+    def source_timeout(self):
+        return getattr(self.source, 'timeout', REQUEST_TIMEOUT) + 1
+
+    def _refresh(self, key):
+        """Fetch key from the source and publish it to waiters."""
+        resource_id, filters, limit = key
+        try:
+            records = self.source(resource_id, dict(filters), limit)
+            with self._lock:
+                self._entries[key] = CachedPrices(records, self.clock())
+                self._errors.pop(key, None)
+        except Exception as e:
+            print(f"⚠️ Price API error for {dict(filters)}: {e}")
+            with self._lock:
+                self._errors[key] = (self.clock(), str(e))
+        finally:
+            with self._lock:
+                event = self._inflight.pop(key, None)
+            if event:
+                event.set()
+
+    def invalidate(self, resource_id=None):
+        """Drop cached entries (all, or for one resource)."""
+        with self._lock:
+            for store in (self._entries, self._errors):
+                for key in [k for k in store if resource_id is None or k[0] == resource_id]:
+                    del store[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'errors': len(self._errors),
+                'inflight': len(self._inflight),
+            }
+
+
+price_service = PriceService()
+
+
+def set_source(source):
+    """Swap the upstream source (e.g. a local stand-in in tests) and clear the cache."""
+    price_service.source = source
+    price_service.invalidate()
+
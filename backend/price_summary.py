@@ -0,0 +1,282 @@
+"""
+Maintained marketplace price summaries
+PriceSummary keeps, per source ('sell' = SellRequest.expected_price,
+'offer' = pending BuyerOffer.initial_price), crop and district, the running
+count, sum, min, max and the median of the latest RECENT_WINDOW prices.
+District '' is the all-district roll-up. Sell requests are placed in the
+farmer's district, buyer offers in district_wanted.
+
+Inserts update the two affected rows in place: the row is created with
+INSERT ... ON CONFLICT DO NOTHING, locked with SELECT ... FOR UPDATE, and
+count/total/min/max are incremented in SQL, so concurrent listings for the
+same key neither lose updates nor fail on uq_price_summaries_key (which,
+raised from after_insert, would fail the listing's own save). Updates and deletes that
+touch a summarised field re-aggregate just the affected keys, since a
+running min/max cannot be decremented. Readers (get_market_price,
+market_nearby) then need one lookup on the unique key instead of loading
+every listing. `python price_summary.py` rebuilds everything.
+"""
+import json
+from datetime import datetime
+
+from sqlalchemy import case, delete, event, func, insert, inspect, select, update
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import Farmer
+from models_marketplace import SellRequest, BuyerOffer, PriceSummary
+
+RECENT_WINDOW = 25
+
+_table = PriceSummary.__table__
+_sell = SellRequest.__table__
+_offer = BuyerOffer.__table__
+_farmers = Farmer.__table__
+
+# Fields whose change can move a row in or out of a summary
+WATCHED_FIELDS = {
+    'sell': ('crop_name', 'expected_price', 'farmer_id'),
+    'offer': ('crop_name', 'initial_price', 'district_wanted', 'status'),
+}
+
+
+def crop_key(crop_name):
+    return (crop_name or '').strip().lower()
+
+
+def _median(prices):
+    ordered = sorted(prices)
+    if not ordered:
+        return None
+    mid = len(ordered) // 2
+    return ordered[mid] if len(ordered) % 2 else (ordered[mid - 1] + ordered[mid]) / 2
+
+
+# ==================== BASE TABLE QUERIES ====================
+
+def _price_rows(source, key, district):
+    """select(price, created_at) of the rows that make up one summary."""
+    if source == 'sell':
+        query = select(_sell.c.expected_price, _sell.c.created_at).where(
+            func.lower(func.trim(_sell.c.crop_name)) == key,
+            _sell.c.expected_price > 0
+        )
+        if district:
+            query = query.join(_farmers, _farmers.c.id == _sell.c.farmer_id).where(_farmers.c.district == district)
+        return query
+    query = select(_offer.c.initial_price, _offer.c.created_at).where(
+        func.lower(func.trim(_offer.c.crop_name)) == key,
+        _offer.c.initial_price > 0,
+        _offer.c.status == 'pending'
+    )
+    if district:
+        query = query.where(_offer.c.district_wanted == district)
+    return query
+
+
+def _farmer_district(connection, farmer_id):
+    if not farmer_id:
+        return ''
+    return connection.execute(select(_farmers.c.district).where(_farmers.c.id == farmer_id)).scalar() or ''
+
+
+def _summary_key(source, key, district):
+    return (_table.c.source == source, _table.c.crop_key == key, _table.c.district == district)
+
+
+def _districts(district):
+    return ('', district) if district else ('',)
+
+
+# ==================== MAINTENANCE ====================
+
+def _ensure_row(connection, source, key, district):
+    """Create an empty summary row unless one exists (safe against concurrent creation)."""
+    values = dict(source=source, crop_key=key, district=district, count=0, total=0,
+                  recent_prices='[]', updated_at=datetime.utcnow())
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        connection.execute(upsert(_table).values(**values).on_conflict_do_nothing(
+            index_elements=['source', 'crop_key', 'district']))
+        return
+    if connection.execute(select(_table.c.id).where(*_summary_key(source, key, district))).first():
+        return
+    try:
+        with connection.begin_nested():
+            connection.execute(insert(_table).values(**values))
+    except IntegrityError:
+        pass
+
+
+def add_price(connection, source, key, district, price):
+    """Fold one new price into the all-district and district summaries."""
+    for scope in _districts(district):
+        _ensure_row(connection, source, key, scope)
+        row = connection.execute(
+            select(_table.c.id, _table.c.recent_prices).where(*_summary_key(source, key, scope)).with_for_update()
+        ).one()
+        recent = (json.loads(row.recent_prices or '[]') + [price])[-RECENT_WINDOW:]
+        connection.execute(update(_table).where(_table.c.id == row.id).values(
+            count=_table.c.count + 1,
+            total=_table.c.total + price,
+            min_price=case((_table.c.min_price.is_(None) | (_table.c.min_price > price), price),
+                           else_=_table.c.min_price),
+            max_price=case((_table.c.max_price.is_(None) | (_table.c.max_price < price), price),
+                           else_=_table.c.max_price),
+            recent_prices=json.dumps(recent),
+            recent_median=_median(recent),
+            updated_at=datetime.utcnow()
+        ))
+
+
+def recompute(connection, source, key, district):
+    """Re-aggregate one summary row from the base table (deletes it when empty)."""
+    query = _price_rows(source, key, district).subquery()
+    price = query.c[0]
+    count, total, low, high = connection.execute(
+        select(func.count(), func.sum(price), func.min(price), func.max(price)).select_from(query)
+    ).one()
+    if not count:
+        connection.execute(delete(_table).where(*_summary_key(source, key, district)))
+        return
+
+    recent = [row[0] for row in connection.execute(
+        select(price).select_from(query).order_by(query.c[1].desc()).limit(RECENT_WINDOW)
+    )][::-1]
+    values = dict(count=count, total=total, min_price=low, max_price=high,
+                  recent_prices=json.dumps(recent), recent_median=_median(recent),
+                  updated_at=datetime.utcnow())
+    _ensure_row(connection, source, key, district)
+    connection.execute(update(_table).where(*_summary_key(source, key, district)).values(**values))
+
+
+def rebuild_price_summaries():
+    """Recompute every summary from scratch. Returns the number of rows written."""
+    connection = db.session.connection()
+    connection.execute(delete(_table))
+    keys = set()
+    for crop_name, district in connection.execute(
+        select(_sell.c.crop_name, _farmers.c.district).select_from(_sell)
+        .outerjoin(_farmers, _farmers.c.id == _sell.c.farmer_id).distinct()
+    ):
+        keys.update(('sell', crop_key(crop_name), scope) for scope in _districts(district))
+    for crop_name, district in connection.execute(
+        select(_offer.c.crop_name, _offer.c.district_wanted).distinct()
+    ):
+        keys.update(('offer', crop_key(crop_name), scope) for scope in _districts(district))
+    for source, key, district in keys:
+        recompute(connection, source, key, district)
+    db.session.commit()
+    return PriceSummary.query.count()
+
+
+# ==================== READS ====================
+
+def get_price_summary(source, crop_name, district=None):
+    """
+    Summary dict for a crop, preferring the district row when it has data.
+    One indexed lookup; None when nothing is listed.
+    """
+    scopes = _districts(district)
+    rows = {row.district: row for row in PriceSummary.query.filter(
+        PriceSummary.source == source,
+        PriceSummary.crop_key == crop_key(crop_name),
+        PriceSummary.district.in_(scopes)
+    )}
+    row = rows.get(district) or rows.get('')
+    if row is None or not row.count:
+        return None
+    return {
+        'source': row.source,
+        'crop': row.crop_key,
+        'district': row.district or None,
+        'count': row.count,
+        'average': round(row.total / row.count, 2),
+        'min': row.min_price,
+        'max': row.max_price,
+        'recent_median': row.recent_median,
+    }
+
+
+# ==================== MAPPER HOOKS ====================
+
+def _contribution(connection, source, target, old=False):
+    """(crop_key, district, price) a row adds to the summaries, or None."""
+    state = inspect(target)
+
+    def value(field):
+        if old:
+            history = state.attrs[field].history
+            if history.deleted:
+                return history.deleted[0]
+        return getattr(target, field)
+
+    if source == 'sell':
+        price = value('expected_price')
+        district = _farmer_district(connection, value('farmer_id'))
+    else:
+        if (value('status') or 'pending') != 'pending':
+            return None
+        price = value('initial_price')
+        district = value('district_wanted') or ''
+    if not price or price <= 0:
+        return None
+    return crop_key(value('crop_name')), district, float(price)
+
+
+def _source(mapper):
+    return 'sell' if mapper.class_ is SellRequest else 'offer'
+
+
+def _row_inserted(mapper, connection, target):
+    source = _source(mapper)
+    contribution = _contribution(connection, source, target)
+    if contribution:
+        add_price(connection, source, *contribution)
+
+
+def _row_updated(mapper, connection, target):
+    source = _source(mapper)
+    state = inspect(target)
+    # Negotiation, photo and timestamp updates leave the summaries alone
+    if not any(state.attrs[field].history.has_changes() for field in WATCHED_FIELDS[source]):
+        return
+    keys = set()
+    for old in (True, False):
+        contribution = _contribution(connection, source, target, old=old)
+        if contribution:
+            keys.update((contribution[0], scope) for scope in _districts(contribution[1]))
+    for key, district in keys:
+        recompute(connection, source, key, district)
+
+
+def _row_deleted(mapper, connection, target):
+    source = _source(mapper)
+    contribution = _contribution(connection, source, target)
+    if contribution:
+        for district in _districts(contribution[1]):
+            recompute(connection, source, contribution[0], district)
+
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+for _model, _source_name in ((SellRequest, 'sell'), (BuyerOffer, 'offer')):
+    event.listen(_model, 'after_insert', _row_inserted)
+    event.listen(_model, 'after_update', _row_updated)
+    event.listen(_model, 'after_delete', _row_deleted)
+    # Load the previous value on assignment, even on expired instances, so the old key is known
+    for _field in WATCHED_FIELDS[_source_name]:
+        event.listen(getattr(_model, _field), 'set', _keep_old_value, active_history=True)
+
+
+if __name__ == '__main__':
+    from app import app
+
+    with app.app_context():
+        print(f"📊 Price summaries rebuilt: {rebuild_price_summaries()}")
@@ -0,0 +1,250 @@
+"""
+Background mandi price ingester
+Pulls commodity prices from data.gov.in on a schedule and writes them to
+MarketPrice with bulk INSERT ... ON CONFLICT upserts keyed on
+(commodity_name, market_name, price_date).
+
+Each commodity keeps a price_date watermark so a run only keeps records
+from the watermark day onwards. The API takes no sort order, so every page
+is read (up to MAX_PAGES) rather than stopping at the first page of old
+records. Timings of the last run are kept in last_sync_stats.
+"""
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import func
+
+from extensions import db
+from models_marketplace import MarketPrice
+from price_service import price_service, commodity_names, COMMODITY_PRICES_RESOURCE, OILSEED_COMMODITIES
+from price_history import invalidate_price_history
+
+SYNC_INTERVAL_SECONDS = int(os.getenv('PRICE_SYNC_INTERVAL_SECONDS', 60 * 60))
+PAGE_SIZE = 500
+PAGES_PER_ROUND = 4          # pages fetched concurrently per commodity per round
+MAX_PAGES = 20
+PAGE_WORKERS = 8
+UPSERT_CHUNK_SIZE = 500
+
+UPSERT_KEY = ('commodity_name', 'market_name', 'price_date')
+UPDATE_COLUMNS = ('market_state', 'market_district', 'open_price', 'high_price',
+                  'low_price', 'close_price', 'updated_at')
+
+# Separate pools so commodity tasks never wait on their own page fetches
+_commodity_pool = ThreadPoolExecutor(max_workers=len(OILSEED_COMMODITIES), thread_name_prefix='price-sync')
+_page_pool = ThreadPoolExecutor(max_workers=PAGE_WORKERS, thread_name_prefix='price-sync-page')
+_sync_lock = threading.Lock()
+
+# commodity_key -> latest price_date stored
+watermarks = {}
+last_sync_stats = {}
+
+
+def _to_float(value):
+    try:
+        return float(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_record(record, commodity_key):
+    """Convert one API record into a market_prices row dict (or None if unusable)."""
+    try:
+        price_date = datetime.strptime(record.get('arrival_date', ''), '%d/%m/%Y').date()
+    except (TypeError, ValueError):
+        # No usable arrival date: the price cannot be placed on a day
+        return None
+
+    market_name = record.get('market', '')
+    if not market_name:
+        return None
+
+    return {
+        'commodity_name': record.get('commodity_name', commodity_key),
+        'market_name': market_name,
+        'market_state': record.get('state', ''),
+        'market_district': record.get('district', ''),
+        # Mandi records carry min/max/modal only; there is no opening price
+        'open_price': None,
+        'close_price': _to_float(record.get('modal_price')),
+        'high_price': _to_float(record.get('max_price')),
+        'low_price': _to_float(record.get('min_price')),
+        'price_date': price_date,
+    }
+
+
+def load_watermarks():
+    """Initialise watermarks from the newest stored price_date per commodity."""
+    for commodity_key in OILSEED_COMMODITIES:
+        if commodity_key in watermarks:
+            continue
+        latest = db.session.query(func.max(MarketPrice.price_date)).filter(
+            MarketPrice.commodity_name.in_(commodity_names(commodity_key))
+        ).scalar()
+        if latest:
+            watermarks[commodity_key] = latest
+
+
+def fetch_new_records(commodity_key, api_name):
+    """
+    Fetch pages concurrently until a short page (or MAX_PAGES), keeping records
+    at/after the watermark. Returns (rows, pages_fetched).
+    """
+    source = price_service.source
+    watermark = watermarks.get(commodity_key)
+    rows = []
+    page = 0
+
+    while page < MAX_PAGES:
+        offsets = [(page + i) * PAGE_SIZE for i in range(min(PAGES_PER_ROUND, MAX_PAGES - page))]
+        pages = list(_page_pool.map(
+            lambda offset: source(COMMODITY_PRICES_RESOURCE, {'commodity_name': api_name}, PAGE_SIZE, offset=offset),
+            offsets
+        ))
+        page += len(offsets)
+
+        for records in pages:
+            for record in records:
+                row = parse_record(record, commodity_key)
+                # Keep the watermark day itself: late arrivals for it still upsert
+                if row and (watermark is None or row['price_date'] >= watermark):
+                    rows.append(row)
+
+        # Records come in no guaranteed order, so a round of old records does not mean the rest are old
+        if any(len(records) < PAGE_SIZE for records in pages):
+            break
+
+    return rows, page
+
+
+def bulk_upsert_market_prices(rows):
+    """Upsert rows into market_prices in chunks. Returns number of rows written."""
+    if not rows:
+        return 0
+
+    # ON CONFLICT cannot touch the same row twice in one statement
+    unique = {}
+    for row in rows:
+        unique[tuple(row[k] for k in UPSERT_KEY)] = row
+    rows = list(unique.values())
+
+    now = datetime.utcnow()
+    for row in rows:
+        row.setdefault('id', str(uuid.uuid4()))
+        row.setdefault('created_at', now)
+        row['updated_at'] = now
+
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return _upsert_row_by_row(rows)
+
+    table = MarketPrice.__table__
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        stmt = insert(table).values(rows[start:start + UPSERT_CHUNK_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(UPSERT_KEY),
+            set_={col: stmt.excluded[col] for col in UPDATE_COLUMNS}
+        )
+        db.session.execute(stmt)
+    db.session.commit()
+    return len(rows)
+
+
+def _upsert_row_by_row(rows):
+    """Fallback for databases without ON CONFLICT support."""
+    for row in rows:
+        existing = MarketPrice.query.filter_by(**{k: row[k] for k in UPSERT_KEY}).first()
+        if existing:
+            for col in UPDATE_COLUMNS:
+                setattr(existing, col, row[col])
+        else:
+            db.session.add(MarketPrice(**row))
+    db.session.commit()
+    return len(rows)
+
+
+def sync_all_prices():
+    """
+    Run one sync over all oilseed commodities.
+    Must be called inside an app context. Returns the run's stats dict.
+    """
+    with _sync_lock:
+        started = time.perf_counter()
+        load_watermarks()
+        stats = {
+            'started_at': datetime.utcnow().isoformat(),
+            'synced_count': 0,
+            'commodities': {},
+            'errors': [],
+        }
+
+        # Fetch every commodity in parallel, then write sequentially on this thread
+        fetches = {
+            key: _commodity_pool.submit(_timed, fetch_new_records, key, api_name)
+            for key, api_name in OILSEED_COMMODITIES.items()
+        }
+
+        for commodity_key, future in fetches.items():
+            entry = stats['commodities'][commodity_key] = {}
+            try:
+                (rows, pages), fetch_ms = future.result()
+                entry.update({'pages': pages, 'fetched': len(rows), 'fetch_ms': fetch_ms})
+
+                written, upsert_ms = _timed(bulk_upsert_market_prices, rows)
+                entry.update({'upserted': written, 'upsert_ms': upsert_ms})
+                stats['synced_count'] += written
+
+                if rows:
+                    watermarks[commodity_key] = max(
+                        max(row['price_date'] for row in rows),
+                        watermarks.get(commodity_key, rows[0]['price_date'])
+                    )
+            except Exception as e:
+                db.session.rollback()
+                entry['error'] = str(e)
+                stats['errors'].append(f"{commodity_key}: {str(e)}")
+
+            watermark = watermarks.get(commodity_key)
+            entry['watermark'] = watermark.isoformat() if watermark else None
+
+        if stats['synced_count']:
+            invalidate_price_history()
+
+        stats['duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        last_sync_stats.clear()
+        last_sync_stats.update(stats)
+        print(f"🔄 Price sync: {stats['synced_count']} rows in {stats['duration_ms']} ms")
+        return stats
+
+
+def _timed(fn, *args):
+    """Run fn and return (result, elapsed_ms)."""
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, round((time.perf_counter() - started) * 1000, 1)
+
+
+def start_price_sync_scheduler(app, interval=SYNC_INTERVAL_SECONDS):
+    """Start a daemon thread that runs sync_all_prices every `interval` seconds."""
+    def loop():
+        while True:
+            with app.app_context():
+                try:
+                    sync_all_prices()
+                except Exception as e:
+                    print(f"❌ Price sync failed: {e}")
+                finally:
+                    db.session.remove()
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, name='price-sync-scheduler', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,95 @@
+"""
+Vectorized profit math shared by every profit calculator in the project
+
+Takes columnar inputs (scalars or numpy arrays that broadcast together) and
+returns every metric as an array, so a sweep over thousands of price/yield
+points is one call:
+
+    profit_metrics(land_area, expected_yield, market_price, cost_per_area)
+
+Units follow the caller: kg/ha and ₹/kg for the dashboards, quintals/acre
+and ₹/quintal for the backend ML stub.
+
+Ratios use masked division: profit_margin, roi, profit_per_unit and
+cost_per_unit are 0 wherever their denominator is not positive, matching
+the `if total > 0 else 0` guards of the scalar code they replace.
+
+The three apps (root app.py, this dashboard, backend/) do not share an
+import root, so each imports its own copy as the top-level module
+`profit_math`: FARMER_DASHBOARD_BACKEND/profit_math.py is the original,
+profit_math.py at the repository root and backend/profit_math.py are
+verbatim copies; backend/test_profit_risk.py checks that all three stay
+identical.
+"""
+
+import numpy as np
+
+
+def round_values(values, decimals):
+    """
+    Round exactly like builtin round(), for scalars and arrays
+
+    np.round scales by 10**decimals first, so values such as 6.325 (stored
+    just above the half) land exactly on .5 and round to even. Those
+    near-ties are re-rounded with builtin round(); everything else keeps
+    the vectorized result.
+    """
+    if np.ndim(values) == 0:
+        return np.float64(round(float(values), decimals))
+    values = np.asarray(values, dtype=float)
+    rounded = np.round(values, decimals)
+    scaled = np.abs(values) * 10.0 ** decimals
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) <= 1e-12 * np.maximum(scaled, 1.0)
+    if near_tie.any():
+        rounded[near_tie] = [round(float(value), decimals) for value in values[near_tie]]
+    return rounded
+
+
+def _ratio(numerator, denominator):
+    """numerator / denominator where denominator > 0, else 0"""
+    numerator, denominator = np.broadcast_arrays(np.asarray(numerator, dtype=float),
+                                                 np.asarray(denominator, dtype=float))
+    return np.divide(numerator, denominator, out=np.zeros(numerator.shape), where=denominator > 0)
+
+
+def profit_metrics(land_area, expected_yield, market_price, cost_per_area, decimals=None):
+    """
+    Revenue, cost, profit and ratio metrics for arrays of scenarios
+
+    Args:
+        land_area: Area per scenario (ha or acres)
+        expected_yield: Yield per unit area
+        market_price: Price per unit of yield
+        cost_per_area: Total cultivation cost per unit area
+        decimals (int): If set, total_yield, total_revenue, total_cost and
+            net_profit are rounded as they are computed (revenue from the
+            rounded yield, profit from the rounded totals)
+
+    Returns:
+        dict: 'total_yield', 'total_revenue', 'total_cost', 'net_profit',
+        'profit_margin' (%), 'roi' (%), 'profit_per_unit', 'cost_per_unit'
+        as float arrays of the broadcast input shape
+    """
+    land_area = np.asarray(land_area, dtype=float)
+    expected_yield = np.asarray(expected_yield, dtype=float)
+    market_price = np.asarray(market_price, dtype=float)
+    cost_per_area = np.asarray(cost_per_area, dtype=float)
+
+    def stage(values):
+        return values if decimals is None else round_values(values, decimals)
+
+    total_yield = stage(expected_yield * land_area)
+    total_revenue = stage(total_yield * market_price)
+    total_cost = stage(cost_per_area * land_area)
+    net_profit = stage(total_revenue - total_cost)
+
+    return {
+        'total_yield': total_yield,
+        'total_revenue': total_revenue,
+        'total_cost': total_cost,
+        'net_profit': net_profit,
+        'profit_margin': _ratio(net_profit, total_revenue) * 100,
+        'roi': _ratio(net_profit, total_cost) * 100,
+        'profit_per_unit': _ratio(net_profit, total_yield),
+        'cost_per_unit': _ratio(cost_per_area, expected_yield),
+    }
@@ -0,0 +1,125 @@
+"""
+Monte Carlo profit risk for the profit simulator
+Draws yield, price and input cost for many paths at once and evaluates them
+with the shared profit math (profit_math.profit_metrics), returning the
+spread of net profit: percentiles, probability of loss and value-at-risk.
+
+- Price: lognormal around the crop price. Its volatility is read off the
+  forecast interval of a random walk over the stored monthly mandi prices
+  (price_history): sigma_h = sigma_monthly * sqrt(months to harvest).
+- Yield and cost: normal with fixed coefficients of variation, floored at 0.
+
+Runs are seeded. Without an explicit seed the seed is derived from the
+inputs, so identical requests give identical results and are served from
+an in-process LRU.
+"""
+import hashlib
+import json
+from datetime import date
+from functools import lru_cache
+
+import numpy as np
+
+from ml.profit_model_stub import crop_inputs, profit_metrics
+from price_history import get_price_series
+from price_service import commodity_names
+
+DEFAULT_PATHS = 100_000
+MAX_PATHS = 200_000
+YIELD_CV = 0.20
+COST_CV = 0.08
+DEFAULT_MONTHLY_PRICE_VOLATILITY = 0.06
+MIN_PRICE_HISTORY_POINTS = 4
+PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+VAR_CONFIDENCE = 95
+
+MONTHS = ('January', 'February', 'March', 'April', 'May', 'June',
+          'July', 'August', 'September', 'October', 'November', 'December')
+
+
+def months_to_harvest(harvest_month, today=None):
+    """Whole months from today until the harvest month (1-12)."""
+    today = today or date.today()
+    name = str(harvest_month).strip().capitalize()
+    if name.isdigit():
+        month = int(name)
+    elif name in MONTHS:
+        month = MONTHS.index(name) + 1
+    else:
+        month = today.month
+    return (month - today.month) % 12 or 12
+
+
+def monthly_price_volatility(crop_name, state=None):
+    """Std dev of monthly log price changes from stored mandi prices, or the default."""
+    try:
+        series = get_price_series(commodity_names(crop_name), state=state, interval='month', months=24)
+    except Exception:
+        series = []
+    prices = np.array([point['price'] for point in series if point.get('price')], dtype=float)
+    if len(prices) < MIN_PRICE_HISTORY_POINTS:
+        return DEFAULT_MONTHLY_PRICE_VOLATILITY, 'default'
+    return float(np.std(np.diff(np.log(prices)), ddof=1)), 'mandi price history'
+
+
+def derive_seed(*inputs):
+    """Stable 64-bit seed from the simulation inputs."""
+    digest = hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'little')
+
+
+@lru_cache(maxsize=256)
+def simulate_profit(area, yield_per_acre, price, cost_per_acre, price_sigma,
+                    yield_cv=YIELD_CV, cost_cv=COST_CV, paths=DEFAULT_PATHS, seed=0):
+    """
+    Net profit distribution over `paths` draws. Returns a dict of plain floats.
+    Cached: the same arguments (including seed) return the same dict object.
+    """
+    rng = np.random.default_rng(seed)
+    z = rng.standard_normal((3, paths))
+
+    prices = price * np.exp(price_sigma * z[0] - 0.5 * price_sigma ** 2)
+    yields = np.maximum(yield_per_acre * (1 + yield_cv * z[1]), 0)
+    costs = np.maximum(cost_per_acre * (1 + cost_cv * z[2]), 0)
+    net = profit_metrics(area, yields, prices, costs)['net_profit']
+
+    cutoff = np.percentile(net, 100 - VAR_CONFIDENCE)
+    return {
+        'paths': paths,
+        'seed': seed,
+        'mean': round(float(net.mean()), 2),
+        'std': round(float(net.std()), 2),
+        'percentiles': {f'p{p}': round(float(v), 2)
+                        for p, v in zip(PERCENTILES, np.percentile(net, PERCENTILES))},
+        'probability_of_loss': round(float(np.mean(net < 0)), 4),
+        # Loss not exceeded with VAR_CONFIDENCE% confidence, and the average loss beyond it
+        'value_at_risk': round(max(0.0, -float(cutoff)), 2),
+        'expected_shortfall': round(max(0.0, -float(net[net <= cutoff].mean())), 2),
+        'var_confidence': VAR_CONFIDENCE,
+    }
+
+
+def simulate_crop_risk(crop_name, state, harvest_month, soil_type, water_type, area_in_acres,
+                       paths=DEFAULT_PATHS, seed=None):
+    """Monte Carlo risk for the simulator form inputs (same crop model as predict_profit)."""
+    paths = int(min(max(paths, 1000), MAX_PATHS))
+    yield_per_acre, price, cost_per_acre = crop_inputs(crop_name, soil_type, water_type, jitter=False)
+    monthly_sigma, volatility_source = monthly_price_volatility(crop_name, state)
+    horizon = months_to_harvest(harvest_month)
+    price_sigma = monthly_sigma * horizon ** 0.5
+
+    if seed is None:
+        seed = derive_seed(crop_name, state, harvest_month, soil_type, water_type, area_in_acres,
+                           paths, round(price_sigma, 6))
+    risk = dict(simulate_profit(float(area_in_acres), float(yield_per_acre), float(price), float(cost_per_acre),
+                                round(price_sigma, 6), paths=paths, seed=int(seed)))
+    risk['price_model'] = {
+        'price_per_quintal': price,
+        'months_to_harvest': horizon,
+        'volatility': round(price_sigma, 4),
+        'volatility_source': volatility_source,
+        # 95% forecast interval of the harvest-time price
+        'interval_95': [round(price * float(np.exp(-1.96 * price_sigma)), 2),
+                        round(price * float(np.exp(1.96 * price_sigma)), 2)],
+    }
+    return risk
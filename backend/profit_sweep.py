@@ -0,0 +1,170 @@
+"""
+Parameter sweeps over the profit simulator
+Evaluates predict_profit's inputs over the Cartesian product of the given
+values in one vectorized pass, and builds a one-at-a-time sensitivity
+(tornado) table around the base inputs.
+
+The crop model (ml.profit_model_stub.crop_inputs) is called once per
+distinct (crop, soil, water) combination; every grid point then indexes
+that small lookup table and the whole grid goes through
+profit_math.profit_metrics in a single call. Prices are taken without the
+stub's random jitter so sweeps are deterministic.
+
+Only the inputs the crop model uses (crop, soil, water) and the area can be
+swept. harvest_month, state and market_district are accepted in the base and
+echoed back, but the simulator's figures do not depend on them, so sweeping
+them is rejected rather than reported as a zero swing.
+
+Sweeps are bounded by MAX_SWEEP_POINTS grid points.
+"""
+import numpy as np
+
+from ml.profit_model_stub import crop_inputs, profit_metrics
+
+MAX_SWEEP_POINTS = 10_000
+MAX_AXIS_VALUES = 200
+
+# predict_profit inputs that change the result, in grid axis order
+SWEEP_INPUTS = ('crop_name', 'soil_type', 'water_type', 'area_in_acres')
+NUMERIC_INPUTS = ('area_in_acres',)
+MODEL_INPUTS = ('crop_name', 'soil_type', 'water_type')     # what crop_inputs depends on
+# predict_profit inputs the figures do not depend on: allowed in the base, not sweepable
+CONTEXT_INPUTS = ('harvest_month', 'state', 'market_district')
+
+DEFAULT_BASE = {
+    'crop_name': 'Mustard',
+    'soil_type': '',
+    'water_type': 'Freshwater',
+    'area_in_acres': 1.0,
+    'harvest_month': 'October',
+    'state': 'Maharashtra',
+    'market_district': '',
+}
+
+
+def axis_values(name, spec):
+    """
+    Values for one swept input: a list, or for numeric inputs a range
+    {"start", "stop", "steps"}. Raises ValueError on bad specs.
+    """
+    if isinstance(spec, dict):
+        if name not in NUMERIC_INPUTS:
+            raise ValueError(f"{name} takes a list of values, not a range")
+        steps = int(spec.get('steps', 10))
+        if not 1 <= steps <= MAX_AXIS_VALUES:
+            raise ValueError(f"{name}: steps must be between 1 and {MAX_AXIS_VALUES}")
+        values = np.linspace(float(spec['start']), float(spec['stop']), steps).round(4).tolist()
+    elif isinstance(spec, list) and spec:
+        if len(spec) > MAX_AXIS_VALUES:
+            raise ValueError(f"{name}: at most {MAX_AXIS_VALUES} values")
+        values = [float(v) for v in spec] if name in NUMERIC_INPUTS else [str(v) for v in spec]
+    else:
+        raise ValueError(f"{name}: expected a non-empty list or a range")
+
+    if name in NUMERIC_INPUTS and min(values) < 0:
+        raise ValueError(f"{name} must not be negative")
+    return list(dict.fromkeys(values))
+
+
+def evaluate_grid(base, sweep):
+    """
+    Profit metrics over the Cartesian product of `sweep` ({input: values}),
+    with every other input held at `base`.
+    Returns (axes, metrics): axes is [(input, values)] in SWEEP_INPUTS order
+    (length-1 axes for fixed inputs); metrics arrays have one dimension per axis.
+    """
+    axes = [(name, sweep[name] if name in sweep else [base[name]]) for name in SWEEP_INPUTS]
+    shape = tuple(len(values) for _, values in axes)
+    if int(np.prod(shape)) > MAX_SWEEP_POINTS:
+        raise ValueError(f"Sweep has {int(np.prod(shape))} points; the limit is {MAX_SWEEP_POINTS}")
+
+    # Crop model per distinct (crop, soil, water) combination: shape (crops, soils, waters, 3)
+    crops, soils, waters = (dict(axes)[name] for name in MODEL_INPUTS)
+    table = np.array([[[crop_inputs(crop, soil, water, jitter=False) for water in waters]
+                       for soil in soils] for crop in crops], dtype=float)
+
+    # Broadcast the table and the area axis to the full grid
+    table = table.reshape(len(crops), len(soils), len(waters), 1, 3)
+    area = np.asarray(dict(axes)['area_in_acres'], dtype=float).reshape(1, 1, 1, -1)
+    yield_per_acre, price, cost_per_acre = (np.broadcast_to(table[..., i], shape) for i in range(3))
+
+    metrics = profit_metrics(area, yield_per_acre, price, cost_per_acre, decimals=2)
+    return axes, {name: np.broadcast_to(values, shape) for name, values in metrics.items()}
+
+
+def sensitivity_table(base, sweep):
+    """
+    Tornado rows: for each swept input alone, the lowest and highest net profit
+    and the values that produce them, sorted by swing (largest first).
+    """
+    _, base_metrics = evaluate_grid(base, {})
+    base_profit = float(base_metrics['net_profit'].item())
+    rows = []
+    for name, values in sweep.items():
+        _, metrics = evaluate_grid(base, {name: values})
+        profits = metrics['net_profit'].reshape(-1)
+        low, high = int(np.argmin(profits)), int(np.argmax(profits))
+        rows.append({
+            'input': name,
+            'base_value': base[name],
+            'low': {'value': values[low], 'net_profit': float(profits[low])},
+            'high': {'value': values[high], 'net_profit': float(profits[high])},
+            'swing': round(float(profits[high] - profits[low]), 2),
+        })
+    rows.sort(key=lambda row: row['swing'], reverse=True)
+    return base_profit, rows
+
+
+def base_inputs(base):
+    """
+    Base inputs over DEFAULT_BASE, with types checked so a bad value is a
+    ValueError rather than an error inside the crop model.
+    """
+    if not isinstance(base, dict):
+        raise ValueError('base must be an object')
+    base = {**DEFAULT_BASE, **{k: v for k, v in base.items() if k in DEFAULT_BASE}}
+    for name, value in base.items():
+        if name in NUMERIC_INPUTS:
+            if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+                raise ValueError(f"{name} must be a number")
+            base[name] = float(value)
+            if base[name] < 0:
+                raise ValueError(f"{name} must not be negative")
+        elif not isinstance(value, str):
+            raise ValueError(f"{name} must be a string")
+    return base
+
+
+def run_sweep(base, sweep):
+    """Full sweep response: grid over the swept inputs plus the tornado table."""
+    base = base_inputs(base)
+    if not isinstance(sweep, dict):
+        raise ValueError('sweep must be an object')
+    if not sweep:
+        raise ValueError('Nothing to sweep')
+    context = set(sweep) & set(CONTEXT_INPUTS)
+    if context:
+        raise ValueError(f"{', '.join(sorted(context))} cannot be swept: the simulator's figures do not depend on them")
+    unknown = set(sweep) - set(SWEEP_INPUTS)
+    if unknown:
+        raise ValueError(f"Unknown inputs: {', '.join(sorted(unknown))}")
+    sweep = {name: axis_values(name, sweep[name]) for name in SWEEP_INPUTS if name in sweep}
+
+    axes, metrics = evaluate_grid(base, sweep)
+    swept = [i for i, (name, _) in enumerate(axes) if name in sweep]
+    fixed = tuple(i for i in range(len(axes)) if i not in swept)
+
+    def grid(values):
+        return np.squeeze(values, axis=fixed).tolist()
+
+    base_profit, tornado = sensitivity_table(base, sweep)
+    return {
+        'base': base,
+        'base_net_profit': base_profit,
+        'points': int(np.prod([len(axes[i][1]) for i in swept])),
+        'axes': [{'input': axes[i][0], 'values': axes[i][1]} for i in swept],
+        'net_profit': grid(metrics['net_profit']),
+        'gross_income': grid(metrics['total_revenue']),
+        'input_cost': grid(metrics['total_cost']),
+        'sensitivity': tornado,
+    }
@@ -0,0 +1,59 @@
+"""
+Per-client rate limiting for expensive routes
+Same policy and token buckets (token_bucket.py, a copy of the dashboard's)
+as the dashboard: RATE_LIMIT['calls'] tokens per RATE_LIMIT['per_seconds']
+for each (cost class, client) pair, where a request takes
+COST_CLASSES[cost_class] tokens. Clients are the logged-in farmer or buyer,
+else the remote address.
+
+Buckets live in-process by default, or in a SQLite file shared by all workers
+on the host when RATE_LIMIT_DB is set (point it at /dev/shm to keep it in
+shared memory).
+
+Limited requests get 429 with Retry-After.
+"""
+import os
+
+from flask import request, session
+
+from token_bucket import InProcessStore, SQLiteStore, make_rate_limited, make_store
+from token_bucket import RateLimiter as TokenBucketLimiter
+
+RATE_LIMIT = {
+    'enabled': os.getenv('RATE_LIMIT_ENABLED', 'true').lower() != 'false',
+    'calls': int(os.getenv('RATE_LIMIT_CALLS', 100)),
+    'per_seconds': int(os.getenv('RATE_LIMIT_PER_SECONDS', 60)),
+}
+
+COST_CLASSES = {
+    'default': 1,
+    'mandi': 5,     # live data.gov.in mandi API fan-out
+}
+
+RATE_LIMIT_DB = os.getenv('RATE_LIMIT_DB')
+
+
+class RateLimiter(TokenBucketLimiter):
+    """Token buckets defaulting to RATE_LIMIT."""
+
+    def __init__(self, calls=None, per_seconds=None, **kwargs):
+        super().__init__(calls or RATE_LIMIT['calls'], per_seconds or RATE_LIMIT['per_seconds'], **kwargs)
+
+
+rate_limiter = RateLimiter(store=make_store(RATE_LIMIT_DB))
+
+
+def client_id():
+    farmer_id = session.get('farmer_id_verified')
+    if farmer_id:
+        return f'farmer:{farmer_id}'
+    buyer_id = session.get('buyer_id_verified')
+    if buyer_id:
+        return f'buyer:{buyer_id}'
+    return f'ip:{request.remote_addr}'
+
+
+rate_limited = make_rate_limited(
+    RATE_LIMIT, COST_CLASSES, lambda: rate_limiter, client_id,
+    lambda retry_after: {'error': f'Too many requests. Try again in {retry_after} seconds.'}
+)
@@ -0,0 +1,172 @@
+"""
+Real-time push
+Publishes new notifications and unread counts to the per-user SocketIO rooms
+(user_<id>) joined in ml/websocket_server.py, so open pages update live
+instead of polling /notifications/api/unread-count, /notifications/api/list
+and /bidding/notifications.
+
+Notification and AuctionNotification rows added through the ORM are picked
+up by a session flush hook and pushed once the transaction commits (dropped
+on rollback). Set-based paths (segment fan-out, mark read, clear) call the
+publish_* functions after their commit. Only users with an open socket are
+looked up or pushed to, so nothing is queried when nobody is connected.
+
+Events:
+- notification:          {'notification': {...}, 'unread_count': n}   (farmers)
+- unread_count:          {'unread_count': n}                          (farmers)
+- auction_notification:  {'notification': {...}, 'unread_count': n}   (auction users)
+- auction_unread_count:  {'unread_count': n}                          (auction users)
+"""
+from datetime import datetime
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import Farmer, Notification, NotificationCounter
+from models_marketplace import AuctionNotification
+from ml.websocket_server import socketio, user_room, online_users
+
+_PENDING_KEY = 'realtime_pending'
+
+
+def _emit(user_id, event_name, payload):
+    if socketio.server is None:      # socket server not initialised (scripts, seeding)
+        return
+    try:
+        socketio.emit(event_name, payload, to=user_room(user_id))
+    except Exception as e:
+        print(f"⚠️ Realtime push failed for {user_id}: {e}")
+
+
+def _rows(statement):
+    # Own connection: also usable from after_commit, where the session can't run SQL
+    with db.engine.connect() as conn:
+        return conn.execute(statement).all()
+
+
+def farmer_unread_counts(farmer_ids):
+    """farmer_id -> unread count, read from NotificationCounter."""
+    if not farmer_ids:
+        return {}
+    counts = dict(_rows(
+        select(NotificationCounter.farmer_id, NotificationCounter.unread_count)
+        .where(NotificationCounter.farmer_id.in_(farmer_ids))
+    ))
+    missing = set(farmer_ids) - set(counts)
+    if missing:
+        counts.update(_rows(
+            select(Notification.farmer_id, func.count(Notification.id))
+            .where(Notification.farmer_id.in_(missing), Notification.is_read == False)
+            .group_by(Notification.farmer_id)
+        ))
+    return {farmer_id: counts.get(farmer_id, 0) for farmer_id in farmer_ids}
+
+
+def auction_unread_counts(user_ids):
+    """user_id -> unread auction notification count."""
+    if not user_ids:
+        return {}
+    counts = dict(_rows(
+        select(AuctionNotification.user_id, func.count(AuctionNotification.id))
+        .where(AuctionNotification.user_id.in_(user_ids), AuctionNotification.is_read == False)
+        .group_by(AuctionNotification.user_id)
+    ))
+    return {user_id: counts.get(user_id, 0) for user_id in user_ids}
+
+
+# ==================== PUBLISH API ====================
+
+def publish_notifications(items):
+    """
+    Push newly created notifications. items are (kind, user_id, payload)
+    with kind 'farmer' (Notification) or 'auction' (AuctionNotification).
+    """
+    online = online_users()
+    items = [item for item in items if item[1] in online]
+    if not items:
+        return
+    counts = {
+        'farmer': farmer_unread_counts({user_id for kind, user_id, _ in items if kind == 'farmer'}),
+        'auction': auction_unread_counts({user_id for kind, user_id, _ in items if kind == 'auction'}),
+    }
+    for kind, user_id, payload in items:
+        event_name = 'notification' if kind == 'farmer' else 'auction_notification'
+        _emit(user_id, event_name, {'notification': payload, 'unread_count': counts[kind][user_id]})
+
+
+def publish_unread_counts(farmer_ids):
+    """Push current unread counts to the given farmers (after reads/deletes)."""
+    online = set(farmer_ids) & online_users()
+    for farmer_id, count in farmer_unread_counts(online).items():
+        _emit(farmer_id, 'unread_count', {'unread_count': count})
+
+
+def publish_auction_unread_counts(user_ids):
+    """Push current unread auction notification counts to the given users."""
+    online = set(user_ids) & online_users()
+    for user_id, count in auction_unread_counts(online).items():
+        _emit(user_id, 'auction_unread_count', {'unread_count': count})
+
+
+def publish_segment(farmer_condition, values):
+    """
+    Push one fanned-out notification (column values as given to fan_out) to
+    the connected farmers matching farmer_condition, with their counters.
+    """
+    online = online_users()
+    if not online:
+        return
+    rows = _rows(
+        select(NotificationCounter.farmer_id, NotificationCounter.unread_count).where(
+            NotificationCounter.farmer_id.in_(online),
+            NotificationCounter.farmer_id.in_(select(Farmer.id).where(farmer_condition))
+        )
+    )
+    if not rows:
+        return
+    payload = {
+        'title': values.get('title'),
+        'description': values.get('description'),
+        'type': values.get('notification_type'),
+        'icon': values.get('icon'),
+        'color': values.get('color'),
+        'relatedId': values.get('related_id'),
+        'relatedType': values.get('related_type'),
+        'actionLink': values.get('action_link'),
+        'isRead': False,
+        'isImportant': bool(values.get('is_important')),
+        'expiresAt': values['expires_at'].isoformat() if values.get('expires_at') else None,
+        'createdAt': datetime.utcnow().isoformat(),
+    }
+    for farmer_id, count in rows:
+        _emit(farmer_id, 'notification', {'notification': payload, 'unread_count': count})
+
+
+# ==================== SESSION HOOKS ====================
+
+@event.listens_for(Session, 'after_flush')
+def _collect_new_notifications(session, flush_context):
+    pending = None
+    for obj in session.new:
+        if isinstance(obj, Notification):
+            item = ('farmer', obj.farmer_id, obj.to_dict())
+        elif isinstance(obj, AuctionNotification):
+            item = ('auction', obj.user_id, obj.to_dict())
+        else:
+            continue
+        if pending is None:
+            pending = session.info.setdefault(_PENDING_KEY, [])
+        pending.append(item)
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_after_commit(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        publish_notifications(pending)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_on_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
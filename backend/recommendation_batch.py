@@ -0,0 +1,247 @@
+"""
+Nightly scheme recommendation precompute
+Recomputes rule-based FarmerRecommendation rows for every farmer, CHUNK_SIZE
+farmers at a time in farmer-id order. Each chunk's distinct profiles are
+scored in a process pool against the compiled scheme index, then the chunk's
+old rule-based rows are replaced with one bulk insert. The chunk and the
+run's farmer-id watermark commit together, so an interrupted run resumes
+after the last finished chunk. A run is claimed with a conditional UPDATE
+and keeps a heartbeat, so two processes never execute the same run.
+
+Fresh LLM recommendations are left in place; the request path serves the
+stored rows and only computes on demand for farmers whose eligibility
+profile (profile_hash) changed after their rows were written.
+
+Run manually: python recommendation_batch.py
+"""
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import or_
+
+from extensions import db
+from models import Farmer, FarmerRecommendation, RecommendationBatchRun
+from scheme_eligibility import SchemeIndex, get_scheme_index, profile_hash
+
+CHUNK_SIZE = 500
+PROFILES_PER_TASK = 200
+BATCH_WORKERS = int(os.getenv('RECOMMENDATION_BATCH_WORKERS', min(4, os.cpu_count() or 1)))
+BATCH_HOUR = int(os.getenv('RECOMMENDATION_BATCH_HOUR', 2))   # local time
+# Outlives the gap between nightly runs
+RECOMMENDATION_TTL = timedelta(hours=36)
+# A running run whose heartbeat is older than this is treated as abandoned
+RUN_HEARTBEAT_TIMEOUT = timedelta(minutes=10)
+
+_batch_lock = threading.Lock()
+_worker_index = None
+
+
+def _init_worker(catalogue):
+    """Process pool initializer: build the scheme index once per worker."""
+    global _worker_index
+    _worker_index = SchemeIndex([SimpleNamespace(**row) for row in catalogue])
+
+
+def _score_profiles(keys):
+    """Score profile keys in a worker. Returns [(scheme_id, score, reason), ...] per key."""
+    return [
+        [(compiled.id, score, reason) for compiled, score, reason in _worker_index.match_profile(key)]
+        for key in keys
+    ]
+
+
+def _priority(score):
+    return 'high' if score >= 80 else 'medium' if score >= 60 else 'low'
+
+
+def _load_chunk(after_id, chunk_size):
+    query = db.session.query(
+        Farmer.id,
+        Farmer.state,
+        Farmer.district,
+        Farmer.caste_category,
+        Farmer.total_land_area_hectares,
+        Farmer.is_oilseed_farmer,
+        Farmer.is_physically_handicapped,
+    )
+    if after_id:
+        query = query.filter(Farmer.id > after_id)
+    return query.order_by(Farmer.id).limit(chunk_size).all()
+
+
+def _score_chunk(farmers, pool):
+    """Score each distinct profile in the chunk once. Returns {profile_key: matches}."""
+    keys = list({SchemeIndex.profile_key(farmer) for farmer in farmers})
+    if pool is None:
+        scored = _score_profiles(keys)
+    else:
+        parts = [keys[i:i + PROFILES_PER_TASK] for i in range(0, len(keys), PROFILES_PER_TASK)]
+        scored = [matches for part in pool.map(_score_profiles, parts) for matches in part]
+    return dict(zip(keys, scored))
+
+
+def _write_chunk(farmers, scored):
+    """Replace the chunk's rule-based rows with one bulk insert. Returns rows written."""
+    farmer_ids = [farmer.id for farmer in farmers]
+    now = datetime.now()
+
+    # Farmers with fresh LLM picks keep them until they expire
+    keep = {
+        farmer_id for (farmer_id,) in db.session.query(FarmerRecommendation.farmer_id).filter(
+            FarmerRecommendation.farmer_id.in_(farmer_ids),
+            FarmerRecommendation.ai_method != 'rule_based',
+            FarmerRecommendation.expires_at > now
+        ).distinct()
+    }
+
+    FarmerRecommendation.query.filter(
+        FarmerRecommendation.farmer_id.in_(farmer_ids),
+        or_(FarmerRecommendation.ai_method == 'rule_based', FarmerRecommendation.expires_at <= now)
+    ).delete(synchronize_session=False)
+
+    created_at = datetime.utcnow()
+    expires_at = now + RECOMMENDATION_TTL
+    rows = [
+        {
+            'id': str(uuid.uuid4()),
+            'farmer_id': farmer.id,
+            'scheme_id': scheme_id,
+            'priority': _priority(score),
+            'match_percentage': score,
+            'reason': reason,
+            'ai_method': 'rule_based',
+            'profile_hash': profile_hash(farmer),
+            'created_at': created_at,
+            'expires_at': expires_at,
+        }
+        for farmer in farmers if farmer.id not in keep
+        for scheme_id, score, reason in scored[SchemeIndex.profile_key(farmer)]
+    ]
+    if rows:
+        db.session.execute(FarmerRecommendation.__table__.insert(), rows)
+    return len(rows)
+
+
+def _claim_run(run_id, now):
+    """Take over a run unless another process is executing it. Returns True if claimed."""
+    claimed = RecommendationBatchRun.query.filter(
+        RecommendationBatchRun.id == run_id,
+        or_(
+            RecommendationBatchRun.status != 'running',
+            RecommendationBatchRun.heartbeat_at.is_(None),
+            RecommendationBatchRun.heartbeat_at < now - RUN_HEARTBEAT_TIMEOUT
+        )
+    ).update({'status': 'running', 'error': None, 'heartbeat_at': now}, synchronize_session=False)
+    db.session.commit()
+    return claimed == 1
+
+
+def _resume_or_start_run():
+    """The unfinished run to resume, a new run, or None if another process holds the latest run."""
+    now = datetime.utcnow()
+    latest = RecommendationBatchRun.query.order_by(RecommendationBatchRun.started_at.desc()).first()
+    if latest and latest.status != 'completed':
+        if not _claim_run(latest.id, now):
+            return None
+        return latest
+
+    run = RecommendationBatchRun(status='running', farmers_processed=0, recommendations_written=0,
+                                 heartbeat_at=now)
+    db.session.add(run)
+    db.session.commit()
+    return run
+
+
+def run_recommendation_batch(chunk_size=CHUNK_SIZE, workers=BATCH_WORKERS):
+    """
+    Precompute recommendations for all farmers, resuming an unfinished run.
+    Must be called inside an app context. Returns the run as a dict, or None
+    when another process is already running the batch.
+    """
+    with _batch_lock:
+        started = time.perf_counter()
+        run = _resume_or_start_run()
+        if run is None:
+            print("⏭️ Recommendation batch already running in another process")
+            return None
+        index = get_scheme_index()
+        catalogue = [compiled.display for compiled in index.schemes]
+
+        pool = None
+        if workers > 1:
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(catalogue,)
+            )
+        else:
+            _init_worker(catalogue)
+
+        try:
+            while True:
+                farmers = _load_chunk(run.last_farmer_id, chunk_size)
+                if not farmers:
+                    break
+                written = _write_chunk(farmers, _score_chunk(farmers, pool))
+                run.last_farmer_id = farmers[-1].id
+                run.farmers_processed += len(farmers)
+                run.recommendations_written += written
+                run.heartbeat_at = datetime.utcnow()
+                db.session.commit()
+
+            run.status = 'completed'
+            run.finished_at = datetime.utcnow()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            run.status = 'failed'
+            run.error = str(e)
+            db.session.commit()
+            print(f"❌ Recommendation batch failed after {run.farmers_processed} farmers: {e}")
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        print(f"🎯 Recommendation batch: {run.farmers_processed} farmers, "
+              f"{run.recommendations_written} rows in {elapsed_ms} ms")
+        return run.to_dict()
+
+
+def _seconds_until(hour):
+    now = datetime.now()
+    next_run = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+
+def start_recommendation_scheduler(app, hour=BATCH_HOUR):
+    """Start a daemon thread that runs the batch every night at `hour`."""
+    def loop():
+        while True:
+            time.sleep(_seconds_until(hour))
+            with app.app_context():
+                try:
+                    run_recommendation_batch()
+                except Exception as e:
+                    print(f"❌ Recommendation batch failed: {e}")
+                finally:
+                    db.session.remove()
+
+    thread = threading.Thread(target=loop, name='recommendation-batch-scheduler', daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == '__main__':
+    from app import app
+    with app.app_context():
+        print(run_recommendation_batch())
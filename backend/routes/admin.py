@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, jsonify, request
 from extensions import db
 from models import Scheme
+from scheme_eligibility import invalidate_scheme_index
 import json
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
@@ -64,6 +65,7 @@ def api_schemes_add():
 
     db.session.add(scheme)
     db.session.commit()
+    invalidate_scheme_index()
 
     return jsonify({
         "success": True,
@@ -95,6 +97,7 @@ def api_schemes_update(scheme_id):
         scheme.required_documents = json.dumps(data['required_documents'])
 
     db.session.commit()
+    invalidate_scheme_index()
 
     return jsonify({
         "success": True,
@@ -109,6 +112,7 @@ def api_schemes_delete(scheme_id):
     
     db.session.delete(scheme)
     db.session.commit()
+    invalidate_scheme_index()
 
     return jsonify({
         "success": True,
@@ -9,17 +9,14 @@ from datetime import datetime, timedelta
 from extensions import db
 from models_marketplace import Auction, Bid, Transaction, BidHistory, AuctionNotification, Buyer
 from models import Farmer
-import requests
+from price_service import price_service, DAILY_PRICES_RESOURCE, OILSEED_COMMODITIES
+from realtime import publish_auction_unread_counts
 import uuid
 import os
 from werkzeug.utils import secure_filename
 
 bidding_bp = Blueprint('bidding', __name__, url_prefix='/bidding')
 
-# Government Mandi API Configuration
-GOVT_API_KEY = "579b464db66ec23bdd00000139dd36efa19740c954f95d9ca3b5abd0"
-GOVT_API_BASE = "https://api.data.gov.in/resource/9ef84268-d588-465a-a5c3-375cda092f58"
-
 # File upload configuration
 UPLOAD_FOLDER = 'static/auction_photos'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
@@ -53,27 +50,17 @@ def buyer_login_required(f):
 def get_base_price(crop_name):
     """Fetch base price from Government Mandi API or use defaults"""
     try:
-        params = {
-            'api-key': GOVT_API_KEY,
-            'format': 'json',
-            'filters[commodity]': crop_name,
-            'limit': 10
-        }
-        
-        response = requests.get(GOVT_API_BASE, params=params, timeout=10)
+        # Same API commodity name and limit as the crop economics dashboard, so both share one cached entry
+        api_name = OILSEED_COMMODITIES.get(crop_name, crop_name)
+        records = price_service.get_records(DAILY_PRICES_RESOURCE, {'commodity': api_name}, limit=100)
+        prices = []
+        for record in records:
+            price = record.get('modal_price') or record.get('price') or 0
+            if price:
+                prices.append(float(price))
         
-        if response.status_code == 200:
-            data = response.json()
-            if 'records' in data and len(data['records']) > 0:
-                # Calculate average price
-                prices = []
-                for record in data['records']:
-                    price = record.get('modal_price') or record.get('price') or 0
-                    if price:
-                        prices.append(float(price))
-                
-                if prices:
-                    return round(sum(prices) / len(prices), 2)
+        if prices:
+            return round(sum(prices) / len(prices), 2)
     except Exception as e:
         print(f"Error fetching base price: {str(e)}")
     
@@ -655,16 +642,7 @@ def get_notifications():
     ).order_by(AuctionNotification.created_at.desc()).all()
     
     return jsonify({
-        'notifications': [
-            {
-                'id': n.id,
-                'message': n.message,
-                'type': n.notification_type,
-                'is_read': n.is_read,
-                'auction_id': n.auction_id,
-                'created_at': n.created_at.isoformat()
-            } for n in notifications
-        ],
+        'notifications': [n.to_dict() for n in notifications],
         'total': len(notifications),
         'unread': len([n for n in notifications if not n.is_read])
     }), 200
@@ -685,6 +663,7 @@ def mark_notification_read(notification_id):
     notification.is_read = True
     notification.read_at = datetime.utcnow()
     db.session.commit()
+    publish_auction_unread_counts([user_id])
     
     return jsonify({'success': True}), 200
 
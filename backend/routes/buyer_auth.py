@@ -3,13 +3,14 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 import sys
 import os
-import requests
 
 # Avoid circular imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from models_marketplace import Buyer, SellRequest, BuyerOffer, Chat, ChatMessage, MarketPrice
 from extensions import db
+from price_sync import sync_all_prices, last_sync_stats
+from matching_engine import match_buyer_offer
 
 buyer_auth_bp = Blueprint('buyer_auth', __name__, url_prefix='/buyer')
 
@@ -264,7 +265,15 @@ def create_offer():
         
         db.session.add(new_offer)
         db.session.commit()
-        
+
+        # Propose trades with open sell requests; the offer is saved either way
+        try:
+            matches = [proposal.to_dict() for proposal in match_buyer_offer(new_offer)]
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️ Matching failed for buyer offer {new_offer.id}: {e}")
+            matches = []
+
         return jsonify({
             'success': True,
             'message': 'Offer created successfully! Farmers in the marketplace can now see your offer.',
@@ -274,7 +283,8 @@ def create_offer():
                 'quantity_quintal': new_offer.quantity_quintal,
                 'initial_price': new_offer.initial_price,
                 'status': new_offer.status
-            }
+            },
+            'matches': matches
         }), 201
         
     except Exception as e:
@@ -618,114 +628,20 @@ def send_chat_message(chat_id):
 
 # ===== MARKET PRICE ENDPOINTS =====
 
-# Oilseed commodity mappings for Data.gov.in API
-OILSEED_COMMODITIES = {
-    'Soybean': 'Soyabean',
-    'Sunflower': 'Sunflower',
-    'Mustard': 'Mustard/Rape seed',
-    'Groundnut': 'Groundnut',
-    'Safflower': 'Safflower',
-    'Castor': 'Castor'
-}
-
-API_KEY = '579b464db66ec23bdd00000139dd36efa19740c954f95d9ca3b5abd0'
-
-
 @buyer_auth_bp.route('/api/sync-prices', methods=['POST'])
 def sync_market_prices():
     """
     Sync commodity prices from Data.gov.in API
-    Fetches latest prices for oilseed commodities
+    Runs the background price ingester once, right now
     """
     try:
-        synced_count = 0
-        errors = []
-        
-        # Call Data.gov.in API for each commodity
-        for commodity_key, commodity_api_name in OILSEED_COMMODITIES.items():
-            try:
-                # Data.gov.in API endpoint
-                api_url = "https://api.data.gov.in/resource/5e4ff2f1-d728-49b5-b92e-12640c4e3ede"
-                
-                params = {
-                    'api-key': API_KEY,
-                    'format': 'json',
-                    'filters[commodity_name]': commodity_api_name,
-                    'limit': 1000
-                }
-                
-                response = requests.get(api_url, params=params, timeout=10)
-                response.raise_for_status()
-                
-                data = response.json()
-                
-                if 'records' in data:
-                    for record in data['records']:
-                        try:
-                            # Extract data from API response
-                            commodity_name = record.get('commodity_name', commodity_key)
-                            market_name = record.get('market', '')
-                            market_state = record.get('state', '')
-                            market_district = record.get('district', '')
-                            
-                            # Parse prices
-                            open_price = float(record.get('arrival_date', 0)) if record.get('arrival_date') else None
-                            close_price = float(record.get('modal_price', 0)) if record.get('modal_price') else None
-                            high_price = float(record.get('max_price', 0)) if record.get('max_price') else None
-                            low_price = float(record.get('min_price', 0)) if record.get('min_price') else None
-                            
-                            # Price date
-                            price_date_str = record.get('arrival_date', '')
-                            try:
-                                price_date = datetime.strptime(price_date_str, '%d/%m/%Y').date()
-                            except:
-                                price_date = datetime.utcnow().date()
-                            
-                            # Check if record exists
-                            existing = MarketPrice.query.filter_by(
-                                commodity_name=commodity_name,
-                                market_name=market_name,
-                                price_date=price_date
-                            ).first()
-                            
-                            if existing:
-                                # Update existing record
-                                existing.open_price = open_price
-                                existing.close_price = close_price
-                                existing.high_price = high_price
-                                existing.low_price = low_price
-                                existing.updated_at = datetime.utcnow()
-                                db.session.add(existing)
-                            else:
-                                # Create new record
-                                new_price = MarketPrice(
-                                    commodity_name=commodity_name,
-                                    market_name=market_name,
-                                    market_state=market_state,
-                                    market_district=market_district,
-                                    open_price=open_price,
-                                    high_price=high_price,
-                                    low_price=low_price,
-                                    close_price=close_price,
-                                    price_date=price_date
-                                )
-                                db.session.add(new_price)
-                                synced_count += 1
-                        except Exception as e:
-                            errors.append(f"Error processing record: {str(e)}")
-                            continue
-                
-                db.session.commit()
-                
-            except requests.exceptions.RequestException as e:
-                errors.append(f"API error for {commodity_key}: {str(e)}")
-            except Exception as e:
-                errors.append(f"Processing error for {commodity_key}: {str(e)}")
-        
+        stats = sync_all_prices()
         return jsonify({
             'success': True,
-            'synced_count': synced_count,
-            'errors': errors if errors else None
+            'synced_count': stats['synced_count'],
+            'duration_ms': stats['duration_ms'],
+            'commodities': stats['commodities'],
+            'errors': stats['errors'] or None
         }), 200
         
     except Exception as e:
@@ -733,6 +649,14 @@ def sync_market_prices():
         return jsonify({'error': str(e)}), 500
 
 
+@buyer_auth_bp.route('/api/sync-status', methods=['GET'])
+def sync_market_prices_status():
+    """Timings, row counts and watermarks of the last price sync run"""
+    if not last_sync_stats:
+        return jsonify({'message': 'No price sync has run yet'}), 200
+    return jsonify(last_sync_stats), 200
+
+
 @buyer_auth_bp.route('/api/prices/<commodity>', methods=['GET'])
 def get_commodity_prices(commodity):
     """
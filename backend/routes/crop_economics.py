@@ -1,15 +1,22 @@
 """
 Crop Economics & Market Pricing Routes
 Provides real-time average prices for oilseeds from Government API
+API routes are rate limited per client (rate_limiter.py).
 """
 
-from flask import Blueprint, render_template, jsonify, session
+from flask import Blueprint, render_template, jsonify, session, request
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 import requests
 from extensions import db
 from models_marketplace import SellRequest, CropListing, MarketPrice
+from sqlalchemy import or_
+from price_service import (price_service, commodity_names, PriceSourceError,
+                           DAILY_PRICES_RESOURCE, OILSEED_COMMODITIES)
+from price_history import get_price_series, INTERVALS
+from rate_limiter import rate_limited
 
 crop_economics_bp = Blueprint('crop_economics', __name__, url_prefix='/crop-economics')
 
@@ -30,73 +37,65 @@ def login_required(f):
 
 # Common oilseeds in India (mapped to government API commodity names)
 OILSEEDS = {
-    'soybean': {'name': 'Soybean', 'unit': 'per quintal', 'icon': '🫘', 'api_name': 'Soyabean'},
-    'mustard': {'name': 'Mustard', 'unit': 'per quintal', 'icon': '🌾', 'api_name': 'Mustard'},
-    'groundnut': {'name': 'Groundnut', 'unit': 'per quintal', 'icon': '🫘', 'api_name': 'Groundnut'},
-    'sunflower': {'name': 'Sunflower', 'unit': 'per quintal', 'icon': '🌻', 'api_name': 'Sunflower'},
-    'safflower': {'name': 'Safflower', 'unit': 'per quintal', 'icon': '🌻', 'api_name': 'Safflower'},
-    'sesame': {'name': 'Sesame', 'unit': 'per kg', 'icon': '🌾', 'api_name': 'Sesame'},
-    'coconut': {'name': 'Coconut', 'unit': 'per piece', 'icon': '🥥', 'api_name': 'Coconut'},
+    'soybean': {'name': 'Soybean', 'unit': 'per quintal', 'icon': '🫘', 'api_name': OILSEED_COMMODITIES['Soybean']},
+    'mustard': {'name': 'Mustard', 'unit': 'per quintal', 'icon': '🌾', 'api_name': OILSEED_COMMODITIES['Mustard']},
+    'groundnut': {'name': 'Groundnut', 'unit': 'per quintal', 'icon': '🫘', 'api_name': OILSEED_COMMODITIES['Groundnut']},
+    'sunflower': {'name': 'Sunflower', 'unit': 'per quintal', 'icon': '🌻', 'api_name': OILSEED_COMMODITIES['Sunflower']},
+    'safflower': {'name': 'Safflower', 'unit': 'per quintal', 'icon': '🌻', 'api_name': OILSEED_COMMODITIES['Safflower']},
+    'sesame': {'name': 'Sesame', 'unit': 'per kg', 'icon': '🌾', 'api_name': OILSEED_COMMODITIES['Sesame']},
+    'coconut': {'name': 'Coconut', 'unit': 'per piece', 'icon': '🥥', 'api_name': OILSEED_COMMODITIES['Coconut']},
 }
 
-def fetch_live_prices_from_api(commodity_name):
+# Dashboard endpoints fetch all oilseeds in parallel within one overall deadline
+PRICE_FANOUT_DEADLINE_SECONDS = 4
+_price_pool = ThreadPoolExecutor(max_workers=len(OILSEEDS), thread_name_prefix='mandi-prices')
+
+# What each freshness means for the dashboard: (source label, trend)
+PRICE_SOURCES = {
+    'live': ('Government API', 'live'),
+    'stale': ('Government API (cached)', 'cached'),
+    'database': ('Stored mandi prices', 'stored'),
+    'mock': ('Mock Data (Demo)', 'demo'),
+}
+
+def parse_api_records(records, commodity_name):
+    """Convert raw data.gov.in records into the market price entries used by the dashboard"""
+    prices = []
+
+    for record in records:
+        try:
+            # Try different field names that might be in the API
+            price = (record.get('modal_price') or 
+                    record.get('price') or 
+                    record.get('avg_price') or 
+                    record.get('close_price') or
+                    0)
+
+            if price and float(price) > 0:
+                prices.append({
+                    'price': float(price),
+                    'market': record.get('market', record.get('market_name', 'Unknown')),
+                    'state': record.get('state', record.get('state_name', 'Unknown')),
+                    'date': record.get('arrival_date', record.get('date', datetime.now().strftime('%Y-%m-%d'))),
+                    'min_price': float(record.get('min_price', 0)),
+                    'max_price': float(record.get('max_price', 0))
+                })
+        except (ValueError, TypeError) as e:
+            print(f"Error parsing record for {commodity_name}: {str(e)}")
+            continue
+
+    return prices
+
+
+def fetch_fallback_prices(commodity_name):
     """
-    Fetch live prices from Government API or database
-    Returns list of prices from different markets
+    Prices from the local database, or mock data if there is none
+    Returns (prices, freshness) where freshness is 'database' or 'mock'
     """
-    try:
-        # Try government API first
-        params = {
-            'api-key': GOVT_API_KEY,
-            'format': 'json',
-            'filters[commodity]': commodity_name,
-            'limit': 100,
-            'sort': {'arrival_date': -1}  # Latest first
-        }
-        
-        response = requests.get(GOVT_API_BASE, params=params, timeout=10)
-        print(f"API Response Status for {commodity_name}: {response.status_code}")
-        
-        if response.status_code == 200:
-            data = response.json()
-            print(f"API Data received for {commodity_name}: {len(data.get('records', []))} records")
-            
-            prices = []
-            
-            if 'records' in data and len(data['records']) > 0:
-                for record in data['records']:
-                    try:
-                        # Try different field names that might be in the API
-                        price = (record.get('modal_price') or 
-                                record.get('price') or 
-                                record.get('avg_price') or 
-                                record.get('close_price') or
-                                0)
-                        
-                        if price and float(price) > 0:
-                            prices.append({
-                                'price': float(price),
-                                'market': record.get('market', record.get('market_name', 'Unknown')),
-                                'state': record.get('state', record.get('state_name', 'Unknown')),
-                                'date': record.get('arrival_date', record.get('date', datetime.now().strftime('%Y-%m-%d'))),
-                                'min_price': float(record.get('min_price', 0)),
-                                'max_price': float(record.get('max_price', 0))
-                            })
-                    except (ValueError, TypeError) as e:
-                        print(f"Error parsing record for {commodity_name}: {str(e)}")
-                        continue
-            
-            if prices:
-                print(f"Prices parsed for {commodity_name}: {len(prices)} valid entries")
-                return prices
-    except requests.exceptions.RequestException as e:
-        print(f"API Error fetching prices for {commodity_name}: {str(e)}")
-    
-    # Fallback to database prices
     print(f"Falling back to database for {commodity_name}")
     try:
         market_prices = MarketPrice.query.filter(
-            MarketPrice.commodity_name.ilike(f'%{commodity_name}%')
+            or_(*[MarketPrice.commodity_name.ilike(f'%{name}%') for name in commodity_names(commodity_name)])
         ).order_by(MarketPrice.updated_at.desc()).limit(50).all()
         
         prices = []
@@ -112,13 +111,66 @@ def fetch_live_prices_from_api(commodity_name):
         
         if prices:
             print(f"Database prices for {commodity_name}: {len(prices)} entries")
-            return prices
+            return prices, 'database'
     except Exception as db_error:
         print(f"Database error: {str(db_error)}")
     
     # If no API or database data, return mock data for demonstration
     print(f"Using mock data for {commodity_name}")
-    return get_mock_prices(commodity_name)
+    return get_mock_prices(commodity_name), 'mock'
+
+
+def fetch_live_prices_from_api(commodity_name):
+    """
+    Fetch live prices from Government API or database
+    Returns list of prices from different markets
+    """
+    api_name = OILSEED_COMMODITIES.get(commodity_name, commodity_name)
+    try:
+        # Shared cached fetcher; only hits the government API when the cache is cold
+        records = price_service.get_records(DAILY_PRICES_RESOURCE, {'commodity': api_name}, limit=100)
+        prices = parse_api_records(records, api_name)
+        if prices:
+            return prices
+    except PriceSourceError as e:
+        print(f"API Error fetching prices for {api_name}: {str(e)}")
+    
+    prices, _ = fetch_fallback_prices(commodity_name)
+    return prices
+
+
+def fetch_all_live_prices(deadline=PRICE_FANOUT_DEADLINE_SECONDS):
+    """
+    Fetch prices for every oilseed concurrently with one shared deadline
+    Returns {crop_key: (prices, freshness)} where freshness is one of
+    'live', 'stale' (served from cache while refreshing), 'database' or 'mock'.
+    Crops whose upstream call misses the deadline fall back to local data;
+    their fetch keeps running and fills the cache for the next request.
+    """
+    futures = {
+        crop_key: _price_pool.submit(
+            price_service.lookup, DAILY_PRICES_RESOURCE, {'commodity': crop_info['api_name']}, 100
+        )
+        for crop_key, crop_info in OILSEEDS.items()
+    }
+    done, _ = wait(futures.values(), timeout=deadline)
+
+    results = {}
+    for crop_key, future in futures.items():
+        crop_name, api_name = OILSEEDS[crop_key]['name'], OILSEEDS[crop_key]['api_name']
+        prices = []
+        if future in done and future.exception() is None:
+            entry = future.result()
+            prices = parse_api_records(entry.records, api_name)
+            freshness = 'stale' if entry.stale else 'live'
+        elif future not in done:
+            print(f"Price fetch for {api_name} missed the {deadline}s deadline")
+
+        if not prices:
+            prices, freshness = fetch_fallback_prices(crop_name)
+        results[crop_key] = (prices, freshness)
+
+    return results
 
 
 def get_mock_prices(commodity_name):
@@ -160,16 +212,17 @@ def dashboard():
 
 @crop_economics_bp.route('/api/prices', methods=['GET'])
 @login_required
+@rate_limited('mandi')
 def get_prices():
     """
     Get live prices for all oilseeds from Government API
     Returns: {crop_name: {average: price, count: num_markets, max: price, min: price, markets: [...]}}
     """
     prices = {}
+    all_prices = fetch_all_live_prices()
     
     for crop_key, crop_info in OILSEEDS.items():
-        # Fetch from government API
-        api_prices = fetch_live_prices_from_api(crop_info['api_name'])
+        api_prices, freshness = all_prices[crop_key]
         
         if api_prices:
             # Calculate statistics
@@ -188,8 +241,9 @@ def get_prices():
                     'count': len(api_prices),
                     'unit': crop_info['unit'],
                     'icon': crop_info['icon'],
-                    'trend': 'live',
-                    'source': 'Government API',
+                    'trend': PRICE_SOURCES[freshness][1],
+                    'source': PRICE_SOURCES[freshness][0],
+                    'freshness': freshness,
                     'markets': api_prices[:10]  # Top 10 markets
                 }
             else:
@@ -210,7 +264,8 @@ def get_empty_price(crop_info):
         'unit': crop_info['unit'],
         'icon': crop_info['icon'],
         'trend': 'no_data',
-        'source': 'Government API',
+        'source': None,
+        'freshness': None,
         'markets': []
     }
 
@@ -256,10 +311,14 @@ def get_mock_price_history(crop_key, days=180):
 
 @crop_economics_bp.route('/api/price-history/<crop>', methods=['GET'])
 @login_required
+@rate_limited('default')
 def get_price_history(crop):
     """
-    Get market price history for a crop (last 6 months)
-    Uses mock data for demonstration
+    Get market price history for a crop from stored mandi prices
+    Query params:
+    - interval: 'month' (default) or 'week'
+    - state: limit to one state's mandis
+    - months: how far back to go (default 12)
     """
     crop_lower = crop.lower()
     
@@ -267,18 +326,36 @@ def get_price_history(crop):
         return jsonify({'error': 'Crop not found'}), 404
     
     crop_info = OILSEEDS[crop_lower]
+    interval = request.args.get('interval', 'month')
+    if interval not in INTERVALS:
+        return jsonify({'error': f'interval must be one of {list(INTERVALS)}'}), 400
+    state = request.args.get('state')
+    months = min(max(request.args.get('months', 12, type=int), 1), 60)
     
-    # Generate mock historical data for last 180 days
-    history = get_mock_price_history(crop_lower, days=180)
+    history = get_price_series(
+        commodity_names(crop_info['name']),
+        state=state,
+        interval=interval,
+        months=months
+    )
+    source = 'Mandi prices (data.gov.in)'
+    
+    if not history:
+        # Nothing synced yet - keep the chart usable for demos
+        history = get_mock_price_history(crop_lower)
+        source = 'Mock Data (Demo)'
     
     return jsonify({
         'crop': crop_info['name'],
+        'interval': interval,
+        'state': state,
         'history': history,
-        'source': 'Mock Data (Demo)'
+        'source': source
     })
 
 
 @crop_economics_bp.route('/api/debug', methods=['GET'])
+@rate_limited('mandi')
 def debug_api():
     """Debug endpoint to test API connection"""
     try:
@@ -303,14 +380,16 @@ def debug_api():
 
 @crop_economics_bp.route('/api/comparison', methods=['GET'])
 @login_required
+@rate_limited('mandi')
 def get_comparison():
     """
     Get live price comparison across multiple crops from Government API
     """
     comparison = []
+    all_prices = fetch_all_live_prices()
     
     for crop_key, crop_info in OILSEEDS.items():
-        api_prices = fetch_live_prices_from_api(crop_info['api_name'])
+        api_prices, freshness = all_prices[crop_key]
         
         if api_prices:
             price_values = [p['price'] for p in api_prices if p['price'] > 0]
@@ -320,21 +399,24 @@ def get_comparison():
                     'crop': crop_info['name'],
                     'price': round(avg_price, 2),
                     'icon': crop_info['icon'],
-                    'count': len(api_prices)
+                    'count': len(api_prices),
+                    'freshness': freshness
                 })
     
     return jsonify(comparison)
 
 @crop_economics_bp.route('/api/top-crops', methods=['GET'])
 @login_required
+@rate_limited('mandi')
 def get_top_crops():
     """
     Get top oilseeds by current market activity from Government API
     """
     crop_data = []
+    all_prices = fetch_all_live_prices()
     
     for crop_key, crop_info in OILSEEDS.items():
-        api_prices = fetch_live_prices_from_api(crop_info['api_name'])
+        api_prices, freshness = all_prices[crop_key]
         
         if api_prices:
             price_values = [p['price'] for p in api_prices if p['price'] > 0]
@@ -344,7 +426,8 @@ def get_top_crops():
                     'name': crop_info['name'],
                     'listings': len(api_prices),
                     'icon': crop_info['icon'],
-                    'price': round(avg_price, 2)
+                    'price': round(avg_price, 2),
+                    'freshness': freshness
                 })
     
     # Sort by number of markets/listings and return top 5
@@ -354,6 +437,7 @@ def get_top_crops():
 
 @crop_economics_bp.route('/api/market-details/<crop>', methods=['GET'])
 @login_required
+@rate_limited('mandi')
 def get_market_details(crop):
     """
     Get detailed price information across all markets for a crop
@@ -364,7 +448,7 @@ def get_market_details(crop):
         return jsonify({'error': 'Crop not found'}), 404
     
     crop_info = OILSEEDS[crop_lower]
-    api_prices = fetch_live_prices_from_api(crop_info['api_name'])
+    api_prices = fetch_live_prices_from_api(crop_info['name'])
     
     if not api_prices:
         return jsonify({
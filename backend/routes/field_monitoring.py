@@ -2,6 +2,9 @@ from flask import Blueprint, request, jsonify, render_template
 import json
 import os
 from datetime import datetime
+from extensions import db as sql_db
+from sensor_alerts import alert_engine, alerts_to_notifications, crop_stage_for, DEFAULT_STAGE
+from notification_service import add_notifications
 
 iot = Blueprint("iot", __name__, url_prefix="/field-monitoring")
 
@@ -55,6 +58,50 @@ def save_db(data):
         json.dump(data, f, indent=2)
 
 
+# device_serial -> (device_id, farmer_id, crop_stage, looked_up_at)
+_device_context = {}
+DEVICE_CONTEXT_TTL = 600
+
+
+def get_device_context(device_serial):
+    """Resolve device id, owning farmer and crop stage (cached per device)."""
+    from models import IoTDevice, Farmer
+
+    cached = _device_context.get(device_serial)
+    if cached and time.time() - cached[3] < DEVICE_CONTEXT_TTL:
+        return cached
+
+    device_id = farmer_id = None
+    stage = DEFAULT_STAGE
+    if device_serial:
+        device = IoTDevice.query.filter_by(device_serial=device_serial).first()
+        if device:
+            device_id, farmer_id = device.id, device.farmer_id
+            farmer = Farmer.query.get(device.farmer_id)
+            if farmer:
+                stage = crop_stage_for(farmer.harvest_date)
+
+    cached = (device_id, farmer_id, stage, time.time())
+    _device_context[device_serial] = cached
+    return cached
+
+
+def run_sensor_alerts(raw, data):
+    """Feed a reading to the alert engine and store any resulting notifications."""
+    device_serial = raw.get("deviceSerial") or raw.get("device_serial") or raw.get("mac")
+    device_id, farmer_id, stage, _ = get_device_context(device_serial)
+    stage = raw.get("cropStage") or stage
+
+    alerts = alert_engine.process(device_serial or "default", data, stage)
+    if alerts and farmer_id:
+        try:
+            add_notifications(alerts_to_notifications(alerts, farmer_id, device_id))
+        except Exception as e:
+            sql_db.session.rollback()
+            print(f"⚠️ Could not store sensor alerts: {e}")
+    return alerts
+
+
 def handle_esp32_update(raw):
     """Shared handler for ESP32 updates"""
     if not raw:
@@ -90,6 +137,8 @@ def handle_esp32_update(raw):
     db["history"].append(new_data)
 
     save_db(db)
+
+    alerts = run_sensor_alerts(raw, new_data)
     
     # Log the update
     print(f"\n✓ ESP32 DATA RECEIVED & PROCESSED")
@@ -97,9 +146,11 @@ def handle_esp32_update(raw):
     print(f"  Soil: {new_data['soilMoist']}%, Light: {new_data['light']} lux")
     print(f"  RSSI: {new_data['rssi']} dBm, Uptime: {new_data['uptime']}s")
     print(f"  Time: {new_data['timestamp']}")
+    for alert in alerts:
+        print(f"  🚨 {alert['title']}: {alert['message']}")
     print()
 
-    return jsonify({"status": "success", "timestamp": new_data["fullDate"]})
+    return jsonify({"status": "success", "timestamp": new_data["fullDate"], "alerts": alerts})
 
 
 # -------------------------------
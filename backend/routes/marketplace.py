@@ -1,11 +1,17 @@
 import uuid
-from flask import Blueprint, render_template, request, redirect, url_for, session, jsonify
+import base64
+import json
+from flask import Blueprint, render_template, request, redirect, url_for, session, jsonify, Response, stream_with_context
 from werkzeug.utils import secure_filename
+from sqlalchemy import and_, cast, literal, null, or_, select, union_all
 import os
 from datetime import datetime
 from extensions import db
 from models import Farmer
 from models_marketplace import CropListing, BuyerOffer, MarketPrice, SellPhoto, SellRequest
+from price_summary import get_price_summary
+from matching_engine import match_sell_request
+from geo_index import DEFAULT_NEARBY_LIMIT, DEFAULT_RADIUS_KM, MAX_NEARBY_LIMIT, locate_farmer, nearby_offers
 
 market_bp = Blueprint("market", __name__, url_prefix="/market")
 
@@ -158,46 +164,37 @@ def buyer_offer(listing_id):
 @market_bp.route("/nearby/<crop>")
 def market_nearby(crop):
     crop = crop.strip()
-    offer = BuyerOffer.query.all()
-    for o in offer:
-        print(o.crop_name)
-    # Fetch buyer offers for this crop (filter by exact crop name)
-    print(f"DEBUG: Searching for crop containing '{crop}'")
-    buyer_offers = BuyerOffer.query.filter(
-        BuyerOffer.crop_name.ilike(f'%{crop}%'),
-        BuyerOffer.status == 'pending'
-    ).all()
-    print(f"DEBUG: Found {len(buyer_offers)} offers")
-
-    # Convert BuyerOffer objects to dict format for template
+    radius_km = request.args.get("radius_km", DEFAULT_RADIUS_KM, type=float)
+    limit = min(max(request.args.get("limit", DEFAULT_NEARBY_LIMIT, type=int), 1), MAX_NEARBY_LIMIT)
+
+    # Pending buyer offers for this crop around the farmer's district/pincode
+    farmer = db.session.get(Farmer, session["farmer_id_verified"]) if "farmer_id_verified" in session else None
+    origin = locate_farmer(farmer)
+    offers = nearby_offers(crop, origin, radius_km=radius_km, limit=limit)
+
     prices = []
-    for offer in buyer_offers:
+    for offer in offers:
         prices.append({
-            'buyer_name': offer.buyer_name or offer.buyer_company or 'Buyer',
-            'distance_km': 0,  # No distance info from buyer offers
-            'price': offer.initial_price,
-            'offer_id': offer.id,
-            'buyer_location': offer.buyer_location,
-            'buyer_mobile': offer.buyer_mobile,
+            'buyer_name': offer['buyer_name'],
+            'distance_km': offer['distance_km'],
+            'price': offer['price'],
+            'offer_id': offer['offer_id'],
+            'buyer_location': offer['buyer_location'],
+            'buyer_mobile': offer['buyer_mobile'],
         })
 
-    if not prices:
-        # fallback default data (this helps UI work instantly)
-        print("No buyer offers found, using fallback data.")
-        db_prices = None
-    else:
-        db_prices = prices
-
-    # Calculate average price
-    if db_prices:
-        avg_price = sum(p['price'] for p in db_prices) / len(db_prices)
+    # Average of pending offers from the maintained summary
+    summary = get_price_summary('offer', crop)
+    if summary:
+        avg_price = summary['average']
     else:
         avg_price = 5432  # fallback
     return render_template(
         "market_nearby.html",
         crop=crop,
         avg_price=int(avg_price),
-        prices=prices
+        prices=prices,
+        radius_km=radius_km if origin else None
     )
 
 @market_bp.route("/deal/<request_id>")
@@ -306,8 +303,16 @@ def create_sell_request():
         db.session.add(p3)
     
     db.session.commit()
-    
-    return jsonify({"success": True, "request_id": sell_request.id}), 201
+
+    # Propose trades with open buyer offers; the sell request is saved either way
+    try:
+        matches = [proposal.to_dict() for proposal in match_sell_request(sell_request)]
+    except Exception as e:
+        db.session.rollback()
+        print(f"⚠️ Matching failed for sell request {sell_request.id}: {e}")
+        matches = []
+
+    return jsonify({"success": True, "request_id": sell_request.id, "matches": matches}), 201
 
 
 @market_bp.route("/all-deals")
@@ -319,56 +324,105 @@ def all_deals_page():
     return render_template("all_deals.html")
 
 
+DEALS_PAGE_SIZE = 50
+MAX_DEALS_PAGE_SIZE = 200
+
+
+def encode_deals_cursor(created_at, deal_id):
+    """Opaque keyset cursor for the deals feed: position after (created_at, id); created_at may be None."""
+    stamp = created_at.isoformat() if created_at is not None else ""
+    return base64.urlsafe_b64encode(f"{stamp}|{deal_id}".encode()).decode()
+
+
+def decode_deals_cursor(cursor):
+    created_at, deal_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+    return (datetime.fromisoformat(created_at) if created_at else None), deal_id
+
+
+def deals_page_query(farmer_id, limit, after=None):
+    """
+    One UNION ALL over the farmer's sell requests and crop listings, newest
+    first. The keyset condition is applied inside each branch so both use
+    their (farmer_id, created_at, id) index.
+
+    Rows without a created_at (older data) come after every dated row, by
+    id. They are separate branches, since NULL never satisfies the keyset
+    comparison and databases disagree on where NULLs sort; a cursor on one
+    of them has created_at None and only continues the undated rows.
+    """
+    branches = []
+    for model, kind, buyer_price, harvest_date in (
+        (SellRequest, "sell_request", SellRequest.buyer_price, SellRequest.harvest_date),
+        (CropListing, "listing", null(), cast(CropListing.harvest_date, db.String)),
+    ):
+        query = select(
+            model.id.label("id"),
+            literal(kind).label("type"),
+            model.farmer_id.label("farmer_id"),
+            model.crop_name.label("crop_name"),
+            model.quantity_quintal.label("quantity_quintal"),
+            model.expected_price.label("expected_price"),
+            buyer_price.label("buyer_price"),
+            harvest_date.label("harvest_date"),
+            model.status.label("status"),
+            model.created_at.label("created_at"),
+        ).where(model.farmer_id == farmer_id)
+        created_at, deal_id = after or (None, None)
+        # Wrapped so each branch keeps its own ORDER BY/LIMIT (SQLite rejects them bare in a UNION)
+        if after is None or created_at is not None:
+            dated = query.where(model.created_at.isnot(None))
+            if after:
+                dated = dated.where(or_(
+                    model.created_at < created_at,
+                    and_(model.created_at == created_at, model.id < deal_id)
+                ))
+            branches.append(select(dated.order_by(model.created_at.desc(), model.id.desc()).limit(limit).subquery()))
+        undated = query.where(model.created_at.is_(None))
+        if after and created_at is None:
+            undated = undated.where(model.id < deal_id)
+        branches.append(select(undated.order_by(model.id.desc()).limit(limit).subquery()))
+
+    feed = union_all(*branches).subquery()
+    return select(feed).order_by(feed.c.created_at.is_(None), feed.c.created_at.desc(), feed.c.id.desc()).limit(limit)
+
+
 @market_bp.route("/deals-list")
 def deals_list():
-    """API endpoint to get all deals for the logged-in farmer"""
+    """
+    API endpoint to get the logged-in farmer's deals, newest first.
+    Query params: limit (default 50, max 200), cursor (next_cursor of the previous page).
+    Streams {"deals": [...], "next_cursor": str|null}.
+    """
     if "farmer_id_verified" not in session:
         return jsonify({"error": "Not logged in"}), 401
-    # Return all sell requests and listings so the UI shows every requested selling
-    sell_requests = SellRequest.query.all()
-    listings = CropListing.query.all()
-
-    combined = []
-
-    for deal in sell_requests:
-        print(deal.harvest_date)
-        combined.append({
-            "id": deal.id,
-            "type": "sell_request",
-            "farmer_id": deal.farmer_id,
-            "crop_name": deal.crop_name,
-            "quantity_quintal": deal.quantity_quintal,
-            "expected_price": deal.expected_price,
-            "buyer_price": deal.buyer_price,
-            "harvest_date": deal.harvest_date,
-            "status": deal.status,
-            "created_at": deal.created_at.isoformat() if deal.created_at else None
-        })
-
-    for lst in listings:
-        combined.append({
-            "id": lst.id,
-            "type": "listing",
-            "farmer_id": lst.farmer_id,
-            "crop_name": lst.crop_name,
-            "quantity_quintal": lst.quantity_quintal,
-            "expected_price": lst.expected_price,
-            "buyer_price": None,
-            "harvest_date": lst.harvest_date.isoformat() if lst.harvest_date else None,
-            "status": lst.status,
-            "created_at": lst.created_at.isoformat() if lst.created_at else None
-        })
 
-    # Sort combined by created_at desc (None values go last)
-    def parse_created(item):
+    limit = min(max(request.args.get("limit", DEALS_PAGE_SIZE, type=int), 1), MAX_DEALS_PAGE_SIZE)
+    after = None
+    if request.args.get("cursor"):
         try:
-            return item["created_at"] or "0000-01-01T00:00:00"
-        except Exception:
-            return "0000-01-01T00:00:00"
-
-    combined_sorted = sorted(combined, key=lambda x: parse_created(x), reverse=True)
-
-    return jsonify(combined_sorted)
+            after = decode_deals_cursor(request.args["cursor"])
+        except (ValueError, UnicodeDecodeError):
+            return jsonify({"error": "Invalid cursor"}), 400
+
+    # One extra row tells whether there is a next page
+    rows = db.session.execute(deals_page_query(session["farmer_id_verified"], limit + 1, after))
+
+    def generate():
+        yield '{"deals": ['
+        last = None
+        for count, row in enumerate(rows):
+            if count == limit:
+                break
+            deal = dict(row._mapping)
+            deal["created_at"] = deal["created_at"].isoformat() if deal["created_at"] else None
+            yield ("," if count else "") + json.dumps(deal)
+            last = row
+        else:
+            last = None
+        next_cursor = encode_deals_cursor(last.created_at, last.id) if last is not None else None
+        yield '], "next_cursor": ' + json.dumps(next_cursor) + '}'
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
 
 
 @market_bp.route("/deal-details/<request_id>")
@@ -1,8 +1,9 @@
 from flask import Blueprint, render_template, request, jsonify, session, redirect
+from functools import wraps
+import hmac
 import os
 from models import db, Notification, Farmer
-from datetime import datetime
-import uuid
+import notification_service
 
 notifications_bp = Blueprint('notifications', __name__, url_prefix='/notifications')
 
@@ -47,8 +48,7 @@ def notification_detail(notification_id):
     
     # Mark as read if not already
     if not notification.is_read:
-        notification.is_read = True
-        db.session.commit()
+        notification_service.mark_read(notification.farmer_id, notification.id)
     
     return render_template('notifications_detail.html', notification=notification)
 
@@ -95,10 +95,7 @@ def api_unread_count():
         return jsonify({'error': 'Unauthorized'}), 401
     
     farmer_id = session.get('farmer_id_verified')
-    unread_count = Notification.query.filter_by(
-        farmer_id=farmer_id, 
-        is_read=False
-    ).count()
+    unread_count = notification_service.unread_count(farmer_id)
     
     return jsonify({'unread_count': unread_count})
 
@@ -120,8 +117,7 @@ def api_notification_detail(notification_id):
     
     # Mark as read
     if not notification.is_read:
-        notification.is_read = True
-        db.session.commit()
+        notification_service.mark_read(farmer_id, notification_id)
     
     return jsonify(notification.to_dict())
 
@@ -141,8 +137,7 @@ def api_mark_as_read(notification_id):
     if not notification:
         return jsonify({'error': 'Notification not found'}), 404
     
-    notification.is_read = True
-    db.session.commit()
+    notification_service.mark_read(farmer_id, notification_id)
     
     return jsonify({'success': True, 'message': 'Marked as read'})
 
@@ -154,11 +149,7 @@ def api_mark_all_as_read():
         return jsonify({'error': 'Unauthorized'}), 401
     
     farmer_id = session.get('farmer_id_verified')
-    Notification.query.filter_by(
-        farmer_id=farmer_id,
-        is_read=False
-    ).update({'is_read': True})
-    db.session.commit()
+    notification_service.mark_all_read(farmer_id)
     
     return jsonify({'success': True, 'message': 'All notifications marked as read'})
 
@@ -178,8 +169,7 @@ def api_delete_notification(notification_id):
     if not notification:
         return jsonify({'error': 'Notification not found'}), 404
     
-    db.session.delete(notification)
-    db.session.commit()
+    notification_service.delete_notification(notification)
     
     return jsonify({'success': True, 'message': 'Notification deleted'})
 
@@ -191,53 +181,68 @@ def api_clear_all():
         return jsonify({'error': 'Unauthorized'}), 401
     
     farmer_id = session.get('farmer_id_verified')
-    Notification.query.filter_by(farmer_id=farmer_id).delete()
-    db.session.commit()
+    notification_service.clear_all(farmer_id)
     
     return jsonify({'success': True, 'message': 'All notifications cleared'})
 
 
 # ==================== ADMIN ROUTES ====================
 
+def admin_required(f):
+    """Require the X-Admin-Key header to match ADMIN_API_KEY (same scheme as the blockchain service)"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        admin_key = os.getenv('ADMIN_API_KEY')
+        if not admin_key:
+            return jsonify({'error': 'Admin API key not configured'}), 500
+        api_key = request.headers.get('X-Admin-Key', '')
+        if not hmac.compare_digest(api_key.encode('utf-8'), admin_key.encode('utf-8')):
+            return jsonify({'error': 'Unauthorized - Admin access required'}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+
 @notifications_bp.route('/api/send', methods=['POST'])
+@admin_required
 def api_send_notification():
-    """Admin: Send notification to a farmer"""
-    # This would typically be an admin-only endpoint
+    """Admin: Send notification to a farmer, or to a segment of farmers
+    Body: farmer_id for a single farmer, otherwise any of state / district / crop
+    (all farmers when none is given; set "broadcast": true to confirm)
+    Requires the X-Admin-Key header.
+    """
     data = request.get_json()
     
     farmer_id = data.get('farmer_id')
     title = data.get('title')
     description = data.get('description')
+    segment = {key: data.get(key) for key in ('state', 'district', 'crop') if data.get(key)}
+    fields = {
+        'icon': data.get('icon', 'bell'),
+        'color': data.get('color', 'info'),
+        'related_id': data.get('related_id'),
+        'related_type': data.get('related_type'),
+        'action_link': data.get('action_link'),
+        'is_important': data.get('is_important', False)
+    }
     notification_type = data.get('type', 'general_alert')
-    icon = data.get('icon', 'bell')
-    color = data.get('color', 'info')
-    related_id = data.get('related_id')
-    related_type = data.get('related_type')
-    action_link = data.get('action_link')
-    is_important = data.get('is_important', False)
-    
-    if not all([farmer_id, title, description]):
-        return jsonify({'error': 'Missing required fields'}), 400
     
-    notification = Notification(
-        id=str(uuid.uuid4()),
-        farmer_id=farmer_id,
-        title=title,
-        description=description,
-        notification_type=notification_type,
-        icon=icon,
-        color=color,
-        related_id=related_id,
-        related_type=related_type,
-        action_link=action_link,
-        is_important=is_important
-    )
-    
-    db.session.add(notification)
-    db.session.commit()
+    if not all([title, description]) or not (farmer_id or segment or data.get('broadcast')):
+        return jsonify({'error': 'Missing required fields'}), 400
     
+    if farmer_id:
+        notification = notification_service.notify_farmer(
+            farmer_id, title, description, notification_type, **fields
+        )
+        return jsonify({
+            'success': True,
+            'message': 'Notification sent',
+            'notification': notification.to_dict()
+        }), 201
+    
+    recipients = notification_service.fan_out(title, description, notification_type, **segment, **fields)
     return jsonify({
         'success': True,
-        'message': 'Notification sent',
-        'notification': notification.to_dict()
+        'message': f'Notification sent to {recipients} farmers',
+        'recipients': recipients,
+        'segment': segment
     }), 201
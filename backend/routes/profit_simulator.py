@@ -1,7 +1,6 @@
 from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for
 from extensions import db
 from models import Farmer
-from models_marketplace import SellRequest
 from datetime import datetime
 import sys
 import os
@@ -11,16 +10,17 @@ profit_bp = Blueprint('profit', __name__, url_prefix='/profit')
 # Import the ML model stub
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from ml.profit_model_stub import predict_profit
+from profit_risk import simulate_crop_risk, DEFAULT_PATHS
+from profit_sweep import run_sweep
+from price_summary import get_price_summary
 
 
-def get_market_price(crop_name):
-    """Fetch average market price from SellRequest listings or return fallback."""
+def get_market_price(crop_name, district=None):
+    """Average asking price from the SellRequest price summary or return fallback."""
     try:
-        listings = SellRequest.query.filter_by(crop_name=crop_name).all()
-        if listings:
-            prices = [l.expected_price for l in listings if l.expected_price]
-            if prices:
-                return round(sum(prices) / len(prices), 2)
+        summary = get_price_summary('sell', crop_name, district)
+        if summary:
+            return summary['average']
     except Exception:
         pass
 
@@ -74,6 +74,7 @@ def api_init():
             'area_in_acres': area_acres,
             'harvest_month': harvest_month
         },
+        'market_price': get_market_price(current_crop, farmer.district),
         'oilseeds_list': ['Mustard', 'Soybean', 'Groundnut', 'Sunflower', 'Safflower', 'Sesame'],
         'harvest_months': ['January', 'February', 'March', 'April', 'May', 'June', 
                            'July', 'August', 'September', 'October', 'November', 'December']
@@ -85,6 +86,9 @@ def api_simulate():
     """
     Accepts oilseed simulation parameters and calls ML model to predict profit.
     Input format matches ML model signature.
+    With "mode": "monte_carlo" the response also carries a `risk` block
+    (percentiles, probability of loss, value-at-risk) from `paths` seeded
+    draws; pass "seed" to pin the random stream.
     """
     if 'farmer_id_verified' not in session:
         return jsonify({'error': 'Not logged in'}), 401
@@ -99,6 +103,9 @@ def api_simulate():
         soil_type = data.get('soil_type', '')
         water_type = data.get('water_type', 'Freshwater')
         area_in_acres = float(data.get('area_in_acres', 1.0))
+        monte_carlo = data.get('mode') == 'monte_carlo'
+        paths = int(data.get('paths', DEFAULT_PATHS))
+        seed = int(data['seed']) if data.get('seed') is not None else None
     except Exception as e:
         return jsonify({'error': 'Invalid input', 'details': str(e)}), 400
 
@@ -113,15 +120,47 @@ def api_simulate():
             water_type=water_type,
             area_in_acres=area_in_acres
         )
+        risk = simulate_crop_risk(
+            crop_name=crop_name,
+            state=state,
+            harvest_month=harvest_month,
+            soil_type=soil_type,
+            water_type=water_type,
+            area_in_acres=area_in_acres,
+            paths=paths,
+            seed=seed
+        ) if monte_carlo else None
     except Exception as e:
         return jsonify({'error': 'ML model error', 'details': str(e)}), 500
 
     # Return the prediction with additional context for the UI
-    return jsonify({
+    result = {
         'crop_name': crop_name,
         'area_in_acres': area_in_acres,
         'soil_type': soil_type,
         'water_type': water_type,
         'harvest_month': harvest_month,
         'prediction': prediction
-    })
+    }
+    if risk is not None:
+        result['risk'] = risk
+    return jsonify(result)
+
+
+@profit_bp.route('/api/sweep', methods=['POST'])
+def api_sweep():
+    """
+    Evaluate the simulator over a grid of inputs in one request.
+    Body: {"base": {simulate inputs}, "sweep": {input: [values] or
+    {"start", "stop", "steps"} for area_in_acres}}
+    Returns the net profit grid over the swept inputs and a tornado table.
+    """
+    if 'farmer_id_verified' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    data = request.json or {}
+    try:
+        result = run_sweep(data.get('base') or {}, data.get('sweep') or {})
+    except (ValueError, TypeError, KeyError) as e:
+        return jsonify({'error': 'Invalid sweep', 'details': str(e)}), 400
+    return jsonify(result)
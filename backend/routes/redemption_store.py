@@ -4,11 +4,10 @@ Manages gamified coin rewards and redemption offers for farmers.
 """
 
 from flask import Blueprint, render_template, request, jsonify, session, redirect
-from datetime import datetime, timedelta
 from extensions import db
-from models import Farmer, CoinBalance, CoinTransaction, RedemptionOffer, FarmerRedemption
-import random
-import string
+from models import Farmer, RedemptionOffer, FarmerRedemption
+from coin_ledger import get_or_create_balance, credit_coins, redeem, RedemptionError
+from offer_catalogue import get_offer_catalogue
 import logging
 
 logger = logging.getLogger(__name__)
@@ -35,24 +34,12 @@ def get_current_farmer():
 
 def ensure_coin_balance(farmer):
     """Ensure farmer has a coin balance record."""
-    if not farmer.coin_balance:
-        coin_balance = CoinBalance(farmer_id=farmer.id)
-        db.session.add(coin_balance)
-        db.session.commit()
-    return farmer.coin_balance
-
-def generate_redemption_code():
-    """Generate a unique redemption code."""
-    code = 'TS' + ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-    # Ensure uniqueness
-    while FarmerRedemption.query.filter_by(redemption_code=code).first():
-        code = 'TS' + ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-    return code
+    return farmer.coin_balance or get_or_create_balance(farmer.id)
 
 def initialize_redemption_offers():
     """Initialize default redemption offers in database."""
-    # Check if offers already exist
-    if RedemptionOffer.query.first():
+    # Check if offers already exist (served from the cached catalogue)
+    if get_offer_catalogue().seeded:
         return
     
     offers = [
@@ -363,17 +350,13 @@ def get_offers():
     coin_balance = ensure_coin_balance(farmer)
     category = request.args.get('category')
     
-    query = RedemptionOffer.query.filter_by(is_active=True)
-    
-    if category and category != 'all':
-        query = query.filter_by(category=category)
-    
-    offers = query.order_by(RedemptionOffer.created_at).all()
+    catalogue = get_offer_catalogue()
     
     return jsonify({
-        'offers': [offer.to_dict() for offer in offers],
+        'offers': catalogue.offers(category, session.get('language', 'en')),
         'available_coins': coin_balance.available_coins,
-        'total_coins': coin_balance.total_coins
+        'total_coins': coin_balance.total_coins,
+        'catalogue_version': catalogue.version
     })
 
 
@@ -412,39 +395,35 @@ def get_best_offer():
     coin_balance = ensure_coin_balance(farmer)
     available_coins = coin_balance.available_coins
     
-    # Get all active offers sorted by coin cost (ascending)
-    offers = RedemptionOffer.query.filter_by(is_active=True).order_by(RedemptionOffer.coin_cost).all()
+    catalogue = get_offer_catalogue()
+    cheapest_offer = catalogue.cheapest()
     
-    if not offers:
+    if not cheapest_offer:
         return jsonify({
             'has_offer': False,
             'available_coins': available_coins,
             'message': 'No offers available'
         })
     
-    # Find best offer within budget
-    best_offer = None
-    for offer in offers:
-        if available_coins >= offer.coin_cost:
-            best_offer = offer
-            break  # Get the cheapest one they can afford
+    # Most valuable offer within budget (bisect over offers sorted by coin cost)
+    best_offer = catalogue.best_affordable(available_coins)
+    language = session.get('language', 'en')
     
     if best_offer:
         return jsonify({
             'has_offer': True,
             'available_coins': available_coins,
-            'offer': best_offer.to_dict(),
+            'offer': catalogue.localize([best_offer], language)[0],
             'can_redeem': True
         })
     else:
         # No offer within budget, recommend the cheapest one
-        cheapest_offer = offers[0]
-        coins_needed = cheapest_offer.coin_cost - available_coins
+        coins_needed = cheapest_offer['coin_cost'] - available_coins
         
         return jsonify({
             'has_offer': True,
             'available_coins': available_coins,
-            'offer': cheapest_offer.to_dict(),
+            'offer': catalogue.localize([cheapest_offer], language)[0],
             'can_redeem': False,
             'coins_needed': coins_needed,
             'message': f'Earn {coins_needed} more coins to redeem this offer!'
@@ -464,72 +443,21 @@ def redeem_offer():
     data = request.get_json()
     offer_id = data.get('offer_id')
     
-    # Validate offer exists
-    offer = RedemptionOffer.query.get(offer_id)
-    if not offer:
-        return jsonify({'error': 'Offer not found'}), 404
-    
-    if not offer.is_active:
-        return jsonify({'error': 'Offer is no longer active'}), 400
-    
-    # Check stock availability
-    if offer.stock_limit and offer.stock_redeemed >= offer.stock_limit:
-        return jsonify({'error': 'Out of stock'}), 400
-    
-    # Get coin balance
-    coin_balance = ensure_coin_balance(farmer)
-    
-    # Check if farmer has enough coins
-    if coin_balance.available_coins < offer.coin_cost:
-        return jsonify({'error': 'Insufficient coins', 'required': offer.coin_cost, 'available': coin_balance.available_coins}), 400
-    
+    # Stock and coins are taken with conditional updates inside one transaction
     try:
-        # Create redemption record
-        redemption_code = generate_redemption_code()
-        expires_at = datetime.utcnow() + timedelta(days=offer.validity_days)
-        
-        redemption = FarmerRedemption(
-            farmer_id=farmer.id,
-            offer_id=offer_id,
-            coins_spent=offer.coin_cost,
-            redemption_code=redemption_code,
-            expires_at=expires_at,
-            status='active'
-        )
-        
-        # Update coin balance
-        coin_balance.available_coins -= offer.coin_cost
-        coin_balance.redeemed_coins += offer.coin_cost
-        coin_balance.updated_at = datetime.utcnow()
-        
-        # Update offer stock
-        offer.stock_redeemed += 1
-        
-        # Record transaction
-        transaction = CoinTransaction(
-            coin_balance_id=coin_balance.id,
-            transaction_type='redeemed',
-            amount=offer.coin_cost,
-            reason=f'Redeemed: {offer.title}',
-            related_type='redemption_offer',
-            related_id=offer_id
-        )
-        
-        db.session.add(redemption)
-        db.session.add(transaction)
-        db.session.commit()
-        
-        return jsonify({
-            'success': True,
-            'redemption_code': redemption_code,
-            'offer_title': offer.title,
-            'expires_at': expires_at.isoformat(),
-            'remaining_coins': coin_balance.available_coins
-        })
-    
+        redemption, remaining_coins = redeem(farmer.id, offer_id)
+    except RedemptionError as e:
+        return jsonify(e.payload), e.status
     except Exception as e:
-        db.session.rollback()
         return jsonify({'error': str(e)}), 500
+    
+    return jsonify({
+        'success': True,
+        'redemption_code': redemption.redemption_code,
+        'offer_title': redemption.offer.title,
+        'expires_at': redemption.expires_at.isoformat(),
+        'remaining_coins': remaining_coins
+    })
 
 
 @redemption_bp.route('/api/my-redemptions', methods=['GET'])
@@ -583,23 +511,7 @@ def add_coins_manual():
         return jsonify({'error': 'Invalid amount'}), 400
     
     try:
-        coin_balance = ensure_coin_balance(farmer)
-        
-        coin_balance.total_coins += amount
-        coin_balance.available_coins += amount
-        coin_balance.updated_at = datetime.utcnow()
-        
-        transaction = CoinTransaction(
-            coin_balance_id=coin_balance.id,
-            transaction_type='earned',
-            amount=amount,
-            reason=reason
-        )
-        
-        farmer.coins_earned += amount
-        
-        db.session.add(transaction)
-        db.session.commit()
+        coin_balance = credit_coins(farmer.id, amount, reason)
         
         return jsonify({
             'success': True,
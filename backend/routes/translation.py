@@ -1,11 +1,14 @@
 """
 Translation API routes for multilingual support
 """
-from flask import Blueprint, request, session, jsonify
-from translations import get_translation, get_all_translations, TRANSLATIONS
+from flask import Blueprint, Response, request, session, jsonify
+from translations import get_translation, get_all_translations, get_bundle, translate_many, TRANSLATIONS
 
 translation_bp = Blueprint('translation', __name__, url_prefix='/api/translate')
 
+# Upper bound on strings per bulk translate request
+MAX_BULK_TEXTS = 1000
+
 # Supported languages
 SUPPORTED_LANGUAGES = {
     'en': 'English',
@@ -83,13 +86,60 @@ def translate_page():
     if target_language not in SUPPORTED_LANGUAGES:
         return jsonify({'error': 'Invalid language code'}), 400
     
-    # Get all translations for this language
-    translations = {}
-    for original_text, lang_translations in TRANSLATIONS.items():
-        if target_language in lang_translations:
-            translations[original_text] = lang_translations[target_language]
+    # Same precompiled bundle as GET /bundle/<language>
+    return _bundle_response(get_bundle(target_language))
+
+
+@translation_bp.route('/bundle/<language>', methods=['GET'])
+def translation_bundle(language):
+    """
+    Whole translation table for one language, compiled at startup.
+    Served gzip-precompressed when accepted; revalidates with ETag / 304.
+    """
+    bundle = get_bundle(language)
+    if bundle is None:
+        return jsonify({'error': 'Invalid language code'}), 400
+    return _bundle_response(bundle)
+
+
+@translation_bp.route('/bulk', methods=['POST'])
+def translate_bulk():
+    """
+    Translate many strings in one call
+    Request: {"texts": ["Warning", "Hello"], "target_language": "hi"}
+    Response keeps the request order; unknown strings come back unchanged.
+    """
+    data = request.get_json(silent=True) or {}
+    texts = data.get('texts')
+    target_language = data.get('target_language', 'en')
+    
+    if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+        return jsonify({'error': 'texts must be a list of strings'}), 400
+    
+    if len(texts) > MAX_BULK_TEXTS:
+        return jsonify({'error': f'At most {MAX_BULK_TEXTS} texts per request'}), 400
+    
+    if target_language not in SUPPORTED_LANGUAGES:
+        return jsonify({'error': 'Invalid language code'}), 400
     
     return jsonify({
         'language': target_language,
-        'translations': translations
+        'translations': translate_many(texts, target_language)
     })
+
+
+def _bundle_response(bundle):
+    # Strong ETags are per representation, so the gzip body gets its own
+    gzipped = bool(request.accept_encodings['gzip'])
+    etag = f'{bundle.etag}-gzip' if gzipped else bundle.etag
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    elif gzipped:
+        response = Response(bundle.gzip_body, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(bundle.body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'public, max-age=3600'
+    return response
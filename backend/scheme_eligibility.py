@@ -0,0 +1,256 @@
+"""
+Scheme eligibility index
+Compiles every active Scheme once into structured predicates (state,
+district, caste category, land-size band, oilseed flag, handicap status)
+and keeps one bitmask per predicate value, bit i standing for scheme i.
+Matching a farmer is an AND of the masks for their profile, so the work per
+request no longer depends on how many schemes are in the catalogue.
+
+Results depend only on the farmer's profile key, so they are memoised per
+key and match_farmers() can score every farmer in one pass for the nightly
+precompute. Stored recommendations carry profile_hash() of that key, so they
+are recomputed only when the farmer's eligibility actually changes. The index is rebuilt when schemes are seeded or edited
+(invalidate_scheme_index) and re-checked against the schemes table every
+INDEX_CHECK_SECONDS so other workers pick up admin edits too.
+"""
+import hashlib
+import threading
+import time
+from bisect import bisect_right
+
+from sqlalchemy import func
+
+from extensions import db
+from models import Scheme
+
+INDEX_CHECK_SECONDS = 60
+TOP_N = 5
+
+# Land-size bands in hectares: [0, 0.5), [0.5, 1), [1, 2), [2, inf)
+LAND_BAND_EDGES = (0.5, 1.0, 2.0)
+OILSEED_DISTRICTS = ('Sangli', 'Satara', 'Ratnagiri')
+RESERVED_CASTES = ('SC', 'ST')
+
+HANDICAP_BONUS = 20
+HANDICAP_REASON = "Special scheme for differently-abled farmers"
+CASTE_BONUS = 15
+CASTE_REASON = " (SC/ST eligibility bonus)"
+
+# Category rules, first match wins:
+# (lowercase name keywords, exact name keywords, score, reason, min land ha, oilseed only)
+CATEGORY_RULES = (
+    ((), ('PM-KISAN',), 90, "Universal income support scheme - you are eligible", 0.0, False),
+    (('oilseed',), ('NMEO',), 85, "Perfect for oilseed cultivation in your region", 0.0, True),
+    (('soil',), (), 80, "Optimize your land productivity with soil testing", 0.0, False),
+    (('insurance',), ('PMFBY',), 75, "Protect your crops from natural disasters", 0.0, False),
+    (('irrigation',), ('Per Drop',), 70, "Improve water efficiency on your farm", 0.5, False),
+    (('dairy', 'livestock'), (), 65, "Diversify income through livestock farming", 0.0, False),
+    (('mechanization',), ('SMAM',), 70, "Reduce farming costs with modern equipment", 1.0, False),
+    (('horticulture',), ('MIDH',), 60, "High-value crop option for your land", 0.0, False),
+    (('employment',), ('MGNREGA',), 55, "Additional guaranteed income source", 0.0, False),
+    (('natural',), (), 50, "Organic farming with government support", 0.0, False),
+    (('credit',), ('KCC',), 75, "Easy agricultural credit at low rates", 0.0, False),
+    (('technology',), ('ATMA',), 60, "Learn modern farming techniques free", 0.0, False),
+    (('market',), ('e-NAM',), 70, "Direct market access for better prices", 0.0, False),
+    (('infrastructure',), ('AIF',), 65, "Build farm infrastructure", 2.0, False),
+)
+
+
+def land_band(hectares):
+    """Index of the land-size band a holding falls into."""
+    return bisect_right(LAND_BAND_EDGES, hectares or 0.0)
+
+
+def profile_hash(farmer):
+    """Short stable hash of the farmer's profile key (see SchemeIndex.profile_key)."""
+    key = repr(SchemeIndex.profile_key(farmer))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+
+class CompiledScheme:
+    """Predicates and display fields of one scheme, extracted once."""
+    __slots__ = ('id', 'score', 'reason', 'min_land', 'oilseed_only', 'states', 'districts',
+                 'handicap_bonus', 'caste_bonus', 'display')
+
+    def __init__(self, scheme):
+        self.id = scheme.id
+        self.score, self.reason, self.min_land, self.oilseed_only = 0, "", 0.0, False
+        lower_name = scheme.name.lower()
+        for keywords, exact, score, reason, min_land, oilseed_only in CATEGORY_RULES:
+            if any(k in lower_name for k in keywords) or any(k in scheme.name for k in exact):
+                self.score, self.reason = score, reason
+                self.min_land, self.oilseed_only = min_land, oilseed_only
+                break
+
+        # Schemes carry no regional restriction yet; None means "any"
+        self.states = None
+        self.districts = None
+
+        description = scheme.description or ""
+        self.handicap_bonus = "disabled" in description.lower()
+        self.caste_bonus = "SC" in description or "ST" in description or "scheduled" in description.lower()
+        self.display = {
+            'id': scheme.id,
+            'name': scheme.name,
+            'description': scheme.description,
+            'benefit_amount': scheme.benefit_amount,
+            'eligibility_criteria': scheme.eligibility_criteria,
+            'focus_area': scheme.focus_area,
+            'focus_color': scheme.focus_color,
+            'external_link': scheme.external_link,
+        }
+
+
+class SchemeIndex:
+    """Bitmask index over compiled schemes."""
+
+    def __init__(self, schemes, fingerprint=None):
+        self.schemes = [CompiledScheme(s) for s in schemes]
+        self.fingerprint = fingerprint
+        self._matches = {}
+        self._lock = threading.Lock()
+
+        self.category_mask = 0
+        self.oilseed_only_mask = 0
+        self.handicap_mask = 0
+        self.caste_mask = 0
+        self.any_state_mask = 0
+        self.any_district_mask = 0
+        self.state_masks = {}
+        self.district_masks = {}
+        self.band_masks = [0] * (len(LAND_BAND_EDGES) + 1)
+
+        for i, compiled in enumerate(self.schemes):
+            bit = 1 << i
+            if compiled.score:
+                self.category_mask |= bit
+            if compiled.oilseed_only:
+                self.oilseed_only_mask |= bit
+            if compiled.handicap_bonus:
+                self.handicap_mask |= bit
+            if compiled.caste_bonus:
+                self.caste_mask |= bit
+            for band in range(len(self.band_masks)):
+                lower = LAND_BAND_EDGES[band - 1] if band else 0.0
+                if compiled.min_land <= lower:
+                    self.band_masks[band] |= bit
+            self._add_region(bit, compiled.states, 'any_state_mask', self.state_masks)
+            self._add_region(bit, compiled.districts, 'any_district_mask', self.district_masks)
+
+    def _add_region(self, bit, values, any_attr, masks):
+        if values is None:
+            setattr(self, any_attr, getattr(self, any_attr) | bit)
+            return
+        for value in values:
+            masks[value] = masks.get(value, 0) | bit
+
+    @staticmethod
+    def profile_key(farmer):
+        """Everything about a farmer that can change their matches."""
+        return (
+            farmer.state,
+            farmer.district,
+            farmer.caste_category in RESERVED_CASTES,
+            land_band(farmer.total_land_area_hectares),
+            bool(farmer.is_oilseed_farmer) or farmer.district in OILSEED_DISTRICTS,
+            bool(farmer.is_physically_handicapped),
+        )
+
+    def _score_profile(self, key):
+        state, district, reserved_caste, band, oilseed, handicapped = key
+        mask = self.category_mask & self.band_masks[band]
+        mask &= self.any_state_mask | self.state_masks.get(state, 0)
+        mask &= self.any_district_mask | self.district_masks.get(district, 0)
+        if not oilseed:
+            mask &= ~self.oilseed_only_mask
+
+        handicap = self.handicap_mask if handicapped else 0
+        caste = self.caste_mask if reserved_caste else 0
+
+        scored = []
+        candidates = mask | handicap | caste
+        while candidates:
+            low = candidates & -candidates
+            i = low.bit_length() - 1
+            candidates ^= low
+            compiled = self.schemes[i]
+            score, reason = (compiled.score, compiled.reason) if mask & low else (0, "")
+            if handicap & low:
+                score += HANDICAP_BONUS
+                reason = HANDICAP_REASON
+            if caste & low:
+                score += CASTE_BONUS
+                reason += CASTE_REASON
+            scored.append((score, i, reason))
+
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [(self.schemes[i], score, reason) for score, i, reason in scored[:TOP_N]]
+
+    def match_profile(self, key):
+        """Top schemes for a profile key as (CompiledScheme, score, reason), best first."""
+        matches = self._matches.get(key)
+        if matches is None:
+            matches = self._score_profile(key)
+            with self._lock:
+                self._matches[key] = matches
+        return matches
+
+    def match(self, farmer):
+        """Top schemes for a farmer as (CompiledScheme, score, reason), best first."""
+        return self.match_profile(self.profile_key(farmer))
+
+    def match_farmers(self, farmers):
+        """Batch match: {farmer.id: matches}. Farmers sharing a profile share the work."""
+        return {farmer.id: self.match(farmer) for farmer in farmers}
+
+    def to_recommendations(self, matches):
+        """Shape matches like the /api/smart-recommendations payload."""
+        recommendations = []
+        for compiled, score, reason in matches:
+            priority = 'high' if score >= 80 else 'medium' if score >= 60 else 'low'
+            item = dict(compiled.display)
+            item.update({
+                'reason': reason,
+                'priority': priority,
+                'match_percentage': score,
+                'ai_method': 'rule_based'
+            })
+            recommendations.append(item)
+        return recommendations
+
+
+_index = None
+_checked_at = 0.0
+_index_lock = threading.Lock()
+
+
+def _fingerprint():
+    """Cheap summary of the active schemes; changes on insert, edit or delete."""
+    count, latest = db.session.query(func.count(Scheme.id), func.max(Scheme.updated_at)).filter(
+        Scheme.is_active == True
+    ).one()
+    return (count, latest)
+
+
+def get_scheme_index():
+    """Current index, (re)built from the schemes table when missing or out of date."""
+    global _index, _checked_at
+    now = time.time()
+    index = _index
+    if index is not None and now - _checked_at < INDEX_CHECK_SECONDS:
+        return index
+
+    with _index_lock:
+        fingerprint = _fingerprint()
+        if _index is None or _index.fingerprint != fingerprint:
+            schemes = Scheme.query.filter_by(is_active=True).order_by(Scheme.created_at, Scheme.id).all()
+            _index = SchemeIndex(schemes, fingerprint)
+        _checked_at = now
+        return _index
+
+
+def invalidate_scheme_index():
+    """Force a rebuild on next use (call after seeding or editing schemes)."""
+    global _index
+    with _index_lock:
+        _index = None
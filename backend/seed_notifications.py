@@ -3,6 +3,7 @@ Seed script to populate sample notifications
 """
 from app import app, db
 from models import Notification, Farmer
+from notification_service import add_notifications
 from datetime import datetime, timedelta
 import uuid
 
@@ -116,6 +117,7 @@ def seed_notifications():
         
         # Create notifications with varied timestamps
         now = datetime.utcnow()
+        notifications = []
         for i, notif_data in enumerate(notifications_data):
             # Spread notifications over the last 7 days
             days_ago = i // 2
@@ -136,9 +138,10 @@ def seed_notifications():
                 created_at=created_at,
                 updated_at=created_at,
             )
-            db.session.add(notification)
+            notifications.append(notification)
         
-        db.session.commit()
+        # Stores the rows and keeps the farmer's unread counter in step
+        add_notifications(notifications)
         print(f"✅ Successfully seeded {len(notifications_data)} notifications for farmer {farmer.name}")
 
 if __name__ == '__main__':
@@ -5,6 +5,7 @@ Run this after migrations: python seed_schemes.py
 import json
 from extensions import db
 from models import Scheme
+from scheme_eligibility import invalidate_scheme_index
 from app import app
 
 def seed_schemes():
@@ -602,6 +603,7 @@ def seed_schemes():
             print(f'Added: {scheme.name}')
         
         db.session.commit()
+        invalidate_scheme_index()
         print(f'\n✓ Successfully added {len(schemes_data)} schemes to the database!')
 
 if __name__ == '__main__':
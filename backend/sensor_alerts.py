@@ -0,0 +1,277 @@
+"""
+Streaming alert engine for IoT field sensor readings
+Runs rolling z-score, EWMA drift and static crop-stage thresholds on every
+reading as it arrives. All per-device state is updated in O(1) per reading.
+"""
+import math
+import time
+from collections import deque
+from datetime import date, datetime
+
+# Sensor fields we watch, keyed by the ESP32 payload name
+WATCHED_METRICS = {
+    'soilMoist': 'soil_moisture',
+    'soilTemp': 'soil_temp',
+    'heatIndex': 'heat_index',
+}
+
+METRIC_LABELS = {
+    'soil_moisture': ('Soil Moisture', '%'),
+    'soil_temp': ('Soil Temperature', '°C'),
+    'heat_index': ('Heat Index', '°C'),
+}
+
+# Static (min, max) limits per crop stage for oilseeds
+STAGE_THRESHOLDS = {
+    'germination': {
+        'soil_moisture': (40, 80),
+        'soil_temp': (15, 32),
+        'heat_index': (None, 38),
+    },
+    'vegetative': {
+        'soil_moisture': (35, 75),
+        'soil_temp': (18, 34),
+        'heat_index': (None, 40),
+    },
+    'flowering': {
+        'soil_moisture': (40, 70),
+        'soil_temp': (18, 30),
+        'heat_index': (None, 36),
+    },
+    'maturity': {
+        'soil_moisture': (20, 60),
+        'soil_temp': (15, 35),
+        'heat_index': (None, 42),
+    },
+}
+DEFAULT_STAGE = 'vegetative'
+
+# Detector settings
+WINDOW_SIZE = 60            # readings in the rolling z-score window
+MIN_SAMPLES = 20            # warm-up before statistical rules fire
+ZSCORE_LIMIT = 3.5
+EWMA_FAST_ALPHA = 0.3
+EWMA_SLOW_ALPHA = 0.02
+DRIFT_LIMIT = 3.0           # fast/slow EWMA gap in noise standard deviations
+
+# De-duplication and rate limiting
+ALERT_COOLDOWN_SECONDS = 30 * 60     # same (metric, rule) re-fires at most every 30 min
+DEVICE_ALERT_LIMIT = 5               # max alerts per device ...
+DEVICE_ALERT_WINDOW_SECONDS = 60 * 60  # ... per hour
+
+
+def crop_stage_for(harvest_date, today=None):
+    """Derive the crop stage from the farmer's expected harvest date."""
+    if not harvest_date:
+        return DEFAULT_STAGE
+    if isinstance(harvest_date, datetime):
+        harvest_date = harvest_date.date()
+    days_left = (harvest_date - (today or date.today())).days
+    if days_left > 90:
+        return 'germination'
+    if days_left > 45:
+        return 'vegetative'
+    if days_left > 15:
+        return 'flowering'
+    return 'maturity'
+
+
+class MetricState:
+    """Rolling window + EWMA state for one metric of one device."""
+    __slots__ = ('window', 'total', 'total_sq', 'fast', 'slow', 'noise_var', 'count')
+
+    def __init__(self):
+        self.window = deque(maxlen=WINDOW_SIZE)
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.fast = None
+        self.slow = None
+        self.noise_var = 0.0
+        self.count = 0
+
+    def zscore(self, value):
+        """Z-score of value against the current window (before it is added)."""
+        n = len(self.window)
+        if n < MIN_SAMPLES:
+            return 0.0
+        mean = self.total / n
+        var = self.total_sq / n - mean * mean
+        if var <= 1e-9:
+            return 0.0
+        return (value - mean) / math.sqrt(var)
+
+    def drift(self):
+        """Gap between fast and slow EWMA in units of reading noise."""
+        if self.count < MIN_SAMPLES or self.noise_var <= 1e-9:
+            return 0.0
+        return (self.fast - self.slow) / math.sqrt(self.noise_var)
+
+    def push(self, value):
+        """Add a reading to the window and both EWMAs."""
+        if len(self.window) == WINDOW_SIZE:
+            old = self.window[0]
+            self.total -= old
+            self.total_sq -= old * old
+        self.window.append(value)
+        self.total += value
+        self.total_sq += value * value
+
+        if self.fast is None:
+            self.fast = self.slow = value
+        else:
+            # Noise is measured around the fast EWMA so a slow trend does
+            # not inflate the variance it is compared against.
+            resid = value - self.fast
+            self.noise_var += EWMA_SLOW_ALPHA * (resid * resid - self.noise_var)
+            self.fast += EWMA_FAST_ALPHA * resid
+            self.slow += EWMA_SLOW_ALPHA * (value - self.slow)
+        self.count += 1
+
+
+class DeviceState:
+    """All detector state for one device."""
+    __slots__ = ('metrics', 'active', 'last_fired', 'recent_alerts')
+
+    def __init__(self):
+        self.metrics = {name: MetricState() for name in WATCHED_METRICS.values()}
+        self.active = set()        # (metric, rule) currently in alarm
+        self.last_fired = {}       # (metric, rule) -> timestamp
+        self.recent_alerts = deque(maxlen=DEVICE_ALERT_LIMIT)
+
+
+class SensorAlertEngine:
+    """
+    Online rule and anomaly engine. Call process() for each reading;
+    it returns the alerts that should be delivered to the farmer.
+    """
+
+    def __init__(self, clock=time.time):
+        self.devices = {}
+        self.clock = clock
+
+    def reset(self, device_key=None):
+        """Drop state for one device (or all devices)."""
+        if device_key is None:
+            self.devices.clear()
+        else:
+            self.devices.pop(device_key, None)
+
+    def process(self, device_key, reading, stage=None):
+        """
+        Evaluate one reading.
+
+        Args:
+            device_key: device serial (or any stable id)
+            reading: dict with ESP32 payload keys (soilMoist, soilTemp, heatIndex)
+            stage: crop stage name from STAGE_THRESHOLDS
+        Returns:
+            list of alert dicts (already de-duplicated and rate limited)
+        """
+        state = self.devices.get(device_key)
+        if state is None:
+            state = self.devices[device_key] = DeviceState()
+
+        limits = STAGE_THRESHOLDS.get(stage or DEFAULT_STAGE, STAGE_THRESHOLDS[DEFAULT_STAGE])
+        now = self.clock()
+        alerts = []
+
+        for field, metric in WATCHED_METRICS.items():
+            value = reading.get(field)
+            if value is None:
+                continue
+            value = float(value)
+            ms = state.metrics[metric]
+
+            firing = {}
+            low, high = limits.get(metric, (None, None))
+            if low is not None and value < low:
+                firing['threshold_low'] = low
+            elif high is not None and value > high:
+                firing['threshold_high'] = high
+
+            z = ms.zscore(value)
+            if abs(z) >= ZSCORE_LIMIT:
+                firing['zscore'] = round(z, 2)
+
+            ms.push(value)
+
+            d = ms.drift()
+            if abs(d) >= DRIFT_LIMIT:
+                firing['drift'] = round(d, 2)
+
+            for rule in ('threshold_low', 'threshold_high', 'zscore', 'drift'):
+                key = (metric, rule)
+                if rule not in firing:
+                    # Condition cleared -> re-arm the rule
+                    state.active.discard(key)
+                    continue
+                if key in state.active:
+                    continue
+                state.active.add(key)
+                if now - state.last_fired.get(key, -ALERT_COOLDOWN_SECONDS) < ALERT_COOLDOWN_SECONDS:
+                    continue
+                if (len(state.recent_alerts) == DEVICE_ALERT_LIMIT
+                        and now - state.recent_alerts[0] < DEVICE_ALERT_WINDOW_SECONDS):
+                    continue
+                state.last_fired[key] = now
+                state.recent_alerts.append(now)
+                alerts.append(_build_alert(metric, rule, value, firing[rule], stage or DEFAULT_STAGE))
+
+        return alerts
+
+
+def _build_alert(metric, rule, value, detail, stage):
+    """Create a farmer-facing alert payload."""
+    label, unit = METRIC_LABELS[metric]
+    if rule == 'threshold_low':
+        title = f'Low {label}'
+        message = f'{label} is {value:g}{unit}, below the {detail:g}{unit} minimum for the {stage} stage.'
+        severity = 'warning'
+    elif rule == 'threshold_high':
+        title = f'High {label}'
+        message = f'{label} is {value:g}{unit}, above the {detail:g}{unit} maximum for the {stage} stage.'
+        severity = 'warning'
+    elif rule == 'zscore':
+        title = f'Unusual {label} reading'
+        message = f'{label} jumped to {value:g}{unit} ({detail:+g}σ from recent readings). Check the field or sensor.'
+        severity = 'info'
+    else:
+        direction = 'rising' if detail > 0 else 'falling'
+        title = f'{label} {direction} steadily'
+        message = f'{label} has been {direction} over recent readings (now {value:g}{unit}).'
+        severity = 'info'
+    return {
+        'metric': metric,
+        'rule': rule,
+        'value': value,
+        'detail': detail,
+        'stage': stage,
+        'title': title,
+        'message': message,
+        'severity': severity,
+    }
+
+
+def alerts_to_notifications(alerts, farmer_id, device_id=None):
+    """Build Notification rows for a farmer from engine alerts."""
+    from models import Notification
+
+    return [
+        Notification(
+            farmer_id=farmer_id,
+            title=alert['title'],
+            description=alert['message'],
+            notification_type='sensor_alert',
+            icon='sensor',
+            color=alert['severity'],
+            related_id=device_id,
+            related_type='iot_device',
+            action_link='/field-monitoring/device-control',
+            is_important=alert['rule'].startswith('threshold'),
+        )
+        for alert in alerts
+    ]
+
+
+# Shared engine instance used by the ingestion endpoint
+alert_engine = SensorAlertEngine()
@@ -18,12 +18,19 @@ function initializeBiddingSocket() {
         return biddingSocket;
     }
 
-    biddingSocket = io();
+    // Reuse the page's notification socket when base.html already opened one
+    biddingSocket = window.notificationSocket || io();
 
     biddingSocket.on('connect', () => {
         console.log('✅ Connected to bidding server');
     });
 
+    // Auction notifications are pushed to the user's room; no polling of /bidding/notifications
+    biddingSocket.on('auction_notification', (data) => {
+        showNotification(data.notification.message, 'info');
+        window.dispatchEvent(new CustomEvent('auction-notification:new', { detail: data }));
+    });
+
     biddingSocket.on('connect_error', (error) => {
         console.error('❌ WebSocket connection error:', error);
         showNotification('Connection error. Some features may not work.', 'warning');
@@ -130,6 +137,15 @@ function onOutbid(callback) {
     socket.on('you_were_outbid', callback);
 }
 
+/**
+ * Listen to auction notifications (won, counter offer, extended, cancelled)
+ * @param {Function} callback - Receives { notification, unread_count }
+ */
+function onAuctionNotification(callback) {
+    const socket = initializeBiddingSocket();
+    socket.on('auction_notification', callback);
+}
+
 /**
  * Listen to auction ended event
  * @param {Function} callback - Callback function
@@ -0,0 +1,171 @@
+"""
+Tests for ledger-backed coin redemption (coin_ledger.py), including a
+flash-sale style run of concurrent redemptions.
+Runs against a temporary SQLite database.
+Run: python -m pytest test_coin_ledger.py -q
+"""
+import threading
+
+from app import app
+from extensions import db
+from models import Farmer, RedemptionOffer, FarmerRedemption
+import coin_ledger
+from coin_ledger import RedemptionError
+
+
+def make_farmer(fid):
+    farmer = Farmer(id=fid, farmer_id=fid[-12:], name=fid, phone_number=fid[-10:], district='Latur')
+    db.session.add(farmer)
+    db.session.commit()
+    return farmer
+
+
+def make_offer(cost=100, stock=None):
+    offer = RedemptionOffer(title=f'Offer {cost}/{stock}', description='-', category='Services',
+                            coin_cost=cost, stock_limit=stock, stock_redeemed=0, validity_days=30)
+    db.session.add(offer)
+    db.session.commit()
+    return offer.id
+
+
+def setup_module(module):
+    with app.app_context():
+        db.create_all()
+
+
+def run_concurrently(jobs):
+    """Run (farmer_id, offer_id) redemptions on parallel threads; returns outcomes."""
+    outcomes = []
+    lock = threading.Lock()
+    start = threading.Barrier(len(jobs))
+
+    def worker(farmer_id, offer_id):
+        with app.app_context():
+            start.wait()
+            try:
+                coin_ledger.redeem(farmer_id, offer_id)
+                outcome = 'ok'
+            except RedemptionError as e:
+                outcome = e.payload['error']
+            finally:
+                db.session.remove()
+            with lock:
+                outcomes.append(outcome)
+
+    threads = [threading.Thread(target=worker, args=job) for job in jobs]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return outcomes
+
+
+def test_redeem_updates_ledger_and_balance():
+    with app.app_context():
+        make_farmer('coin-farmer-0001')
+        offer_id = make_offer(cost=150)
+        coin_ledger.credit_coins('coin-farmer-0001', 500, 'Deal Completed')
+
+        redemption, remaining = coin_ledger.redeem('coin-farmer-0001', offer_id)
+        assert remaining == 350
+        assert redemption.redemption_code.startswith('TS') and len(redemption.redemption_code) == 18
+
+        balance = coin_ledger.get_or_create_balance('coin-farmer-0001')
+        assert coin_ledger.ledger_totals(balance.id) == (500, 150)
+        assert db.session.get(Farmer, 'coin-farmer-0001').coins_earned == 500
+
+        # Materialized columns are rebuilt exactly from the ledger
+        rebuilt = coin_ledger.rebuild_balance('coin-farmer-0001')
+        assert (rebuilt.total_coins, rebuilt.available_coins, rebuilt.redeemed_coins) == (500, 350, 150)
+
+
+def test_insufficient_coins_leaves_stock_untouched():
+    with app.app_context():
+        make_farmer('coin-farmer-0002')
+        offer_id = make_offer(cost=300, stock=1)
+        coin_ledger.credit_coins('coin-farmer-0002', 100, 'Subsidy Applied')
+        try:
+            coin_ledger.redeem('coin-farmer-0002', offer_id)
+            assert False, 'expected RedemptionError'
+        except RedemptionError as e:
+            assert e.payload == {'error': 'Insufficient coins', 'required': 300, 'available': 100}
+        assert db.session.get(RedemptionOffer, offer_id).stock_redeemed == 0
+
+
+def test_flash_sale_never_oversells():
+    with app.app_context():
+        offer_id = make_offer(cost=50, stock=5)
+        farmer_ids = [f'flash-farmer-{i:03d}' for i in range(20)]
+        for fid in farmer_ids:
+            make_farmer(fid)
+            coin_ledger.credit_coins(fid, 100, 'Signup bonus')
+
+    outcomes = run_concurrently([(fid, offer_id) for fid in farmer_ids for _ in range(2)])
+    assert outcomes.count('ok') == 5
+    assert outcomes.count('Out of stock') == 35
+
+    with app.app_context():
+        assert db.session.get(RedemptionOffer, offer_id).stock_redeemed == 5
+        assert FarmerRedemption.query.filter_by(offer_id=offer_id).count() == 5
+
+
+def test_concurrent_redemptions_cannot_overdraw():
+    with app.app_context():
+        make_farmer('coin-farmer-0003')
+        offer_id = make_offer(cost=100)
+        coin_ledger.credit_coins('coin-farmer-0003', 300, 'Deal Completed')
+
+    outcomes = run_concurrently([('coin-farmer-0003', offer_id)] * 12)
+    assert outcomes.count('ok') == 3
+    assert outcomes.count('Insufficient coins') == 9
+
+    with app.app_context():
+        balance = coin_ledger.get_or_create_balance('coin-farmer-0003')
+        assert balance.available_coins == 0
+        assert coin_ledger.ledger_totals(balance.id) == (300, 300)
+        assert db.session.get(RedemptionOffer, offer_id).stock_redeemed == 3
+
+
+def test_redeem_charges_the_current_price():
+    from offer_catalogue import get_offer_catalogue
+
+    with app.app_context():
+        make_farmer('coin-farmer-0004')
+        offer_id = make_offer(cost=100)
+        coin_ledger.credit_coins('coin-farmer-0004', 500, 'Deal Completed')
+        catalogue = get_offer_catalogue()
+
+        # Price change made by another process: this process's catalogue is not invalidated
+        with db.engine.begin() as connection:
+            connection.execute(RedemptionOffer.__table__.update()
+                               .where(RedemptionOffer.id == offer_id).values(coin_cost=250, validity_days=7))
+        assert get_offer_catalogue() is catalogue
+
+        redemption, remaining = coin_ledger.redeem('coin-farmer-0004', offer_id)
+        assert redemption.coins_spent == 250 and remaining == 250
+        assert 6 <= (redemption.expires_at - redemption.redeemed_at).days <= 7
+
+
+def test_missing_and_inactive_offers():
+    with app.app_context():
+        make_farmer('coin-farmer-0005')
+        coin_ledger.credit_coins('coin-farmer-0005', 500, 'Deal Completed')
+        offer_id = make_offer(cost=10)
+        db.session.get(RedemptionOffer, offer_id).is_active = False
+        db.session.commit()
+        for target, error in ((offer_id, 'Offer is no longer active'), ('no-such-offer', 'Offer not found')):
+            try:
+                coin_ledger.redeem('coin-farmer-0005', target)
+                assert False, 'expected RedemptionError'
+            except RedemptionError as e:
+                assert e.payload['error'] == error
+
+
+def test_codes_are_unique():
+    codes = {coin_ledger.generate_redemption_code() for _ in range(10000)}
+    assert len(codes) == 10000
+
+
+if __name__ == '__main__':
+    import pytest
+    raise SystemExit(pytest.main([__file__, '-q']))
@@ -0,0 +1,198 @@
+"""
+Tests for pre-translated scheme and offer content (content_i18n.py).
+Uses the stub translator and a temporary SQLite database.
+Run: python -m pytest test_content_i18n.py -q
+"""
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app import app
+from extensions import db
+from models import Farmer, Scheme, RedemptionOffer, ContentTranslation, FarmerRecommendation
+import content_i18n
+from offer_catalogue import get_offer_catalogue
+from translator import StubBackend, TranslationStore, Translator
+
+backend = StubBackend()
+_thread_queue = content_i18n.translation_queue
+
+
+def setup_module(module):
+    content_i18n.text_translator = Translator(
+        backend=backend, store=TranslationStore(os.path.join(tempfile.mkdtemp(), 'cache.sqlite3')))
+    content_i18n.translation_queue = content_i18n.InlineTranslationQueue()
+    with app.app_context():
+        db.create_all()
+        db.session.add(Farmer(id='i18n-farmer-01', farmer_id='I18NFARM0001', name='Bhasha',
+                              phone_number='5500000001', district='Jalgaon'))
+        db.session.commit()
+
+
+def make_scheme(code):
+    scheme = Scheme(scheme_code=code, name=f'Scheme {code}', description='Support for oilseed farmers',
+                    scheme_type='scheme', focus_area='Income Support', benefit_amount='₹6,000/year',
+                    eligibility_criteria='Small and marginal farmers')
+    db.session.add(scheme)
+    db.session.commit()
+    return scheme
+
+
+def stored(content_id):
+    return {(row.language, row.field): row.text
+            for row in ContentTranslation.query.filter_by(content_id=content_id)}
+
+
+def test_create_translates_every_field_once_per_language():
+    with app.app_context():
+        backend.calls.clear()
+        scheme = make_scheme('i18n-create')
+        rows = stored(scheme.id)
+        assert len(rows) == 5 * 3
+        assert rows[('hi', 'name')] == '[hi] Scheme i18n-create'
+        assert rows[('gu', 'eligibility_criteria')] == '[gu] Small and marginal farmers'
+        assert sorted(language for _, language in backend.calls) == ['gu', 'hi', 'mr']
+
+
+def test_translation_waits_for_commit_and_batches_rows():
+    with app.app_context():
+        backend.calls.clear()
+        schemes = [Scheme(scheme_code=f'i18n-batch-{i}', name=f'Batch {i}', description='Drip irrigation',
+                          scheme_type='scheme', focus_area='Water', benefit_amount='-',
+                          eligibility_criteria='-') for i in range(3)]
+        db.session.add_all(schemes)
+        db.session.flush()
+        assert backend.calls == []              # nothing translated inside the flush
+        db.session.commit()
+
+        # One call per language for all three rows; shared texts sent once
+        assert sorted(language for _, language in backend.calls) == ['gu', 'hi', 'mr']
+        assert sorted(backend.calls[0][0]) == ['-', 'Batch 0', 'Batch 1', 'Batch 2', 'Drip irrigation', 'Water']
+        assert all(len(stored(scheme.id)) == 15 for scheme in schemes)
+
+
+def test_rolled_back_changes_are_not_translated():
+    with app.app_context():
+        backend.calls.clear()
+        db.session.add(Scheme(scheme_code='i18n-rollback', name='Never', description='-', scheme_type='scheme',
+                              focus_area='-', benefit_amount='-', eligibility_criteria='-'))
+        db.session.flush()
+        db.session.rollback()
+        db.session.commit()
+        assert backend.calls == []
+
+
+def test_background_queue_translates_after_commit():
+    content_i18n.translation_queue = _thread_queue
+    try:
+        with app.app_context():
+            scheme = make_scheme('i18n-thread')
+            _thread_queue.join()
+            assert stored(scheme.id)[('hi', 'name')] == '[hi] Scheme i18n-thread'
+    finally:
+        content_i18n.translation_queue = content_i18n.InlineTranslationQueue()
+
+
+def test_update_retranslates_only_changed_fields():
+    with app.app_context():
+        scheme = make_scheme('i18n-update')
+        backend.calls.clear()
+        scheme.description = 'Support for soybean farmers'
+        db.session.commit()
+        assert backend.calls == [(['Support for soybean farmers'], language) for language in ('hi', 'mr', 'gu')]
+        rows = stored(scheme.id)
+        assert rows[('mr', 'description')] == '[mr] Support for soybean farmers'
+        assert rows[('mr', 'name')] == '[mr] Scheme i18n-update'
+        assert len(rows) == 15
+
+        # Unrelated column updates do no translation work and no lookups
+        engine = db.engine
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        backend.calls.clear()
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            scheme.is_recommended = True
+            db.session.commit()
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+        assert backend.calls == []
+        assert not [s for s in statements if 'content_translations' in s]
+
+
+def test_api_serves_stored_translations_for_session_language():
+    with app.app_context():
+        scheme_id = make_scheme('i18n-api').id
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['farmer_id_verified'] = 'i18n-farmer-01'
+        sess['language'] = 'hi'
+
+    backend.calls.clear()
+    data = client.get(f'/subsidies/api/detail/{scheme_id}').get_json()
+    assert data['name'] == '[hi] Scheme i18n-api'
+    assert data['benefit_amount'] == '[hi] ₹6,000/year'
+    assert data['scheme_code'] == 'i18n-api'
+    assert backend.calls == []
+
+    with client.session_transaction() as sess:
+        sess['language'] = 'en'
+    assert client.get(f'/subsidies/api/detail/{scheme_id}').get_json()['name'] == 'Scheme i18n-api'
+
+
+def test_ai_recommendations_are_localized():
+    with app.app_context():
+        scheme_id = make_scheme('i18n-ai').id
+        db.session.add(FarmerRecommendation(farmer_id='i18n-farmer-01', scheme_id=scheme_id, priority='high',
+                                            match_percentage=90, reason='Grows soybean', ai_method='gemini',
+                                            expires_at=datetime.now() + timedelta(hours=24)))
+        db.session.commit()
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['farmer_id_verified'] = 'i18n-farmer-01'
+        sess['language'] = 'hi'
+
+    schemes = client.get('/subsidies/api/ai-recommendations').get_json()['recommended_schemes']
+    rec = next(item for item in schemes if item['scheme_id'] == scheme_id)
+    assert rec['scheme_name'] == '[hi] Scheme i18n-ai'
+    assert rec['eligibility_criteria'] == '[hi] Small and marginal farmers'
+    assert 'name' not in rec
+
+    with client.session_transaction() as sess:
+        sess['language'] = 'en'
+    schemes = client.get('/subsidies/api/ai-recommendations').get_json()['recommended_schemes']
+    assert next(item for item in schemes if item['scheme_id'] == scheme_id)['scheme_name'] == 'Scheme i18n-ai'
+
+
+def test_offer_catalogue_overlays_translations():
+    with app.app_context():
+        offer = RedemptionOffer(title='Free soil test', description='One soil health card', category='Services',
+                                coin_cost=120, validity_days=30)
+        db.session.add(offer)
+        db.session.commit()
+        assert ('hi', 'actual_value') not in stored(offer.id)     # empty fields are skipped
+
+        catalogue = get_offer_catalogue()
+        translated = {o['id']: o for o in catalogue.offers('Services', 'mr')}[offer.id]
+        assert translated['title'] == '[mr] Free soil test'
+        english = {o['id']: o for o in catalogue.offers('Services')}[offer.id]
+        assert english['title'] == 'Free soil test'
+
+
+def test_delete_removes_translations():
+    with app.app_context():
+        scheme = make_scheme('i18n-delete')
+        scheme_id = scheme.id
+        db.session.delete(scheme)
+        db.session.commit()
+        assert stored(scheme_id) == {}
+
+
+if __name__ == '__main__':
+    import pytest
+    raise SystemExit(pytest.main([__file__, '-q']))
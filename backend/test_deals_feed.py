@@ -0,0 +1,128 @@
+"""
+Tests for the paginated deals feed (/market/deals-list).
+Run: python -m pytest test_deals_feed.py -q
+"""
+from datetime import datetime, timedelta, date
+
+from sqlalchemy import event
+
+from app import app
+from extensions import db
+from models import Farmer
+from models_marketplace import SellRequest, CropListing
+
+START = datetime(2025, 6, 1, 9, 0, 0)
+
+
+def setup_module(module):
+    with app.app_context():
+        db.create_all()
+        for i in range(2):
+            farmer_id = f'feed-farmer-0{i}'
+            if not db.session.get(Farmer, farmer_id):
+                db.session.add(Farmer(id=farmer_id, farmer_id=f'FEEDFARM000{i}', name='Saudagar',
+                                      phone_number=f'590000000{i}', district='Akola'))
+        db.session.commit()
+        # 7 sell requests and 5 listings for farmer 0 (two share a timestamp), 3 for farmer 1
+        for i in range(7):
+            db.session.add(SellRequest(farmer_id='feed-farmer-00', crop_name='Soybean', quantity_quintal=i + 1,
+                                       expected_price=4500 + i, harvest_date='2025-10-01',
+                                       created_at=START + timedelta(hours=2 * i)))
+        for i in range(5):
+            db.session.add(CropListing(farmer_id='feed-farmer-00', crop_name='Mustard', quantity_quintal=i + 1,
+                                       expected_price=5200, harvest_date=date(2026, 3, 1),
+                                       created_at=START + timedelta(hours=2 * i + 1 if i else 0)))
+        for i in range(3):
+            db.session.add(SellRequest(farmer_id='feed-farmer-01', crop_name='Groundnut', quantity_quintal=5,
+                                       expected_price=6000, created_at=START + timedelta(hours=i)))
+        db.session.commit()
+
+
+def client_for(farmer_id):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['farmer_id_verified'] = farmer_id
+    return client
+
+
+def test_pages_cover_only_own_deals_in_order():
+    client = client_for('feed-farmer-00')
+    deals, cursor, pages = [], None, 0
+    while True:
+        url = '/market/deals-list?limit=5' + (f'&cursor={cursor}' if cursor else '')
+        page = client.get(url).get_json()
+        deals.extend(page['deals'])
+        pages += 1
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+
+    assert pages == 3
+    assert len(deals) == 12 and len({d['id'] for d in deals}) == 12
+    assert {d['farmer_id'] for d in deals} == {'feed-farmer-00'}
+    keys = [(d['created_at'], d['id']) for d in deals]
+    assert keys == sorted(keys, reverse=True)
+    assert {d['type'] for d in deals} == {'sell_request', 'listing'}
+    listing = next(d for d in deals if d['type'] == 'listing')
+    assert listing['harvest_date'] == '2026-03-01' and listing['buyer_price'] is None
+
+
+def test_rows_without_created_at_come_last_on_every_page():
+    with app.app_context():
+        undated = [SellRequest(farmer_id='feed-farmer-02', crop_name='Sesame', quantity_quintal=2,
+                               expected_price=9000) for _ in range(3)]
+        dated = [CropListing(farmer_id='feed-farmer-02', crop_name='Sesame', quantity_quintal=1,
+                             expected_price=9000, created_at=START + timedelta(days=i)) for i in range(3)]
+        if not db.session.get(Farmer, 'feed-farmer-02'):
+            db.session.add(Farmer(id='feed-farmer-02', farmer_id='FEEDFARM0002', name='Saudagar',
+                                  phone_number='5900000002', district='Akola'))
+        db.session.add_all(undated + dated)
+        db.session.commit()
+        db.session.execute(SellRequest.__table__.update()
+                           .where(SellRequest.id.in_([row.id for row in undated])).values(created_at=None))
+        db.session.commit()
+        undated_ids = sorted((row.id for row in undated), reverse=True)
+
+    client = client_for('feed-farmer-02')
+    deals, cursor = [], None
+    while True:
+        response = client.get('/market/deals-list?limit=2' + (f'&cursor={cursor}' if cursor else ''))
+        page = response.get_json()       # a complete JSON document on every page
+        deals.extend(page['deals'])
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+
+    assert len(deals) == 6
+    assert [d['created_at'] is None for d in deals] == [False] * 3 + [True] * 3
+    assert [d['id'] for d in deals[3:]] == undated_ids
+
+
+def test_single_query_per_page():
+    client = client_for('feed-farmer-01')
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        page = client.get('/market/deals-list').get_json()
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert len(page['deals']) == 3 and page['next_cursor'] is None
+    feed_queries = [s for s in statements if 'UNION ALL' in s]
+    assert len(feed_queries) == 1
+    assert len([s for s in statements if 'sell_requests' in s]) == 1
+
+
+def test_requires_login_and_valid_cursor():
+    assert app.test_client().get('/market/deals-list').status_code == 401
+    assert client_for('feed-farmer-00').get('/market/deals-list?cursor=bm90LWEtY3Vyc29y').status_code == 400
+
+
+if __name__ == '__main__':
+    import pytest
+    raise SystemExit(pytest.main([__file__, '-q']))
@@ -0,0 +1,147 @@
+"""
+Tests for the marketplace geo layer (geo_index.py).
+Runs against a temporary SQLite database.
+Run: python -m pytest test_geo_index.py -q
+"""
+import random
+import re
+
+from app import app
+from extensions import db
+from models import Farmer
+from models_marketplace import Buyer, BuyerOffer
+import geo_index
+from geo_index import OfferGeoIndex, get_centroids, get_offer_index, haversine_km, locate_farmer, nearby_offers
+
+
+def entry(offer_id, point, price, crop='soybean'):
+    return {'offer_id': offer_id, 'crop': crop, 'price': price, 'point': point}
+
+
+def setup_module(module):
+    with app.app_context():
+        db.create_all()
+        if not db.session.get(Farmer, 'geo-farmer-01'):
+            db.session.add(Farmer(id='geo-farmer-01', farmer_id='GEOFARMER01', name='Geo Farmer',
+                                  phone_number='8100000001', district='Latur', pincode='413512'))
+        if not db.session.get(Buyer, 'geo-buyer-01'):
+            db.session.add(Buyer(id='geo-buyer-01', email='geo-buyer@example.com', password='x',
+                                 buyer_name='Solapur Oils', district='Solapur'))
+        db.session.commit()
+
+
+def test_centroid_lookups():
+    centroids = get_centroids()
+    pune, mumbai = centroids.district('Pune'), centroids.district(' mumbai ')
+    assert 110 < haversine_km(*pune, *mumbai) < 125
+    assert centroids.district('Dharashiv') == centroids.district('Osmanabad')
+    assert centroids.text('APMC Yard, Latur.') == centroids.district('Latur')
+    assert centroids.text('Andheri, Mumbai Suburban') == centroids.district('Mumbai Suburban')
+    assert centroids.pincode('413001') == centroids.district('Solapur')
+    assert centroids.pincode('413999') is None
+    assert centroids.pincode('413999', exact=False) is not None
+
+
+def test_districts_are_keyed_by_state():
+    centroids = get_centroids()
+    maharashtra = centroids.district('Aurangabad', 'Maharashtra')
+    bihar = centroids.district('aurangabad', 'bihar')
+    assert maharashtra and bihar and haversine_km(*maharashtra, *bihar) > 1000
+    assert centroids.district('Sambhajinagar', 'Maharashtra') == maharashtra
+    # Ambiguous without a state; unknown in a state that does not have it
+    assert centroids.district('Aurangabad') is None
+    assert centroids.district('Latur', 'Bihar') is None
+    assert centroids.district('Latur') == centroids.district('Latur', 'Maharashtra')
+    assert centroids.text('Mandi, Hamirpur', 'Himachal Pradesh') != centroids.text('Mandi, Hamirpur', 'Uttar Pradesh')
+    assert centroids.text('Mandi, Hamirpur') is None
+
+
+def test_farmers_and_offers_use_their_state():
+    farmer = Farmer(id='geo-farmer-02', district='Bilaspur', state='Chhattisgarh')
+    assert geo_index.locate_farmer(farmer) == get_centroids().district('Bilaspur', 'Chhattisgarh')
+    farmer.state = 'Rajasthan'      # no Bilaspur there: no location rather than the wrong one
+    assert geo_index.locate_farmer(farmer) is None
+
+    himachal = get_centroids().district('Hamirpur', 'Himachal Pradesh')
+    assert geo_index.locate_offer('Hamirpur', buyer_state='Himachal Pradesh') == himachal
+    assert geo_index.locate_offer(None, None, 'Hamirpur', None, 'Himachal Pradesh') == himachal
+    # Wanted districts outside the buyer's state still resolve when the name is unique
+    assert geo_index.locate_offer('Latur', buyer_state='Gujarat') == get_centroids().district('Latur')
+
+
+def test_nearby_matches_brute_force():
+    rng = random.Random(7)
+    points = list(get_centroids().by_pincode.values())
+    entries = [entry(str(i), rng.choice(points) if i % 4 else (rng.uniform(8, 34), rng.uniform(68, 90)),
+                     rng.randint(4000, 6000)) for i in range(3000)]
+    index = OfferGeoIndex(entries)
+
+    for _ in range(40):
+        lat, lon = rng.uniform(10, 32), rng.uniform(70, 88)
+        radius, limit = rng.choice([50, 150, 600, None]), rng.choice([1, 20, None])
+        expected = sorted((haversine_km(lat, lon, *e['point']), -e['price']) for e in entries)
+        expected = [pair for pair in expected if radius is None or pair[0] <= radius][:limit]
+        got = [(distance, -e['price']) for distance, e in index.nearby('Soybean', lat, lon, radius, limit)]
+        assert [(round(d, 9), p) for d, p in got] == [(round(d, 9), p) for d, p in expected]
+
+
+def test_remove_and_unplaced_offers():
+    index = OfferGeoIndex([entry('a', (18.5, 73.8), 5000), entry('b', None, 7000), entry('c', (18.5, 73.8), 5100)])
+    assert [e['offer_id'] for _, e in index.nearby('soybean', 18.5, 73.8)] == ['c', 'a']
+    assert [e['offer_id'] for e in index.best_priced('soybean')] == ['b', 'c', 'a']
+    index.remove('c')
+    index.remove('b')
+    index.add(entry('a', (19.9, 73.7), 5000))      # moved
+    assert len(index) == 1
+    assert index.nearby('soybean', 18.5, 73.8, radius_km=50) == []
+    assert index.cells['soybean'] and not index.unplaced['soybean']
+
+
+def test_index_follows_commits_and_rollbacks():
+    with app.app_context():
+        geo_index._index = None
+        origin = locate_farmer(db.session.get(Farmer, 'geo-farmer-01'))
+        assert origin == get_centroids().district('Latur')
+
+        near = BuyerOffer(buyer_id='geo-buyer-01', crop_name='Safflower', quantity_quintal=10, initial_price=5600)
+        far = BuyerOffer(buyer_name='Nagpur Mills', crop_name='Safflower', quantity_quintal=10,
+                         initial_price=5900, location_wanted='Kalmeshwar, Nagpur')
+        db.session.add_all([near, far])
+        db.session.commit()
+        index = get_offer_index()
+
+        offers = nearby_offers('safflower', origin, radius_km=None)
+        assert [o['offer_id'] for o in offers] == [near.id, far.id]
+        assert 90 < offers[0]['distance_km'] < 110                # Latur -> Solapur
+        assert [o['offer_id'] for o in nearby_offers('Safflower', origin)] == [near.id]
+
+        extra = BuyerOffer(buyer_name='Latur Traders', crop_name='Safflower', quantity_quintal=5,
+                           initial_price=5700, district_wanted='Latur')
+        db.session.add(extra)
+        db.session.flush()
+        db.session.rollback()
+        assert len(nearby_offers('Safflower', origin, radius_km=None)) == 2
+
+        far.status = 'accepted'
+        db.session.commit()
+        assert get_offer_index() is index
+        assert [o['offer_id'] for o in nearby_offers('Safflower', origin, radius_km=None)] == [near.id]
+        assert [o['distance_km'] for o in nearby_offers('Safflower', None)] == [None]
+
+
+def test_market_nearby_shows_distances():
+    with app.app_context():
+        db.session.add(BuyerOffer(buyer_name='Osmanabad Agro', crop_name='Niger Seed', quantity_quintal=3,
+                                  initial_price=8100, district_wanted='Osmanabad'))
+        db.session.commit()
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['farmer_id_verified'] = 'geo-farmer-01'
+    html = client.get('/market/nearby/Niger Seed').get_data(as_text=True)
+    assert 'Osmanabad Agro' in html
+    assert 40 < float(re.search(r'([\d.]+) km away', html).group(1)) < 80      # Latur -> Osmanabad
+
+
+if __name__ == '__main__':
+    import pytest
+    raise SystemExit(pytest.main([__file__, '-q']))
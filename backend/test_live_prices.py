@@ -0,0 +1,143 @@
+"""
+Tests for the concurrent dashboard price fetch (fetch_all_live_prices in
+routes/crop_economics.py): shared deadline, fallbacks and source labels.
+Uses a local stand-in source instead of the data.gov.in API.
+Run: python -m pytest test_live_prices.py -q
+"""
+import threading
+import time
+from datetime import date
+
+from app import app
+from extensions import db
+from models_marketplace import MarketPrice
+from price_service import price_service, set_source
+from routes.bidding import get_base_price
+from routes.crop_economics import OILSEEDS, fetch_all_live_prices
+
+DEADLINE = 0.3
+
+
+class StubPriceSource:
+    """One slow commodity, one failing commodity, the rest answer at once."""
+    timeout = 2
+
+    def __init__(self, slow=(), failing=(), delay=1.0):
+        self.slow = set(slow)
+        self.failing = set(failing)
+        self.delay = delay
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, resource_id, filters, limit):
+        commodity = filters['commodity']
+        with self.lock:
+            self.calls.append(commodity)
+        if commodity in self.slow:
+            time.sleep(self.delay)
+        if commodity in self.failing:
+            raise ConnectionError('upstream down')
+        return [{'commodity': commodity, 'market': 'Latur', 'state': 'Maharashtra',
+                 'modal_price': '5000', 'min_price': '4800', 'max_price': '5200'}]
+
+
+_original_source = price_service.source
+
+
+def use_source(source):
+    """Switch sources once fetches from earlier tests are done, so none land in the fresh cache."""
+    for _ in range(300):
+        if not price_service.stats()['inflight']:
+            break
+        time.sleep(0.01)
+    set_source(source)
+
+
+def setup_module(module):
+    with app.app_context():
+        db.session.add(MarketPrice(commodity_name='Groundnut', market_name='Rajkot', market_state='Gujarat',
+                                   close_price=6900, low_price=6800, high_price=7000,
+                                   price_date=date(2025, 12, 1)))
+        db.session.commit()
+
+
+def teardown_module(module):
+    use_source(_original_source)
+
+
+def test_deadline_is_honoured_with_slow_and_failing_sources():
+    use_source(StubPriceSource(slow={'Mustard/Rape seed'}, failing={'Groundnut'}))
+    with app.app_context():
+        started = time.perf_counter()
+        results = fetch_all_live_prices(deadline=DEADLINE)
+        elapsed = time.perf_counter() - started
+
+    assert elapsed < DEADLINE + 0.5
+    assert set(results) == set(OILSEEDS)
+    assert results['soybean'][1] == 'live'
+    assert results['soybean'][0][0]['price'] == 5000.0
+
+    # Missed the deadline: nothing synced for mustard, so demo data
+    prices, freshness = results['mustard']
+    assert freshness == 'mock' and prices
+
+    # Upstream error: stored mandi prices
+    prices, freshness = results['groundnut']
+    assert freshness == 'database'
+    assert prices[0]['market'] == 'Rajkot' and prices[0]['price'] == 6900
+
+
+def test_late_fetch_fills_the_cache_for_the_next_request():
+    source = StubPriceSource(slow={'Sunflower'}, delay=0.5)
+    use_source(source)
+    with app.app_context():
+        assert fetch_all_live_prices(deadline=DEADLINE)['sunflower'][1] == 'mock'
+        time.sleep(0.6)
+        assert fetch_all_live_prices(deadline=DEADLINE)['sunflower'][1] == 'live'
+    assert source.calls.count('Sunflower') == 1
+
+
+def test_stale_entries_are_labelled():
+    use_source(StubPriceSource())
+    ttl = price_service.ttl
+    try:
+        with app.app_context():
+            fetch_all_live_prices(deadline=DEADLINE)
+            price_service.ttl = 0
+            assert fetch_all_live_prices(deadline=DEADLINE)['soybean'][1] == 'stale'
+    finally:
+        price_service.ttl = ttl
+
+
+def test_price_api_reports_the_actual_source():
+    use_source(StubPriceSource(failing={'Groundnut', 'Mustard/Rape seed'}))
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['farmer_id_verified'] = 'prices-farmer-01'
+    prices = client.get('/crop-economics/api/prices').get_json()
+
+    assert (prices['soybean']['source'], prices['soybean']['trend']) == ('Government API', 'live')
+    assert prices['groundnut']['freshness'] == 'database'
+    assert prices['groundnut']['source'] == 'Stored mandi prices'
+    assert prices['groundnut']['trend'] == 'stored'
+    assert prices['mustard']['freshness'] == 'mock'
+    assert (prices['mustard']['source'], prices['mustard']['trend']) == ('Mock Data (Demo)', 'demo')
+
+
+def test_bidding_base_price_shares_the_dashboard_cache():
+    source = StubPriceSource()
+    use_source(source)
+    with app.app_context():
+        fetch_all_live_prices(deadline=DEADLINE)
+    assert get_base_price('Soybean') == 5000.0
+    assert get_base_price('Mustard') == 5000.0
+
+    # Looked up under the API names the dashboard already fetched
+    assert source.calls.count('Soyabean') == 1
+    assert source.calls.count('Mustard/Rape seed') == 1
+    assert 'Soybean' not in source.calls and 'Mustard' not in source.calls
+
+
+if __name__ == '__main__':
+    import pytest
+    raise SystemExit(pytest.main([__file__, '-q']))
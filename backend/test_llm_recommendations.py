@@ -0,0 +1,194 @@
+"""
+Tests for the background LLM recommendation worker (llm_recommendations.py).
+Uses the inline job queue and a local stand-in for the Gemini model.
+Run: python -m pytest test_llm_recommendations.py -q
+"""
+import json
+from types import SimpleNamespace
+
+from app import app
+from extensions import db
+from models import Farmer, Scheme, FarmerRecommendation
+from scheme_eligibility import invalidate_scheme_index
+import routes.subsidies
+from llm_recommendations import (LLMRecommender, InlineJobQueue, ThreadJobQueue, TokenBucket, ResultCache,
+                                 profile_features, cache_key)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class LocalModel:
+    """Stand-in for Gemini: recommends the first scheme in the prompt."""
+
+    def __init__(self, fail=None):
+        self.prompts = []
+        self.fail = fail
+
+    def __call__(self, prompt):
+        self.prompts.append(prompt)
+        if self.fail:
+            raise RuntimeError(self.fail)
+        schemes = json.loads(prompt.split('AVAILABLE SCHEMES & SUBSIDIES:')[1].split('Based on')[0])
+        return 'Sure! ' + json.dumps({'recommended_schemes': [
+            {'scheme_id': schemes[0]['id'], 'priority': 'high', 'match_percentage': 93, 'reason': 'LLM pick'},
+            {'scheme_id': 'unknown-scheme', 'priority': 'low', 'match_percentage': 10, 'reason': 'x'},
+        ]})
+
+
+def make_recommender(model=None, queue_size=10):
+    bucket = TokenBucket(rate=100, capacity=10)
+    return LLMRecommender(job_queue=InlineJobQueue(maxsize=queue_size), generate=model or LocalModel(),
+                          bucket=bucket)
+
+
+def add_farmer(fid, name='Farmer', land=1.0):
+    farmer = Farmer(id=fid, farmer_id=fid[-12:], name=name, phone_number=fid[-10:], district='Latur',
+                    total_land_area_hectares=land, current_crops='Soybean, Groundnut')
+    db.session.add(farmer)
+    db.session.commit()
+    return farmer
+
+
+def setup_module(module):
+    with app.app_context():
+        db.create_all()
+        FarmerRecommendation.query.delete()
+        Scheme.query.delete()
+        db.session.add(Scheme(scheme_code='pmkisan', name='PM-KISAN Samman Nidhi', description='Income',
+                              scheme_type='subsidy', focus_area='Income', benefit_amount='-',
+                              eligibility_criteria='-'))
+        db.session.commit()
+        invalidate_scheme_index()
+
+
+def test_token_bucket_spaces_calls():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=0.5, capacity=2, clock=clock)
+    assert bucket.try_acquire() == 0 and bucket.try_acquire() == 0
+    assert bucket.try_acquire() == 2.0
+    clock.now += 2
+    assert bucket.try_acquire() == 0
+    bucket.drain()
+    assert bucket.try_acquire() > 0
+
+
+def test_cache_key_ignores_names_and_formatting():
+    a = SimpleNamespace(state='Maharashtra', district='Latur ', total_land_area_hectares=1.1,
+                        land_holder_type='Owner', soil_type='Black', current_crops='Soybean, groundnut',
+                        caste_category='obc', is_oilseed_farmer=True, is_pm_kisan_beneficiary=False,
+                        is_physically_handicapped=False)
+    b = SimpleNamespace(**dict(vars(a), district='latur', current_crops='Groundnut,Soybean',
+                               total_land_area_hectares=0.9))
+    assert cache_key(profile_features(a), 'v1') == cache_key(profile_features(b), 'v1')
+    assert cache_key(profile_features(a), 'v1') != cache_key(profile_features(a), 'v2')
+
+
+def test_identical_profiles_share_one_model_call():
+    model = LocalModel()
+    recommender = make_recommender(model)
+    with app.app_context():
+        farmers = [add_farmer(f'llm-share-{i:03d}', name=f'Farmer {i}') for i in range(3)]
+        assert [recommender.request_upgrade(f) for f in farmers] == ['queued'] * 3
+        assert len(recommender.job_queue.jobs) == 1
+
+        recommender.job_queue.run_pending()
+        assert len(model.prompts) == 1
+        assert 'Farmer 0' not in model.prompts[0]
+        for farmer in farmers:
+            rows = FarmerRecommendation.query.filter_by(farmer_id=farmer.id).all()
+            assert [(r.ai_method, r.reason) for r in rows] == [('gemini', 'LLM pick')]
+
+        # Same features later -> served from the result cache without a job
+        late = add_farmer('llm-share-late', name='Late')
+        assert recommender.request_upgrade(late) == 'cached'
+        assert not recommender.job_queue.jobs
+        assert len(model.prompts) == 1
+
+
+def test_quota_error_drains_bucket_and_keeps_rule_rows():
+    recommender = make_recommender(LocalModel(fail='429 Quota exceeded'))
+    with app.app_context():
+        farmer = add_farmer('llm-quota-0001', land=3.0)
+        recommender.request_upgrade(farmer)
+        recommender.job_queue.run_pending()
+        assert recommender.stats['failures'] == 1
+        assert recommender.bucket.try_acquire() > 0
+        assert not recommender.is_pending(farmer.id)
+        assert FarmerRecommendation.query.filter_by(farmer_id=farmer.id).count() == 0
+
+
+def test_failed_key_is_not_retried_until_ttl():
+    clock = FakeClock()
+    model = LocalModel(fail='503 unavailable')
+    recommender = make_recommender(model)
+    recommender.failures = ResultCache(ttl=60, clock=clock)
+    with app.app_context():
+        farmer = add_farmer('llm-fail-00001', land=7.0)
+        assert recommender.request_upgrade(farmer) == 'queued'
+        assert recommender.job_queue.jobs[0][0](*recommender.job_queue.jobs[0][1]) == 'failed'
+        recommender.job_queue.jobs.clear()
+        assert recommender.upgrade_status(farmer) == 'retry_later'
+
+        # Within the TTL: no new job, no model call
+        assert recommender.request_upgrade(farmer) == 'retry_later'
+        assert not recommender.job_queue.jobs and len(model.prompts) == 1
+
+        clock.now += 61
+        model.fail = None
+        assert recommender.request_upgrade(farmer) == 'queued'
+        recommender.job_queue.run_pending()
+        assert [r.ai_method for r in FarmerRecommendation.query.filter_by(farmer_id=farmer.id)] == ['gemini']
+
+
+def test_full_queue_rejects_new_keys():
+    recommender = make_recommender(queue_size=1)
+    with app.app_context():
+        first = add_farmer('llm-full-00001', land=11.0)
+        second = add_farmer('llm-full-00002', land=13.0)
+        same_as_first = add_farmer('llm-full-00003', land=11.0)
+        assert recommender.request_upgrade(first) == 'queued'
+        assert recommender.request_upgrade(second) == 'retry_later'
+        assert not recommender.is_pending(second.id)
+        # Merging into a job already queued needs no new slot
+        assert recommender.request_upgrade(same_as_first) == 'queued'
+        assert recommender.stats['rejected'] == 1 and len(recommender.job_queue.jobs) == 1
+
+
+def test_thread_queue_is_bounded():
+    job_queue = ThreadJobQueue(maxsize=1)
+    job_queue.thread = SimpleNamespace(is_alive=lambda: True)    # no worker draining the queue
+    with app.app_context():
+        assert job_queue.submit(print, 'one') is True
+        assert job_queue.submit(print, 'two') is False
+
+
+def test_page_returns_rule_based_then_upgrades(monkeypatch):
+    recommender = make_recommender()
+    monkeypatch.setattr(routes.subsidies, 'llm_recommender', recommender)
+    with app.app_context():
+        add_farmer('llm-page-00001', land=5.0)
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['farmer_id_verified'] = 'llm-page-00001'
+
+    data = client.post('/subsidies/api/smart-recommendations').get_json()
+    assert data['method'] == 'rule_based' and data['upgrade'] == 'queued'
+
+    with app.app_context():
+        recommender.job_queue.run_pending()
+
+    data = client.get('/subsidies/api/smart-recommendations').get_json()
+    assert data['method'] == 'gemini' and data['upgrade'] == 'done'
+    assert data['recommended_schemes'][0]['reason'] == 'LLM pick'
+
+
+if __name__ == '__main__':
+    import pytest
+    raise SystemExit(pytest.main([__file__, '-q']))
@@ -0,0 +1,205 @@
+"""
+Tests for the SellRequest / BuyerOffer matching engine (matching_engine.py).
+Runs against a temporary SQLite database.
+Run: python -m pytest test_matching_engine.py -q
+"""
+import random
+from datetime import datetime, timedelta
+
+from app import app
+from extensions import db
+from models import Farmer, Notification
+from models_marketplace import Buyer, BuyerOffer, MatchProposal, SellRequest
+from geo_index import get_centroids, haversine_km
+from matching_engine import ASK, BID, MatchingEngine, Order, reset_matching_engine
+
+T0 = datetime(2025, 11, 1, 8, 0, 0)
+
+
+def order(oid, side, price, quantity, minutes=0, district=None):
+    point = get_centroids().district(district) if district else None
+    return Order(oid, side, 'mustard', price, quantity, T0 + timedelta(minutes=minutes), point)
+
+
+def setup_module(module):
+    with app.app_context():
+        db.create_all()
+        for fid, district, phone in (('match-farmer-01', 'Latur', '8200000001'),
+                                     ('match-farmer-02', 'Nagpur', '8200000002')):
+            if not db.session.get(Farmer, fid):
+                db.session.add(Farmer(id=fid, farmer_id=fid[-12:].upper(), name='Match Farmer',
+                                      phone_number=phone, district=district))
+        if not db.session.get(Buyer, 'match-buyer-01'):
+            db.session.add(Buyer(id='match-buyer-01', email='match-buyer@example.com', password='x',
+                                 buyer_name='Solapur Oil Mill', district='Solapur'))
+        db.session.commit()
+        reset_matching_engine()
+
+
+def test_price_time_priority_and_partial_fills():
+    engine = MatchingEngine()
+    for resting in (order('a1', ASK, 5200, 10, 0), order('a2', ASK, 5000, 4, 5),
+                    order('a3', ASK, 5000, 6, 1), order('a4', ASK, 5600, 50, 0)):
+        engine.add(resting)
+
+    bid = order('b1', BID, 5300, 15)
+    fills = engine.find_matches(bid)
+    assert [(r.id, q, r.price) for r, q, _ in fills] == [('a3', 6, 5000), ('a2', 4, 5000), ('a1', 5, 5200)]
+    engine.apply(bid, fills)
+    assert 'b1' not in engine.book('mustard', BID).orders
+    assert set(engine.book('mustard', ASK).orders) == {'a1', 'a4'}
+    assert engine.book('mustard', ASK).orders['a1'][1].remaining == 5
+
+    # Nothing left that crosses 5300, so the next bid rests
+    bid = order('b2', BID, 5300, 8, 10)
+    fills = engine.find_matches(bid)
+    assert [(r.id, q) for r, q, _ in fills] == [('a1', 5)]
+    engine.apply(bid, fills)
+    assert engine.book('mustard', BID).orders['b2'][1].remaining == 3
+    assert engine.find_matches(order('a5', ASK, 5400, 1)) == []
+
+
+def test_distance_limit():
+    engine = MatchingEngine(max_distance_km=300)
+    engine.add(order('far', ASK, 4800, 10, district='Nagpur'))
+    engine.add(order('near', ASK, 5000, 10, district='Solapur'))
+    engine.add(order('unknown', ASK, 5100, 10))
+    fills = engine.find_matches(order('bid', BID, 5500, 25, district='Latur'))
+    assert [(r.id, q) for r, q, _ in fills] == [('near', 10), ('unknown', 10)]
+    assert 90 < fills[0][2] < 110 and fills[1][2] is None
+
+
+def test_matches_brute_force():
+    rng = random.Random(3)
+    districts = list(get_centroids().by_name)
+    engine = MatchingEngine(max_distance_km=250)
+    book = []
+    for i in range(2000):
+        resting = order(f'a{i}', ASK, rng.randint(40, 60) * 100, rng.randint(1, 20), rng.randint(0, 10000),
+                        rng.choice(districts + [None]))
+        engine.add(resting)
+        book.append(resting)
+
+    for i in range(30):
+        bid = order(f'b{i}', BID, rng.randint(40, 60) * 100, rng.randint(1, 80), 20000 + i, rng.choice(districts))
+        eligible = sorted((a for a in book if a.remaining >= 0.01 and a.price <= bid.price
+                           and (a.point is None or haversine_km(*a.point, *bid.point) <= 250)),
+                          key=lambda a: a.priority)
+        expected, left = [], bid.remaining
+        for a in eligible:
+            if left < 0.01:
+                break
+            expected.append((a.id, min(left, a.remaining)))
+            left -= min(left, a.remaining)
+        fills = engine.find_matches(bid)
+        assert [(r.id, q) for r, q, _ in fills] == expected
+        engine.apply(bid, fills)
+        engine.remove(bid)          # keep the ask book only
+
+
+def buyer_client():
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['buyer_id_verified'] = 'match-buyer-01'
+        sess['buyer_name'] = 'Solapur Oil Mill'
+    return client
+
+
+def test_new_buyer_offer_proposes_against_open_sell_requests():
+    with app.app_context():
+        cheap = SellRequest(farmer_id='match-farmer-01', crop_name='Linseed', quantity_quintal=6,
+                            expected_price=6100, location='Ausa, Latur', created_at=T0)
+        dear = SellRequest(farmer_id='match-farmer-01', crop_name='Linseed', quantity_quintal=10,
+                           expected_price=6300, created_at=T0)
+        far = SellRequest(farmer_id='match-farmer-02', crop_name='Linseed', quantity_quintal=10,
+                          expected_price=5900, created_at=T0)
+        taken = SellRequest(farmer_id='match-farmer-01', crop_name='Linseed', quantity_quintal=10,
+                            expected_price=6000, created_at=T0)
+        db.session.add_all([cheap, dear, far, taken])
+        db.session.commit()
+        ids = cheap.id, dear.id, taken.id
+        reset_matching_engine()
+
+        # Accepted elsewhere after the books were loaded: re-checked and skipped
+        from matching_engine import get_matching_engine
+        get_matching_engine()
+        taken.status = 'accepted'
+        db.session.commit()
+
+    response = buyer_client().post('/buyer/api/create-offer', json={
+        'crop_name': 'Linseed', 'quantity_quintal': 12, 'initial_price': 6400, 'district_wanted': 'Latur'})
+    assert response.status_code == 201
+    matches = response.get_json()['matches']
+    assert [(m['sell_request_id'], m['quantity_quintal'], m['price']) for m in matches] == \
+        [(ids[0], 6, 6100), (ids[1], 6, 6300)]
+    assert matches[0]['distance_km'] == 0 and matches[0]['bid_price'] == 6400
+
+    with app.app_context():
+        assert MatchProposal.query.filter_by(buyer_offer_id=response.get_json()['offer']['id']).count() == 2
+        notes = Notification.query.filter_by(farmer_id='match-farmer-01', notification_type='market_match').all()
+        assert len(notes) == 2 and {n.related_id for n in notes} == set(ids[:2])
+
+    # The rest of the dear ask fills against the next bid
+    response = buyer_client().post('/buyer/api/create-offer', json={
+        'crop_name': 'Linseed', 'quantity_quintal': 20, 'initial_price': 6300, 'district_wanted': 'Latur'})
+    assert [(m['sell_request_id'], m['quantity_quintal']) for m in response.get_json()['matches']] == [(ids[1], 4)]
+
+
+def test_new_sell_request_fills_resting_bids_after_reload():
+    with app.app_context():
+        db.session.add(BuyerOffer(buyer_id='match-buyer-01', crop_name='Castor', quantity_quintal=8,
+                                  initial_price=6700, district_wanted='Osmanabad', status='pending'))
+        db.session.commit()
+        reset_matching_engine()
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['farmer_id_verified'] = 'match-farmer-01'
+    response = client.post('/market/sell/create', data={
+        'crop': 'Castor', 'quantity': '20', 'expected_price': '6500', 'harvest_date': '2026-01-15'})
+    assert response.status_code == 201
+    matches = response.get_json()['matches']
+    assert [(m['quantity_quintal'], m['price'], m['ask_price']) for m in matches] == [(8, 6700, 6500)]
+    assert 40 < matches[0]['distance_km'] < 80
+
+    # 12 quintal still rest in the book for the next bid
+    response = buyer_client().post('/buyer/api/create-offer', json={
+        'crop_name': 'castor', 'quantity_quintal': 30, 'initial_price': 6600})
+    assert [m['quantity_quintal'] for m in response.get_json()['matches']] == [12]
+
+
+def test_quantity_proposed_by_another_process_is_not_reallocated():
+    with app.app_context():
+        ask = SellRequest(farmer_id='match-farmer-01', crop_name='Niger', quantity_quintal=10,
+                          expected_price=7000, created_at=T0)
+        db.session.add(ask)
+        db.session.commit()
+        ask_id = ask.id
+        reset_matching_engine()
+        from matching_engine import get_matching_engine
+        get_matching_engine()
+
+        # Another worker proposed 7 quintal of it; this process's book still shows 10
+        other = BuyerOffer(buyer_id='match-buyer-01', crop_name='Niger', quantity_quintal=7,
+                           initial_price=7100, status='pending')
+        db.session.add(other)
+        db.session.flush()
+        db.session.add(MatchProposal(sell_request_id=ask_id, buyer_offer_id=other.id, crop_key='niger',
+                                     quantity_quintal=7, price=7000, ask_price=7000, bid_price=7100,
+                                     status='proposed'))
+        db.session.commit()
+
+    response = buyer_client().post('/buyer/api/create-offer', json={
+        'crop_name': 'Niger', 'quantity_quintal': 10, 'initial_price': 7200})
+    assert [(m['sell_request_id'], m['quantity_quintal']) for m in response.get_json()['matches']] == \
+        [(ask_id, 3)]
+
+    # Fully allocated now, so it leaves the book
+    response = buyer_client().post('/buyer/api/create-offer', json={
+        'crop_name': 'Niger', 'quantity_quintal': 5, 'initial_price': 7200})
+    assert response.get_json()['matches'] == []
+
+
+if __name__ == '__main__':
+    import pytest
+    raise SystemExit(pytest.main([__file__, '-q']))
@@ -0,0 +1,178 @@
+"""
+Tests for segment fan-out and unread counters (notification_service.py).
+Runs against a temporary SQLite database.
+Run: python -m pytest test_notification_service.py -q
+"""
+
+from sqlalchemy import event
+
+from app import app
+from extensions import db
+from models import Farmer, Notification, NotificationCounter
+import notification_service
+
+DISTRICTS = ['Osmanabad', 'Wardha', 'Gadchiroli']
+
+
+def setup_module(module):
+    with app.app_context():
+        db.create_all()
+        for i in range(60):
+            db.session.add(Farmer(
+                id=f'notif-farmer-{i:03d}', farmer_id=f'N{i:011d}', name=f'Farmer {i}',
+                phone_number=f'7{i:09d}', district=DISTRICTS[i % 3],
+                state='Maharashtra' if i < 45 else 'Karnataka',
+                current_crops='Safflower, Gram' if i % 2 else 'Niger'
+            ))
+        db.session.commit()
+
+
+def setup_function(function):
+    with app.app_context():
+        Notification.query.delete()
+        NotificationCounter.query.delete()
+        db.session.commit()
+
+
+def unread_by_count(farmer_id):
+    return Notification.query.filter_by(farmer_id=farmer_id, is_read=False).count()
+
+
+def test_fan_out_targets_segment_in_chunks():
+    with app.app_context():
+        sent = notification_service.fan_out('Rain alert', 'Heavy rain expected', 'general_alert',
+                                             state='maharashtra', district='Osmanabad', chunk_size=4,
+                                             icon='cloud')
+        assert sent == 15
+        rows = Notification.query.all()
+        assert len(rows) == 15 and len({r.id for r in rows}) == 15
+        assert all(len(r.id) == 36 and r.icon == 'cloud' for r in rows)
+        assert {r.farmer_id for r in rows} == {f'notif-farmer-{i:03d}' for i in range(0, 45, 3)}
+
+        sent = notification_service.fan_out('Safflower MSP', 'New MSP announced', 'price_alert', crop='safflower')
+        assert sent == 30
+
+
+def test_counters_match_counts_after_mixed_operations():
+    with app.app_context():
+        farmer_id = 'notif-farmer-001'
+        first = notification_service.notify_farmer(farmer_id, 'Hello', 'Welcome', icon='bell')
+        notification_service.fan_out('Everyone', 'Broadcast', chunk_size=7)
+        notification_service.fan_out('Wardha', 'District news', district='Wardha', chunk_size=7)
+        assert notification_service.unread_count(farmer_id) == unread_by_count(farmer_id) == 3
+
+        notification_service.mark_read(farmer_id, first.id)
+        notification_service.mark_read(farmer_id, first.id)      # already read: no double decrement
+        assert notification_service.unread_count(farmer_id) == unread_by_count(farmer_id) == 2
+
+        other = Notification.query.filter_by(farmer_id=farmer_id, is_read=False).first()
+        notification_service.delete_notification(other)
+        assert notification_service.unread_count(farmer_id) == unread_by_count(farmer_id) == 1
+
+        notification_service.mark_all_read(farmer_id)
+        assert notification_service.unread_count(farmer_id) == 0
+
+        # Every farmer's counter agrees with a real count
+        for farmer in Farmer.query.all():
+            assert notification_service.unread_count(farmer.id) == unread_by_count(farmer.id)
+
+
+def test_missing_counter_starts_from_existing_unread():
+    with app.app_context():
+        db.session.add(Notification(farmer_id='notif-farmer-005', title='Old', description='Pre-counter',
+                                    notification_type='general_alert'))
+        db.session.commit()
+        notification_service.fan_out('New', 'After counters', district='Gadchiroli')
+        assert notification_service.unread_count('notif-farmer-005') == 2
+
+
+def test_unread_count_endpoint_is_primary_key_read():
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['farmer_id_verified'] = 'notif-farmer-002'
+    with app.app_context():
+        notification_service.notify_farmer('notif-farmer-002', 'Hi', 'There')
+        engine = db.engine
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        data = client.get('/notifications/api/unread-count').get_json()
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    assert data == {'unread_count': 1}
+    assert len(statements) == 1 and 'notification_counters' in statements[0]
+    assert 'count(' not in statements[0].lower()
+
+
+def test_send_endpoint_accepts_segments(monkeypatch):
+    monkeypatch.setenv('ADMIN_API_KEY', 'test-admin-key')
+    client = app.test_client()
+    admin = {'X-Admin-Key': 'test-admin-key'}
+    response = client.post('/notifications/api/send', headers=admin, json={
+        'title': 'Karnataka update', 'description': 'State scheme', 'state': 'Karnataka'
+    })
+    assert response.status_code == 201
+    assert response.get_json()['recipients'] == 15
+
+    response = client.post('/notifications/api/send', headers=admin, json={'title': 'x', 'description': 'y'})
+    assert response.status_code == 400
+
+
+def test_send_endpoint_requires_admin_key(monkeypatch):
+    client = app.test_client()
+    body = {'title': 'Everyone', 'description': 'Spam', 'broadcast': True}
+    with client.session_transaction() as sess:
+        sess['farmer_id_verified'] = 'notif-farmer-000'    # a farmer session is not enough
+
+    monkeypatch.delenv('ADMIN_API_KEY', raising=False)
+    assert client.post('/notifications/api/send', json=body).status_code == 500
+
+    monkeypatch.setenv('ADMIN_API_KEY', 'test-admin-key')
+    assert client.post('/notifications/api/send', json=body).status_code == 403
+    response = client.post('/notifications/api/send', json=body, headers={'X-Admin-Key': 'wrong'})
+    assert response.status_code == 403
+    with app.app_context():
+        assert Notification.query.filter_by(title='Everyone').count() == 0
+
+
+def racing_get(monkeypatch, farmer_id, unread_count):
+    """
+    Another request commits farmer_id's counter, but our next lookup still
+    misses it: the interleaving where both requests try to create the row.
+    """
+    with db.engine.begin() as conn:
+        conn.execute(NotificationCounter.__table__.insert().values(farmer_id=farmer_id, unread_count=unread_count))
+    real_get = db.session.get
+
+    def get(model, ident, *args, **kwargs):
+        if model is NotificationCounter:
+            monkeypatch.setattr(db.session, 'get', real_get)
+            return None
+        return real_get(model, ident, *args, **kwargs)
+
+    monkeypatch.setattr(db.session, 'get', get)
+
+
+def test_counter_created_concurrently_is_not_an_error(monkeypatch):
+    with app.app_context():
+        racing_get(monkeypatch, 'notif-farmer-001', unread_count=0)
+        notification_service.notify_farmer('notif-farmer-001', 'Hello', 'First')
+        assert notification_service.unread_count('notif-farmer-001') == 1
+
+        racing_get(monkeypatch, 'notif-farmer-002', unread_count=4)
+        assert notification_service.unread_count('notif-farmer-002') == 4
+
+        racing_get(monkeypatch, 'notif-farmer-003', unread_count=4)
+        notification_service.clear_all('notif-farmer-003')
+        assert notification_service.unread_count('notif-farmer-003') == 0
+
+
+if __name__ == '__main__':
+    import pytest
+    raise SystemExit(pytest.main([__file__, '-q']))
@@ -0,0 +1,116 @@
+"""
+Tests for the cached redemption offer catalogue (offer_catalogue.py).
+Runs against a temporary SQLite database.
+Run: python -m pytest test_offer_catalogue.py -q
+"""
+
+import pytest
+from sqlalchemy import event
+
+from app import app
+from extensions import db
+from models import Farmer, RedemptionOffer, FarmerRedemption
+import coin_ledger
+from offer_catalogue import OfferCatalogue, get_offer_catalogue, invalidate_offer_catalogue
+
+
+def offer(oid, cost, category='Services', stock=None, redeemed=0):
+    return {'id': oid, 'coin_cost': cost, 'category': category, 'stock_limit': stock,
+            'stock_redeemed': redeemed, 'available_stock': stock - redeemed if stock is not None else None}
+
+
+def setup_module(module):
+    with app.app_context():
+        db.create_all()
+        FarmerRedemption.query.delete()
+        RedemptionOffer.query.delete()
+        invalidate_offer_catalogue()
+        db.session.add(Farmer(id='offer-farmer-01', farmer_id='OFFERFARM01', name='Offer Farmer',
+                              phone_number='8000000001', district='Latur'))
+        db.session.commit()
+        coin_ledger.credit_coins('offer-farmer-01', 260, 'Signup bonus')
+
+
+def test_best_affordable_is_bisect_over_cost():
+    catalogue = OfferCatalogue([offer('a', 300), offer('b', 100, 'VIP'), offer('c', 250),
+                                offer('d', 200, stock=2, redeemed=2)], version=1)
+    assert catalogue.best_affordable(260)['id'] == 'c'
+    assert catalogue.best_affordable(240)['id'] == 'b'    # 'd' is sold out
+    assert catalogue.best_affordable(50) is None
+    assert catalogue.cheapest()['id'] == 'b'
+    assert [o['id'] for o in catalogue.offers('Services')] == ['a', 'c', 'd']
+    assert catalogue.offers('all') is catalogue.all
+
+
+def test_store_makes_no_catalogue_queries_in_steady_state():
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['farmer_id_verified'] = 'offer-farmer-01'
+
+    client.get('/redemption/store')          # seeds offers on first visit
+    client.get('/redemption/api/offers')     # warms the catalogue
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        client.get('/redemption/store')
+        data = client.get('/redemption/api/offers?category=VIP').get_json()
+        best = client.get('/redemption/api/best-offer').get_json()
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    assert not [s for s in statements if 'redemption_offers' in s]
+    assert data['offers'] and all(o['category'] == 'VIP' for o in data['offers'])
+    assert best['can_redeem'] and best['offer']['coin_cost'] == 250
+
+
+def test_offer_edit_invalidates_catalogue():
+    with app.app_context():
+        before = get_offer_catalogue()
+        row = RedemptionOffer.query.filter_by(coin_cost=800).first()
+        row.coin_cost = 750
+        db.session.commit()
+        after = get_offer_catalogue()
+    assert after.version > before.version
+    assert 750 in after.costs and 800 not in after.costs
+
+
+def test_redemption_updates_cached_stock():
+    with app.app_context():
+        row = RedemptionOffer(title='Limited', description='-', category='VIP', coin_cost=10,
+                              stock_limit=3, stock_redeemed=0, validity_days=30)
+        db.session.add(row)
+        db.session.commit()
+        offer_id = row.id
+        invalidate_offer_catalogue()
+        catalogue = get_offer_catalogue()
+
+        coin_ledger.redeem('offer-farmer-01', offer_id)
+        assert get_offer_catalogue() is catalogue
+        assert catalogue.by_id[offer_id]['available_stock'] == 2
+
+
+def test_zero_stock_limit_is_sold_out_everywhere():
+    with app.app_context():
+        row = RedemptionOffer(title='None left', description='-', category='VIP', coin_cost=5,
+                              stock_limit=0, stock_redeemed=0, validity_days=30)
+        db.session.add(row)
+        db.session.commit()
+        offer_id = row.id
+        assert row.to_dict()['available_stock'] == 0
+
+        catalogue = get_offer_catalogue()
+        assert catalogue.by_id[offer_id]['available_stock'] == 0
+        assert catalogue.best_affordable(5) is None or catalogue.best_affordable(5)['id'] != offer_id
+        with pytest.raises(coin_ledger.RedemptionError, match='Out of stock'):
+            coin_ledger.redeem('offer-farmer-01', offer_id)
+
+
+if __name__ == '__main__':
+    raise SystemExit(pytest.main([__file__, '-q']))
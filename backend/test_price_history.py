@@ -0,0 +1,85 @@
+"""
+Tests for the OHLC price history engine (price_history.py).
+Run: python -m pytest test_price_history.py -q
+"""
+from datetime import date
+
+import price_history
+from price_history import resample_ohlc, period_start
+
+
+def row(day, close, high=None, low=None, volume=None, open_=None):
+    return (day, open_, high, low, close, volume)
+
+
+def test_period_start():
+    assert period_start(date(2025, 11, 13), 'week') == date(2025, 11, 10)
+    assert period_start(date(2025, 11, 13), 'month') == date(2025, 11, 1)
+
+
+def test_monthly_ohlc_across_markets():
+    rows = [
+        row(date(2025, 10, 3), 5000, 5100, 4900, 10),
+        row(date(2025, 10, 3), 5200, 5300, 5100, 5),     # second market same day
+        row(date(2025, 10, 20), 5400, 5600, 5300, 8),
+        row(date(2025, 11, 2), 5500, 5550, 5450),
+        row(date(2025, 11, 28), 5300, 5350, 5200, 2),
+    ]
+    october, november = resample_ohlc(rows, 'month')
+
+    assert october['date'] == '2025-10-01'
+    assert october['open'] == 5100       # mean of both markets on 3 Oct
+    assert october['close'] == 5400
+    assert october['high'] == 5600
+    assert october['low'] == 4900
+    assert october['price'] == 5250      # mean of daily means
+    assert october['volume'] == 23
+    assert october['count'] == 3
+
+    assert november['open'] == 5500
+    assert november['close'] == 5300
+    assert november['low'] == 5200
+
+
+def test_weekly_buckets_and_missing_prices():
+    rows = [
+        row(date(2025, 11, 10), None, open_=4800),       # close missing -> open used
+        row(date(2025, 11, 12), 5000),
+        row(date(2025, 11, 17), None),                   # no usable price -> dropped
+        row(date(2025, 11, 18), 5100),
+    ]
+    weeks = resample_ohlc(rows, 'week')
+    assert [w['date'] for w in weeks] == ['2025-11-10', '2025-11-17']
+    assert weeks[0]['open'] == 4800 and weeks[0]['close'] == 5000
+    assert weeks[0]['high'] == 5000 and weeks[0]['low'] == 4800
+    assert weeks[1]['price'] == 5100
+
+
+def test_empty():
+    assert resample_ohlc([], 'month') == []
+
+
+def test_series_cache_is_bounded():
+    load_rows, max_entries = price_history._load_rows, price_history.HISTORY_CACHE_MAX_ENTRIES
+    loads = []
+    price_history._load_rows = lambda names, state, since: loads.append(state) or []
+    price_history.HISTORY_CACHE_MAX_ENTRIES = 3
+    try:
+        price_history.invalidate_price_history()
+        for state in ['A', 'B', 'C', 'A', 'D', 'E']:
+            price_history.get_price_series({'Mustard'}, state=state)
+        # 'A' was used again before 'D' arrived, so 'B' and 'C' were evicted
+        assert len(price_history._series_cache) == 3
+        assert [key[1] for key in price_history._series_cache] == ['A', 'D', 'E']
+        assert loads == ['A', 'B', 'C', 'D', 'E']
+    finally:
+        price_history._load_rows = load_rows
+        price_history.HISTORY_CACHE_MAX_ENTRIES = max_entries
+        price_history.invalidate_price_history()
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'✅ {name}')
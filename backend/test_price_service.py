@@ -0,0 +1,148 @@
+"""
+Tests for the shared mandi price fetcher (price_service.py).
+Uses a local stand-in source instead of the data.gov.in API.
+Run: python -m pytest test_price_service.py -q
+"""
+import threading
+import time
+
+from price_service import PriceService, PriceSourceError, DAILY_PRICES_RESOURCE
+
+
+class LocalPriceSource:
+    """Stand-in for MandiHttpSource that records every call."""
+    timeout = 2
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, resource_id, filters, limit):
+        with self.lock:
+            self.calls.append((resource_id, filters, limit))
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError('upstream down')
+        return [{'commodity': filters.get('commodity'), 'modal_price': str(5000 + len(self.calls))}]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_service(source, clock=None):
+    return PriceService(source=source, ttl=60, stale_ttl=600, error_ttl=30, clock=clock or FakeClock())
+
+
+def test_ttl_cache_hits_source_once():
+    source = LocalPriceSource()
+    service = make_service(source)
+    for _ in range(5):
+        records = service.get_records(DAILY_PRICES_RESOURCE, {'commodity': 'Mustard'})
+    assert records[0]['modal_price'] == '5001'
+    assert len(source.calls) == 1
+
+
+def test_single_flight_for_concurrent_misses():
+    source = LocalPriceSource(delay=0.2)
+    service = make_service(source, clock=time.time)
+    results = []
+
+    def worker():
+        results.append(service.get_records(DAILY_PRICES_RESOURCE, {'commodity': 'Groundnut'}))
+
+    threads = [threading.Thread(target=worker) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(source.calls) == 1
+    assert len(results) == 10
+
+
+def test_stale_while_revalidate():
+    clock = FakeClock()
+    source = LocalPriceSource()
+    service = make_service(source, clock)
+    service.get_records(DAILY_PRICES_RESOURCE, {'commodity': 'Soyabean'})
+
+    clock.now += 120   # past ttl, within stale window
+    entry = service.lookup(DAILY_PRICES_RESOURCE, {'commodity': 'Soyabean'})
+    assert entry.stale
+    assert entry.records[0]['modal_price'] == '5001'
+
+    # background refresh replaces the entry
+    for _ in range(50):
+        if len(source.calls) == 2 and not service.stats()['inflight']:
+            break
+        time.sleep(0.01)
+    entry = service.lookup(DAILY_PRICES_RESOURCE, {'commodity': 'Soyabean'})
+    assert not entry.stale
+    assert entry.records[0]['modal_price'] == '5002'
+
+
+def test_failures_are_cached_briefly():
+    clock = FakeClock()
+    source = LocalPriceSource(fail=True)
+    service = make_service(source, clock)
+
+    for _ in range(3):
+        try:
+            service.get_records(DAILY_PRICES_RESOURCE, {'commodity': 'Sesame'})
+            assert False, 'expected PriceSourceError'
+        except PriceSourceError:
+            pass
+    assert len(source.calls) == 1
+
+    clock.now += 31
+    source.fail = False
+    assert service.get_records(DAILY_PRICES_RESOURCE, {'commodity': 'Sesame'})
+    assert len(source.calls) == 2
+
+
+def wait_for_refresh(service):
+    for _ in range(50):
+        if not service.stats()['inflight']:
+            return
+        time.sleep(0.01)
+
+
+def test_stale_refresh_backs_off_after_failure():
+    clock = FakeClock()
+    source = LocalPriceSource()
+    service = make_service(source, clock)
+    service.get_records(DAILY_PRICES_RESOURCE, {'commodity': 'Niger'})
+
+    source.fail = True
+    clock.now += 120   # stale: first request starts one refresh, which fails
+    assert service.lookup(DAILY_PRICES_RESOURCE, {'commodity': 'Niger'}).stale
+    wait_for_refresh(service)
+    assert len(source.calls) == 2
+
+    for _ in range(5):
+        entry = service.lookup(DAILY_PRICES_RESOURCE, {'commodity': 'Niger'})
+        assert entry.stale and entry.error == 'upstream down'
+    wait_for_refresh(service)
+    assert len(source.calls) == 2
+
+    clock.now += 31    # error TTL over: the next stale read tries again
+    source.fail = False
+    service.lookup(DAILY_PRICES_RESOURCE, {'commodity': 'Niger'})
+    wait_for_refresh(service)
+    assert len(source.calls) == 3
+    assert not service.lookup(DAILY_PRICES_RESOURCE, {'commodity': 'Niger'}).stale
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'✅ {name}')
@@ -0,0 +1,154 @@
+"""
+Tests for maintained marketplace price summaries (price_summary.py).
+Run: python -m pytest test_price_summary.py -q
+"""
+import json
+import threading
+
+from sqlalchemy import event
+
+from app import app
+from extensions import db
+from models import Farmer
+from models_marketplace import SellRequest, BuyerOffer, PriceSummary
+from price_summary import get_price_summary, rebuild_price_summaries
+from routes.profit_simulator import get_market_price
+
+
+def setup_module(module):
+    with app.app_context():
+        db.create_all()
+        for i, district in enumerate(('Bharatpur', 'Alwar')):
+            farmer_id = f'summary-farmer-0{i}'
+            if not db.session.get(Farmer, farmer_id):
+                db.session.add(Farmer(id=farmer_id, farmer_id=f'SUMFARM000{i}', name='Daam',
+                                      phone_number=f'580000000{i}', district=district))
+        db.session.commit()
+
+
+def sell(crop, price, farmer='summary-farmer-00'):
+    request = SellRequest(farmer_id=farmer, crop_name=crop, quantity_quintal=10, expected_price=price)
+    db.session.add(request)
+    db.session.commit()
+    return request
+
+
+def offer(crop, price, district='Bharatpur', status='pending'):
+    buyer_offer = BuyerOffer(crop_name=crop, quantity_quintal=20, initial_price=price,
+                             district_wanted=district, status=status, buyer_name='Vyapari')
+    db.session.add(buyer_offer)
+    db.session.commit()
+    return buyer_offer
+
+
+def test_inserts_update_crop_and_district_rows():
+    with app.app_context():
+        sell('Kalonji', 5000)
+        sell('kalonji ', 5600)
+        sell('Kalonji', 6200, farmer='summary-farmer-01')
+
+        overall = get_price_summary('sell', 'Kalonji')
+        assert overall['count'] == 3 and overall['average'] == 5600
+        assert (overall['min'], overall['max'], overall['recent_median']) == (5000, 6200, 5600)
+
+        district = get_price_summary('sell', 'Kalonji', 'Alwar')
+        assert district['count'] == 1 and district['average'] == 6200
+        # Districts without listings fall back to the all-district row
+        assert get_price_summary('sell', 'Kalonji', 'Jaipur')['count'] == 3
+        assert get_market_price('Kalonji', 'Bharatpur') == 5300
+
+
+def test_concurrent_first_listings_are_all_counted():
+    start = threading.Barrier(8)
+    errors = []
+
+    def worker(i):
+        with app.app_context():
+            start.wait()
+            try:
+                sell('Quinoa', 1000 + i * 100, farmer=f'summary-farmer-0{i % 2}')
+            except Exception as e:
+                errors.append(e)
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with app.app_context():
+        overall = get_price_summary('sell', 'Quinoa')
+        assert (overall['count'], overall['min'], overall['max']) == (8, 1000, 1700)
+        assert overall['average'] == 1350
+        assert get_price_summary('sell', 'Quinoa', 'Alwar')['count'] == 4
+        row = PriceSummary.query.filter_by(source='sell', crop_key='quinoa', district='').one()
+        assert len(json.loads(row.recent_prices)) == 8
+
+
+def test_updates_and_deletes_reaggregate():
+    with app.app_context():
+        first = offer('Chia', 7000)
+        second = offer('Chia', 8000)
+        offer('Chia', 9000, status='declined')
+        assert get_price_summary('offer', 'Chia')['count'] == 2
+
+        second.initial_price = 7600
+        db.session.commit()
+        summary = get_price_summary('offer', 'Chia', 'Bharatpur')
+        assert (summary['count'], summary['max'], summary['average']) == (2, 7600, 7300)
+
+        first.status = 'accepted'             # no longer an open offer
+        db.session.commit()
+        assert get_price_summary('offer', 'Chia')['min'] == 7600
+
+        db.session.delete(second)
+        db.session.commit()
+        assert get_price_summary('offer', 'Chia') is None
+        assert PriceSummary.query.filter_by(crop_key='chia').count() == 0
+
+
+def test_unrelated_updates_do_no_summary_work():
+    with app.app_context():
+        request = sell('Jojoba', 4000)
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            request.buyer_price = 4200
+            db.session.commit()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        assert not [s for s in statements if 'price_summaries' in s]
+
+
+def test_rebuild_matches_incremental():
+    with app.app_context():
+        before = {(r.source, r.crop_key, r.district): (r.count, r.total, r.min_price, r.max_price, r.recent_median)
+                  for r in PriceSummary.query}
+        rebuild_price_summaries()
+        after = {(r.source, r.crop_key, r.district): (r.count, r.total, r.min_price, r.max_price, r.recent_median)
+                 for r in PriceSummary.query}
+        assert after == before
+
+
+def test_market_nearby_reads_the_summary():
+    with app.app_context():
+        offer('Quinoa', 9000)
+        offer('Quinoa', 9500, district='Alwar')
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['farmer_id_verified'] = 'summary-farmer-00'
+    response = client.get('/market/nearby/Quinoa')
+    assert response.status_code == 200
+    assert '9250' in response.get_data(as_text=True)
+
+
+if __name__ == '__main__':
+    import pytest
+    raise SystemExit(pytest.main([__file__, '-q']))
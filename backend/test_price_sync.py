@@ -0,0 +1,154 @@
+"""
+Tests for the background mandi price ingester (price_sync.py).
+Runs against a temporary SQLite database with a local paged source.
+Run: python -m pytest test_price_sync.py -q
+"""
+from datetime import date
+
+from app import app
+from extensions import db
+from models_marketplace import MarketPrice
+import price_service
+import price_sync
+from routes.crop_economics import OILSEEDS
+
+
+class PagedSource:
+    """Serves a fixed list of records per commodity, PAGE_SIZE at a time."""
+    timeout = 2
+
+    def __init__(self, records_by_commodity):
+        self.records = records_by_commodity
+        self.offsets = []
+
+    def __call__(self, resource_id, filters, limit, offset=0):
+        self.offsets.append((filters['commodity_name'], offset))
+        records = self.records.get(filters['commodity_name'], [])
+        return records[offset:offset + limit]
+
+
+def make_records(commodity, days, markets=3, price=5000):
+    return [
+        {
+            'commodity_name': commodity,
+            'market': f'Mandi {m}',
+            'state': 'Maharashtra',
+            'district': 'Latur',
+            'arrival_date': f'{d:02d}/11/2025',
+            'min_price': str(price - 100),
+            'max_price': str(price + 100),
+            'modal_price': str(price),
+        }
+        for d in days for m in range(markets)
+    ]
+
+
+def setup_module(module):
+    with app.app_context():
+        db.create_all()
+
+
+def setup_function(function):
+    price_sync.watermarks.clear()
+    with app.app_context():
+        MarketPrice.query.delete()
+        db.session.commit()
+
+
+def test_bulk_upsert_inserts_then_updates():
+    source = PagedSource({'Soyabean': make_records('Soyabean', [1, 2])})
+    price_service.set_source(source)
+    with app.app_context():
+        stats = price_sync.sync_all_prices()
+        assert stats['commodities']['Soybean']['upserted'] == 6
+        assert MarketPrice.query.count() == 6
+
+        # Same keys, new price -> updated in place, no duplicates
+        source.records['Soyabean'] = make_records('Soyabean', [2], price=5200)
+        price_sync.sync_all_prices()
+        assert MarketPrice.query.count() == 6
+        row = MarketPrice.query.filter_by(market_name='Mandi 0', price_date=date(2025, 11, 2)).one()
+        assert row.close_price == 5200
+        assert row.high_price == 5300
+
+
+def test_watermark_skips_old_arrivals():
+    source = PagedSource({'Groundnut': make_records('Groundnut', [10, 11])})
+    price_service.set_source(source)
+    with app.app_context():
+        price_sync.sync_all_prices()
+        assert price_sync.watermarks['Groundnut'] == date(2025, 11, 11)
+
+        source.records['Groundnut'] = make_records('Groundnut', [9, 10, 11, 12])
+        stats = price_sync.sync_all_prices()
+        # day 11 (watermark day) + day 12 only
+        assert stats['commodities']['Groundnut']['fetched'] == 6
+        assert MarketPrice.query.filter_by(price_date=date(2025, 11, 9)).count() == 0
+
+
+def test_pages_fetched_until_short_page(monkeypatch):
+    monkeypatch.setattr(price_sync, 'PAGE_SIZE', 4)
+    monkeypatch.setattr(price_sync, 'PAGES_PER_ROUND', 2)
+    source = PagedSource({'Sunflower': make_records('Sunflower', range(1, 6), markets=2)})
+    price_service.set_source(source)
+    with app.app_context():
+        stats = price_sync.sync_all_prices()
+    offsets = sorted(o for c, o in source.offsets if c == 'Sunflower')
+    assert offsets == [0, 4, 8, 12]
+    assert stats['commodities']['Sunflower']['upserted'] == 10
+    assert 'fetch_ms' in stats['commodities']['Sunflower']
+
+
+def test_new_records_after_old_pages_are_kept(monkeypatch):
+    monkeypatch.setattr(price_sync, 'PAGE_SIZE', 4)
+    monkeypatch.setattr(price_sync, 'PAGES_PER_ROUND', 2)
+    source = PagedSource({'Sesame': make_records('Sesame', [20], markets=2)})
+    price_service.set_source(source)
+    with app.app_context():
+        price_sync.sync_all_prices()
+        assert price_sync.watermarks['Sesame'] == date(2025, 11, 20)
+
+        # Oldest first: two full rounds of old arrivals before the new ones
+        source.records['Sesame'] = make_records('Sesame', range(1, 9), markets=2) + \
+            make_records('Sesame', [21, 22], markets=2)
+        stats = price_sync.sync_all_prices()
+        assert stats['commodities']['Sesame']['fetched'] == 4
+        assert MarketPrice.query.filter_by(price_date=date(2025, 11, 22)).count() == 2
+
+
+def test_records_without_a_date_are_skipped():
+    records = make_records('Castor', [5], markets=2)
+    records[0]['arrival_date'] = ''
+    records[1]['arrival_date'] = 'not a date'
+    source = PagedSource({'Castor': records + make_records('Castor', [6], markets=1)})
+    price_service.set_source(source)
+    with app.app_context():
+        stats = price_sync.sync_all_prices()
+        assert stats['commodities']['Castor']['upserted'] == 1
+        assert MarketPrice.query.filter_by(commodity_name='Castor').one().price_date == date(2025, 11, 6)
+        assert price_sync.watermarks['Castor'] == date(2025, 11, 6)
+
+
+def test_every_dashboard_crop_is_synced_and_found_by_history():
+    source = PagedSource({api_name: make_records(api_name, [3])
+                          for api_name in price_service.OILSEED_COMMODITIES.values()})
+    price_service.set_source(source)
+    with app.app_context():
+        stats = price_sync.sync_all_prices()
+        assert stats['commodities']['Sesame']['upserted'] == 3
+        assert stats['commodities']['Coconut']['upserted'] == 3
+
+        # Stored under the API name, read back through the dashboard crop name
+        assert MarketPrice.query.filter_by(commodity_name='Mustard/Rape seed').count() == 3
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['farmer_id_verified'] = 'sync-farmer-01'
+        for crop in OILSEEDS:
+            history = client.get(f'/crop-economics/api/price-history/{crop}?months=60').get_json()
+            assert history['source'] == 'Mandi prices (data.gov.in)', crop
+            assert history['history'][0]['count'] == 3
+
+
+if __name__ == '__main__':
+    import pytest
+    raise SystemExit(pytest.main([__file__, '-q']))
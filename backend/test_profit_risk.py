@@ -0,0 +1,99 @@
+"""
+Tests for the Monte Carlo profit risk simulator (profit_risk.py).
+Run: python -m pytest test_profit_risk.py -q
+"""
+import os
+import time
+from datetime import date
+
+import numpy as np
+
+from app import app
+from extensions import db
+from models import Farmer
+from profit_risk import simulate_profit, months_to_harvest, DEFAULT_PATHS
+
+
+def setup_module(module):
+    with app.app_context():
+        db.create_all()
+        if not db.session.get(Farmer, 'risk-farmer-01'):
+            db.session.add(Farmer(id='risk-farmer-01', farmer_id='RISKFARM0001', name='Jokhim',
+                                  phone_number='5600000001', district='Bharatpur'))
+            db.session.commit()
+
+
+def test_seeded_runs_are_reproducible():
+    first = simulate_profit(2.5, 9.35, 5100.0, 15000.0, 0.12, paths=20_000, seed=7)
+    simulate_profit.cache_clear()
+    second = simulate_profit(2.5, 9.35, 5100.0, 15000.0, 0.12, paths=20_000, seed=7)
+    assert first == second
+    assert simulate_profit(2.5, 9.35, 5100.0, 15000.0, 0.12, paths=20_000, seed=8) != first
+
+
+def test_statistics_match_the_model():
+    # Zero volatility everywhere collapses to the point estimate
+    flat = simulate_profit(2.0, 10.0, 5000.0, 20000.0, 0.0, yield_cv=0.0, cost_cv=0.0, paths=5000, seed=1)
+    assert flat['percentiles']['p5'] == flat['percentiles']['p95'] == flat['mean'] == 60000
+    assert flat['probability_of_loss'] == 0 and flat['value_at_risk'] == 0
+
+    # A crop that loses money on average
+    risky = simulate_profit(1.0, 4.0, 3000.0, 15000.0, 0.2, paths=50_000, seed=3)
+    pct = risky['percentiles']
+    assert pct['p5'] < pct['p25'] < pct['p50'] < pct['p75'] < pct['p95']
+    assert 0.5 < risky['probability_of_loss'] < 1
+    assert risky['value_at_risk'] == -pct['p5']
+    assert risky['expected_shortfall'] >= risky['value_at_risk']
+    assert abs(risky['mean'] - (4 * 3000 - 15000)) < 200
+
+
+def test_hundred_thousand_paths_are_fast():
+    simulate_profit(2.5, 9.35, 5100.0, 15000.0, 0.12, seed=11)      # warm up
+    start = time.perf_counter()
+    simulate_profit(2.5, 9.35, 5100.0, 15000.0, 0.12, seed=12)
+    assert time.perf_counter() - start < 0.25
+
+
+def test_months_to_harvest():
+    today = date(2025, 11, 15)
+    assert months_to_harvest('March', today) == 4
+    assert months_to_harvest(3, today) == 4
+    assert months_to_harvest('November', today) == 12
+
+
+def test_simulate_endpoint_monte_carlo_mode():
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['farmer_id_verified'] = 'risk-farmer-01'
+    payload = {'crop_name': 'Mustard', 'state': 'Rajasthan', 'harvest_month': 'March',
+               'soil_type': 'Loamy', 'water_type': 'Freshwater', 'area_in_acres': 2.5}
+
+    plain = client.post('/profit/api/simulate', json=payload).get_json()
+    assert 'prediction' in plain and 'risk' not in plain
+
+    first = client.post('/profit/api/simulate', json=dict(payload, mode='monte_carlo')).get_json()
+    second = client.post('/profit/api/simulate', json=dict(payload, mode='monte_carlo')).get_json()
+    risk = first['risk']
+    assert risk == second['risk']
+    assert risk['paths'] == DEFAULT_PATHS
+    assert set(risk['percentiles']) == {'p5', 'p10', 'p25', 'p50', 'p75', 'p90', 'p95'}
+    low, high = risk['price_model']['interval_95']
+    assert low < risk['price_model']['price_per_quintal'] < high
+
+    seeded = client.post('/profit/api/simulate', json=dict(payload, mode='monte_carlo', seed=5, paths=10_000))
+    assert seeded.get_json()['risk']['seed'] == 5
+    assert np.isclose(seeded.get_json()['risk']['mean'], risk['mean'], rtol=0.05)
+
+
+def test_profit_math_copies_are_identical():
+    here = os.path.dirname(os.path.abspath(__file__))
+    copies = [os.path.join(here, 'profit_math.py'),
+              os.path.join(here, '..', 'profit_math.py'),
+              os.path.join(here, '..', 'FARMER_DASHBOARD_BACKEND', 'profit_math.py')]
+    texts = [open(path, encoding='utf-8').read().replace('\r\n', '\n') for path in copies]
+    assert texts[0] == texts[1] == texts[2]
+
+
+if __name__ == '__main__':
+    import pytest
+    raise SystemExit(pytest.main([__file__, '-q']))
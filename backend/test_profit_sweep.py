@@ -0,0 +1,110 @@
+"""
+Tests for parameter sweeps over the profit simulator (profit_sweep.py).
+Run: python -m pytest test_profit_sweep.py -q
+"""
+
+import pytest
+
+from app import app
+from extensions import db
+from models import Farmer
+from ml.profit_model_stub import crop_inputs
+from profit_sweep import run_sweep, MAX_SWEEP_POINTS
+
+BASE = {'crop_name': 'Mustard', 'soil_type': 'Loamy', 'water_type': 'Freshwater', 'area_in_acres': 2.5}
+
+
+def setup_module(module):
+    with app.app_context():
+        db.create_all()
+        if not db.session.get(Farmer, 'sweep-farmer-01'):
+            db.session.add(Farmer(id='sweep-farmer-01', farmer_id='SWEEPFARM001', name='Parikshan',
+                                  phone_number='5700000001', district='Bharatpur'))
+            db.session.commit()
+
+
+def point_profit(crop, soil, water, area):
+    yield_per_acre, price, cost = crop_inputs(crop, soil, water, jitter=False)
+    total_yield = round(yield_per_acre * area, 2)
+    return round(round(total_yield * price, 2) - round(cost * area, 2), 2)
+
+
+def test_grid_matches_point_by_point_evaluation():
+    crops, soils, areas = ['Mustard', 'Soybean', 'Sesame'], ['Black', 'Sandy'], [0.5, 1.0, 4.0]
+    result = run_sweep(BASE, {'crop_name': crops, 'soil_type': soils, 'area_in_acres': areas})
+    assert [axis['input'] for axis in result['axes']] == ['crop_name', 'soil_type', 'area_in_acres']
+    assert result['points'] == 18
+    for i, crop in enumerate(crops):
+        for j, soil in enumerate(soils):
+            for k, area in enumerate(areas):
+                assert result['net_profit'][i][j][k] == pytest.approx(point_profit(crop, soil, 'Freshwater', area))
+
+
+def test_ranges_and_tornado_order():
+    result = run_sweep(BASE, {
+        'area_in_acres': {'start': 1, 'stop': 5, 'steps': 5},
+        'water_type': ['Freshwater', 'Brackish water', 'Salt water'],
+    })
+    assert result['axes'][1]['values'] == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert len(result['net_profit']) == 3 and len(result['net_profit'][0]) == 5
+
+    tornado = result['sensitivity']
+    assert [row['input'] for row in tornado] == ['area_in_acres', 'water_type']
+    assert tornado[0]['low']['value'] == 1.0 and tornado[0]['high']['value'] == 5.0
+    assert tornado[1]['low']['value'] == 'Salt water'
+    assert result['base_net_profit'] == pytest.approx(point_profit('Mustard', 'Loamy', 'Freshwater', 2.5))
+
+
+def test_limits_and_validation():
+    with pytest.raises(ValueError, match='limit'):
+        run_sweep(BASE, {'area_in_acres': {'start': 0, 'stop': 10, 'steps': 200},
+                         'crop_name': [f'Crop {i}' for i in range(MAX_SWEEP_POINTS // 100)]})
+    with pytest.raises(ValueError):
+        run_sweep(BASE, {'rainfall': [1, 2]})
+    with pytest.raises(ValueError):
+        run_sweep(BASE, {'area_in_acres': [-1, 2]})
+    with pytest.raises(ValueError):
+        run_sweep(BASE, {})
+
+
+def test_inputs_the_simulator_ignores_cannot_be_swept():
+    for name, values in (('harvest_month', ['March', 'October']), ('state', ['Punjab', 'Gujarat']),
+                         ('market_district', ['Alwar', 'Jaipur'])):
+        with pytest.raises(ValueError, match='cannot be swept'):
+            run_sweep(BASE, {name: values, 'area_in_acres': [1, 2]})
+
+    result = run_sweep({**BASE, 'harvest_month': 'March', 'state': 'Punjab'}, {'area_in_acres': [1, 2]})
+    assert result['base']['harvest_month'] == 'March' and result['base']['state'] == 'Punjab'
+
+
+def test_base_values_are_type_checked():
+    for bad in ({'soil_type': 5}, {'crop_name': ['Mustard']}, {'water_type': None},
+                {'area_in_acres': 'two'}, {'area_in_acres': -1}, {'area_in_acres': True}):
+        with pytest.raises(ValueError):
+            run_sweep({**BASE, **bad}, {'area_in_acres': [1, 2]})
+    with pytest.raises(ValueError):
+        run_sweep(['Mustard'], {'area_in_acres': [1, 2]})
+
+
+def test_sweep_endpoint():
+    client = app.test_client()
+    assert client.post('/profit/api/sweep', json={}).status_code == 401
+    with client.session_transaction() as sess:
+        sess['farmer_id_verified'] = 'sweep-farmer-01'
+
+    response = client.post('/profit/api/sweep', json={'base': BASE, 'sweep': {'soil_type': ['Black', 'Sandy']}})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['net_profit'] == [point_profit('Mustard', soil, 'Freshwater', 2.5) for soil in ('Black', 'Sandy')]
+    assert data['sensitivity'][0]['input'] == 'soil_type'
+
+    bad = client.post('/profit/api/sweep', json={'base': BASE, 'sweep': {'crop_name': 'Mustard'}})
+    assert bad.status_code == 400
+    bad_base = client.post('/profit/api/sweep', json={'base': {'soil_type': 5}, 'sweep': {'area_in_acres': [1, 2]}})
+    assert bad_base.status_code == 400
+    ignored = client.post('/profit/api/sweep', json={'base': BASE, 'sweep': {'harvest_month': ['March']}})
+    assert ignored.status_code == 400 and 'cannot be swept' in ignored.get_json()['details']
+
+
+if __name__ == '__main__':
+    raise SystemExit(pytest.main([__file__, '-q']))
@@ -0,0 +1,110 @@
+"""
+Tests for per-client rate limiting (rate_limiter.py) on the crop economics API.
+Run: python -m pytest test_rate_limiter.py -q
+"""
+import os
+import tempfile
+import threading
+import time
+
+import rate_limiter
+from rate_limiter import RateLimiter, InProcessStore, SQLiteStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_burst_then_refill():
+    clock = FakeClock()
+    limiter = RateLimiter(calls=100, per_seconds=60, clock=clock)
+    assert [limiter.hit('k')[0] for _ in range(101)].count(True) == 100
+    allowed, retry_after = limiter.hit('k')
+    assert not allowed and abs(retry_after - 0.6) < 1e-9
+    clock.now += 0.6
+    assert limiter.hit('k')[0]
+    assert limiter.hit('another-client')[0]
+
+
+def test_cost_class_takes_more_tokens():
+    limiter = RateLimiter(calls=100, per_seconds=60, clock=FakeClock())
+    assert [limiter.hit('mandi:k', cost=5)[0] for _ in range(21)].count(True) == 20
+
+
+def test_sqlite_store_shared_between_workers():
+    path = os.path.join(tempfile.mkdtemp(), 'rate_limits.sqlite3')
+    clock = FakeClock()
+    workers = [RateLimiter(calls=4, per_seconds=60, store=SQLiteStore(path), clock=clock) for _ in range(2)]
+    results = [workers[i % 2].hit('k')[0] for i in range(5)]
+    assert results == [True, True, True, True, False]
+
+
+def test_in_process_store_update_is_atomic():
+    store = InProcessStore()
+
+    def take_token(tokens):
+        time.sleep(0.001)   # widen the window between the read and the write
+        tokens = 3 if tokens is None else tokens
+        return tokens > 0, tokens - 1, 0.0
+
+    barrier = threading.Barrier(20)
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(store.update('k', take_token)[0])
+
+    threads = [threading.Thread(target=worker) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count(True) == 3
+
+
+def test_token_bucket_is_a_copy_of_the_dashboard_module():
+    here = os.path.dirname(os.path.abspath(__file__))
+    copies = [os.path.join(here, 'token_bucket.py'),
+              os.path.join(here, '..', 'FARMER_DASHBOARD_BACKEND', 'token_bucket.py')]
+    backend_copy, dashboard_copy = (open(path, encoding='utf-8').read().replace('\r\n', '\n') for path in copies)
+    assert backend_copy == dashboard_copy
+
+
+def test_routes_return_429_with_retry_after():
+    from app import app
+
+    clock = FakeClock()
+    original = rate_limiter.rate_limiter
+    rate_limiter.rate_limiter = RateLimiter(calls=2, per_seconds=60, store=InProcessStore(), clock=clock)
+    try:
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['farmer_id_verified'] = 'rate-farmer-01'
+        url = '/crop-economics/api/price-history/unknown-crop'
+        assert [client.get(url).status_code for _ in range(3)] == [404, 404, 429]
+        response = client.get(url)
+        assert response.headers['Retry-After'] == '30'
+
+        # Buckets are per client
+        other = app.test_client()
+        with other.session_transaction() as sess:
+            sess['farmer_id_verified'] = 'rate-farmer-02'
+        assert other.get(url).status_code == 404
+
+        # Mandi-backed routes have their own bucket; a 5-token call empties this 2-token one
+        mandi_url = '/crop-economics/api/market-details/unknown-crop'
+        assert [other.get(mandi_url).status_code for _ in range(2)] == [404, 429]
+        assert other.get(url).status_code == 404
+    finally:
+        rate_limiter.rate_limiter = original
+
+
+if __name__ == '__main__':
+    tests = [(name, fn) for name, fn in list(globals().items()) if name.startswith('test_')]
+    for name, fn in tests:
+        fn()
+        print(f"✅ {name}")
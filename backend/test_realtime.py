@@ -0,0 +1,134 @@
+"""
+Tests for live notification pushes over SocketIO (realtime.py and the
+per-user rooms in ml/websocket_server.py).
+Runs against a temporary SQLite database.
+Run: python -m pytest test_realtime.py -q
+"""
+
+from sqlalchemy import event
+
+from app import app
+from extensions import db
+from models import Farmer, Notification, NotificationCounter
+from models_marketplace import AuctionNotification
+from ml.websocket_server import socketio, online_users
+import notification_service
+import realtime
+
+
+def setup_module(module):
+    with app.app_context():
+        db.create_all()
+        for i in range(4):
+            db.session.add(Farmer(id=f'live-farmer-{i}', farmer_id=f'LIVE{i:08d}', name=f'Live {i}',
+                                  phone_number=f'66000000{i:02d}', state='Maharashtra',
+                                  district='Nandurbar' if i < 3 else 'Dhule'))
+        db.session.commit()
+
+
+def connect(**session_values):
+    """Socket client carrying a logged-in Flask session."""
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess.update(session_values)
+    socket = socketio.test_client(app, flask_test_client=client)
+    socket.get_received()          # drop connection_response
+    return socket
+
+
+def received(socket, name):
+    return [message['args'][0] for message in socket.get_received() if message['name'] == name]
+
+
+def test_connect_joins_user_room_and_tracks_presence():
+    first = connect(farmer_id_verified='live-farmer-0')
+    second = connect(farmer_id_verified='live-farmer-0')
+    assert 'live-farmer-0' in online_users()
+
+    first.disconnect()
+    assert 'live-farmer-0' in online_users()       # another tab is still open
+    second.disconnect()
+    assert 'live-farmer-0' not in online_users()
+
+
+def test_new_notification_is_pushed_with_unread_count():
+    socket = connect(farmer_id_verified='live-farmer-1')
+    other = connect(farmer_id_verified='live-farmer-2')
+    with app.app_context():
+        notification = notification_service.notify_farmer('live-farmer-1', 'Rain', 'Heavy rain tonight')
+        pushes = received(socket, 'notification')
+        assert len(pushes) == 1
+        assert pushes[0]['notification']['id'] == notification.id
+        assert pushes[0]['unread_count'] == 1
+        assert received(other, 'notification') == []
+
+        notification_service.mark_read('live-farmer-1', notification.id)
+        assert received(socket, 'unread_count') == [{'unread_count': 0}]
+    socket.disconnect()
+    other.disconnect()
+
+
+def test_rolled_back_notification_is_not_pushed():
+    socket = connect(farmer_id_verified='live-farmer-1')
+    with app.app_context():
+        db.session.add(Notification(farmer_id='live-farmer-1', title='Draft', description='-',
+                                    notification_type='general_alert'))
+        db.session.flush()
+        db.session.rollback()
+        assert received(socket, 'notification') == []
+    socket.disconnect()
+
+
+def test_fan_out_pushes_to_connected_farmers_in_segment():
+    inside = connect(farmer_id_verified='live-farmer-2')
+    outside = connect(farmer_id_verified='live-farmer-3')
+    with app.app_context():
+        Notification.query.delete()
+        NotificationCounter.query.delete()
+        db.session.commit()
+        sent = notification_service.fan_out('Mandi closed', 'Holiday', district='Nandurbar', chunk_size=2)
+    assert sent == 3
+
+    pushes = received(inside, 'notification')
+    assert len(pushes) == 1
+    assert pushes[0]['notification']['title'] == 'Mandi closed' and pushes[0]['unread_count'] == 1
+    assert received(outside, 'notification') == []
+    inside.disconnect()
+    outside.disconnect()
+
+
+def test_auction_notification_reaches_buyer_room():
+    socket = connect(buyer_id_verified='live-buyer-1')
+    with app.app_context():
+        db.session.add(AuctionNotification(user_id='live-buyer-1', user_type='buyer', auction_id='auction-x',
+                                           message='You won the auction', notification_type='won'))
+        db.session.commit()
+    pushes = received(socket, 'auction_notification')
+    assert len(pushes) == 1
+    assert pushes[0]['notification']['message'] == 'You won the auction'
+    assert pushes[0]['unread_count'] == 1
+    socket.disconnect()
+
+
+def test_nobody_online_costs_no_queries():
+    with app.app_context():
+        engine = db.engine
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        with app.app_context():
+            realtime.publish_notifications([('farmer', 'live-farmer-0', {'title': 'x'})])
+            realtime.publish_unread_counts(['live-farmer-0'])
+            realtime.publish_auction_unread_counts(['live-buyer-1'])
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert statements == []
+
+
+if __name__ == '__main__':
+    import pytest
+    raise SystemExit(pytest.main([__file__, '-q']))
@@ -0,0 +1,164 @@
+"""
+Tests for the nightly recommendation precompute (recommendation_batch.py)
+and the smart-recommendations read path.
+Runs against a temporary SQLite database.
+Run: python -m pytest test_recommendation_batch.py -q
+"""
+from datetime import datetime, timedelta
+
+from app import app
+from extensions import db
+from models import Farmer, Scheme, FarmerRecommendation, RecommendationBatchRun
+from scheme_eligibility import invalidate_scheme_index
+import recommendation_batch
+
+FARMER_COUNT = 25
+FARMER_IDS = [f'farmer-{i:03d}' for i in range(FARMER_COUNT)]
+
+
+def module_rows():
+    """This module's farmers' recommendations (the batch covers every farmer in the database)."""
+    return FarmerRecommendation.query.filter(FarmerRecommendation.farmer_id.in_(FARMER_IDS))
+
+
+def setup_module(module):
+    with app.app_context():
+        db.create_all()
+        FarmerRecommendation.query.delete()
+        Scheme.query.delete()
+        for code, name in [('pmkisan', 'PM-KISAN Samman Nidhi'), ('soil', 'Soil Health Card'),
+                           ('smam', 'Mechanization (SMAM)'), ('kcc', 'Kisan Credit Card (KCC)')]:
+            db.session.add(Scheme(scheme_code=code, name=name, description=name, scheme_type='scheme',
+                                  focus_area='Test', benefit_amount='-', eligibility_criteria='-'))
+        for i in range(FARMER_COUNT):
+            db.session.add(Farmer(id=f'farmer-{i:03d}', farmer_id=f'F{i:011d}', name=f'Farmer {i}',
+                                  phone_number=f'9{i:09d}', district='Pune',
+                                  total_land_area_hectares=0.2 if i % 2 else 1.5))
+        db.session.commit()
+        invalidate_scheme_index()
+
+
+def setup_function(function):
+    with app.app_context():
+        FarmerRecommendation.query.delete()
+        RecommendationBatchRun.query.delete()
+        db.session.commit()
+
+
+def test_batch_covers_every_farmer_in_chunks():
+    with app.app_context():
+        result = recommendation_batch.run_recommendation_batch(chunk_size=7, workers=1)
+        assert result['status'] == 'completed'
+        assert result['farmers_processed'] == Farmer.query.count()
+        assert result['last_farmer_id'] == db.session.query(db.func.max(Farmer.id)).scalar()
+        # Large holdings also get SMAM
+        assert FarmerRecommendation.query.filter_by(farmer_id='farmer-000').count() == 4
+        assert FarmerRecommendation.query.filter_by(farmer_id='farmer-001').count() == 3
+        assert module_rows().count() == 4 * 13 + 3 * 12
+        assert result['recommendations_written'] == FarmerRecommendation.query.count()
+
+        # A second run replaces rows instead of piling them up
+        recommendation_batch.run_recommendation_batch(chunk_size=7, workers=1)
+        assert FarmerRecommendation.query.filter_by(farmer_id='farmer-000').count() == 4
+
+
+def test_unfinished_run_resumes_from_watermark():
+    with app.app_context():
+        db.session.add(RecommendationBatchRun(status='failed', last_farmer_id='farmer-019',
+                                              farmers_processed=20, recommendations_written=0))
+        db.session.commit()
+        result = recommendation_batch.run_recommendation_batch(chunk_size=10, workers=1)
+        resumed = Farmer.query.filter(Farmer.id > 'farmer-019').count()
+        assert result['farmers_processed'] == 20 + resumed
+        assert FarmerRecommendation.query.filter_by(farmer_id='farmer-019').count() == 0
+        assert FarmerRecommendation.query.filter_by(farmer_id='farmer-020').count() > 0
+
+
+def test_run_held_by_another_process_is_not_taken_over():
+    with app.app_context():
+        db.session.add(RecommendationBatchRun(status='running', last_farmer_id='farmer-009', farmers_processed=10,
+                                              recommendations_written=0, heartbeat_at=datetime.utcnow()))
+        db.session.commit()
+        assert recommendation_batch.run_recommendation_batch(workers=1) is None
+        assert module_rows().count() == 0
+
+        # Heartbeat gone quiet -> the run was abandoned and is resumed
+        run = RecommendationBatchRun.query.one()
+        run.heartbeat_at = datetime.utcnow() - recommendation_batch.RUN_HEARTBEAT_TIMEOUT - timedelta(minutes=1)
+        db.session.commit()
+        result = recommendation_batch.run_recommendation_batch(workers=1)
+        assert result['id'] == run.id and result['status'] == 'completed'
+        assert FarmerRecommendation.query.filter_by(farmer_id='farmer-009').count() == 0
+        assert FarmerRecommendation.query.filter_by(farmer_id='farmer-010').count() > 0
+
+
+def test_claim_is_conditional():
+    with app.app_context():
+        now = datetime.utcnow()
+        run = RecommendationBatchRun(status='failed', farmers_processed=0, recommendations_written=0)
+        db.session.add(run)
+        db.session.commit()
+        # Two processes race for the same failed run: only the first UPDATE matches
+        assert recommendation_batch._claim_run(run.id, now)
+        assert not recommendation_batch._claim_run(run.id, now)
+
+
+def test_fresh_llm_recommendations_are_kept():
+    with app.app_context():
+        scheme = Scheme.query.filter_by(scheme_code='kcc').first()
+        db.session.add(FarmerRecommendation(farmer_id='farmer-002', scheme_id=scheme.id, ai_method='gemini',
+                                            match_percentage=99, expires_at=datetime.now() + timedelta(hours=5)))
+        db.session.commit()
+        recommendation_batch.run_recommendation_batch(workers=1)
+        methods = [r.ai_method for r in FarmerRecommendation.query.filter_by(farmer_id='farmer-002')]
+        assert methods == ['gemini']
+
+
+def test_process_pool_matches_inline_scoring():
+    with app.app_context():
+        recommendation_batch.run_recommendation_batch(workers=1)
+        inline = sorted((r.farmer_id, r.scheme_id, r.match_percentage, r.profile_hash) for r in module_rows())
+        recommendation_batch.run_recommendation_batch(chunk_size=10, workers=2)
+        pooled = sorted((r.farmer_id, r.scheme_id, r.match_percentage, r.profile_hash) for r in module_rows())
+    assert pooled == inline
+
+
+def test_request_path_serves_precomputed_rows():
+    with app.app_context():
+        recommendation_batch.run_recommendation_batch(workers=1)
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['farmer_id_verified'] = 'farmer-000'
+
+    response = client.get('/subsidies/api/smart-recommendations')
+    data = response.get_json()
+    assert response.status_code == 200
+    assert data['from_cache'] and data['method'] == 'rule_based'
+    assert data['recommended_schemes'][0]['name'] == 'PM-KISAN Samman Nidhi'
+
+    # Edits that cannot change eligibility keep the precomputed rows
+    with app.app_context():
+        farmer = db.session.get(Farmer, 'farmer-000')
+        farmer.name = 'Farmer Zero'
+        farmer.updated_at = datetime.utcnow() + timedelta(minutes=1)
+        db.session.commit()
+    response = client.get('/subsidies/api/smart-recommendations')
+    assert response.status_code == 200 and response.get_json()['from_cache']
+
+    # Land holding shrinks below the SMAM band -> computed on demand
+    with app.app_context():
+        farmer = db.session.get(Farmer, 'farmer-000')
+        farmer.total_land_area_hectares = 0.2
+        db.session.commit()
+    response = client.get('/subsidies/api/smart-recommendations')
+    assert response.status_code == 201
+    assert not response.get_json().get('from_cache')
+    assert len(response.get_json()['recommended_schemes']) == 3
+    response = client.get('/subsidies/api/smart-recommendations')
+    assert response.status_code == 200 and response.get_json()['from_cache']
+
+
+if __name__ == '__main__':
+    import pytest
+    raise SystemExit(pytest.main([__file__, '-q']))
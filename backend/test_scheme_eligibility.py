@@ -0,0 +1,121 @@
+"""
+Tests for the compiled scheme eligibility index (scheme_eligibility.py).
+Runs against a temporary SQLite database seeded with a small catalogue.
+Run: python -m pytest test_scheme_eligibility.py -q
+"""
+from types import SimpleNamespace
+
+from app import app
+from extensions import db
+from models import Scheme
+import scheme_eligibility
+from scheme_eligibility import SchemeIndex, get_scheme_index, invalidate_scheme_index
+
+CATALOGUE = [
+    ('pmkisan', 'PM-KISAN Samman Nidhi', 'Income support for all farmers'),
+    ('nmeo', 'National Mission on Edible Oils (NMEO-OP)', 'Oilseed area expansion'),
+    ('perdrop', 'Per Drop More Crop', 'Micro irrigation subsidy'),
+    ('smam', 'Sub-Mission on Agricultural Mechanization (SMAM)', 'Machinery for SCs/STs and small farmers'),
+    ('aif', 'Agri Infrastructure Fund (AIF)', 'Warehouses and cold storage'),
+    ('divyang', 'Divyang Kisan Sahayata', 'Tools for disabled farmers'),
+    ('kcc', 'Kisan Credit Card (KCC) Scheme', 'Short term credit'),
+]
+
+
+def make_scheme(code, name, description):
+    return Scheme(scheme_code=code, name=name, description=description, scheme_type='scheme',
+                  focus_area='Test', benefit_amount='-', eligibility_criteria='-')
+
+
+def make_farmer(fid='f1', district='Pune', land=0.2, caste='General', oilseed=False, handicapped=False):
+    return SimpleNamespace(id=fid, state='Maharashtra', district=district, total_land_area_hectares=land,
+                           caste_category=caste, is_oilseed_farmer=oilseed,
+                           is_physically_handicapped=handicapped)
+
+
+def names(index, farmer):
+    return [compiled.display['name'] for compiled, score, reason in index.match(farmer)]
+
+
+def setup_module(module):
+    with app.app_context():
+        db.create_all()
+        Scheme.query.delete()
+        for row in CATALOGUE:
+            db.session.add(make_scheme(*row))
+        db.session.commit()
+    # Drop any index compiled from an earlier catalogue
+    invalidate_scheme_index()
+
+
+def test_land_band_and_oilseed_predicates():
+    with app.app_context():
+        index = get_scheme_index()
+
+    small = names(index, make_farmer(land=0.2))
+    assert small == ['PM-KISAN Samman Nidhi', 'Kisan Credit Card (KCC) Scheme']
+
+    large = names(index, make_farmer(land=3, oilseed=True))
+    assert large[:3] == ['PM-KISAN Samman Nidhi', 'National Mission on Edible Oils (NMEO-OP)',
+                         'Kisan Credit Card (KCC) Scheme']
+    assert len(large) == 5
+
+    # Oilseed districts qualify without the oilseed flag
+    assert 'National Mission on Edible Oils (NMEO-OP)' in names(index, make_farmer(district='Sangli'))
+
+
+def test_bonus_predicates_match_previous_scoring():
+    with app.app_context():
+        index = get_scheme_index()
+
+    matches = {c.display['name']: (score, reason)
+               for c, score, reason in index.match(make_farmer(land=0.2, caste='SC', handicapped=True))}
+    # Too small for SMAM, but the SC/ST bonus alone still recommends it
+    assert matches['Sub-Mission on Agricultural Mechanization (SMAM)'] == (15, ' (SC/ST eligibility bonus)')
+    assert matches['Divyang Kisan Sahayata'] == (20, 'Special scheme for differently-abled farmers')
+
+
+def test_batch_matching_shares_profiles():
+    with app.app_context():
+        index = get_scheme_index()
+    farmers = [make_farmer(fid=f'f{i}', land=1.5 + (i % 2) * 0.1) for i in range(100)]
+    results = index.match_farmers(farmers)
+    assert len(results) == 100
+    assert len(index._matches) >= 1
+    assert results['f0'] == results['f1']
+
+
+def test_recommendation_payload_shape():
+    with app.app_context():
+        index = get_scheme_index()
+    recs = index.to_recommendations(index.match(make_farmer(land=1.2)))
+    assert recs[0]['name'] == 'PM-KISAN Samman Nidhi'
+    assert recs[0]['priority'] == 'high'
+    assert recs[0]['ai_method'] == 'rule_based'
+    assert {'id', 'reason', 'match_percentage', 'external_link'} <= set(recs[0])
+
+
+def test_index_rebuilt_after_catalogue_change():
+    with app.app_context():
+        first = get_scheme_index()
+        db.session.add(make_scheme('enam', 'e-NAM', 'Online market'))
+        db.session.commit()
+        invalidate_scheme_index()
+        second = get_scheme_index()
+    assert second is not first
+    assert 'e-NAM' in names(second, make_farmer())
+
+
+def test_catalogue_size_does_not_change_match_work():
+    schemes = [make_scheme(f's{i}', f'Soil Scheme {i}', 'Soil testing') for i in range(2000)]
+    for i, scheme in enumerate(schemes):
+        scheme.id = f'id-{i}'
+    index = SchemeIndex(schemes)
+    matches = index.match(make_farmer())
+    assert len(matches) == scheme_eligibility.TOP_N
+    assert index.match(make_farmer(fid='other')) is matches
+
+
+if __name__ == '__main__':
+    import pytest
+    raise SystemExit(pytest.main([__file__, '-q']))
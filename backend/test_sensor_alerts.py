@@ -0,0 +1,108 @@
+"""
+Tests for the streaming IoT alert engine (sensor_alerts.py).
+Run: python -m pytest test_sensor_alerts.py -q
+"""
+import random
+import time
+from datetime import date, timedelta
+
+from sensor_alerts import SensorAlertEngine, crop_stage_for, WINDOW_SIZE
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def normal_reading(rng):
+    return {
+        'soilMoist': 55 + rng.uniform(-2, 2),
+        'soilTemp': 25 + rng.uniform(-0.5, 0.5),
+        'heatIndex': 30 + rng.uniform(-0.5, 0.5),
+    }
+
+
+def test_static_threshold_fires_once_and_rearms():
+    clock = FakeClock()
+    engine = SensorAlertEngine(clock=clock)
+    reading = {'soilMoist': 10, 'soilTemp': 25, 'heatIndex': 30}
+
+    alerts = engine.process('dev-1', reading, 'flowering')
+    assert [a['rule'] for a in alerts] == ['threshold_low']
+
+    # Condition persists -> de-duplicated
+    for _ in range(10):
+        clock.now += 60
+        assert engine.process('dev-1', reading, 'flowering') == []
+
+    # Clears, then comes back after the cooldown -> fires again
+    clock.now += 3600
+    engine.process('dev-1', {'soilMoist': 55}, 'flowering')
+    alerts = engine.process('dev-1', reading, 'flowering')
+    assert [a['rule'] for a in alerts] == ['threshold_low']
+
+
+def test_zscore_spike_detected_after_warmup():
+    rng = random.Random(7)
+    engine = SensorAlertEngine(clock=FakeClock())
+    for _ in range(WINDOW_SIZE):
+        assert engine.process('dev-1', normal_reading(rng)) == []
+
+    spike = normal_reading(rng)
+    spike['soilTemp'] = 33
+    rules = {(a['metric'], a['rule']) for a in engine.process('dev-1', spike)}
+    assert ('soil_temp', 'zscore') in rules
+
+
+def test_ewma_drift_detected():
+    rng = random.Random(3)
+    engine = SensorAlertEngine(clock=FakeClock())
+    for _ in range(200):
+        engine.process('dev-1', normal_reading(rng))
+
+    fired = []
+    for step in range(40):
+        reading = normal_reading(rng)
+        reading['soilMoist'] = 55 - step * 0.4
+        fired += engine.process('dev-1', reading)
+    assert any(a['metric'] == 'soil_moisture' and a['rule'] == 'drift' for a in fired)
+
+
+def test_per_device_rate_limit():
+    clock = FakeClock()
+    engine = SensorAlertEngine(clock=clock)
+    total = 0
+    for i in range(20):
+        clock.now += 1
+        value = 10 if i % 2 == 0 else 55
+        total += len(engine.process(f'dev-{0}', {'soilMoist': value, 'heatIndex': 50 if i % 2 == 0 else 30}))
+    assert total <= 5
+
+
+def test_crop_stage_from_harvest_date():
+    today = date(2025, 1, 1)
+    assert crop_stage_for(None) == 'vegetative'
+    assert crop_stage_for(today + timedelta(days=120), today) == 'germination'
+    assert crop_stage_for(today + timedelta(days=30), today) == 'flowering'
+    assert crop_stage_for(today, today) == 'maturity'
+
+
+def test_throughput_thousands_per_second():
+    rng = random.Random(1)
+    engine = SensorAlertEngine()
+    readings = [normal_reading(rng) for _ in range(20000)]
+    start = time.perf_counter()
+    for i, reading in enumerate(readings):
+        engine.process(f'dev-{i % 100}', reading)
+    elapsed = time.perf_counter() - start
+    assert len(readings) / elapsed > 5000
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_'):
+            fn()
+            print(f'✅ {name}')
@@ -0,0 +1,79 @@
+"""
+Tests for the precompiled translation tables, language bundles and the bulk
+translate endpoint (translations.py, routes/translation.py).
+Run: python -m pytest test_translations.py -q
+"""
+import gzip
+import json
+
+from app import app
+from translations import (TRANSLATIONS, TRANSLATIONS_VERSION, get_bundle, get_language_table,
+                          get_translation, translate_many)
+
+
+def test_tables_match_dictionary_lookups():
+    for language in ('hi', 'mr', 'gu'):
+        table = get_language_table(language)
+        for text, translations in TRANSLATIONS.items():
+            assert get_translation(text, language) == translations.get(language, text)
+            if language in translations:
+                assert table[text] == translations[language]
+    assert get_translation('Warning', 'en') == 'Warning'
+    assert get_translation('Not in the table', 'hi') == 'Not in the table'
+    assert get_translation('Warning', 'xx') == 'Warning'
+
+
+def test_translate_many_keeps_order():
+    assert translate_many(['Warning', 'Unknown', '', 'English'], 'gu') == [
+        TRANSLATIONS['Warning']['gu'], 'Unknown', '', TRANSLATIONS['English']['gu']]
+
+
+def test_bundle_is_gzipped_and_versioned():
+    client = app.test_client()
+    response = client.get('/api/translate/bundle/mr', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    data = json.loads(gzip.decompress(response.data))
+    assert data['version'] == TRANSLATIONS_VERSION
+    assert data['translations'] == get_language_table('mr')
+
+    etag = response.headers['ETag']
+    assert etag.strip('"') == get_bundle('mr').etag + '-gzip'
+    cached = client.get('/api/translate/bundle/mr', headers={'If-None-Match': etag, 'Accept-Encoding': 'gzip'})
+    assert cached.status_code == 304 and cached.data == b'' and cached.headers['ETag'] == etag
+
+    plain = client.get('/api/translate/bundle/mr')
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.get_json() == data
+    assert plain.headers['ETag'].strip('"') == get_bundle('mr').etag
+
+    # Each representation only revalidates against its own ETag
+    assert client.get('/api/translate/bundle/mr', headers={'If-None-Match': etag}).status_code == 200
+    assert client.get('/api/translate/bundle/mr', headers={
+        'If-None-Match': plain.headers['ETag'], 'Accept-Encoding': 'gzip'}).status_code == 200
+    assert client.get('/api/translate/bundle/mr', headers={
+        'If-None-Match': plain.headers['ETag']}).status_code == 304
+
+    assert client.get('/api/translate/bundle/xx').status_code == 400
+
+
+def test_translate_page_serves_bundle():
+    client = app.test_client()
+    data = client.post('/api/translate/translate-page', json={'target_language': 'hi'}).get_json()
+    expected = {text: t['hi'] for text, t in TRANSLATIONS.items() if 'hi' in t}
+    assert data['language'] == 'hi' and data['translations'] == expected
+
+
+def test_bulk_endpoint():
+    client = app.test_client()
+    response = client.post('/api/translate/bulk', json={'texts': ['Warning', 'Hello'], 'target_language': 'hi'})
+    assert response.get_json() == {'language': 'hi', 'translations': [TRANSLATIONS['Warning']['hi'], 'Hello']}
+
+    assert client.post('/api/translate/bulk', json={'texts': 'Warning'}).status_code == 400
+    assert client.post('/api/translate/bulk', json={'texts': ['a'], 'target_language': 'xx'}).status_code == 400
+    assert client.post('/api/translate/bulk', json={'texts': ['a'] * 1001}).status_code == 400
+
+
+if __name__ == '__main__':
+    import pytest
+    raise SystemExit(pytest.main([__file__, '-q']))
@@ -0,0 +1,88 @@
+"""
+Tests for the two-tier translation cache (translator.py).
+Uses the local stub backend and a temporary SQLite store.
+Run: python -m pytest test_translator.py -q
+"""
+import os
+import tempfile
+
+from translator import StubBackend, TranslationStore, Translator
+
+
+def make_translator(path=None, **kwargs):
+    backend = StubBackend()
+    path = path or os.path.join(tempfile.mkdtemp(), 'translations.sqlite3')
+    return Translator(backend=backend, store=TranslationStore(path), **kwargs), backend
+
+
+def test_misses_are_batched_into_one_call():
+    translator, backend = make_translator()
+    texts = ['Soybean', 'Groundnut', 'Soybean', '', 'Mustard']
+    assert translator.translate_batch(texts, 'hi') == [
+        '[hi] Soybean', '[hi] Groundnut', '[hi] Soybean', '', '[hi] Mustard']
+    assert backend.calls == [(['Soybean', 'Groundnut', 'Mustard'], 'hi')]
+
+    # Everything is now an LRU hit
+    assert translator.translate('Groundnut', 'hi') == '[hi] Groundnut'
+    assert len(backend.calls) == 1
+
+
+def test_store_is_shared_across_instances():
+    path = os.path.join(tempfile.mkdtemp(), 'shared.sqlite3')
+    first, first_backend = make_translator(path)
+    first.translate_batch(['PM-KISAN income support', 'Crop insurance'], 'mr')
+
+    # A fresh worker with an empty LRU reads from the store, not the API
+    second, second_backend = make_translator(path)
+    assert second.translate_batch(['Crop insurance', 'New scheme'], 'mr') == [
+        '[mr] Crop insurance', '[mr] New scheme']
+    assert second_backend.calls == [(['New scheme'], 'mr')]
+    assert len(first_backend.calls) == 1
+
+
+def test_api_batches_are_capped():
+    translator, backend = make_translator(api_batch_size=3)
+    translator.translate_batch([f'text {i}' for i in range(7)], 'gu')
+    assert [len(texts) for texts, _ in backend.calls] == [3, 3, 1]
+
+
+def test_english_and_unknown_languages_skip_translation():
+    translator, backend = make_translator()
+    assert translator.translate_batch(['Hello'], 'en') == ['Hello']
+    assert translator.translate('Hello', 'xx') == 'Hello'
+    assert backend.calls == []
+
+
+def test_failures_are_not_cached():
+    translator, _ = make_translator()
+    attempts = []
+
+    def flaky(texts, language):
+        attempts.append(texts)
+        if len(attempts) == 1:
+            raise RuntimeError('quota exceeded')
+        return [text.upper() for text in texts]
+
+    translator.backend = flaky
+    assert translator.translate('wheat', 'hi') == 'wheat'
+    assert translator.translate('wheat', 'hi') == 'WHEAT'
+    assert len(attempts) == 2
+
+    translator.backend = lambda texts, language: None      # no credentials configured
+    assert translator.translate('barley', 'hi') == 'barley'
+    assert translator.store.get_many(['barley'], 'hi') == {}
+
+
+def test_lru_is_bounded():
+    translator, backend = make_translator(lru_size=2)
+    translator.translate_batch(['a', 'b', 'c'], 'hi')
+    assert len(translator.lru.entries) == 2
+    translator.translate('a', 'hi')                 # evicted from LRU, still in the store
+    assert len(backend.calls) == 1
+
+
+if __name__ == '__main__':
+    tests = [(name, fn) for name, fn in list(globals().items()) if name.startswith('test_')]
+    for name, fn in tests:
+        fn()
+        print(f"✅ {name}")
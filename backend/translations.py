@@ -1,7 +1,18 @@
 """
 Simple multilingual translation system using predefined dictionaries
 Supports: Hindi (hi), Marathi (mr), English (en), Gujarati (gu)
+
+TRANSLATIONS is compiled once at import into one flat {text: translation}
+table per language, plus a JSON bundle per language (raw and gzip bytes)
+with an ETag derived from the content, so lookups are a single dict get
+and clients can download and cache a whole language at once.
 """
+import gzip
+import hashlib
+import json
+from collections import namedtuple
+
+LANGUAGES = ('en', 'hi', 'mr', 'gu')
 
 # Translation dictionary for common UI strings
 TRANSLATIONS = {
@@ -206,6 +217,36 @@ TRANSLATIONS = {
 }
 
 
+TranslationBundle = namedtuple('TranslationBundle', 'language etag body gzip_body')
+
+
+def compile_tables(translations):
+    """Invert {text: {lang: translation}} into {lang: {text: translation}}"""
+    tables = {language: {} for language in LANGUAGES}
+    for original_text, lang_translations in translations.items():
+        for language, translated in lang_translations.items():
+            tables.setdefault(language, {})[original_text] = translated
+    tables['en'] = {}
+    return tables
+
+
+def build_bundle(language, table, version):
+    body = json.dumps(
+        {'language': language, 'version': version, 'translations': table},
+        ensure_ascii=False, sort_keys=True, separators=(',', ':')
+    ).encode('utf-8')
+    return TranslationBundle(language, f'{version}-{language}', body, gzip.compress(body, mtime=0))
+
+
+TRANSLATIONS_VERSION = hashlib.sha256(
+    json.dumps(TRANSLATIONS, ensure_ascii=False, sort_keys=True).encode('utf-8')
+).hexdigest()[:16]
+_TABLES = compile_tables(TRANSLATIONS)
+_BUNDLES = {language: build_bundle(language, table, TRANSLATIONS_VERSION)
+            for language, table in _TABLES.items()}
+_EMPTY = {}
+
+
 def get_translation(text, language='en'):
     """
     Get translation for text in specified language
@@ -219,11 +260,23 @@ def get_translation(text, language='en'):
     """
     if language == 'en' or not text:
         return text
-    
-    if text in TRANSLATIONS:
-        return TRANSLATIONS[text].get(language, text)
-    
-    return text
+    return _TABLES.get(language, _EMPTY).get(text, text)
+
+
+def get_language_table(language):
+    """Flat {text: translation} table for a language (empty for en/unknown)"""
+    return _TABLES.get(language, _EMPTY)
+
+
+def translate_many(texts, language='en'):
+    """Translate a list of strings with one table lookup each, keeping order"""
+    table = _TABLES.get(language, _EMPTY)
+    return [table.get(text, text) if text else text for text in texts]
+
+
+def get_bundle(language):
+    """Precompiled JSON bundle for a language, or None if unsupported"""
+    return _BUNDLES.get(language)
 
 
 def get_all_translations():
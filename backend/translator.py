@@ -1,15 +1,32 @@
 """
 Translation utility using Google Translate API
 Supports: Hindi (hi), Marathi (mr), English (en), Gujarati (gu)
+
+Translations go through two cache tiers before the API:
+1. an in-process LRU (LRU_SIZE entries),
+2. a SQLite file shared by every worker on the host (TRANSLATION_CACHE_DB),
+   keyed by (language, sha256 of the source text).
+All misses of a batch are sent to the API in one multi-string request
+(API_BATCH_SIZE strings per call), so API usage grows with new content,
+not with traffic. Failed or unconfigured translations are never cached.
 """
-from google.cloud import translate_v2
-from functools import lru_cache
+from collections import OrderedDict
+from datetime import datetime
+import hashlib
 import os
+import sqlite3
+import threading
+
+try:
+    from google.cloud import translate_v2
+    GOOGLE_TRANSLATE_AVAILABLE = True
+except ImportError:
+    GOOGLE_TRANSLATE_AVAILABLE = False
 
 # Initialize translation client
 try:
     # Try to use service account if credentials are set
-    if os.getenv('GOOGLE_APPLICATION_CREDENTIALS'):
+    if GOOGLE_TRANSLATE_AVAILABLE and os.getenv('GOOGLE_APPLICATION_CREDENTIALS'):
         translate_client = translate_v2.Client()
     else:
         # Fallback to simple translation using requests (free tier)
@@ -34,40 +51,210 @@ LANG_CODES = {
     'gu': 'gu',
 }
 
+LRU_SIZE = 5000
+API_BATCH_SIZE = 128      # strings per Translate v2 request
+CACHE_DB_PATH = os.getenv(
+    'TRANSLATION_CACHE_DB',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'translation_cache.sqlite3')
+)
+
+
+def _source_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+# ==================== BACKENDS ====================
+
+def google_backend(texts, target_language):
+    """Translate a list of strings in one API call; None when not configured."""
+    if not translate_client:
+        # In production, you should set up Google Cloud credentials
+        return None
+    results = translate_client.translate(texts, target_language=LANG_CODES[target_language], format_='text')
+    return [result['translatedText'] for result in results]
+
+
+class StubBackend:
+    """Offline translator for tests and local development: '[hi] text'. Records calls."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts, target_language):
+        self.calls.append((list(texts), target_language))
+        return [f'[{target_language}] {text}' for text in texts]
+
+
+# ==================== CACHE TIERS ====================
+
+class LRUCache:
+    """Thread-safe in-process LRU."""
+
+    def __init__(self, maxsize=LRU_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class TranslationStore:
+    """Persistent translation cache in a SQLite file (WAL, safe across processes)."""
+
+    def __init__(self, path=CACHE_DB_PATH):
+        self.path = path
+        self.local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS translations ('
+                ' language TEXT NOT NULL, source_hash TEXT NOT NULL,'
+                ' source TEXT NOT NULL, translated TEXT NOT NULL, created_at TEXT NOT NULL,'
+                ' PRIMARY KEY (language, source_hash))'
+            )
+
+    def _connect(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = sqlite3.connect(self.path, timeout=10)
+        return conn
+
+    def get_many(self, texts, target_language):
+        """{text: translation} for the texts already stored."""
+        by_hash = {_source_hash(text): text for text in texts}
+        found = {}
+        hashes = list(by_hash)
+        conn = self._connect()
+        for i in range(0, len(hashes), 500):      # stay under SQLite's variable limit
+            chunk = hashes[i:i + 500]
+            rows = conn.execute(
+                f"SELECT source_hash, translated FROM translations WHERE language = ? "
+                f"AND source_hash IN ({','.join('?' * len(chunk))})",
+                [target_language, *chunk]
+            ).fetchall()
+            found.update((by_hash[source_hash], translated) for source_hash, translated in rows)
+        return found
+
+    def put_many(self, translations, target_language):
+        now = datetime.utcnow().isoformat()
+        with self._connect() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?)',
+                [(target_language, _source_hash(text), text, translated, now)
+                 for text, translated in translations.items()]
+            )
+
+
+# ==================== TRANSLATOR ====================
+
+class Translator:
+    """LRU -> shared store -> one batched API call for whatever is left."""
+
+    def __init__(self, backend=google_backend, store=None, lru_size=LRU_SIZE, api_batch_size=API_BATCH_SIZE):
+        self.backend = backend
+        self._store = store
+        self.lru = LRUCache(lru_size)
+        self.api_batch_size = api_batch_size
+        self.api_calls = 0
+
+    @property
+    def store(self):
+        # Opened on first use so importing the module never touches the disk
+        if self._store is None:
+            self._store = TranslationStore()
+        return self._store
+
+    def translate(self, text, target_language='en'):
+        return self.translate_batch([text], target_language)[0]
+
+    def translate_batch(self, texts, target_language='en'):
+        """Translate a list of strings, keeping order. Untranslatable ones come back as-is."""
+        if target_language == 'en' or target_language not in LANG_CODES:
+            return list(texts)
+
+        results = {}
+        missing = []
+        for text in dict.fromkeys(t for t in texts if t):
+            cached = self.lru.get((target_language, text))
+            if cached is None:
+                missing.append(text)
+            else:
+                results[text] = cached
+
+        if missing:
+            stored = self.store.get_many(missing, target_language)
+            for text, translated in stored.items():
+                self.lru.put((target_language, text), translated)
+            results.update(stored)
+            missing = [text for text in missing if text not in stored]
+
+        if missing:
+            results.update(self._fetch(missing, target_language))
+
+        return [results.get(text, text) if text else text for text in texts]
+
+    def _fetch(self, texts, target_language):
+        fetched = {}
+        for i in range(0, len(texts), self.api_batch_size):
+            chunk = texts[i:i + self.api_batch_size]
+            try:
+                translated = self.backend(chunk, target_language)
+            except Exception as e:
+                print(f"Translation error for {len(chunk)} strings to {target_language}: {e}")
+                continue
+            if translated is None:
+                continue
+            self.api_calls += 1
+            fetched.update(zip(chunk, translated))
+
+        if fetched:
+            self.store.put_many(fetched, target_language)
+            for text, value in fetched.items():
+                self.lru.put((target_language, text), value)
+        return fetched
+
+
+translator = Translator()
+
 
-@lru_cache(maxsize=1000)
 def translate_text(text, target_language='en'):
     """
     Translate text to target language using Google Translate
-    
+
     Args:
         text (str): Text to translate
         target_language (str): Target language code (en, hi, mr, gu)
-    
+
     Returns:
         str: Translated text or original if translation fails
     """
     if not text or target_language == 'en':
         return text
-    
-    if target_language not in LANG_CODES:
-        return text
-    
-    try:
-        if translate_client:
-            # Use Google Cloud Translate API
-            result = translate_client.translate_text(
-                text,
-                target_language=LANG_CODES[target_language]
-            )
-            return result['translatedText']
-        else:
-            # Fallback: return original text
-            # In production, you should set up Google Cloud credentials
-            return text
-    except Exception as e:
-        print(f"Translation error for '{text}' to {target_language}: {e}")
-        return text
+    return translator.translate(text, target_language)
+
+
+def translate_texts(texts, target_language='en'):
+    """Translate many strings with at most one API request per API_BATCH_SIZE misses."""
+    return translator.translate_batch(texts, target_language)
 
 
 def get_supported_languages():